@@ -18,11 +18,28 @@ Kullanım:
     
     # Environment variables ile
     # EPIAS_USERNAME ve EPIAS_PASSWORD set edilmişse otomatik kullanılır
+
+Çağrı hattı (EpiasClient._call):
+    disk yanıt önbelleği → host hız sınırı → sınırlı thread havuzu (eptr2
+    bloklayıcı) → jitter'lı üstel geri çekilme ile yeniden deneme
+- Önbellek anahtarı (endpoint, start_date, end_date). Kesinleşmiş dönemler
+  (bitişinden EPIAS_CACHE_FINAL_AFTER_DAYS gün geçmiş) süresiz geçerlidir;
+  açık dönemler EPIAS_CACHE_OPEN_TTL_SECONDS sonra yeniden çekilir.
+- Aynı kimlik bilgileriyle oluşturulan istemciler tek EPTR2 oturumunu
+  paylaşır (get_shared_epias_client).
 """
 
+import asyncio
+import hashlib
+import json
 import logging
 import os
-from datetime import datetime, timedelta
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
 from typing import Optional, Dict, Any, List
 from dataclasses import dataclass
 
@@ -33,6 +50,10 @@ logger = logging.getLogger(__name__)
 # CONFIGURATION
 # ═══════════════════════════════════════════════════════════════════════════════
 
+# Tüm eptr2 çağrılarının gittiği host (hız sınırı anahtarı)
+EPIAS_HOST = "seffaflik.epias.com.tr"
+
+
 @dataclass
 class EpiasConfig:
     """EPİAŞ API yapılandırması"""
@@ -40,6 +61,12 @@ class EpiasConfig:
     password: Optional[str] = None
     timeout_seconds: int = 30
     max_retries: int = 3
+    max_concurrency: Optional[int] = None          # Eşzamanlı eptr2 çağrısı
+    rate_limit_per_second: Optional[float] = None  # Host başına istek/sn (0 = sınırsız)
+    retry_base_delay_seconds: float = 0.5
+    cache_dir: Optional[str] = None                # "" → disk önbelleği kapalı
+    cache_open_ttl_seconds: Optional[int] = None
+    cache_final_after_days: Optional[int] = None
     
     def __post_init__(self):
         # Environment variables'dan al
@@ -47,6 +74,19 @@ class EpiasConfig:
             self.username = os.getenv("EPIAS_USERNAME")
         if not self.password:
             self.password = os.getenv("EPIAS_PASSWORD")
+        if self.max_concurrency is None:
+            self.max_concurrency = int(os.getenv("EPIAS_MAX_CONCURRENCY", "4"))
+        if self.rate_limit_per_second is None:
+            self.rate_limit_per_second = float(os.getenv("EPIAS_RATE_LIMIT_RPS", "4"))
+        if self.cache_dir is None:
+            self.cache_dir = os.getenv(
+                "EPIAS_CACHE_DIR",
+                os.path.join(tempfile.gettempdir(), "epias_response_cache"),
+            )
+        if self.cache_open_ttl_seconds is None:
+            self.cache_open_ttl_seconds = int(os.getenv("EPIAS_CACHE_OPEN_TTL_SECONDS", "3600"))
+        if self.cache_final_after_days is None:
+            self.cache_final_after_days = int(os.getenv("EPIAS_CACHE_FINAL_AFTER_DAYS", "60"))
 
 
 @dataclass
@@ -103,6 +143,121 @@ class EpiasAuthError(EpiasApiError):
     pass
 
 
+# ═══════════════════════════════════════════════════════════════════════════════
+# HIZ SINIRI, THREAD HAVUZU, YANIT ÖNBELLEĞİ
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class HostRateLimiter:
+    """Host başına istek aralığı sınırı.
+
+    Her istek bir sonraki boş slotu ayırır ve o ana kadar bekler. Durum
+    threading.Lock ile korunur → farklı event loop'lardan (ör. fallback'in
+    thread içi loop'u) gelen çağrılar da aynı sınırı paylaşır.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._next_slot: Dict[str, float] = {}
+    
+    def reserve(self, host: str, rate_per_second: float) -> float:
+        """Slot ayır; beklenmesi gereken süreyi (sn) döndür."""
+        if not rate_per_second or rate_per_second <= 0:
+            return 0.0
+        interval = 1.0 / rate_per_second
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + interval
+            return slot - now
+    
+    async def acquire(self, host: str, rate_per_second: float) -> None:
+        delay = self.reserve(host, rate_per_second)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+_rate_limiter = HostRateLimiter()
+
+# Bloklayıcı eptr2 çağrıları için paylaşılan havuz (varsayılan executor yerine)
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_workers = 0
+_executor_lock = threading.Lock()
+
+
+def _get_executor(max_workers: int) -> ThreadPoolExecutor:
+    """eptr2 havuzu — daha büyük max_workers istenirse yeniden kurulur."""
+    global _executor, _executor_workers
+    with _executor_lock:
+        if _executor is None or max_workers > _executor_workers:
+            old = _executor
+            _executor = ThreadPoolExecutor(
+                max_workers=max(1, max_workers), thread_name_prefix="epias",
+            )
+            _executor_workers = max(1, max_workers)
+            if old is not None:
+                old.shutdown(wait=False)
+        return _executor
+
+
+class EpiasResponseCache:
+    """eptr2 yanıtlarının disk önbelleği — anahtar (endpoint, start, end).
+
+    Kayıtlar JSON olarak {cache_dir}/{endpoint}/{start}_{end}.json dosyasına
+    atomik yazılır (geçici dosya + os.replace). Bitiş tarihinden
+    final_after_days gün geçmiş aralıklar kesinleşmiş sayılır ve süresiz
+    geçerlidir; açık aralıklar open_ttl_seconds sonra bayatlar.
+    """
+    
+    def __init__(self, directory: str, open_ttl_seconds: int = 3600, final_after_days: int = 60):
+        self.directory = directory
+        self.open_ttl_seconds = open_ttl_seconds
+        self.final_after_days = final_after_days
+    
+    @classmethod
+    def from_config(cls, config: EpiasConfig) -> Optional["EpiasResponseCache"]:
+        if not config.cache_dir:
+            return None
+        return cls(config.cache_dir, config.cache_open_ttl_seconds, config.cache_final_after_days)
+    
+    def _path(self, endpoint: str, start_date: str, end_date: str) -> str:
+        safe = "".join(c if c.isalnum() or c in "-_" else "_" for c in endpoint)
+        return os.path.join(self.directory, safe, f"{start_date}_{end_date}.json")
+    
+    def is_final(self, end_date: str, today: Optional[date] = None) -> bool:
+        """Aralık kesinleşmiş mi (EPİAŞ artık revize etmez)?"""
+        today = today or date.today()
+        return date.fromisoformat(end_date) + timedelta(days=self.final_after_days) < today
+    
+    def get(self, endpoint: str, start_date: str, end_date: str) -> Optional[List[Dict[str, Any]]]:
+        """Geçerli önbellek kaydı; yoksa/bayatsa None."""
+        path = self._path(endpoint, start_date, end_date)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not self.is_final(end_date):
+            if time.time() - entry.get("fetched_at", 0) > self.open_ttl_seconds:
+                return None
+        return entry.get("records")
+    
+    def put(self, endpoint: str, start_date: str, end_date: str, records: List[Dict[str, Any]]) -> None:
+        """Kaydı atomik yaz — yazılamazsa yalnızca uyarı (önbellek opsiyonel)."""
+        path = self._path(endpoint, start_date, end_date)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            payload = json.dumps(
+                {"fetched_at": time.time(), "records": records},
+                ensure_ascii=False, default=str,
+            )
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"EPİAŞ yanıt önbelleği yazılamadı ({path}): {e}")
+
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # EPİAŞ CLIENT (eptr2 tabanlı)
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -114,34 +269,96 @@ class EpiasClient:
     eptr2 kütüphanesini kullanır. Kimlik bilgileri gereklidir.
     """
     
-    def __init__(self, config: Optional[EpiasConfig] = None, username: str = None, password: str = None):
+    def __init__(
+        self,
+        config: Optional[EpiasConfig] = None,
+        username: str = None,
+        password: str = None,
+        cache: Optional[EpiasResponseCache] = None,
+    ):
         self.config = config or EpiasConfig(username=username, password=password)
+        self.cache = cache if cache is not None else EpiasResponseCache.from_config(self.config)
         self._eptr = None
+        self._eptr_lock = threading.Lock()
     
     def _get_eptr(self):
-        """eptr2 client'ı lazy initialize et"""
+        """eptr2 client'ı lazy initialize et (thread-safe, oturum yeniden kullanılır)"""
         if self._eptr is None:
+            with self._eptr_lock:
+                if self._eptr is None:
+                    try:
+                        from eptr2 import EPTR2
+                    except ImportError:
+                        raise EpiasApiError(
+                            "eptr2 kütüphanesi yüklü değil. "
+                            "Yüklemek için: pip install eptr2"
+                        )
+                    
+                    if not self.config.username or not self.config.password:
+                        raise EpiasAuthError(
+                            "EPİAŞ kimlik bilgileri gerekli. "
+                            "EPIAS_USERNAME ve EPIAS_PASSWORD environment variables'ları set edin "
+                            "veya EpiasClient(username='...', password='...') kullanın."
+                        )
+                    
+                    self._eptr = EPTR2(
+                        username=self.config.username,
+                        password=self.config.password
+                    )
+        
+        return self._eptr
+    
+    def _fetch_blocking(self, endpoint: str, start_date: str, end_date: str) -> List[Dict[str, Any]]:
+        """Tek eptr2 çağrısı (thread havuzunda çalışır)."""
+        eptr = self._get_eptr()
+        df = eptr.call(endpoint, start_date=start_date, end_date=end_date)
+        return df.to_dict('records') if hasattr(df, 'to_dict') else []
+    
+    async def _call(
+        self, endpoint: str, start_date: str, end_date: str, use_cache: bool = True,
+    ) -> List[Dict[str, Any]]:
+        """Önbellek → hız sınırı → havuz → jitter'lı yeniden deneme.
+        
+        Kimlik/kütüphane hataları (EpiasApiError) yeniden denenmez. Boş yanıt
+        önbelleğe yazılmaz (dönem henüz yayımlanmamış olabilir).
+        """
+        if use_cache and self.cache is not None:
+            cached = self.cache.get(endpoint, start_date, end_date)
+            if cached is not None:
+                logger.debug(f"EPİAŞ önbellek: {endpoint} {start_date}..{end_date}")
+                return cached
+        
+        loop = asyncio.get_running_loop()
+        executor = _get_executor(self.config.max_concurrency)
+        attempts = max(1, self.config.max_retries)
+        
+        for attempt in range(attempts):
+            await _rate_limiter.acquire(EPIAS_HOST, self.config.rate_limit_per_second)
             try:
-                from eptr2 import EPTR2
-            except ImportError:
-                raise EpiasApiError(
-                    "eptr2 kütüphanesi yüklü değil. "
-                    "Yüklemek için: pip install eptr2"
+                records = await asyncio.wait_for(
+                    loop.run_in_executor(
+                        executor, self._fetch_blocking, endpoint, start_date, end_date,
+                    ),
+                    timeout=self.config.timeout_seconds,
                 )
-            
-            if not self.config.username or not self.config.password:
-                raise EpiasAuthError(
-                    "EPİAŞ kimlik bilgileri gerekli. "
-                    "EPIAS_USERNAME ve EPIAS_PASSWORD environment variables'ları set edin "
-                    "veya EpiasClient(username='...', password='...') kullanın."
+                break
+            except EpiasApiError:
+                raise
+            except Exception as e:
+                if attempt == attempts - 1:
+                    raise EpiasApiError(
+                        f"EPİAŞ {endpoint} çağrısı {attempts} denemede başarısız: {e}"
+                    ) from e
+                delay = self.config.retry_base_delay_seconds * (2 ** attempt) * random.uniform(0.5, 1.5)
+                logger.warning(
+                    f"EPİAŞ {endpoint} hatası (deneme {attempt + 1}/{attempts}): {e} "
+                    f"— {delay:.2f}s sonra tekrar"
                 )
-            
-            self._eptr = EPTR2(
-                username=self.config.username,
-                password=self.config.password
-            )
+                await asyncio.sleep(delay)
         
-        return self._eptr
+        if records and self.cache is not None:
+            self.cache.put(endpoint, start_date, end_date, records)
+        return records
     
     def _get_period_dates(self, period: str) -> tuple[str, str]:
         """YYYY-MM formatından başlangıç ve bitiş tarihlerini hesapla."""
@@ -157,15 +374,11 @@ class EpiasClient:
     
     async def get_hourly_ptf(self, start_date: str, end_date: str) -> List[Dict[str, Any]]:
         """Saatlik PTF verilerini çek."""
-        import asyncio
-        
-        def _fetch():
-            eptr = self._get_eptr()
-            df = eptr.call("mcp", start_date=start_date, end_date=end_date)
-            return df.to_dict('records') if hasattr(df, 'to_dict') else []
-        
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, _fetch)
+        return await self._call("mcp", start_date, end_date)
+    
+    async def get_hourly_smf(self, start_date: str, end_date: str) -> List[Dict[str, Any]]:
+        """Saatlik SMF (sistem marjinal fiyatı) verilerini çek."""
+        return await self._call("smp", start_date, end_date)
     
     async def get_monthly_ptf_average(self, period: str) -> PtfData:
         """Belirli bir ay için PTF ortalamasını hesapla."""
@@ -202,23 +415,15 @@ class EpiasClient:
     
     async def get_yekdem_unit_price(self, period: str) -> YekdemData:
         """Belirli bir ay için YEKDEM birim bedelini çek."""
-        import asyncio
-        
         start_date, end_date = self._get_period_dates(period)
         
         logger.info(f"EPİAŞ YEKDEM verisi çekiliyor: {period}")
         
-        def _fetch():
-            eptr = self._get_eptr()
-            try:
-                df = eptr.call("renewables-support-amount", start_date=start_date, end_date=end_date)
-                return df.to_dict('records') if hasattr(df, 'to_dict') else []
-            except Exception as e:
-                logger.warning(f"YEKDEM call hatası: {e}")
-                return []
-        
-        loop = asyncio.get_event_loop()
-        items = await loop.run_in_executor(None, _fetch)
+        try:
+            items = await self._call("renewables-support-amount", start_date, end_date)
+        except Exception as e:
+            logger.warning(f"YEKDEM call hatası: {e}")
+            items = []
         
         if not items:
             raise EpiasDataNotFoundError(f"YEKDEM verisi bulunamadı: {period}")
@@ -246,17 +451,28 @@ class EpiasClient:
         ptf_data = None
         yekdem_data = None
         
-        try:
-            ptf_data = await self.get_monthly_ptf_average(period)
-        except (EpiasApiError, EpiasDataNotFoundError) as e:
-            warnings.append(f"PTF verisi alınamadı: {e}")
-            logger.error(f"PTF fetch failed for {period}: {e}")
+        # PTF ve YEKDEM aynı anda çekilir (hız sınırı ve havuz paylaşılır)
+        ptf_outcome, yekdem_outcome = await asyncio.gather(
+            self.get_monthly_ptf_average(period),
+            self.get_yekdem_unit_price(period),
+            return_exceptions=True,
+        )
         
-        try:
-            yekdem_data = await self.get_yekdem_unit_price(period)
-        except (EpiasApiError, EpiasDataNotFoundError) as e:
-            warnings.append(f"YEKDEM verisi alınamadı: {e}")
-            logger.error(f"YEKDEM fetch failed for {period}: {e}")
+        if isinstance(ptf_outcome, (EpiasApiError, EpiasDataNotFoundError)):
+            warnings.append(f"PTF verisi alınamadı: {ptf_outcome}")
+            logger.error(f"PTF fetch failed for {period}: {ptf_outcome}")
+        elif isinstance(ptf_outcome, BaseException):
+            raise ptf_outcome
+        else:
+            ptf_data = ptf_outcome
+        
+        if isinstance(yekdem_outcome, (EpiasApiError, EpiasDataNotFoundError)):
+            warnings.append(f"YEKDEM verisi alınamadı: {yekdem_outcome}")
+            logger.error(f"YEKDEM fetch failed for {period}: {yekdem_outcome}")
+        elif isinstance(yekdem_outcome, BaseException):
+            raise yekdem_outcome
+        else:
+            yekdem_data = yekdem_outcome
         
         return MarketPricesResult(
             period=period,
@@ -309,6 +525,39 @@ class MockEpiasClient:
         "2026-01": 368.0, "2026-02": 370.0, "2026-03": 372.0,
     }
     
+    # Saatlik mock seri için gün içi şekil (aylık ortalamaya göre oran)
+    HOURLY_SHAPE = (
+        0.82, 0.78, 0.75, 0.74, 0.75, 0.80, 0.90, 1.00,
+        1.06, 1.08, 1.07, 1.05, 1.02, 1.03, 1.05, 1.07,
+        1.12, 1.22, 1.28, 1.24, 1.15, 1.05, 0.96, 0.88,
+    )
+    
+    def _hourly_series(
+        self, start_date: str, end_date: str, key: str, factor: float,
+    ) -> List[Dict[str, Any]]:
+        """eptr2 kayıt biçiminde (date, hour, key) saatlik seri üret."""
+        day = datetime.strptime(start_date, "%Y-%m-%d")
+        last = datetime.strptime(end_date, "%Y-%m-%d")
+        items = []
+        while day <= last:
+            base = self.SAMPLE_PTF.get(day.strftime("%Y-%m"), 2900.0)
+            for hour, shape in enumerate(self.HOURLY_SHAPE):
+                items.append({
+                    "date": f"{day:%Y-%m-%d}T{hour:02d}:00:00+03:00",
+                    "hour": f"{hour:02d}:00",
+                    key: round(base * shape * factor, 2),
+                })
+            day += timedelta(days=1)
+        return items
+    
+    async def get_hourly_ptf(self, start_date: str, end_date: str) -> List[Dict[str, Any]]:
+        """Mock saatlik PTF"""
+        return self._hourly_series(start_date, end_date, "price", 1.0)
+    
+    async def get_hourly_smf(self, start_date: str, end_date: str) -> List[Dict[str, Any]]:
+        """Mock saatlik SMF (PTF'nin %3 üstü)"""
+        return self._hourly_series(start_date, end_date, "systemMarginalPrice", 1.03)
+    
     async def get_monthly_ptf_average(self, period: str) -> PtfData:
         """Mock PTF verisi döndür"""
         ptf = self.SAMPLE_PTF.get(period, 2900.0)
@@ -350,6 +599,30 @@ class MockEpiasClient:
 # CONVENIENCE FUNCTIONS
 # ═══════════════════════════════════════════════════════════════════════════════
 
+_shared_clients: Dict[str, EpiasClient] = {}
+_shared_clients_lock = threading.Lock()
+
+
+def get_shared_epias_client(username: str = None, password: str = None) -> EpiasClient:
+    """Kimlik bilgisi başına tek EpiasClient — EPTR2 oturumu (login) yeniden kullanılır."""
+    config = EpiasConfig(username=username, password=password)
+    key = hashlib.sha256(
+        f"{config.username}\0{config.password}".encode("utf-8")
+    ).hexdigest()
+    with _shared_clients_lock:
+        client = _shared_clients.get(key)
+        if client is None:
+            client = EpiasClient(config=config)
+            _shared_clients[key] = client
+        return client
+
+
+def reset_shared_epias_clients() -> None:
+    """Paylaşılan istemcileri unut (test / kimlik bilgisi değişimi)."""
+    with _shared_clients_lock:
+        _shared_clients.clear()
+
+
 async def fetch_market_prices_from_epias(
     period: str,
     username: str = None,
@@ -371,7 +644,7 @@ async def fetch_market_prices_from_epias(
     if use_mock:
         client = MockEpiasClient()
     else:
-        client = EpiasClient(username=username, password=password)
+        client = get_shared_epias_client(username=username, password=password)
     
     return await client.get_market_prices(period)
 
@@ -387,7 +660,7 @@ async def fetch_ptf_from_epias(
         if use_mock:
             client = MockEpiasClient()
         else:
-            client = EpiasClient(username=username, password=password)
+            client = get_shared_epias_client(username=username, password=password)
         
         ptf_data = await client.get_monthly_ptf_average(period)
         return ptf_data.average_tl_per_mwh
@@ -407,7 +680,7 @@ async def fetch_yekdem_from_epias(
         if use_mock:
             client = MockEpiasClient()
         else:
-            client = EpiasClient(username=username, password=password)
+            client = get_shared_epias_client(username=username, password=password)
         
         yekdem_data = await client.get_yekdem_unit_price(period)
         return yekdem_data.unit_cost_tl_per_mwh
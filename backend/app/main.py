@@ -338,6 +338,21 @@ async def startup_event():
     except Exception as e:
         logger.warning(f"Pricing profil şablonu seed hatası (kritik değil): {e}")
 
+    # Pricing Risk Engine: süresi dolmuş analiz cache kayıtları için TTL süpürücüsü
+    try:
+        from .pricing.pricing_cache import start_cache_sweeper
+        from .database import SessionLocal
+        start_cache_sweeper(SessionLocal)
+    except Exception as e:
+        logger.warning(f"Pricing cache süpürücüsü başlatılamadı (kritik değil): {e}")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # PDF: havuzdaki sıcak Chromium tarayıcılarını kapat
+    from .services.pdf_browser_pool import shutdown_browser_pool
+    shutdown_browser_pool()
+
 
 def _add_sample_market_prices():
     """
@@ -4816,7 +4831,7 @@ async def get_prices_with_epias_fallback(
         OFFER_USE_REAL_CONSUMPTION,
     )
 
-    prices, source_desc = get_market_prices_with_epias_fallback(db, period, auto_fetch)
+    prices, source_desc = await get_market_prices_with_epias_fallback(db, period, auto_fetch)
 
     # SoT-X Seviye 1: profil-ağırlıklı PTF (hourly) — calculator ile parite.
     # Profil sırası: explicit profile → tariff_group default → puant_agir fail-safe.
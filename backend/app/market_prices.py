@@ -11,15 +11,17 @@ Kullanım:
 - get_latest_market_prices() → En güncel dönem
 - upsert_market_prices(period, ptf, yekdem) → Admin güncelleme
 - fetch_and_cache_from_epias(period) → EPİAŞ'tan çek ve cache'le
+- await get_market_prices_with_epias_fallback(period) → DB → EPİAŞ (singleflight) → default
 """
 
 import logging
 import asyncio
 import os
+import time
 from datetime import datetime, timezone
 from typing import Optional, Tuple
 from dataclasses import dataclass
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, sessionmaker
 
 logger = logging.getLogger(__name__)
 
@@ -81,18 +83,18 @@ def _zone_weighted_avg_ptf(records: list[tuple[int, float]], profile: str) -> Op
 def weighted_ptf_for_profile(db: Session, period: str, profile: str = "puant_agir") -> WeightedPtfResult:
     """hourly_market_prices (period + is_active==1) → profil-ağırlıklı PTF.
 
+    Zon toplamları dönem PTF özetinden (ptf_aggregates) okunur (saat döngüsü yok);
+    sonuç _zone_weighted_avg_ptf ile aynı formül.
     Hourly veri yoksa ptf_tl_per_mwh=None (caller fallback/fail-closed'a karar verir).
     """
-    from .pricing.schemas import HourlyMarketPrice
-    rows = (
-        db.query(HourlyMarketPrice.hour, HourlyMarketPrice.ptf_tl_per_mwh)
-        .filter(HourlyMarketPrice.period == period, HourlyMarketPrice.is_active == 1)
-        .all()
-    )
-    records = [(int(h), float(p)) for h, p in rows]
+    from .pricing.ptf_aggregates import get_ptf_aggregate
+    agg = get_ptf_aggregate(db, period)
+    if agg is None:
+        return WeightedPtfResult(ptf_tl_per_mwh=None, hours=0, profile=profile)
+    weights = PROFILE_WEIGHTS.get(profile, PROFILE_WEIGHTS["puant_agir"])
     return WeightedPtfResult(
-        ptf_tl_per_mwh=_zone_weighted_avg_ptf(records, profile),
-        hours=len(records),
+        ptf_tl_per_mwh=agg.weighted_ptf(weights),
+        hours=agg.hours,
         profile=profile,
     )
 
@@ -107,46 +109,19 @@ def consumption_weighted_ptf(db: Session, period: str, customer_id: str) -> Opti
     Aktif ConsumptionProfile yok / eşleşen saat yok / toplam kWh=0 → None
     (caller mevcut profil-proxy'ye düşer; fail-safe korunur).
     """
-    from .pricing.schemas import HourlyMarketPrice, ConsumptionProfile, ConsumptionHourlyData
-    from .pricing.excel_parser import ParsedMarketRecord, ParsedConsumptionRecord
+    from .pricing.consumption_store import get_active_profile, load_profile_records
+    from .pricing.market_store import get_market_segment
     from .pricing.pricing_engine import calculate_weighted_prices
 
-    profile = (
-        db.query(ConsumptionProfile)
-        .filter(
-            ConsumptionProfile.customer_id == customer_id,
-            ConsumptionProfile.period == period,
-            ConsumptionProfile.is_active == 1,
-        )
-        .first()
-    )
+    profile = get_active_profile(db, customer_id, period)
     if not profile:
         return None
 
-    cons_rows = (
-        db.query(ConsumptionHourlyData.date, ConsumptionHourlyData.hour,
-                 ConsumptionHourlyData.consumption_kwh)
-        .filter(ConsumptionHourlyData.profile_id == profile.id)
-        .all()
-    )
-    if not cons_rows:
+    consumption_records = load_profile_records(db, profile)
+    if not consumption_records:
         return None
 
-    mkt_rows = (
-        db.query(HourlyMarketPrice.date, HourlyMarketPrice.hour,
-                 HourlyMarketPrice.ptf_tl_per_mwh, HourlyMarketPrice.smf_tl_per_mwh)
-        .filter(HourlyMarketPrice.period == period, HourlyMarketPrice.is_active == 1)
-        .all()
-    )
-    market_records = [
-        ParsedMarketRecord(period=period, date=d, hour=int(h),
-                           ptf_tl_per_mwh=float(p), smf_tl_per_mwh=float(s or 0))
-        for d, h, p, s in mkt_rows
-    ]
-    consumption_records = [
-        ParsedConsumptionRecord(date=d, hour=int(h), consumption_kwh=float(k))
-        for d, h, k in cons_rows
-    ]
+    market_records = get_market_segment(db, period).to_records()
     try:
         result = calculate_weighted_prices(market_records, consumption_records)
     except ValueError:
@@ -316,6 +291,7 @@ def upsert_market_prices(
     captured_at: Optional[datetime] = None,
     change_reason: Optional[str] = None,
     source: Optional[str] = None,
+    commit: bool = True,
 ) -> Tuple[bool, str]:
     """
     Piyasa fiyatlarını ekle veya güncelle.
@@ -339,6 +315,7 @@ def upsert_market_prices(
         captured_at: Verinin alındığı tarih (default: now UTC)
         change_reason: Değişiklik nedeni (audit)
         source: Kaynak (epias_manual/epias_api/migration/seed)
+        commit: False ise yalnızca flush — çağıranın işlemine katılır
     
     Returns:
         (success, message)
@@ -378,7 +355,10 @@ def upsert_market_prices(
         if source is not None:
             existing.source = source
         
-        db.commit()
+        if commit:
+            db.commit()
+        else:
+            db.flush()
         logger.info(f"Piyasa fiyatları güncellendi: {period} PTF={ptf_tl_per_mwh}, YEKDEM={yekdem_tl_per_mwh}")
         return (True, f"Dönem {period} güncellendi")
     else:
@@ -401,7 +381,10 @@ def upsert_market_prices(
             source=effective_source,
         )
         db.add(new_record)
-        db.commit()
+        if commit:
+            db.commit()
+        else:
+            db.flush()
         logger.info(f"Piyasa fiyatları eklendi: {period} PTF={ptf_tl_per_mwh}, YEKDEM={yekdem_tl_per_mwh}")
         return (True, f"Dönem {period} eklendi")
 
@@ -581,7 +564,24 @@ async def fetch_and_cache_from_epias(
     # EPİAŞ'tan çek (veya mock kullan)
     try:
         result = await fetch_market_prices_from_epias(period, use_mock=use_mock)
-        
+    except EpiasAuthError as e:
+        logger.error(f"EPİAŞ kimlik doğrulama hatası: {e}")
+        return (False, None, f"EPİAŞ kimlik doğrulama hatası: {str(e)}")
+    except Exception as e:
+        logger.error(f"EPİAŞ fetch hatası: {e}")
+        return (False, None, f"EPİAŞ API hatası: {str(e)}")
+    
+    return _persist_epias_result(db, period, result, use_mock)
+
+
+def _persist_epias_result(
+    db: Session,
+    period: str,
+    result,
+    use_mock: bool = False,
+) -> Tuple[bool, MarketPrices, str]:
+    """EPİAŞ sonucunu (MarketPricesResult) DB'ye yaz — ağ çağrısı yapmaz."""
+    try:
         if result.ptf_tl_per_mwh is None:
             return (False, None, f"EPİAŞ'tan PTF verisi alınamadı: {', '.join(result.warnings)}")
         
@@ -613,62 +613,142 @@ async def fetch_and_cache_from_epias(
         source_str = "Mock veriden" if use_mock else "EPİAŞ'tan"
         return (True, prices, f"{source_str} alındı ve cache'lendi{warnings_str}")
         
-    except EpiasAuthError as e:
-        logger.error(f"EPİAŞ kimlik doğrulama hatası: {e}")
-        return (False, None, f"EPİAŞ kimlik doğrulama hatası: {str(e)}")
     except Exception as e:
         logger.error(f"EPİAŞ fetch hatası: {e}")
         return (False, None, f"EPİAŞ API hatası: {str(e)}")
 
 
-def get_market_prices_with_epias_fallback(
+# ─── Fallback singleflight ────────────────────────────────────────────────────
+# Aynı (period, price_type) için eşzamanlı fallback istekleri tek EPİAŞ
+# çağrısını ve tek DB yazımını paylaşır. EPİAŞ'ın henüz yayımlamadığı
+# dönemler kısa süre negatif önbellekte tutulur (her teklif yeniden
+# round-trip yapmasın).
+EPIAS_FALLBACK_NEGATIVE_TTL_SECONDS = float(os.getenv("EPIAS_FALLBACK_NEGATIVE_TTL_SECONDS", "120"))
+EPIAS_FALLBACK_TIMEOUT_SECONDS = float(os.getenv("EPIAS_FALLBACK_TIMEOUT_SECONDS", "30"))
+
+# key → (event loop, task); task başka loop'a aitse paylaşılmaz
+_fallback_inflight: dict[Tuple[str, str], Tuple[asyncio.AbstractEventLoop, "asyncio.Task"]] = {}
+# key → (monotonic bitiş, mesaj)
+_fallback_negative: dict[Tuple[str, str], Tuple[float, str]] = {}
+
+
+def clear_epias_fallback_state() -> None:
+    """Negatif önbelleği ve uçuştaki kayıtları temizle (test / manuel sync sonrası)."""
+    _fallback_negative.clear()
+    _fallback_inflight.clear()
+
+
+async def _run_fallback_flight(
+    session_factory,
+    period: str,
+    price_type: str,
+) -> Tuple[bool, Optional[MarketPrices], str]:
+    """Tek uçuş: kendi session'ı ile DB'yi yeniden kontrol et, yoksa EPİAŞ'tan çek ve yaz."""
+    key = (period, price_type)
+    db = session_factory()
+    try:
+        # Başka süreç/uçuş bu arada yazmış olabilir
+        existing = get_market_prices(db, period, price_type)
+        if existing:
+            outcome = (True, existing, "DB'den alındı (eşzamanlı yazım)")
+        else:
+            outcome = await fetch_and_cache_from_epias(db, period)
+    finally:
+        db.close()
+    
+    if outcome[0]:
+        _fallback_negative.pop(key, None)
+    else:
+        _fallback_negative[key] = (
+            time.monotonic() + EPIAS_FALLBACK_NEGATIVE_TTL_SECONDS, outcome[2],
+        )
+    return outcome
+
+
+async def fetch_from_epias_singleflight(
+    db: Session,
+    period: str,
+    price_type: str = "PTF",
+) -> Tuple[bool, Optional[MarketPrices], str]:
+    """
+    EPİAŞ fetch + DB yazımı — aynı (period, price_type) için tek uçuş.
+    
+    İlk çağıran bir task başlatır; eşzamanlı çağıranlar aynı task'ı bekler.
+    Task kendi session'ını açar (db ile aynı engine) ve shield edilir →
+    bekleyenlerden biri iptal olsa ya da zaman aşımına uğrasa da diğerleri
+    sonucu alır. Başarısız sonuç EPIAS_FALLBACK_NEGATIVE_TTL_SECONDS boyunca
+    tekrar denenmez.
+    
+    Returns:
+        (success, market_prices, message)
+    
+    Raises:
+        asyncio.TimeoutError: EPIAS_FALLBACK_TIMEOUT_SECONDS aşıldı (uçuş sürer)
+    """
+    key = (period, price_type)
+    
+    negative = _fallback_negative.get(key)
+    if negative is not None:
+        if negative[0] > time.monotonic():
+            return (False, None, f"Negatif önbellek: {negative[1]}")
+        _fallback_negative.pop(key, None)
+    
+    loop = asyncio.get_running_loop()
+    entry = _fallback_inflight.get(key)
+    if entry is not None and entry[0] is loop and not entry[1].done():
+        task = entry[1]
+    else:
+        task = loop.create_task(_run_fallback_flight(
+            sessionmaker(bind=db.get_bind()), period, price_type,
+        ))
+        _fallback_inflight[key] = (loop, task)
+        
+        def _forget(done: "asyncio.Task", key=key) -> None:
+            current = _fallback_inflight.get(key)
+            if current is not None and current[1] is done:
+                del _fallback_inflight[key]
+        
+        task.add_done_callback(_forget)
+    
+    return await asyncio.wait_for(asyncio.shield(task), timeout=EPIAS_FALLBACK_TIMEOUT_SECONDS)
+
+
+async def get_market_prices_with_epias_fallback(
     db: Session,
     period: str,
-    auto_fetch: bool = True
+    auto_fetch: bool = True,
+    price_type: str = "PTF",
 ) -> Tuple[MarketPrices, str]:
     """
     Piyasa fiyatlarını al - DB yoksa EPİAŞ'tan çek.
     
     Öncelik sırası:
     1. DB'deki kayıt
-    2. EPİAŞ API (auto_fetch=True ise)
+    2. EPİAŞ API (auto_fetch=True ise; yalnız PTF serisi) — singleflight
     3. Default değerler
     
     Args:
         db: Database session
         period: Dönem (YYYY-MM)
         auto_fetch: EPİAŞ'tan otomatik çek
+        price_type: Fiyat tipi (default: "PTF")
     
     Returns:
         (market_prices, source_description)
     """
     # 1. DB'de ara
-    prices = get_market_prices(db, period)
+    prices = get_market_prices(db, period, price_type)
     if prices:
         return (prices, f"DB ({prices.source})")
     
-    # 2. EPİAŞ'tan çek (sync wrapper - thread ile async çakışmasını önle)
-    if auto_fetch:
+    # 2. EPİAŞ'tan çek — eşzamanlı istekler tek uçuşu paylaşır
+    if auto_fetch and price_type == "PTF":
         try:
-            import concurrent.futures
-            
-            def _run_in_new_loop():
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                try:
-                    return loop.run_until_complete(
-                        fetch_and_cache_from_epias(db, period)
-                    )
-                finally:
-                    loop.close()
-            
-            with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
-                future = executor.submit(_run_in_new_loop)
-                success, epias_prices, msg = future.result(timeout=30)
-                if success and epias_prices:
-                    return (epias_prices, f"EPİAŞ API: {msg}")
+            success, epias_prices, msg = await fetch_from_epias_singleflight(db, period, price_type)
+            if success and epias_prices:
+                return (epias_prices, f"EPİAŞ API: {msg}")
         except Exception as e:
-            logger.warning(f"EPİAŞ auto-fetch başarısız: {e}")
+            logger.warning(f"EPİAŞ auto-fetch başarısız: {e!r}")
     
     # 3. Default
     logger.warning(f"Dönem {period} için piyasa fiyatı bulunamadı, default kullanılıyor")
@@ -678,35 +758,78 @@ def get_market_prices_with_epias_fallback(
             ptf_tl_per_mwh=DEFAULT_PTF_TL_PER_MWH,
             yekdem_tl_per_mwh=DEFAULT_YEKDEM_TL_PER_MWH,
             source="default",
-            is_locked=False
+            is_locked=False,
+            price_type=price_type,
         ),
         "Default (EPİAŞ ve DB'de bulunamadı)"
     )
 
 
+# Toplu sync'te aynı anda EPİAŞ'a giden dönem sayısı. İstek hızı ayrıca
+# epias_client'taki host hız sınırıyla (EPIAS_RATE_LIMIT_RPS) sınırlanır.
+EPIAS_SYNC_CONCURRENCY = int(os.getenv("EPIAS_SYNC_CONCURRENCY", "4"))
+
+
 async def sync_multiple_periods_from_epias(
     db: Session,
     periods: list[str],
-    force_refresh: bool = False
+    force_refresh: bool = False,
+    use_mock: bool = False,
+    max_concurrency: Optional[int] = None,
 ) -> dict[str, Tuple[bool, str]]:
     """
     Birden fazla dönem için EPİAŞ'tan veri çek.
     
+    Ağ çağrıları en fazla max_concurrency dönem paralel yürür; DB yazımı
+    tek session üzerinden, fetch'ler tamamlandıkça sırayla yapılır.
+    Kesinleşmiş dönemlerin yanıtları EPİAŞ disk önbelleğinden gelir →
+    tekrar sync'lerde yalnızca açık/değişen dönemler ağa çıkar.
+    
     Args:
         db: Database session
         periods: Dönem listesi (YYYY-MM)
-        force_refresh: Mevcut cache'i yoksay
+        force_refresh: Mevcut DB cache'ini yoksay
+        use_mock: True ise mock veri kullan
+        max_concurrency: Paralel dönem sayısı (None → EPIAS_SYNC_CONCURRENCY)
     
     Returns:
-        {period: (success, message)}
+        {period: (success, message)} — giriş sırasıyla
     """
-    results = {}
-    
-    for period in periods:
-        success, _, msg = await fetch_and_cache_from_epias(db, period, force_refresh)
+    from .epias_client import fetch_market_prices_from_epias, EpiasAuthError
+    
+    results: dict[str, Tuple[bool, str]] = {}
+    to_fetch: list[str] = []
+    
+    for period in dict.fromkeys(periods):
+        if not force_refresh:
+            existing = get_market_prices(db, period)
+            if existing and existing.source in ("epias", "mock"):
+                results[period] = (True, "Cache'den alındı")
+                continue
+        to_fetch.append(period)
+    
+    semaphore = asyncio.Semaphore(max(1, max_concurrency or EPIAS_SYNC_CONCURRENCY))
+    
+    async def _fetch(period: str):
+        async with semaphore:
+            try:
+                return period, await fetch_market_prices_from_epias(period, use_mock=use_mock), None
+            except EpiasAuthError as e:
+                logger.error(f"EPİAŞ kimlik doğrulama hatası: {e}")
+                return period, None, f"EPİAŞ kimlik doğrulama hatası: {str(e)}"
+            except Exception as e:
+                logger.error(f"EPİAŞ fetch hatası ({period}): {e}")
+                return period, None, f"EPİAŞ API hatası: {str(e)}"
+    
+    for next_done in asyncio.as_completed([_fetch(p) for p in to_fetch]):
+        period, result, error = await next_done
+        if error is not None:
+            results[period] = (False, error)
+            continue
+        success, _, msg = _persist_epias_result(db, period, result, use_mock)
         results[period] = (success, msg)
     
-    return results
+    return {period: results[period] for period in dict.fromkeys(periods)}
 
 
 def get_periods_needing_sync(db: Session, months_back: int = 12) -> list[str]:
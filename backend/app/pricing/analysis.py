@@ -0,0 +1,517 @@
+"""
+Pricing Risk Engine — Tek Dönem Analiz Hesaplaması.
+
+/pricing/analyze'ın DB'siz saf hesaplama çekirdeği: piyasa ve tüketim
+kayıtları ile YEKDEM verildiğinde AnalyzeResponse üretir. Veri yükleme,
+cache ve HTTP hata eşlemesi router'da kalır; böylece aynı hesaplama
+/pricing/analyze-batch tarafından süreç havuzunda da çalıştırılabilir
+(bkz. portfolio.py).
+
+Hesap iki aşamalıdır: prepare_analysis teklif parametrelerinden bağımsız
+yeterli istatistikleri (ağırlıklı toplamlar, dilim toplamları, saatlik baz
+maliyet) kurar; finish_analysis katsayı / bayi / dengesizlik parametreleriyle
+sonucu üretir. Yalnızca parametre değişen tekrar analizde hazırlık
+önbellekten gelir (bkz. pricing_cache.get_prepared_analysis).
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+from ..distribution_tariffs import get_distribution_unit_price
+from .excel_parser import ParsedMarketRecord, ParsedConsumptionRecord
+from .imbalance import calculate_imbalance_cost
+from .margin_reality import calculate_hourly_margins, calculate_margin_reality
+from .models import (
+    AnalyzeResponse,
+    DataQualityReport,
+    DistributionInfo,
+    HourDetailMode,
+    HourlyCostColumns,
+    HourlyCostDetail,
+    HourlyCostEntry,
+    ImbalanceParams,
+    LossMapSummary,
+    PricingSummary,
+    RiskScoreResult,
+    SupplierCostSummary,
+    TimeZoneBreakdown,
+    WeightedPriceResult,
+)
+from .multiplier_simulator import calculate_safe_multiplier
+from .period_frame import ZONE_ORDER, build_period_frame, seq_sum
+from .pricing_engine import (
+    CostBasis,
+    build_cost_basis,
+    calculate_weighted_prices,
+    hourly_cost_columns,
+    summarize_cost_totals,
+)
+from .risk_calculator import (
+    calculate_risk_score,
+    check_risk_safe_multiplier_coherence,
+    generate_offer_warning,
+)
+from .time_zones import calculate_time_zone_breakdown
+
+logger = logging.getLogger(__name__)
+
+# hour_detail=page için varsayılan sayfa boyu (saat) — bir hafta
+PRICING_HOUR_PAGE_SIZE = int(os.getenv("PRICING_HOUR_PAGE_SIZE", "168"))
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Dağıtım Bedeli
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def calculate_distribution_info(
+    voltage_level: str,
+    total_kwh: float,
+    tariff_group: str = "sanayi",
+    term_type: str = "çift_terim",
+) -> DistributionInfo | None:
+    """Dağıtım bedeli hesapla — voltage_level (AG/OG) bazlı.
+
+    Mevcut distribution_tariffs.py modülündeki EPDK tarife tablosunu kullanır.
+    Varsayılan: Sanayi, Çift Terim (en yaygın senaryo).
+    """
+    vl = voltage_level.upper() if voltage_level else "OG"
+    if vl not in ("AG", "OG"):
+        vl = "OG"
+
+    lookup = get_distribution_unit_price(tariff_group, vl, term_type)
+    if not lookup.success or lookup.unit_price is None:
+        return None
+
+    total_tl = round(total_kwh * lookup.unit_price, 2)
+    return DistributionInfo(
+        voltage_level=vl,
+        unit_price_tl_per_kwh=lookup.unit_price,
+        total_kwh=round(total_kwh, 2),
+        total_tl=total_tl,
+        tariff_key=lookup.tariff_key,
+    )
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Parametreden Bağımsız Hazırlık (Yeterli İstatistikler)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+@dataclass
+class PreparedAnalysis:
+    """Teklif parametrelerinden (katsayı, bayi, dengesizlik) bağımsız aşama.
+
+    Σkwh, Σkwh·PTF, Σkwh·SMF (weighted), dilim toplamları (tz_breakdown) ve
+    saatlik baz maliyet dizileri (basis) bir kez hesaplanır; finish_analysis
+    yalnızca parametreye bağlı adımları çalıştırır. Nesne paylaşılır —
+    değiştirilmemelidir.
+    """
+    period: str
+    customer_id: Optional[str]
+    yekdem: float
+    warnings: list[dict]
+    basis: CostBasis
+    dist_info: DistributionInfo | None
+    tz_breakdown: dict[str, TimeZoneBreakdown]
+    risk: RiskScoreResult
+    # Marj gerçekliği girdileri (HourlyCostEntry ile aynı değerler)
+    hourly_kwh_rounded: list[float]
+    hourly_timestamps: list[str]
+    hourly_time_zones: list[str]
+
+    @property
+    def weighted(self) -> WeightedPriceResult:
+        return self.basis.weighted
+
+    @property
+    def dist_unit_price(self) -> float:
+        return self.dist_info.unit_price_tl_per_kwh if self.dist_info else 0.0
+
+
+def prepare_analysis(
+    period: str,
+    customer_id: Optional[str],
+    market_records: list[ParsedMarketRecord],
+    consumption_records: list[ParsedConsumptionRecord],
+    yekdem: float,
+    voltage_level: Optional[str] = "og",
+    warnings: Optional[list[dict]] = None,
+) -> PreparedAnalysis:
+    """Adım 4–6 ve 9: ağırlıklı fiyat, maliyet tabanı, dilim dağılımı, risk.
+
+    Raises:
+        ValueError: Toplam tüketim sıfır, eşleşen saat yok vb.
+    """
+    # 4. Ağırlıklı fiyat hesapla — sütunsal çerçeve bir kez kurulur, 4–6 paylaşır
+    frame = build_period_frame(market_records, consumption_records)
+    weighted = calculate_weighted_prices(market_records, consumption_records, frame=frame)
+
+    # 5. Dağıtım bedeli + katsayıdan bağımsız saatlik maliyet tabanı
+    dist_info = calculate_distribution_info(
+        voltage_level=voltage_level or "og",
+        total_kwh=weighted.total_consumption_kwh,
+    )
+    basis = build_cost_basis(frame, yekdem, weighted=weighted)
+
+    # 6. Zaman dilimi dağılımı
+    tz_breakdown = calculate_time_zone_breakdown(
+        market_records, consumption_records, yekdem, frame=frame,
+    )
+
+    # 9. Risk skoru
+    risk = calculate_risk_score(weighted, tz_breakdown)
+
+    return PreparedAnalysis(
+        period=period,
+        customer_id=customer_id,
+        yekdem=yekdem,
+        warnings=list(warnings or []),
+        basis=basis,
+        dist_info=dist_info,
+        tz_breakdown=tz_breakdown,
+        risk=risk,
+        hourly_kwh_rounded=[round(k, 4) for k in frame.kwh.tolist()],
+        hourly_timestamps=[
+            f"{d} {h:02d}:00" for d, h in zip(frame.dates, frame.hours.tolist())
+        ],
+        hourly_time_zones=[ZONE_ORDER[z].value for z in frame.zone.tolist()],
+    )
+
+
+def _build_loss_map(
+    prepared: PreparedAnalysis,
+    sales_price: np.ndarray,
+    margin: np.ndarray,
+) -> LossMapSummary:
+    """Zarar haritası — calculate_hourly_costs saat kayıtları ile aynı sonuç.
+
+    Zarar saati yuvarlanmamış marj < 0; sıralama ve toplam yuvarlanmış
+    marj (round(m, 2)) üzerinden, eşitlikte saat sırası korunur.
+    """
+    frame = prepared.basis.frame
+    loss_idx = np.flatnonzero(margin < 0).tolist()
+    loss_margin = [round(m, 2) for m in margin[loss_idx].tolist()]
+
+    loss_by_tz: dict[str, int] = {"T1": 0, "T2": 0, "T3": 0}
+    for z in frame.zone[loss_idx].tolist():
+        loss_by_tz[ZONE_ORDER[z].value] += 1
+
+    worst = sorted(range(len(loss_idx)), key=lambda j: loss_margin[j])[:10]
+    return LossMapSummary(
+        total_loss_hours=len(loss_idx),
+        total_loss_tl=round(sum(loss_margin), 2),
+        by_time_zone=loss_by_tz,
+        worst_hours=[
+            {
+                "date": frame.dates[loss_idx[j]],
+                "hour": int(frame.hours[loss_idx[j]]),
+                "ptf": float(frame.ptf[loss_idx[j]]),
+                "sales_price": round(float(sales_price[loss_idx[j]]), 2),
+                "loss_tl": loss_margin[j],
+            }
+            for j in worst
+        ],
+    )
+
+
+def finish_analysis(
+    prepared: PreparedAnalysis,
+    multiplier: float,
+    imbalance_params: ImbalanceParams,
+    dealer_commission_pct: float = 0.0,
+    hourly_margins: bool = True,
+) -> AnalyzeResponse:
+    """Adım 7–14 — yalnızca teklif parametrelerine bağlı kısım.
+
+    Saatlik maliyet kayıtları üretilmez; toplamlar ve zarar haritası maliyet
+    tabanı dizilerinden calculate_hourly_costs ile aynı işlem sırasıyla
+    türetilir (bit-for-bit aynı sonuç). hourly_margins=False ise marj
+    gerçekliğinin saatlik histogram dizisi (hourly_margins_tl) boş bırakılır —
+    /analyze özet yanıtı ve önbellek satırı saat sayısıyla büyümez.
+    """
+    warnings = list(prepared.warnings)
+    basis = prepared.basis
+    weighted = prepared.weighted
+    yekdem = prepared.yekdem
+    dist_unit_price = prepared.dist_unit_price
+
+    # 5'. Saatlik satış/marj — kWh × (Ağırlıklı_PTF + YEKDEM) × Katsayı / 1000
+    sales_price = basis.kwh_energy * multiplier / 1000.0
+    margin = sales_price - basis.base_cost
+    totals = summarize_cost_totals(
+        basis, seq_sum(sales_price), imbalance_params,
+        dealer_commission_pct=dealer_commission_pct,
+        distribution_unit_price_tl_per_kwh=dist_unit_price,
+    )
+
+    # 7. Dengesizlik maliyeti (TL/MWh)
+    imbalance_cost = calculate_imbalance_cost(
+        weighted.weighted_ptf_tl_per_mwh,
+        weighted.weighted_smf_tl_per_mwh,
+        imbalance_params,
+    )
+
+    # 8. Güvenli katsayı
+    safe_result = calculate_safe_multiplier(
+        [],
+        yekdem_tl_per_mwh=yekdem,
+        imbalance_params=imbalance_params,
+        dealer_commission_pct=dealer_commission_pct,
+        bases=[basis],
+    )
+
+    # 9. Risk skoru (hazırlıkta hesaplandı)
+    risk = prepared.risk.model_copy(deep=True)
+
+    # 10. Zarar haritası
+    loss_map = _build_loss_map(prepared, sales_price, margin)
+
+    # 11. Uyarılar (veri yükleme uyarılarına eklenir)
+    offer_warning = generate_offer_warning(
+        multiplier, safe_result.safe_multiplier,
+        safe_result.recommended_multiplier, risk.score,
+    )
+    if offer_warning:
+        warnings.append({"type": "safe_multiplier_warning", "message": offer_warning})
+
+    coherence = check_risk_safe_multiplier_coherence(
+        risk.score, safe_result.safe_multiplier,
+    )
+    if coherence:
+        warnings.append({"type": "coherence_warning", "message": coherence})
+
+    # 12. Tedarikçi maliyet özeti
+    energy_cost = weighted.weighted_ptf_tl_per_mwh + yekdem
+    supplier_cost = SupplierCostSummary(
+        weighted_ptf_tl_per_mwh=weighted.weighted_ptf_tl_per_mwh,
+        yekdem_tl_per_mwh=yekdem,
+        imbalance_tl_per_mwh=round(imbalance_cost, 2),
+        total_cost_tl_per_mwh=round(
+            weighted.weighted_ptf_tl_per_mwh + yekdem + imbalance_cost, 2
+        ),
+    )
+
+    # 13. Fiyatlama özeti — dual price, dual margin, risk flags
+    total_consumption = weighted.total_consumption_kwh
+    dist_per_mwh = dist_unit_price * 1000  # TL/kWh → TL/MWh
+
+    sales_energy_price_per_mwh = round(energy_cost * multiplier, 2)
+    sales_effective_price_per_mwh = round(sales_energy_price_per_mwh + dist_per_mwh, 2)
+
+    gross_margin_energy_per_mwh = round(sales_energy_price_per_mwh - energy_cost, 2)
+    gross_margin_total_per_mwh = round(sales_energy_price_per_mwh - energy_cost - dist_per_mwh, 2)
+
+    dealer_per_mwh = round(
+        totals["dealer_commission_total_tl"] / (total_consumption / 1000.0), 2
+    ) if total_consumption > 0 else 0.0
+    imbalance_per_mwh = round(
+        totals["imbalance_cost_total_tl"] / (total_consumption / 1000.0), 2
+    ) if total_consumption > 0 else 0.0
+
+    net_margin_per_mwh = round(
+        gross_margin_total_per_mwh - dealer_per_mwh - imbalance_per_mwh, 2
+    )
+
+    # Risk flags (priority ordered: P1 > P2, both can coexist)
+    risk_flags: list[dict] = []
+    if totals["net_margin_total_tl"] < 0:
+        risk_flags.append({
+            "type": "LOSS_RISK",
+            "priority": 1,
+            "message": "Net marj negatif — teklif zarar üretir",
+        })
+    if gross_margin_total_per_mwh < 0:
+        risk_flags.append({
+            "type": "UNPROFITABLE_OFFER",
+            "priority": 2,
+            "message": "Toplam brüt marj negatif — dağıtım dahil maliyet satışı aşıyor",
+        })
+
+    pricing = PricingSummary(
+        multiplier=multiplier,
+        # Dual sales price
+        sales_energy_price_per_mwh=sales_energy_price_per_mwh,
+        sales_effective_price_per_mwh=sales_effective_price_per_mwh,
+        # Dual margin (per MWh)
+        gross_margin_energy_per_mwh=gross_margin_energy_per_mwh,
+        gross_margin_total_per_mwh=gross_margin_total_per_mwh,
+        net_margin_per_mwh=net_margin_per_mwh,
+        # Cost breakdown (per MWh)
+        distribution_cost_per_mwh=round(dist_per_mwh, 2),
+        imbalance_cost_per_mwh=imbalance_per_mwh,
+        dealer_commission_per_mwh=dealer_per_mwh,
+        # Risk flags
+        risk_flags=risk_flags,
+        # Totals (TL)
+        total_sales_tl=totals["total_sales_revenue_tl"],
+        total_cost_tl=totals["total_base_cost_tl"],
+        total_gross_margin_tl=totals["total_gross_margin_tl"],
+        total_dealer_commission_tl=totals["dealer_commission_total_tl"],
+        total_net_margin_tl=totals["total_net_margin_tl"],
+        # Backward compat aliases
+        sales_price_tl_per_mwh=sales_energy_price_per_mwh,
+        gross_margin_tl_per_mwh=gross_margin_energy_per_mwh,
+        dealer_commission_tl_per_mwh=dealer_per_mwh,
+        net_margin_tl_per_mwh=net_margin_per_mwh,
+    )
+
+    # ── 14. Nominal vs Gerçek Marj Analizi ─────────────────────────────
+    try:
+        margin_reality_result = calculate_margin_reality(
+            offer_ptf_tl_per_mwh=weighted.weighted_ptf_tl_per_mwh,
+            yekdem_tl_per_mwh=yekdem,
+            multiplier=multiplier,
+            hourly_ptf_prices=basis.frame.ptf,
+            hourly_consumption_kwh=prepared.hourly_kwh_rounded,
+            hourly_timestamps=prepared.hourly_timestamps,
+            hourly_time_zones=prepared.hourly_time_zones,
+            include_yekdem=True,
+            include_hourly_margins=hourly_margins,
+        )
+        margin_reality_dict = margin_reality_result.model_dump()
+    except Exception as e:
+        logger.warning("margin_reality calculation failed (non-critical): %s", e)
+        margin_reality_dict = None
+
+    return AnalyzeResponse(
+        period=prepared.period,
+        customer_id=prepared.customer_id,
+        weighted_prices=weighted.model_copy(deep=True),
+        supplier_cost=supplier_cost,
+        pricing=pricing,
+        time_zone_breakdown={
+            k: v.model_copy(deep=True) for k, v in prepared.tz_breakdown.items()
+        },
+        loss_map=loss_map,
+        risk_score=risk,
+        safe_multiplier=safe_result,
+        distribution=prepared.dist_info.model_copy(deep=True) if prepared.dist_info else None,
+        margin_reality=margin_reality_dict,
+        warnings=warnings,
+        data_quality=DataQualityReport(),
+        cache_hit=False,
+    )
+
+
+def build_hour_detail(
+    prepared: PreparedAnalysis,
+    multiplier: float,
+    mode: HourDetailMode,
+    offset: int = 0,
+    limit: Optional[int] = None,
+) -> HourlyCostDetail | None:
+    """İstenen saatlik detay dilimini hazırlık dizilerinden tembel üret.
+
+    Yalnız [offset, offset + limit) saatleri hesaplanır; değerler
+    calculate_hourly_costs kayıtlarıyla aynıdır. limit verilmezse page modu
+    PRICING_HOUR_PAGE_SIZE, columnar modu kalan tüm saatleri döndürür.
+
+    Returns:
+        HourlyCostDetail; mode=summary ise None.
+    """
+    if mode == HourDetailMode.SUMMARY:
+        return None
+
+    total_hours = prepared.basis.frame.matched_hours
+    if limit is None and mode == HourDetailMode.PAGE:
+        limit = PRICING_HOUR_PAGE_SIZE
+    start = min(offset, total_hours)
+    stop = total_hours if limit is None else min(start + limit, total_hours)
+
+    columns = hourly_cost_columns(prepared.basis, multiplier, start, stop)
+    detail = HourlyCostDetail(
+        mode=mode,
+        total_hours=total_hours,
+        offset=start,
+        count=stop - start,
+        next_offset=stop if stop < total_hours else None,
+        yekdem_tl_per_mwh=prepared.yekdem,
+    )
+    if mode == HourDetailMode.COLUMNAR:
+        detail.columns = HourlyCostColumns.model_construct(**columns)
+    else:
+        keys = list(columns)
+        detail.hours = [
+            HourlyCostEntry.model_construct(
+                yekdem_tl_per_mwh=prepared.yekdem, **dict(zip(keys, row)),
+            )
+            for row in zip(*columns.values())
+        ]
+    return detail
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Analiz Çekirdeği
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def build_hourly_margins(prepared: PreparedAnalysis, multiplier: float) -> list[float]:
+    """Marj gerçekliği histogram dizisi (hourly_margins_tl) — finish_analysis
+    ile aynı girdilerden, diğer metrikler yeniden hesaplanmadan."""
+    return calculate_hourly_margins(
+        offer_ptf_tl_per_mwh=prepared.weighted.weighted_ptf_tl_per_mwh,
+        yekdem_tl_per_mwh=prepared.yekdem,
+        multiplier=multiplier,
+        hourly_ptf_prices=prepared.basis.frame.ptf,
+        hourly_consumption_kwh=prepared.hourly_kwh_rounded,
+        include_yekdem=True,
+    )
+
+
+def compute_analysis(
+    period: str,
+    customer_id: Optional[str],
+    market_records: list[ParsedMarketRecord],
+    consumption_records: list[ParsedConsumptionRecord],
+    yekdem: float,
+    multiplier: float,
+    imbalance_params: ImbalanceParams,
+    dealer_commission_pct: float = 0.0,
+    voltage_level: Optional[str] = "og",
+    warnings: Optional[list[dict]] = None,
+    hourly_margins: bool = True,
+) -> AnalyzeResponse:
+    """Tam fiyatlama analizi — adım 4–14 (ağırlıklı fiyat → marj gerçekliği).
+
+    prepare_analysis + finish_analysis; yalnızca teklif parametreleri değişen
+    tekrar analizlerde hazırlık aşaması önbellekten kullanılabilir.
+
+    Args:
+        period: Dönem (YYYY-MM).
+        customer_id: Müşteri kimliği (şablon analizinde None).
+        market_records: Dönemin saatlik piyasa verileri (boş olmamalı).
+        consumption_records: Saatlik tüketim verileri.
+        yekdem: YEKDEM bedeli (TL/MWh); eksikse 0 ve warnings'te uyarı.
+        multiplier: Katsayı.
+        imbalance_params: Dengesizlik parametreleri.
+        dealer_commission_pct: Bayi komisyon yüzdesi (0–100).
+        voltage_level: Gerilim seviyesi (ag/og) — dağıtım bedeli için.
+        warnings: Veri yükleme aşamasından gelen uyarılar (kopyalanır).
+        hourly_margins: False → marj gerçekliği histogramı boş (/analyze özeti).
+
+    Returns:
+        AnalyzeResponse (cache_hit=False).
+
+    Raises:
+        ValueError: Toplam tüketim sıfır vb. hesaplama hataları.
+    """
+    prepared = prepare_analysis(
+        period=period,
+        customer_id=customer_id,
+        market_records=market_records,
+        consumption_records=consumption_records,
+        yekdem=yekdem,
+        voltage_level=voltage_level,
+        warnings=warnings,
+    )
+    return finish_analysis(
+        prepared,
+        multiplier=multiplier,
+        imbalance_params=imbalance_params,
+        dealer_commission_pct=dealer_commission_pct,
+        hourly_margins=hourly_margins,
+    )
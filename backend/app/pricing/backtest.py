@@ -0,0 +1,385 @@
+"""
+Pricing Risk Engine — Çok Yıllı Geçmiş Backtest.
+
+Önerilen katsayı / sözleşme parametreleri, müşterinin (veya şablonun) veri
+bulunan TÜM geçmiş dönemlerine uygulanır; dönem başına marj, zararlı saat
+ve kümülatif kâr/zarar raporlanır.
+
+/pricing/compare her dönem için ORM kayıtlarını yeniden yükler. Burada:
+
+- Piyasa verisi + YEKDEM dönem başına BİR KEZ, sütunsal dizi deposuna
+  (MarketHistory) yüklenir: slot = gün ordinal × 24 + saat → yoğun PTF/SMF
+- Müşteri tüketimi (date, hour) yerine slot dizisi olarak taşınır; eşleştirme
+  dizi indekslemesiyle yapılır (build_period_frame ile aynı semantik:
+  tüketim sırası korunur, eşleşmeyen saat atlanır, yinelenen piyasa
+  kaydında son kayıt geçerli)
+- Dönem hesapları maliyet tabanı + sweep_multipliers + summarize_cost_totals
+  ile yapılır → calculate_hourly_costs ile bit-for-bit aynı toplamlar
+  (dağıtım bedeli hariç — /compare ile aynı)
+- Müşteriler "spawn" süreç havuzunda paralel işlenir; depo worker başına
+  initializer ile bir kez gönderilir (bkz. pool_utils)
+"""
+
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Iterable, Iterator, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from .excel_parser import ParsedConsumptionRecord
+from .market_store import get_market_segment
+from .models import BacktestSummary, ImbalanceParams
+from .multiplier_simulator import sweep_multipliers
+from .period_frame import HOUR_ZONE_CODES, PeriodFrame
+from .pool_utils import iter_ordered_results
+from .pricing_engine import build_cost_basis, summarize_cost_totals
+from .schemas import HourlyMarketPrice
+from .yekdem_service import get_yekdem_values
+
+logger = logging.getLogger(__name__)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Çok Dönemli Piyasa Deposu
+# ═══════════════════════════════════════════════════════════════════════════════
+
+@dataclass(frozen=True)
+class PeriodMarketArrays:
+    """Bir dönemin piyasa verisi — slot indeksli yoğun diziler.
+
+    ptf[i] / smf[i] = start_slot + i saatine ait fiyat; present[i] = kayıt var.
+    days[j] = start_slot // 24 + j gününün YYYY-MM-DD metni.
+    """
+    period: str
+    start_slot: int
+    ptf: np.ndarray
+    smf: np.ndarray
+    present: np.ndarray
+    days: np.ndarray
+    yekdem_tl_per_mwh: float
+    yekdem_missing: bool = False
+
+
+@dataclass(frozen=True)
+class MarketHistory:
+    """Backtest'in okuduğu tüm dönemler — dönem sıralı, salt-okunur."""
+    periods: dict[str, PeriodMarketArrays]
+
+    @property
+    def period_list(self) -> list[str]:
+        return sorted(self.periods)
+
+
+def _period_arrays(period: str, rows: np.ndarray, yekdem: Optional[float]) -> PeriodMarketArrays:
+    ordinals = {d: date.fromisoformat(d).toordinal() for d in np.unique(rows["date"]).tolist()}
+    slots = np.array(
+        [ordinals[d] for d in rows["date"].tolist()], dtype=np.int64,
+    ) * 24 + rows["hour"].astype(np.int64)
+    start = int(slots.min())
+    size = int(slots.max()) - start + 1
+    ptf = np.zeros(size)
+    smf = np.zeros(size)
+    present = np.zeros(size, dtype=bool)
+    # Segment (date, hour, id) sıralı → tekrarlı slotta son atama geçerli
+    ptf[slots - start] = rows["ptf"]
+    smf[slots - start] = rows["smf"]
+    present[slots - start] = True
+    first_day = start // 24
+    days = np.array([
+        date.fromordinal(o).isoformat()
+        for o in range(first_day, (start + size - 1) // 24 + 1)
+    ])
+    return PeriodMarketArrays(
+        period=period,
+        start_slot=start,
+        ptf=ptf,
+        smf=smf,
+        present=present,
+        days=days,
+        yekdem_tl_per_mwh=yekdem if yekdem is not None else 0.0,
+        yekdem_missing=yekdem is None,
+    )
+
+
+def list_market_periods(
+    db: Session,
+    start_period: Optional[str] = None,
+    end_period: Optional[str] = None,
+) -> list[str]:
+    """Aktif piyasa verisi olan dönemler (artan), isteğe bağlı aralıkla."""
+    query = db.query(HourlyMarketPrice.period).filter(HourlyMarketPrice.is_active == 1)
+    if start_period:
+        query = query.filter(HourlyMarketPrice.period >= start_period)
+    if end_period:
+        query = query.filter(HourlyMarketPrice.period <= end_period)
+    return sorted(p for (p,) in query.distinct().all())
+
+
+def load_market_history(db: Session, periods: Iterable[str]) -> MarketHistory:
+    """Dönemlerin aktif piyasa segmentlerini + YEKDEM'i bir kez yükle.
+
+    Segmentler paylaşımlı market_store'dan okunur (satırlar yeniden
+    hidrate edilmez); YEKDEM tek sorguda gelir. Verisi olmayan dönemler
+    depoya girmez.
+    """
+    periods = list(periods)
+    yekdem = get_yekdem_values(db, periods)
+    history: dict[str, PeriodMarketArrays] = {}
+    for period in periods:
+        rows = get_market_segment(db, period).rows
+        if rows.shape[0] == 0:
+            continue
+        history[period] = _period_arrays(period, rows, yekdem.get(period))
+    return MarketHistory(periods=history)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Tüketim Slotları
+# ═══════════════════════════════════════════════════════════════════════════════
+
+@dataclass
+class ConsumptionSlots:
+    """Bir dönemin tüketimi — kayıt sırasıyla slot ve kWh dizileri."""
+    slots: np.ndarray   # int64, gün ordinal × 24 + saat
+    kwh: np.ndarray     # float64
+
+
+def consumption_slots(records: list[ParsedConsumptionRecord]) -> ConsumptionSlots:
+    """Tüketim kayıtlarını slot dizisine çevir (sıra korunur).
+
+    Saat 0–23 dışındaki kayıtlar piyasa slotu ile eşleşemeyeceği için
+    (build_period_frame'de de eşleşmez) atlanır.
+    """
+    ordinals: dict[str, int] = {}
+    slots: list[int] = []
+    kwh: list[float] = []
+    for r in records:
+        if not 0 <= r.hour <= 23:
+            continue
+        ordinal = ordinals.get(r.date)
+        if ordinal is None:
+            ordinal = date.fromisoformat(r.date).toordinal()
+            ordinals[r.date] = ordinal
+        slots.append(ordinal * 24 + r.hour)
+        kwh.append(r.consumption_kwh)
+    return ConsumptionSlots(
+        slots=np.array(slots, dtype=np.int64),
+        kwh=np.array(kwh, dtype=np.float64),
+    )
+
+
+def match_frame(market: PeriodMarketArrays, consumption: ConsumptionSlots) -> PeriodFrame:
+    """Slot eşleştirmesiyle PeriodFrame kur (build_period_frame semantiği)."""
+    offsets = consumption.slots - market.start_slot
+    in_range = (offsets >= 0) & (offsets < market.present.shape[0])
+    matched = np.zeros(offsets.shape[0], dtype=bool)
+    matched[in_range] = market.present[offsets[in_range]]
+
+    idx = offsets[matched]
+    slots = consumption.slots[matched]
+    hours = slots % 24
+
+    return PeriodFrame(
+        dates=market.days[slots // 24 - market.start_slot // 24].tolist(),
+        hours=hours,
+        ptf=market.ptf[idx],
+        smf=market.smf[idx],
+        kwh=consumption.kwh[matched],
+        zone=HOUR_ZONE_CODES[hours],
+    )
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Backtest Hesabı
+# ═══════════════════════════════════════════════════════════════════════════════
+
+@dataclass
+class BacktestContext:
+    """Tüm kalemler için ortak, bir kez hazırlanan girdiler."""
+    history: MarketHistory
+    multiplier: float
+    imbalance_params: ImbalanceParams
+    dealer_commission_pct: float = 0.0
+
+
+@dataclass
+class BacktestTask:
+    """Tek kalem: dönem → tüketim slotları veya yükleme hatası."""
+    index: int
+    customer_id: Optional[str]
+    consumption: dict[str, ConsumptionSlots] = field(default_factory=dict)
+    error: Optional[dict] = None
+
+
+def backtest_period(
+    market: PeriodMarketArrays,
+    consumption: ConsumptionSlots,
+    multiplier: float,
+    imbalance_params: ImbalanceParams,
+    dealer_commission_pct: float = 0.0,
+) -> dict:
+    """Tek dönem — calculate_hourly_costs ile aynı toplamlar.
+
+    Raises:
+        ValueError: Eşleşen saat yok veya toplam tüketim sıfır.
+    """
+    basis = build_cost_basis(match_frame(market, consumption), market.yekdem_tl_per_mwh)
+    _, sales, loss_hours, total_loss = next(
+        sweep_multipliers(basis, np.array([multiplier], dtype=np.float64))
+    )
+    totals = summarize_cost_totals(
+        basis, sales[0], imbalance_params,
+        dealer_commission_pct=dealer_commission_pct,
+    )
+    return {
+        "period": market.period,
+        "yekdem_tl_per_mwh": market.yekdem_tl_per_mwh,
+        "weighted_ptf_tl_per_mwh": basis.weighted.weighted_ptf_tl_per_mwh,
+        "total_consumption_kwh": basis.weighted.total_consumption_kwh,
+        "hours": basis.weighted.hours_count,
+        "total_sales_tl": totals["total_sales_revenue_tl"],
+        "total_cost_tl": totals["total_base_cost_tl"],
+        "gross_margin_tl": totals["total_gross_margin_tl"],
+        "dealer_commission_tl": totals["dealer_commission_total_tl"],
+        "imbalance_cost_tl": totals["imbalance_cost_total_tl"],
+        "net_margin_tl": totals["total_net_margin_tl"],
+        "loss_hours": loss_hours[0],
+        "total_loss_tl": round(total_loss[0], 2),
+    }
+
+
+def backtest_task(context: BacktestContext, task: BacktestTask) -> dict:
+    """Tek kalemi tüm dönemlerde çalıştır → NDJSON satırı (dict).
+
+    Dönem hatası kalemi bozmaz; dönem "errors" listesine yazılır.
+    """
+    line: dict = {"type": "item", "index": task.index, "customer_id": task.customer_id}
+    if task.error is not None:
+        return {**line, "status": "error", "error": task.error}
+
+    rows: list[dict] = []
+    errors: list[dict] = []
+    cumulative = 0.0
+    for period in context.history.period_list:
+        consumption = task.consumption.get(period)
+        if consumption is None:
+            continue
+        try:
+            row = backtest_period(
+                context.history.periods[period], consumption,
+                context.multiplier, context.imbalance_params,
+                context.dealer_commission_pct,
+            )
+        except ValueError as e:
+            errors.append({"period": period, "message": str(e)})
+            continue
+        cumulative += row["net_margin_tl"]
+        row["cumulative_net_margin_tl"] = round(cumulative, 2)
+        rows.append(row)
+
+    if not rows:
+        return {
+            **line, "status": "error",
+            "error": {
+                "error": "no_backtest_periods",
+                "message": "Piyasa ve tüketim verisi eşleşen dönem bulunamadı.",
+                "periods": errors,
+            },
+        }
+    return {
+        **line, "status": "ok",
+        "result": {
+            "periods": rows,
+            "errors": errors,
+            "periods_analyzed": len(rows),
+            "loss_periods": sum(1 for r in rows if r["net_margin_tl"] < 0),
+            "total_net_margin_tl": round(cumulative, 2),
+            "total_loss_hours": sum(r["loss_hours"] for r in rows),
+            "worst_period": min(rows, key=lambda r: r["net_margin_tl"])["period"],
+        },
+    }
+
+
+def _pool_error_line(task: BacktestTask, exc: Exception) -> dict:
+    """Havuz hatası (worker çöktü, görev serileştirilemedi) → kalem hata satırı."""
+    logger.error("backtest item %d failed in pool: %r", task.index, exc)
+    return {
+        "type": "item", "index": task.index, "customer_id": task.customer_id,
+        "status": "error",
+        "error": {"error": "worker_error", "message": str(exc) or type(exc).__name__},
+    }
+
+
+def iter_backtest_results(
+    context: BacktestContext,
+    tasks: Iterable[BacktestTask],
+    max_workers: int = 1,
+) -> Iterator[dict]:
+    """Kalemleri çalıştır ve sonuç satırlarını GİRİŞ SIRASIYLA üret.
+
+    max_workers <= 1 → aynı süreçte. Aksi halde sınırlı pencereli süreç
+    havuzu (pool_utils.iter_ordered_results; havuz hatası kalem hatası olur).
+    """
+    return iter_ordered_results(
+        backtest_task, context, tasks, max_workers, on_error=_pool_error_line,
+    )
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Portföy Özeti
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class BacktestAccumulator:
+    """Akış satırlarından dönem bazlı portföy kâr/zararı biriktir."""
+
+    def __init__(self, history: MarketHistory) -> None:
+        self.history = history
+        self.items_ok = 0
+        self.items_failed = 0
+        self.loss_making_items = 0
+        self.net_by_period: dict[str, float] = {}
+        self.loss_hours_by_period: dict[str, int] = {}
+
+    def add(self, line: dict) -> None:
+        if line.get("status") != "ok":
+            self.items_failed += 1
+            return
+        result = line["result"]
+        self.items_ok += 1
+        if result["total_net_margin_tl"] < 0:
+            self.loss_making_items += 1
+        for row in result["periods"]:
+            period = row["period"]
+            self.net_by_period[period] = self.net_by_period.get(period, 0.0) + row["net_margin_tl"]
+            self.loss_hours_by_period[period] = (
+                self.loss_hours_by_period.get(period, 0) + row["loss_hours"]
+            )
+
+    def summary(self) -> BacktestSummary:
+        cumulative = 0.0
+        by_period: list[dict] = []
+        for period in sorted(self.net_by_period):
+            cumulative += self.net_by_period[period]
+            by_period.append({
+                "period": period,
+                "net_margin_tl": round(self.net_by_period[period], 2),
+                "loss_hours": self.loss_hours_by_period[period],
+                "cumulative_net_margin_tl": round(cumulative, 2),
+            })
+        return BacktestSummary(
+            periods=self.history.period_list,
+            yekdem_missing_periods=[
+                p for p in self.history.period_list
+                if self.history.periods[p].yekdem_missing
+            ],
+            items_total=self.items_ok + self.items_failed,
+            items_ok=self.items_ok,
+            items_failed=self.items_failed,
+            loss_making_items=self.loss_making_items,
+            total_net_margin_tl=round(cumulative, 2),
+            by_period=by_period,
+        )
@@ -0,0 +1,188 @@
+"""
+Pricing Risk Engine — Toplu Yazma Katmanı.
+
+Saatlik piyasa ve tüketim yüklemeleri satır başına ORM nesnesi oluşturup
+eski versiyonu Python'da tek tek arşivliyordu; çok aylık yüklemelerde yazma
+kilidi saniyelerce tutuluyordu. Burada:
+
+- Arşivleme küme tabanlı: tek `UPDATE ... SET is_active=0 WHERE ...`
+- Ekleme PostgreSQL (psycopg 3) üzerinde COPY FROM STDIN, diğer
+  veritabanlarında Core `insert()` + executemany
+- ORM kimlik haritası atlanır; çağıran commit'ten sonra gerekirse yeniden okur
+
+Tüm fonksiyonlar çağıranın oturum/işlemi içinde çalışır, commit ETMEZ.
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import Iterable, Optional
+
+from sqlalchemy import Table, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from .excel_parser import ParsedConsumptionRecord, ParsedMarketRecord
+from .schemas import ConsumptionHourlyData, DataVersion, HourlyMarketPrice
+
+logger = logging.getLogger(__name__)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Genel toplu ekleme
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+def _uses_copy(db: Session) -> bool:
+    dialect = db.get_bind().dialect
+    return dialect.name == "postgresql" and dialect.driver == "psycopg"
+
+
+def _column_defaults(db: Session, table: Table, given: Iterable[str]) -> dict:
+    """COPY'de verilmeyen sütunların istemci tarafı default değerleri.
+
+    Skaler default'lar doğrudan, SQL ifadeleri (func.now()) işlem içinde bir
+    kez değerlendirilerek alınır — insert() yolunun yazacağı değerle aynı.
+    """
+    given = set(given)
+    defaults: dict = {}
+    for column in table.columns:
+        if column.primary_key or column.name in given or column.default is None:
+            continue
+        if column.default.is_scalar:
+            defaults[column.name] = column.default.arg
+        elif column.default.is_clause_element:
+            defaults[column.name] = db.execute(select(column.default.arg)).scalar()
+    return defaults
+
+
+def _copy_rows(db: Session, table: Table, rows: list[dict]) -> None:
+    """PostgreSQL COPY FROM STDIN — oturumun işlem bağlantısı üzerinden."""
+    defaults = _column_defaults(db, table, rows[0].keys())
+    columns = list(rows[0].keys()) + list(defaults.keys())
+    fill = tuple(defaults.values())
+
+    preparer = db.get_bind().dialect.identifier_preparer
+    sql = "COPY {} ({}) FROM STDIN".format(
+        preparer.format_table(table),
+        ", ".join(preparer.quote(c) for c in columns),
+    )
+    dbapi_conn = db.connection().connection.dbapi_connection
+    with dbapi_conn.cursor() as cursor:
+        with cursor.copy(sql) as copy:
+            for row in rows:
+                copy.write_row(tuple(row.values()) + fill)
+
+
+def bulk_insert_rows(db: Session, table: Table, rows: list[dict]) -> int:
+    """Satırları tek seferde ekle. Tüm satırlar aynı anahtar sırasında olmalı.
+
+    Returns:
+        Eklenen satır sayısı.
+    """
+    if not rows:
+        return 0
+    db.flush()  # bekleyen ORM değişiklikleri (ör. profil id) önce yazılsın
+    if _uses_copy(db):
+        _copy_rows(db, table, rows)
+    else:
+        db.execute(insert(table), rows)
+    return len(rows)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Piyasa verisi
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+def archive_market_period(db: Session, period: str) -> tuple[int, int]:
+    """Dönemin aktif saatlik piyasa satırlarını tek UPDATE ile arşivle.
+
+    Returns:
+        (arşivlenen satır sayısı, dönemdeki en yüksek versiyon — yoksa 0)
+    """
+    max_version = (
+        db.query(func.max(HourlyMarketPrice.version))
+        .filter(HourlyMarketPrice.period == period)
+        .scalar()
+    ) or 0
+    archived = db.execute(
+        update(HourlyMarketPrice)
+        .where(
+            HourlyMarketPrice.period == period,
+            HourlyMarketPrice.is_active == 1,
+        )
+        .values(is_active=0)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    return archived, max_version
+
+
+def insert_market_records(
+    db: Session,
+    records: list[ParsedMarketRecord],
+    version: int,
+    source: str = "epias_excel",
+) -> int:
+    """Saatlik PTF/SMF kayıtlarını aktif versiyon olarak toplu ekle."""
+    rows = [
+        {
+            "period": rec.period,
+            "date": rec.date,
+            "hour": rec.hour,
+            "ptf_tl_per_mwh": rec.ptf_tl_per_mwh,
+            "smf_tl_per_mwh": rec.smf_tl_per_mwh,
+            "source": source,
+            "version": version,
+            "is_active": 1,
+        }
+        for rec in records
+    ]
+    return bulk_insert_rows(db, HourlyMarketPrice.__table__, rows)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Tüketim verisi
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+def insert_consumption_records(
+    db: Session,
+    profile_id: int,
+    records: list[ParsedConsumptionRecord],
+) -> int:
+    """Profilin saatlik tüketim kayıtlarını toplu ekle."""
+    rows = [
+        {
+            "profile_id": profile_id,
+            "date": r.date,
+            "hour": r.hour,
+            "consumption_kwh": r.consumption_kwh,
+        }
+        for r in records
+    ]
+    return bulk_insert_rows(db, ConsumptionHourlyData.__table__, rows)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Versiyon kayıtları
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+def archive_data_versions(
+    db: Session,
+    data_type: str,
+    period: str,
+    customer_id: Optional[str],
+) -> int:
+    """Aktif data_versions kayıtlarını tek UPDATE ile arşivle."""
+    return db.execute(
+        update(DataVersion)
+        .where(
+            DataVersion.data_type == data_type,
+            DataVersion.period == period,
+            DataVersion.customer_id == customer_id,
+            DataVersion.is_active == 1,
+        )
+        .values(is_active=0)
+        .execution_options(synchronize_session=False)
+    ).rowcount
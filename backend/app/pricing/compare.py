@@ -0,0 +1,147 @@
+"""
+Pricing Risk Engine — Çoklu Ay Karşılaştırma (/pricing/compare).
+
+12–24 aylık karşılaştırmalarda dönem başına ORM kaydı hidrate edip her
+dönemi sırayla hesaplamak ve ardından güvenli katsayı için tüm dönemleri
+yeniden kurmak yerine:
+
+- Piyasa verisi + YEKDEM backtest'in dizi deposuna (MarketHistory) bir kez
+  yüklenir; tüketim slot dizisi olarak taşınır (bkz. backtest)
+- Dönem hesapları (ağırlıklı fiyat, net marj, dilim dağılımı, risk) birbirinden
+  bağımsızdır → istenirse (max_workers) "spawn" süreç havuzunda paralel
+  çalışır; depo worker başına initializer ile bir kez gönderilir. Dizi
+  deposu üzerinde bir dönem ~0.4 ms sürdüğünden varsayılan aynı süreçtir:
+  24 dönemde havuz başlatma maliyeti kazancı aşar
+- Dönemlerin maliyet tabanları (CostBasis) güvenli katsayı adımında yeniden
+  kullanılır; yalnızca YEKDEM farklıysa aynı çerçeveden yeniden kurulur
+
+Sonuçlar calculate_hourly_costs / calculate_safe_multiplier ile
+bit-for-bit aynıdır.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Optional
+
+from .backtest import ConsumptionSlots, MarketHistory, match_frame
+from .models import ImbalanceParams, RiskLevel, WeightedPriceResult
+from .period_frame import seq_sum
+from .pool_utils import iter_ordered_results
+from .portfolio import PRICING_BATCH_MAX_WORKERS
+from .pricing_engine import (
+    CostBasis,
+    build_cost_basis,
+    calculate_weighted_prices,
+    summarize_cost_totals,
+)
+from .risk_calculator import calculate_risk_score
+from .time_zones import calculate_time_zone_breakdown
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Dönem Hesabı
+# ═══════════════════════════════════════════════════════════════════════════════
+
+@dataclass
+class CompareContext:
+    """Tüm dönemler için ortak girdiler — worker başına bir kez gönderilir."""
+    history: MarketHistory
+    multiplier: float
+    imbalance_params: ImbalanceParams
+    dealer_commission_pct: float = 0.0
+
+
+@dataclass
+class ComparePeriodResult:
+    """Tek dönem sonucu; basis güvenli katsayı adımında yeniden kullanılır."""
+    period: str
+    weighted: WeightedPriceResult
+    net_margin_tl: float
+    risk_score: RiskLevel
+    basis: CostBasis
+
+
+def compare_period(
+    context: CompareContext,
+    period: str,
+    consumption: ConsumptionSlots,
+) -> ComparePeriodResult:
+    """Tek dönem — calculate_weighted_prices + calculate_hourly_costs +
+    calculate_time_zone_breakdown + calculate_risk_score ile aynı sonuç.
+
+    Raises:
+        ValueError: Eşleşen saat yok veya toplam tüketim sıfır.
+    """
+    market = context.history.periods[period]
+    yekdem = market.yekdem_tl_per_mwh
+    frame = match_frame(market, consumption)
+    weighted = calculate_weighted_prices([], [], frame=frame)
+    basis = build_cost_basis(frame, yekdem, weighted=weighted)
+    totals = summarize_cost_totals(
+        basis, seq_sum(basis.kwh_energy * context.multiplier / 1000.0),
+        context.imbalance_params,
+        dealer_commission_pct=context.dealer_commission_pct,
+    )
+    tz_breakdown = calculate_time_zone_breakdown([], [], yekdem, frame=frame)
+    return ComparePeriodResult(
+        period=period,
+        weighted=weighted,
+        net_margin_tl=totals["total_net_margin_tl"],
+        risk_score=calculate_risk_score(weighted, tz_breakdown).score,
+        basis=basis,
+    )
+
+
+def _compare_or_error(
+    context: CompareContext,
+    period: str,
+    consumption: ConsumptionSlots,
+) -> ComparePeriodResult | str:
+    try:
+        return compare_period(context, period, consumption)
+    except ValueError as e:
+        return str(e)
+
+
+def _compare_task(
+    context: CompareContext,
+    task: tuple[str, ConsumptionSlots],
+) -> ComparePeriodResult | str:
+    return _compare_or_error(context, *task)
+
+
+def resolve_compare_workers(n_periods: int, requested: Optional[int] = None) -> int:
+    """Etkin worker sayısı — havuz yalnız max_workers açıkça istenirse."""
+    if requested is None:
+        return 1
+    return max(1, min(requested, PRICING_BATCH_MAX_WORKERS, n_periods))
+
+
+def run_compare_periods(
+    context: CompareContext,
+    consumption: dict[str, ConsumptionSlots],
+    periods: list[str],
+    max_workers: int = 1,
+) -> list[ComparePeriodResult | str]:
+    """Dönemleri hesapla; sonuçlar periods SIRASIYLA döner.
+
+    Eşleşmeyen / tüketimi sıfır dönem için ValueError mesajı (str) döner.
+    max_workers <= 1 → aynı süreçte.
+    """
+    tasks = [(period, consumption[period]) for period in periods]
+    return list(iter_ordered_results(_compare_task, context, tasks, max_workers))
+
+
+def safe_multiplier_bases(
+    results: list[ComparePeriodResult],
+    yekdem_tl_per_mwh: float,
+) -> list[CostBasis]:
+    """Güvenli katsayı tabanları — tek YEKDEM ile (calculate_safe_multiplier
+    sözleşmesi). Dönemin kendi YEKDEM'i aynıysa taban olduğu gibi kullanılır.
+    """
+    return [
+        r.basis if r.basis.yekdem_tl_per_mwh == yekdem_tl_per_mwh
+        else build_cost_basis(r.basis.frame, yekdem_tl_per_mwh, weighted=r.weighted)
+        for r in results
+    ]
@@ -8,6 +8,8 @@ Excel parse sonucunu DB'ye kaydeder:
 
 Versiyonlama: Aynı müşteri+dönem için tekrar yükleme →
 önceki versiyon arşivlenir (is_active=0), yeni versiyon oluşturulur.
+Arşivleme tek UPDATE, saatlik veriler toplu ekleme ile yazılır (bulk_writer).
+Commit sonrası profilin kompakt okuma blobu yayınlanır (consumption_store).
 
 Requirements: 4.1, 4.2, 4.4, 20.1, 20.2, 20.3, 21.2
 """
@@ -17,10 +19,13 @@ from __future__ import annotations
 import logging
 from typing import Optional
 
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 
-from .schemas import ConsumptionProfile, ConsumptionHourlyData, DataVersion
+from .schemas import ConsumptionProfile, DataVersion
 from .excel_parser import ParsedConsumptionRecord
+from .bulk_writer import archive_data_versions, insert_consumption_records
+from .consumption_store import publish_consumption_blob
 
 logger = logging.getLogger(__name__)
 
@@ -56,21 +61,20 @@ def save_consumption_profile(
         Oluşturulan ConsumptionProfile ORM nesnesi.
     """
     # ── 1. Mevcut aktif profilleri arşivle ─────────────────────────────────
-    existing_active = (
-        db.query(ConsumptionProfile)
-        .filter(
+    archived = db.execute(
+        update(ConsumptionProfile)
+        .where(
             ConsumptionProfile.customer_id == customer_id,
             ConsumptionProfile.period == period,
             ConsumptionProfile.is_active == 1,
         )
-        .all()
-    )
-
-    for profile in existing_active:
-        profile.is_active = 0
+        .values(is_active=0)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if archived:
         logger.info(
-            "Profil arşivlendi: customer_id=%s, period=%s, version=%d",
-            customer_id, period, profile.version,
+            "Profil arşivlendi: customer_id=%s, period=%s, count=%d",
+            customer_id, period, archived,
         )
 
     # ── 2. Yeni versiyon numarası belirle ──────────────────────────────────
@@ -107,31 +111,11 @@ def save_consumption_profile(
     db.flush()  # ID almak için flush
 
     # ── 6. Saatlik verileri kaydet ─────────────────────────────────────────
-    hourly_data_objects = [
-        ConsumptionHourlyData(
-            profile_id=new_profile.id,
-            date=r.date,
-            hour=r.hour,
-            consumption_kwh=r.consumption_kwh,
-        )
-        for r in records
-    ]
-    db.add_all(hourly_data_objects)
+    insert_consumption_records(db, new_profile.id, records)
 
     # ── 7. data_versions tablosuna kayıt ekle ─────────────────────────────
     # Mevcut aktif data_version'ları arşivle
-    existing_dv = (
-        db.query(DataVersion)
-        .filter(
-            DataVersion.data_type == "consumption",
-            DataVersion.period == period,
-            DataVersion.customer_id == customer_id,
-            DataVersion.is_active == 1,
-        )
-        .all()
-    )
-    for dv in existing_dv:
-        dv.is_active = 0
+    archive_data_versions(db, "consumption", period, customer_id)
 
     new_dv = DataVersion(
         data_type="consumption",
@@ -147,6 +131,9 @@ def save_consumption_profile(
     db.commit()
     db.refresh(new_profile)
 
+    # ── 9. Kompakt blob (okuyucular satırları yeniden hidrate etmez) ────────
+    publish_consumption_blob(db, new_profile, records)
+
     logger.info(
         "Tüketim profili kaydedildi: customer_id=%s, period=%s, version=%d, "
         "rows=%d, total_kwh=%.2f",
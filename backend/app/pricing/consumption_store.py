@@ -0,0 +1,384 @@
+"""
+Pricing Risk Engine — Kompakt Tüketim Profili Okuma Önbelleği.
+
+Her ConsumptionProfile dönem başına ~744 consumption_hourly_data satırına
+açılır; her okuyucu bu satırları sıralayıp ORM/tuple olarak yeniden
+hidrate ediyordu. Burada profil okuma için tek bir ikili blob olarak
+önbelleğe alınır:
+
+    başlık (magic, biçim sürümü, dtype, çözünürlük dk, başlangıç, adet)
+    + yoğun float32/float64 dizi (eksik saatler NaN)
+
+Kapsam: bu bir OKUMA önbelleğidir, depolama azaltımı değildir.
+consumption_hourly_data satırları doğruluk kaynağı olarak yazılmaya devam
+eder — şema kanonik alembic head'ine sabitli olduğundan blob profil
+satırında tutulamaz.
+
+Anahtar: profil satırından (id, version, created_at, total_kwh) — sorgu
+yok. Saatlik satırları yalnız save_consumption_profile yazar ve her
+yükleme yeni profil (yeni id/versiyon) oluşturur; bir profilin satırları
+sonradan değişmez. Blob bu anahtarla diske yazılır; tüm worker'lar paylaşır.
+Profil id/versiyonu başka veritabanında da aynı olabilir → bloblar
+veritabanı kimliği (market_store.database_identity) adlı alt dizinde
+tutulur ve anahtar kimliği içerir.
+
+- save_consumption_profile blobu commit sonrası yayınlar
+- Blobu olmayan profiller ilk okumada satırlardan kurulur;
+  backfill_consumption_blobs() aktif profilleri toplu olarak dönüştürür
+
+Kullanan okuyucular:
+- pricing router _load_consumption_records / backtest tüketim yüklemesi
+- market_prices.consumption_weighted_ptf
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import struct
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from .excel_parser import ParsedConsumptionRecord
+from .market_store import database_identity
+from .schemas import ConsumptionHourlyData, ConsumptionProfile
+
+logger = logging.getLogger(__name__)
+
+# Blob kök dizini: env var veya sistem geçici dizini (tüm worker'lar
+# paylaşır); her veritabanı kendi alt dizinini kullanır
+PRICING_CONSUMPTION_STORE_DIR = os.getenv(
+    "PRICING_CONSUMPTION_STORE_DIR",
+    os.path.join(tempfile.gettempdir(), "pricing_consumption_store"),
+)
+# İşlem içi önbellekte tutulan blob sayısı
+PRICING_CONSUMPTION_STORE_MAX_ENTRIES = int(
+    os.getenv("PRICING_CONSUMPTION_STORE_MAX_ENTRIES", "2048")
+)
+
+# Başlık: magic, biçim sürümü, dtype boyutu (4|8), çözünürlük (dk),
+# başlangıç (1970-01-01'den beri dakika), değer adedi — little-endian
+_MAGIC = b"GCPB"
+_FORMAT_VERSION = 1
+_HEADER = struct.Struct("<4sBBHqI")
+_EPOCH = date(1970, 1, 1)
+_DTYPES = {4: np.dtype("<f4"), 8: np.dtype("<f8")}
+
+HOURLY_RESOLUTION_MINUTES = 60
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Kodlama / Çözme
+# ═══════════════════════════════════════════════════════════════════════════════
+
+@dataclass(frozen=True)
+class CompactConsumption:
+    """Yoğun tüketim dizisi — values[i] = start + i × çözünürlük (NaN = kayıt yok)."""
+    start_date: date
+    start_hour: int
+    resolution_minutes: int
+    values: np.ndarray
+
+    def to_records(self) -> list[ParsedConsumptionRecord]:
+        """(date, hour) sıralı ParsedConsumptionRecord listesi; eksik saatler atlanır."""
+        slots = np.flatnonzero(~np.isnan(self.values))
+        offsets = slots + self.start_hour
+        days = (offsets // 24).tolist()
+        hours = (offsets % 24).tolist()
+        kwh = self.values[slots].astype(np.float64).tolist()
+        start_ordinal = self.start_date.toordinal()
+        date_cache: dict[int, str] = {}
+        records: list[ParsedConsumptionRecord] = []
+        for d, h, k in zip(days, hours, kwh):
+            date_str = date_cache.get(d)
+            if date_str is None:
+                date_str = date.fromordinal(start_ordinal + d).isoformat()
+                date_cache[d] = date_str
+            records.append(ParsedConsumptionRecord(date=date_str, hour=h, consumption_kwh=k))
+        return records
+
+
+def compact_consumption(
+    records: list[ParsedConsumptionRecord],
+    dtype: np.dtype | str = np.float64,
+) -> CompactConsumption:
+    """Saatlik kayıtları yoğun diziye dönüştür.
+
+    float32 yalnızca depolama alanı önemliyse seçilmelidir — değerler
+    float64 satırlarla birebir aynı geri okunmaz.
+
+    Raises:
+        ValueError: Saat 0–23 dışında, tarih geçersiz veya (date, hour) tekrarlı.
+    """
+    dtype = np.dtype(dtype).newbyteorder("<")
+    if dtype.itemsize not in _DTYPES or dtype.kind != "f":
+        raise ValueError(f"Desteklenmeyen blob dtype: {dtype}")
+    if not records:
+        return CompactConsumption(_EPOCH, 0, HOURLY_RESOLUTION_MINUTES, np.empty(0, dtype=dtype))
+
+    ordinals: dict[str, int] = {}
+    slots = np.empty(len(records), dtype=np.int64)
+    for i, r in enumerate(records):
+        if not 0 <= r.hour <= 23:
+            raise ValueError(f"Geçersiz saat: {r.hour} ({r.date})")
+        ordinal = ordinals.get(r.date)
+        if ordinal is None:
+            ordinal = date.fromisoformat(r.date).toordinal()
+            ordinals[r.date] = ordinal
+        slots[i] = ordinal * 24 + r.hour
+
+    first = int(slots.min())
+    slots -= first
+    values = np.full(int(slots.max()) + 1, np.nan, dtype=dtype)
+    values[slots] = [r.consumption_kwh for r in records]
+    if np.count_nonzero(~np.isnan(values)) != len(records):
+        raise ValueError("Tekrarlanan (tarih, saat) kaydı — kompakt gösterime dönüştürülemez")
+
+    return CompactConsumption(
+        start_date=date.fromordinal(first // 24),
+        start_hour=first % 24,
+        resolution_minutes=HOURLY_RESOLUTION_MINUTES,
+        values=values,
+    )
+
+
+def encode_consumption(
+    records: list[ParsedConsumptionRecord],
+    dtype: np.dtype | str = np.float64,
+) -> bytes:
+    """Kayıtları ikili bloba kodla (bkz. modül başlığı)."""
+    compact = compact_consumption(records, dtype)
+    start_minutes = (
+        (compact.start_date - _EPOCH).days * 24 + compact.start_hour
+    ) * 60
+    header = _HEADER.pack(
+        _MAGIC, _FORMAT_VERSION, compact.values.dtype.itemsize,
+        compact.resolution_minutes, start_minutes, compact.values.shape[0],
+    )
+    return header + compact.values.tobytes()
+
+
+def decode_consumption(blob: bytes) -> CompactConsumption:
+    """İkili blobu çöz.
+
+    Raises:
+        ValueError: Bozuk veya desteklenmeyen blob.
+    """
+    if len(blob) < _HEADER.size:
+        raise ValueError("Tüketim blobu çok kısa")
+    magic, fmt_version, itemsize, resolution, start_minutes, count = _HEADER.unpack_from(blob)
+    if magic != _MAGIC or fmt_version != _FORMAT_VERSION or itemsize not in _DTYPES:
+        raise ValueError("Desteklenmeyen tüketim blobu biçimi")
+    if resolution != HOURLY_RESOLUTION_MINUTES:
+        raise ValueError(f"Desteklenmeyen çözünürlük: {resolution} dk")
+    if len(blob) != _HEADER.size + count * itemsize:
+        raise ValueError("Tüketim blobu boyutu başlıkla uyuşmuyor")
+
+    values = np.frombuffer(blob, dtype=_DTYPES[itemsize], count=count, offset=_HEADER.size)
+    start_hours = start_minutes // 60
+    return CompactConsumption(
+        start_date=_EPOCH + timedelta(days=start_hours // 24),
+        start_hour=start_hours % 24,
+        resolution_minutes=resolution,
+        values=values,
+    )
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Depo
+# ═══════════════════════════════════════════════════════════════════════════════
+
+# İşlem içi LRU: blob anahtarı → blob byte'ları
+_blobs: OrderedDict[str, bytes] = OrderedDict()
+_lock = threading.Lock()
+
+
+def _store_dir(db: Session) -> str:
+    """Veritabanının blob dizini."""
+    return os.path.join(PRICING_CONSUMPTION_STORE_DIR, database_identity(db))
+
+
+def _blob_key(db: Session, profile: ConsumptionProfile) -> str:
+    """Veritabanı kimliği + profil satırından blob anahtarı (DB sorgusu yok)."""
+    fingerprint = (
+        f"{database_identity(db)}|{profile.id}|{profile.version}|"
+        f"{profile.created_at}|{float(profile.total_kwh)!r}"
+    )
+    return f"{profile.id}_{hashlib.sha256(fingerprint.encode()).hexdigest()[:16]}"
+
+
+def _blob_path(db: Session, key: str) -> str:
+    return os.path.join(_store_dir(db), f"{key}.bin")
+
+
+def _remember(key: str, blob: bytes) -> None:
+    with _lock:
+        _blobs[key] = blob
+        _blobs.move_to_end(key)
+        while len(_blobs) > PRICING_CONSUMPTION_STORE_MAX_ENTRIES:
+            _blobs.popitem(last=False)
+
+
+def _write_blob(db: Session, key: str, blob: bytes) -> None:
+    """Blobu atomik olarak diske yaz. Yazılamazsa yalnız işlem içinde tutulur."""
+    directory = _store_dir(db)
+    try:
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=f".{key}_", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(blob)
+            os.replace(tmp_path, _blob_path(db, key))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    except OSError as e:
+        logger.warning(f"Tüketim blobu yazılamadı ({key}): {e}")
+
+
+def _read_blob(db: Session, key: str) -> bytes | None:
+    with _lock:
+        blob = _blobs.get(key)
+        if blob is not None:
+            _blobs.move_to_end(key)
+            return blob
+    try:
+        with open(_blob_path(db, key), "rb") as f:
+            blob = f.read()
+    except OSError:
+        return None
+    _remember(key, blob)
+    return blob
+
+
+def _query_records(db: Session, profile_id: int) -> list[ParsedConsumptionRecord]:
+    """Saatlik satırları (date, hour) sırasıyla oku — geçiş/yedek yolu."""
+    rows = (
+        db.query(
+            ConsumptionHourlyData.date,
+            ConsumptionHourlyData.hour,
+            ConsumptionHourlyData.consumption_kwh,
+        )
+        .filter(ConsumptionHourlyData.profile_id == profile_id)
+        .order_by(ConsumptionHourlyData.date, ConsumptionHourlyData.hour)
+        .all()
+    )
+    return [
+        ParsedConsumptionRecord(date=d, hour=int(h), consumption_kwh=float(k))
+        for d, h, k in rows
+    ]
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Public API
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _publish(db: Session, key: str, records: list[ParsedConsumptionRecord]) -> bool:
+    try:
+        blob = encode_consumption(records)
+    except ValueError as e:
+        logger.info(f"Tüketim blobu oluşturulmadı ({key}): {e}")
+        return False
+    _write_blob(db, key, blob)
+    _remember(key, blob)
+    return True
+
+
+def publish_consumption_blob(
+    db: Session,
+    profile: ConsumptionProfile,
+    records: list[ParsedConsumptionRecord],
+) -> bool:
+    """Commit edilmiş profilin blobunu yayınla (records satırlarla aynı olmalı).
+
+    Returns:
+        True → blob yazıldı; False → kayıtlar kompakt gösterime uymuyor
+        (okuyucular satırlardan okumaya devam eder).
+    """
+    return _publish(db, _blob_key(db, profile), records)
+
+
+def load_profile_records(
+    db: Session,
+    profile: ConsumptionProfile,
+) -> list[ParsedConsumptionRecord]:
+    """Profilin saatlik kayıtlarını (date, hour) sıralı getir.
+
+    Sıra: işlem içi önbellek → diskteki blob → satırlar (blob kurulur ve
+    yayınlanır). Blob varken DB'ye hiç gidilmez. Dönen liste her çağrıda
+    yenidir.
+    """
+    key = _blob_key(db, profile)
+    blob = _read_blob(db, key)
+    if blob is not None:
+        try:
+            return decode_consumption(blob).to_records()
+        except ValueError as e:
+            logger.warning(f"Bozuk tüketim blobu yok sayıldı ({key}): {e}")
+
+    records = _query_records(db, profile.id)
+    if records:
+        _publish(db, key, records)
+    return records
+
+
+def get_active_profile(
+    db: Session,
+    customer_id: str,
+    period: str,
+) -> ConsumptionProfile | None:
+    """Müşteri + dönem için aktif tüketim profili."""
+    return (
+        db.query(ConsumptionProfile)
+        .filter(
+            ConsumptionProfile.customer_id == customer_id,
+            ConsumptionProfile.period == period,
+            ConsumptionProfile.is_active == 1,
+        )
+        .first()
+    )
+
+
+def backfill_consumption_blobs(db: Session, batch_size: int = 500) -> int:
+    """Blobu olmayan aktif profilleri satırlardan dönüştür (geçiş aracı).
+
+    Returns:
+        Yeni yayınlanan blob sayısı.
+    """
+    published = 0
+    last_id = 0
+    while True:
+        profiles = (
+            db.query(ConsumptionProfile)
+            .filter(
+                ConsumptionProfile.is_active == 1,
+                ConsumptionProfile.id > last_id,
+            )
+            .order_by(ConsumptionProfile.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not profiles:
+            return published
+        for profile in profiles:
+            last_id = profile.id
+            key = _blob_key(db, profile)
+            if os.path.exists(_blob_path(db, key)):
+                continue
+            records = _query_records(db, profile.id)
+            if records and _publish(db, key, records):
+                published += 1
+
+
+def clear_consumption_store() -> None:
+    """İşlem içi önbelleği temizle (diskteki bloblar profil anahtarı ile korunur)."""
+    with _lock:
+        _blobs.clear()
@@ -0,0 +1,372 @@
+"""
+Pricing Risk Engine — EPİAŞ Saatlik Piyasa Verisi Alımı.
+
+Saatlik PTF/SMF verisi EPİAŞ Şeffaflık API'sinden doğrudan
+hourly_market_prices tablosuna alınır (Excel yüklemesine alternatif):
+
+1. Dönemin aktif satırları okunur; beklenen (date, hour) slotlarından
+   eksik olanlar bulunur (yarından sonraki günler henüz yayımlanmadığı
+   için istenmez)
+2. Eksik günler ardışık, en fazla EPIAS_INGEST_CHUNK_DAYS günlük aralıklara
+   bölünür; her aralık için PTF ve SMF eşzamanlı çekilir (istemcinin hız
+   sınırı / disk önbelleği geçerlidir)
+3. Tek işlemde: eski versiyon arşivlenir, mevcut satırlar + yeni saatler
+   yeni versiyon olarak toplu yazılır, data_versions kaydı yazılır; dönem
+   tamamlandıysa aylık PTF ortalaması (market_reference_prices) güncellenir
+4. Commit sonrası paylaşımlı piyasa segmenti ve dönem PTF özeti
+   (ptf_aggregates) yeniden kurulur
+
+İstemci: get_hourly_ptf / get_hourly_smf sunan herhangi bir nesne
+(EpiasClient, MockEpiasClient veya test stub'ı).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import calendar
+import logging
+import os
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Any, Iterable, Optional
+
+from sqlalchemy.orm import Session
+
+from .bulk_writer import archive_data_versions, archive_market_period, bulk_insert_rows
+from .excel_parser import _calculate_market_quality_score, expected_hours_for_period
+from .market_store import rebuild_market_segment
+from .ptf_aggregates import refresh_ptf_aggregate
+from .schemas import DataVersion, HourlyMarketPrice
+
+logger = logging.getLogger(__name__)
+
+# Tek EPİAŞ çağrısının kapsadığı azami gün sayısı
+EPIAS_INGEST_CHUNK_DAYS = int(os.getenv("EPIAS_INGEST_CHUNK_DAYS", "7"))
+
+EPIAS_INGEST_SOURCE = "epias_api"
+
+# eptr2 kayıtlarındaki fiyat alanı adayları (ilk dolu olan kullanılır)
+PTF_KEYS = ("price", "mcp", "ptf")
+SMF_KEYS = ("systemMarginalPrice", "smp", "smf", "price")
+
+Slot = tuple[str, int]  # (YYYY-MM-DD, 0–23)
+
+
+@dataclass
+class HourlyIngestResult:
+    """Tek dönemlik alım sonucu. version None → yeni versiyon yazılmadı."""
+    period: str
+    version: Optional[int]
+    requested_slots: int                 # EPİAŞ'tan istenen eksik saat
+    inserted_slots: int                  # EPİAŞ'tan gelip yazılan saat
+    carried_rows: int                    # Önceki versiyondan taşınan satır
+    total_rows: int                      # Aktif versiyondaki satır sayısı
+    expected_hours: int
+    missing_hours: int                   # Dönemde hâlâ eksik saat
+    quality_score: Optional[int] = None
+    ptf_average_tl_per_mwh: Optional[float] = None  # Aylık özet güncellendiyse
+    ranges: list[tuple[str, str]] = field(default_factory=list)
+    warnings: list[str] = field(default_factory=list)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Slot / Aralık Yardımcıları
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+def expected_slots(period: str, until: Optional[date] = None) -> list[Slot]:
+    """Dönemin (date, hour) slotları — until sonrası günler hariç."""
+    year, month = int(period[:4]), int(period[5:7])
+    days = calendar.monthrange(year, month)[1]
+    slots: list[Slot] = []
+    for day in range(1, days + 1):
+        current = date(year, month, day)
+        if until is not None and current > until:
+            break
+        iso = current.isoformat()
+        slots.extend((iso, hour) for hour in range(24))
+    return slots
+
+
+def chunk_ranges(dates: Iterable[str], chunk_days: int = EPIAS_INGEST_CHUNK_DAYS) -> list[tuple[str, str]]:
+    """Günleri ardışık, en fazla chunk_days günlük [start, end] aralıklarına böl."""
+    chunk_days = max(1, chunk_days)
+    ranges: list[tuple[str, str]] = []
+    start = prev = None
+    length = 0
+    for current in sorted({date.fromisoformat(d) for d in dates}):
+        if start is not None and current == prev + timedelta(days=1) and length < chunk_days:
+            prev = current
+            length += 1
+            continue
+        if start is not None:
+            ranges.append((start.isoformat(), prev.isoformat()))
+        start = prev = current
+        length = 1
+    if start is not None:
+        ranges.append((start.isoformat(), prev.isoformat()))
+    return ranges
+
+
+def slot_of(item: dict[str, Any]) -> Optional[Slot]:
+    """eptr2 kaydının (date, hour) slotu.
+
+    date alanı ISO zaman damgası ("2025-01-01T05:00:00+03:00"), pandas
+    Timestamp ya da yalnız tarih olabilir; saat damgada yoksa "hour"
+    ("05:00" veya 5) alanından okunur.
+    """
+    raw = item.get("date")
+    if raw is None:
+        return None
+    if hasattr(raw, "strftime"):
+        day = raw.strftime("%Y-%m-%d")
+        hour = getattr(raw, "hour", None)
+    else:
+        text = str(raw)
+        day = text[:10]
+        hour = int(text[11:13]) if len(text) >= 13 and text[10] in "T " else None
+    if hour is None:
+        hour_raw = item.get("hour")
+        if hour_raw is None:
+            return None
+        hour = int(str(hour_raw).split(":")[0])
+    return day, int(hour)
+
+
+def parse_hourly(items: Iterable[dict[str, Any]], keys: tuple[str, ...]) -> dict[Slot, float]:
+    """eptr2 kayıtlarını {slot: fiyat} sözlüğüne çevir; okunamayanlar atlanır."""
+    values: dict[Slot, float] = {}
+    for item in items:
+        slot = slot_of(item)
+        if slot is None:
+            continue
+        for key in keys:
+            value = item.get(key)
+            if value is not None:
+                try:
+                    values[slot] = float(value)
+                except (TypeError, ValueError):
+                    pass
+                break
+    return values
+
+
+async def fetch_hourly_prices(client, ranges: list[tuple[str, str]]) -> dict[Slot, tuple[float, float]]:
+    """Aralıkların PTF/SMF değerlerini eşzamanlı çek → {slot: (ptf, smf)}.
+
+    Yalnız iki fiyatı da gelen slotlar döner (SMF PTF'den geç yayımlanır;
+    eksik kalan saat bir sonraki alımda yeniden istenir).
+    """
+    async def _fetch(start: str, end: str):
+        return await asyncio.gather(
+            client.get_hourly_ptf(start, end),
+            client.get_hourly_smf(start, end),
+        )
+
+    responses = await asyncio.gather(*(_fetch(start, end) for start, end in ranges))
+    prices: dict[Slot, tuple[float, float]] = {}
+    for ptf_items, smf_items in responses:
+        ptf = parse_hourly(ptf_items, PTF_KEYS)
+        smf = parse_hourly(smf_items, SMF_KEYS)
+        for slot, value in ptf.items():
+            if slot in smf:
+                prices[slot] = (value, smf[slot])
+    return prices
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Alım
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+def _active_rows(db: Session, period: str) -> list[dict]:
+    """Aktif saatlik satırlar — bulk_insert_rows sütun sırasında."""
+    rows = (
+        db.query(
+            HourlyMarketPrice.date,
+            HourlyMarketPrice.hour,
+            HourlyMarketPrice.ptf_tl_per_mwh,
+            HourlyMarketPrice.smf_tl_per_mwh,
+            HourlyMarketPrice.source,
+        )
+        .filter(
+            HourlyMarketPrice.period == period,
+            HourlyMarketPrice.is_active == 1,
+        )
+        .order_by(HourlyMarketPrice.date, HourlyMarketPrice.hour, HourlyMarketPrice.id)
+        .all()
+    )
+    # Aynı slotta birden fazla aktif satır varsa sonuncusu geçerli
+    by_slot: dict[Slot, dict] = {}
+    for d, h, ptf, smf, source in rows:
+        by_slot[(d, int(h))] = _row(period, d, int(h), ptf, smf, source)
+    return list(by_slot.values())
+
+
+def _row(period: str, day: str, hour: int, ptf: float, smf: float, source: str) -> dict:
+    return {
+        "period": period,
+        "date": day,
+        "hour": hour,
+        "ptf_tl_per_mwh": float(ptf),
+        "smf_tl_per_mwh": float(smf),
+        "source": source,
+    }
+
+
+def _refresh_period_aggregate(db: Session, period: str, rows: list[dict], warnings: list[str]) -> Optional[float]:
+    """Aylık PTF ortalamasını market_reference_prices'a yaz (commit ETMEZ).
+
+    Ortalama EpiasClient.get_monthly_ptf_average ile aynı: basit aritmetik
+    ortalama, 2 ondalık. Kilitli dönem ve guardrail hatası uyarıya dönüşür.
+    """
+    from ..market_prices import get_market_prices, upsert_market_prices
+    from .yekdem_service import get_yekdem
+
+    prices = [r["ptf_tl_per_mwh"] for r in rows]
+    average = round(sum(prices) / len(prices), 2)
+
+    existing = get_market_prices(db, period)
+    if existing is not None and existing.is_locked:
+        warnings.append(f"Dönem {period} kilitli, aylık PTF özeti güncellenmedi")
+        return None
+    if existing is not None:
+        yekdem = existing.yekdem_tl_per_mwh
+    else:
+        yekdem_record = get_yekdem(db, period)
+        yekdem = yekdem_record.yekdem_tl_per_mwh if yekdem_record else 0.0
+
+    success, msg = upsert_market_prices(
+        db=db,
+        period=period,
+        ptf_tl_per_mwh=average,
+        yekdem_tl_per_mwh=yekdem,
+        source_note=f"EPİAŞ API saatlik ({len(prices)} saat)",
+        updated_by="epias_ingest",
+        source=EPIAS_INGEST_SOURCE,
+        commit=False,
+    )
+    if not success:
+        warnings.append(f"Aylık PTF özeti yazılamadı: {msg}")
+        return None
+    return average
+
+
+async def ingest_hourly_market_data(
+    db: Session,
+    period: str,
+    client,
+    until: Optional[date] = None,
+    chunk_days: int = EPIAS_INGEST_CHUNK_DAYS,
+    refresh_aggregates: bool = True,
+) -> HourlyIngestResult:
+    """Dönemin eksik saatlerini EPİAŞ'tan al ve yeni versiyon olarak yaz.
+
+    Args:
+        db: SQLAlchemy session.
+        period: Dönem (YYYY-MM).
+        client: get_hourly_ptf / get_hourly_smf sunan EPİAŞ istemcisi.
+        until: Bu tarihten sonraki günler istenmez (None → yarın; gün öncesi
+            PTF yarın için yayımlanır).
+        chunk_days: Tek çağrının kapsadığı azami gün.
+        refresh_aggregates: Dönem tamamlandıysa aylık PTF özetini güncelle.
+
+    Returns:
+        HourlyIngestResult — eksik saat yoksa veya EPİAŞ yeni veri
+        döndürmediyse version=None, DB'ye yazılmaz.
+
+    Raises:
+        ValueError: Geçersiz dönem formatı.
+        EpiasApiError / EpiasAuthError: İstemci hataları (işlem açılmadan).
+    """
+    exp_hours = expected_hours_for_period(period)
+    if until is None:
+        until = date.today() + timedelta(days=1)
+
+    existing = _active_rows(db, period)
+    have = {(r["date"], r["hour"]) for r in existing}
+    wanted = [slot for slot in expected_slots(period, until) if slot not in have]
+
+    result = HourlyIngestResult(
+        period=period,
+        version=None,
+        requested_slots=len(wanted),
+        inserted_slots=0,
+        carried_rows=0,
+        total_rows=len(existing),
+        expected_hours=exp_hours,
+        missing_hours=exp_hours - len(existing),
+    )
+    if not wanted:
+        return result
+
+    result.ranges = chunk_ranges((day for day, _ in wanted), chunk_days)
+    fetched = await fetch_hourly_prices(client, result.ranges)
+
+    new_rows = [
+        _row(period, day, hour, *fetched[(day, hour)], EPIAS_INGEST_SOURCE)
+        for day, hour in wanted
+        if (day, hour) in fetched
+    ]
+    if len(new_rows) < len(wanted):
+        result.warnings.append(
+            f"{len(wanted) - len(new_rows)} saat için EPİAŞ PTF/SMF döndürmedi"
+        )
+    if not new_rows:
+        return result
+
+    rows = sorted(existing + new_rows, key=lambda r: (r["date"], r["hour"]))
+    missing = exp_hours - len(rows)
+    quality_score = _calculate_market_quality_score(
+        total_valid=len(rows),
+        expected_hours=exp_hours,
+        missing_count=missing,
+        rejected_count=0,
+        duplicate_count=0,
+    )
+
+    try:
+        _, max_version = archive_market_period(db, period)
+        version = max_version + 1
+        for row in rows:
+            row["version"] = version
+            row["is_active"] = 1
+        bulk_insert_rows(db, HourlyMarketPrice.__table__, rows)
+
+        archive_data_versions(db, "market_data", period, None)
+        db.add(DataVersion(
+            data_type="market_data",
+            period=period,
+            version=version,
+            uploaded_by="epias_ingest",
+            row_count=len(rows),
+            quality_score=quality_score,
+            is_active=1,
+        ))
+
+        if refresh_aggregates and missing == 0:
+            result.ptf_average_tl_per_mwh = _refresh_period_aggregate(
+                db, period, rows, result.warnings,
+            )
+
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    # Paylaşımlı piyasa segmentini ve dönem PTF özetini yeni versiyonla yeniden kur
+    rebuild_market_segment(db, period)
+    refresh_ptf_aggregate(db, period)
+
+    result.version = version
+    result.inserted_slots = len(new_rows)
+    result.carried_rows = len(existing)
+    result.total_rows = len(rows)
+    result.missing_hours = missing
+    result.quality_score = quality_score
+
+    logger.info(
+        "EPİAŞ saatlik alım: period=%s, v=%d, yeni=%d, taşınan=%d, eksik=%d",
+        period, version, len(new_rows), len(existing), missing,
+    )
+    return result
@@ -4,23 +4,62 @@ Pricing Risk Engine — Excel Dışa Aktarma (Formatter).
 Saatlik piyasa verilerini ve tüketim profillerini EPİAŞ-uyumlu
 Excel formatına geri yazar. Round-trip özelliği için kritik bileşen.
 
+Çalışma kitapları write-only üretilir (tabular_export); aynı tablolar
+CSV ve Parquet olarak da dışa aktarılabilir. Kayıtlar iterable olabilir →
+çok dönemli dışa aktarmada dönemler sırayla akıtılır.
+
 Requirements: 1.7, 1.8, 4.5, 4.6
 """
 
 from __future__ import annotations
 
-import io
 from datetime import datetime
-
-from openpyxl import Workbook
+from typing import IO, Iterable
 
 from .excel_parser import ParsedMarketRecord, ParsedConsumptionRecord
+from .models import ExportFormat
+from .tabular_export import ExportColumn, ExportTable, export_table, read_spooled
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # Piyasa Verisi Excel Dışa Aktarma
 # ═══════════════════════════════════════════════════════════════════════════════
 
+MARKET_DATA_COLUMNS = (
+    ExportColumn("Tarih", "timestamp", "datetime", number_format="DD.MM.YYYY HH:MM"),
+    ExportColumn("Bölge", "region"),
+    ExportColumn("PTF (TL/MWh)", "ptf_tl_per_mwh", "float"),
+    ExportColumn("SMF (TL/MWh)", "smf_tl_per_mwh", "float"),
+)
+
+
+def market_data_table(records: Iterable[ParsedMarketRecord]) -> ExportTable:
+    """Piyasa kayıtları → dışa aktarma tablosu (tarih + saat tek datetime)."""
+    return ExportTable(
+        title="Uzlaştırma Dönemi Detayı",
+        columns=MARKET_DATA_COLUMNS,
+        rows=(
+            (
+                datetime.fromisoformat(rec.date).replace(hour=rec.hour),
+                "TR1", rec.ptf_tl_per_mwh, rec.smf_tl_per_mwh,
+            )
+            for rec in records
+        ),
+    )
+
+
+def export_market_data(
+    records: Iterable[ParsedMarketRecord],
+    period: str,
+    fmt: ExportFormat = ExportFormat.XLSX,
+) -> IO[bytes]:
+    """Saatlik piyasa verilerini istenen formatta spool'a yaz.
+
+    Returns:
+        Başa sarılmış SpooledTemporaryFile (çağıran kapatır).
+    """
+    return export_table(market_data_table(records), fmt)
+
 
 def export_market_data_to_excel(
     records: list[ParsedMarketRecord],
@@ -39,33 +78,46 @@ def export_market_data_to_excel(
         period: Dönem (YYYY-MM) — dosya adı/metadata için.
 
     Returns:
-        Excel dosyasının byte içeriği (BytesIO).
+        Excel dosyasının byte içeriği.
     """
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Uzlaştırma Dönemi Detayı"
+    return read_spooled(export_market_data(records, period))
 
-    # Header satırı
-    ws.append(["Tarih", "Bölge", "PTF (TL/MWh)", "SMF (TL/MWh)"])
 
-    # Veri satırları — tarih + saat bilgisini datetime olarak yaz
-    for rec in records:
-        dt = datetime.strptime(f"{rec.date} {rec.hour:02d}:00:00", "%Y-%m-%d %H:%M:%S")
-        ws.append([dt, "TR1", rec.ptf_tl_per_mwh, rec.smf_tl_per_mwh])
+# ═══════════════════════════════════════════════════════════════════════════════
+# Tüketim Verisi Excel Dışa Aktarma
+# ═══════════════════════════════════════════════════════════════════════════════
 
-    # Tarih sütunu formatı
-    for row_idx in range(2, len(records) + 2):
-        ws.cell(row=row_idx, column=1).number_format = "DD.MM.YYYY HH:MM"
+CONSUMPTION_COLUMNS = (
+    ExportColumn("Tarih", "date", "datetime", number_format="DD.MM.YYYY"),
+    ExportColumn("Saat", "hour", "int"),
+    ExportColumn("Tüketim (kWh)", "consumption_kwh", "float"),
+)
 
-    buf = io.BytesIO()
-    wb.save(buf)
-    buf.seek(0)
-    return buf.read()
 
+def consumption_table(records: Iterable[ParsedConsumptionRecord]) -> ExportTable:
+    """Tüketim kayıtları → dışa aktarma tablosu."""
+    return ExportTable(
+        title="Tüketim Verisi",
+        columns=CONSUMPTION_COLUMNS,
+        # Tarih'i datetime olarak yaz (parser her iki formatı da destekler)
+        rows=(
+            (datetime.fromisoformat(rec.date), rec.hour, rec.consumption_kwh)
+            for rec in records
+        ),
+    )
 
-# ═══════════════════════════════════════════════════════════════════════════════
-# Tüketim Verisi Excel Dışa Aktarma
-# ═══════════════════════════════════════════════════════════════════════════════
+
+def export_consumption(
+    records: Iterable[ParsedConsumptionRecord],
+    period: str,
+    fmt: ExportFormat = ExportFormat.XLSX,
+) -> IO[bytes]:
+    """Tüketim profilini istenen formatta spool'a yaz.
+
+    Returns:
+        Başa sarılmış SpooledTemporaryFile (çağıran kapatır).
+    """
+    return export_table(consumption_table(records), fmt)
 
 
 def export_consumption_to_excel(
@@ -84,26 +136,6 @@ def export_consumption_to_excel(
         period: Dönem (YYYY-MM) — dosya adı/metadata için.
 
     Returns:
-        Excel dosyasının byte içeriği (BytesIO).
+        Excel dosyasının byte içeriği.
     """
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Tüketim Verisi"
-
-    # Header satırı
-    ws.append(["Tarih", "Saat", "Tüketim (kWh)"])
-
-    # Veri satırları
-    for rec in records:
-        # Tarih'i datetime olarak yaz (parser her iki formatı da destekler)
-        dt = datetime.strptime(rec.date, "%Y-%m-%d")
-        ws.append([dt, rec.hour, rec.consumption_kwh])
-
-    # Tarih sütunu formatı
-    for row_idx in range(2, len(records) + 2):
-        ws.cell(row=row_idx, column=1).number_format = "DD.MM.YYYY"
-
-    buf = io.BytesIO()
-    wb.save(buf)
-    buf.seek(0)
-    return buf.read()
+    return read_spooled(export_consumption(records, period))
@@ -13,6 +13,11 @@ Desteklenen EPİAŞ Excel formatı (Uzlaştırma Dönemi Detayı):
 - Sütun E: SMF (TL / MWh) — int veya float
 - Saat bilgisi Tarih sütunundaki datetime.hour'dan çıkarılır.
 
+Okuma motoru çağrı başına seçilir (engine=):
+- "openpyxl": load_workbook(read_only=True) — varsayılan
+- "iterparse": sheet XML'ini byte'lardan akışla okur (xlsx_stream) — aynı
+  kayıtlar ve kalite skoru, büyük dosyalarda daha hızlı ve az bellek
+
 Requirements: 1.1, 1.2, 1.3, 1.4, 1.5, 2.4, 4.1, 4.3, 4.4, 18.1, 18.2, 18.3, 18.4
 """
 
@@ -21,14 +26,16 @@ from __future__ import annotations
 import calendar
 import io
 import logging
+import os
 import re
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Optional
+from typing import Iterator, Optional
 
 from openpyxl import load_workbook
 
 from .models import ExcelParseResult, ConsumptionParseResult
+from .xlsx_stream import StreamingWorkbook
 
 logger = logging.getLogger(__name__)
 
@@ -38,6 +45,10 @@ logger = logging.getLogger(__name__)
 
 _PERIOD_RE = re.compile(r"^\d{4}-(0[1-9]|1[0-2])$")
 
+# Excel okuma motorları; varsayılan env var ile değiştirilebilir
+EXCEL_ENGINES = ("openpyxl", "iterparse")
+PRICING_EXCEL_ENGINE = os.getenv("PRICING_EXCEL_ENGINE", "openpyxl")
+
 # PTF/SMF değer aralığı
 _PTF_MIN = 0.0
 _PTF_MAX = 50_000.0
@@ -185,6 +196,75 @@ def _match_column(header_text: str, keywords: dict[str, str]) -> Optional[str]:
     return None
 
 
+# ═══════════════════════════════════════════════════════════════════════════════
+# Excel okuma motorları
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+class _OpenpyxlWorkbook:
+    """openpyxl read-only çalışma kitabı — StreamingWorkbook ile aynı arayüz."""
+
+    def __init__(self, file_bytes: bytes) -> None:
+        self._wb = load_workbook(
+            filename=io.BytesIO(file_bytes),
+            read_only=True,
+            data_only=True,
+        )
+        self.sheetnames: list[str] = self._wb.sheetnames
+
+    def close(self) -> None:
+        self._wb.close()
+
+    def iter_rows(
+        self,
+        sheet_name: str,
+        min_row: int = 1,
+        max_row: Optional[int] = None,
+    ) -> Iterator[tuple]:
+        return self._wb[sheet_name].iter_rows(
+            min_row=min_row, max_row=max_row, values_only=True,
+        )
+
+
+def _resolve_engine(engine: Optional[str]) -> str:
+    """Motor adını doğrula; None → PRICING_EXCEL_ENGINE."""
+    resolved = engine or PRICING_EXCEL_ENGINE
+    if resolved not in EXCEL_ENGINES:
+        raise ValueError(
+            f"Geçersiz Excel motoru: '{resolved}'. "
+            f"Beklenen: {', '.join(EXCEL_ENGINES)}"
+        )
+    return resolved
+
+
+def _open_workbook(file_bytes: bytes, engine: str):
+    """Seçilen motorla çalışma kitabını aç (sheetnames, iter_rows, close)."""
+    if engine == "iterparse":
+        return StreamingWorkbook(file_bytes)
+    return _OpenpyxlWorkbook(file_bytes)
+
+
+def _find_header_row(
+    wb,
+    sheet_name: str,
+    keywords: dict[str, str],
+    required: tuple[str, str],
+) -> tuple[Optional[int], dict[str, int]]:
+    """İlk 20 satırda header ara → (1-tabanlı satır no, mantıksal ad → 0-tabanlı sütun)."""
+    for row_idx, row in enumerate(wb.iter_rows(sheet_name, min_row=1, max_row=20), start=1):
+        temp_map: dict[str, int] = {}
+        for col_idx, value in enumerate(row):
+            if value is None:
+                continue
+            logical = _match_column(str(value), keywords)
+            if logical and logical not in temp_map:
+                temp_map[logical] = col_idx
+
+        if all(name in temp_map for name in required):
+            return row_idx, temp_map
+    return None, {}
+
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # EPİAŞ Excel Parser
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -193,6 +273,7 @@ def _match_column(header_text: str, keywords: dict[str, str]) -> Optional[str]:
 def parse_epias_excel(
     file_bytes: bytes,
     filename: str,
+    engine: Optional[str] = None,
 ) -> EpiasParseOutput:
     """EPİAŞ uzlaştırma Excel dosyasını ayrıştır.
 
@@ -205,21 +286,22 @@ def parse_epias_excel(
     Args:
         file_bytes: Excel dosyasının byte içeriği.
         filename: Orijinal dosya adı (loglama için).
+        engine: "openpyxl" veya "iterparse"; None → PRICING_EXCEL_ENGINE.
 
     Returns:
         EpiasParseOutput: result (ExcelParseResult) + records listesi.
+
+    Raises:
+        ValueError: Geçersiz motor adı.
     """
+    engine = _resolve_engine(engine)
     warnings: list[str] = []
     rejected_rows: list[dict] = []
     records: list[ParsedMarketRecord] = []
 
     # ── 1. Excel dosyasını aç ──────────────────────────────────────────────
     try:
-        wb = load_workbook(
-            filename=io.BytesIO(file_bytes),
-            read_only=True,
-            data_only=True,
-        )
+        wb = _open_workbook(file_bytes, engine)
     except Exception as exc:
         logger.error("Excel dosyası açılamadı: %s — %s", filename, exc)
         return EpiasParseOutput(
@@ -242,37 +324,24 @@ def parse_epias_excel(
         "uzlaştırma",
         "uzlastirma",
     ]
-    ws = None
+    sheet_name: Optional[str] = None
     for sn in wb.sheetnames:
         if sn.strip().lower() in target_sheet_names:
-            ws = wb[sn]
+            sheet_name = sn
             break
-    if ws is None:
+    if sheet_name is None:
         # İlk sheet'i kullan
-        ws = wb[wb.sheetnames[0]]
+        sheet_name = wb.sheetnames[0]
         warnings.append(
             f"'Uzlaştırma Dönemi Detayı' sheet'i bulunamadı, "
             f"ilk sheet kullanılıyor: '{wb.sheetnames[0]}'"
         )
 
     # ── 3. Header satırını bul ─────────────────────────────────────────────
-    col_map: dict[str, int] = {}  # logical_name → column index (0-based)
-    header_row_idx: Optional[int] = None
-
-    for row_idx, row in enumerate(ws.iter_rows(min_row=1, max_row=20, values_only=False), start=1):
-        temp_map: dict[str, int] = {}
-        for cell in row:
-            if cell.value is None:
-                continue
-            logical = _match_column(str(cell.value), _EPIAS_HEADER_KEYWORDS)
-            if logical and logical not in temp_map:
-                temp_map[logical] = cell.column - 1  # 0-based
-
-        # En az Tarih ve PTF bulunmalı
-        if "tarih" in temp_map and "ptf" in temp_map:
-            col_map = temp_map
-            header_row_idx = row_idx
-            break
+    # En az Tarih ve PTF bulunmalı; col_map: logical_name → column index (0-based)
+    header_row_idx, col_map = _find_header_row(
+        wb, sheet_name, _EPIAS_HEADER_KEYWORDS, ("tarih", "ptf"),
+    )
 
     if header_row_idx is None:
         wb.close()
@@ -307,7 +376,7 @@ def parse_epias_excel(
     seen_date_hours: dict[str, int] = {}  # "YYYY-MM-DD_HH" → count
     row_number = header_row_idx  # data starts after header
 
-    for row in ws.iter_rows(min_row=header_row_idx + 1, values_only=True):
+    for row in wb.iter_rows(sheet_name, min_row=header_row_idx + 1):
         row_number += 1
 
         # Boş satır kontrolü
@@ -530,6 +599,7 @@ def parse_consumption_excel(
     file_bytes: bytes,
     filename: str,
     customer_id: str,
+    engine: Optional[str] = None,
 ) -> ConsumptionParseOutput:
     """Müşteri tüketim Excel dosyasını ayrıştır.
 
@@ -541,21 +611,22 @@ def parse_consumption_excel(
         file_bytes: Excel dosyasının byte içeriği.
         filename: Orijinal dosya adı (loglama için).
         customer_id: Müşteri kimliği.
+        engine: "openpyxl" veya "iterparse"; None → PRICING_EXCEL_ENGINE.
 
     Returns:
         ConsumptionParseOutput: result (ConsumptionParseResult) + records listesi.
+
+    Raises:
+        ValueError: Geçersiz motor adı.
     """
+    engine = _resolve_engine(engine)
     warnings: list[str] = []
     records: list[ParsedConsumptionRecord] = []
     negative_hours: list[int] = []
 
     # ── 1. Excel dosyasını aç ──────────────────────────────────────────────
     try:
-        wb = load_workbook(
-            filename=io.BytesIO(file_bytes),
-            read_only=True,
-            data_only=True,
-        )
+        wb = _open_workbook(file_bytes, engine)
     except Exception as exc:
         logger.error("Tüketim Excel dosyası açılamadı: %s — %s", filename, exc)
         return ConsumptionParseOutput(
@@ -571,26 +642,13 @@ def parse_consumption_excel(
         )
 
     # İlk sheet'i kullan
-    ws = wb[wb.sheetnames[0]]
+    sheet_name = wb.sheetnames[0]
 
     # ── 2. Header satırını bul ─────────────────────────────────────────────
-    col_map: dict[str, int] = {}
-    header_row_idx: Optional[int] = None
-
-    for row_idx, row in enumerate(ws.iter_rows(min_row=1, max_row=20, values_only=False), start=1):
-        temp_map: dict[str, int] = {}
-        for cell in row:
-            if cell.value is None:
-                continue
-            logical = _match_column(str(cell.value), _CONSUMPTION_HEADER_KEYWORDS)
-            if logical and logical not in temp_map:
-                temp_map[logical] = cell.column - 1  # 0-based
-
-        # En az Tarih ve Tüketim bulunmalı
-        if "tarih" in temp_map and "tuketim" in temp_map:
-            col_map = temp_map
-            header_row_idx = row_idx
-            break
+    # En az Tarih ve Tüketim bulunmalı
+    header_row_idx, col_map = _find_header_row(
+        wb, sheet_name, _CONSUMPTION_HEADER_KEYWORDS, ("tarih", "tuketim"),
+    )
 
     if header_row_idx is None:
         wb.close()
@@ -614,7 +672,7 @@ def parse_consumption_excel(
     row_number = header_row_idx
     record_index = 0
 
-    for row in ws.iter_rows(min_row=header_row_idx + 1, values_only=True):
+    for row in wb.iter_rows(sheet_name, min_row=header_row_idx + 1):
         row_number += 1
 
         if row is None or all(c is None for c in row):
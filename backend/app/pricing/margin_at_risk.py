@@ -0,0 +1,412 @@
+"""
+Pricing Risk Engine — Monte Carlo Marj Riski (Margin-at-Risk).
+
+risk_calculator ve margin_reality tek bir gerçekleşmiş PTF yolunu inceler.
+Bu modül teklif katsayısı için net marj DAĞILIMINI üretir:
+
+- Fiyat yolu: hourly_market_prices geçmişinden gün şekilleri (24 saatlik
+  PTF/SMF, kaynak dönemin ortalama PTF'sine normalize) gün tipine göre
+  blok bootstrap ile yeniden örneklenir (hafta içi / Cumartesi / Pazar;
+  aynı tipteki ardışık günler blok halinde taşınır)
+- Fiyat seviyesi: referans dönem ortalama PTF × yol başına lognormal şok
+- Tüketim: saatlik profil × saat başına lognormal gürültü (ortalama 1)
+- Marj: summarize_cost_totals ile aynı formüller (dağıtım hariç,
+  bayi payı sınırlı, dengesizlik calculate_imbalance_cost + RISK_FLOOR)
+
+Hesap yol × saat matrisleri üzerinde vektörel yapılır; yollar sabit
+boyutlu parçalara bölünür ve her parçanın tohumu SeedSequence.spawn ile
+türetilir → sonuç worker sayısından bağımsız, aynı tohumla tekrar üretilebilir.
+Büyük koşular "spawn" bağlamlı süreç havuzunda parçalanır (bkz. pool_utils).
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import os
+from dataclasses import dataclass
+from datetime import date
+from typing import Iterable, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from .market_store import MarketSegment, get_market_segment
+from .models import ImbalanceParams, MarginAtRiskResult
+from .pool_utils import iter_ordered_results
+from .pricing_engine import RISK_FLOOR, CostBasis
+
+logger = logging.getLogger(__name__)
+
+# İstek başına yol üst sınırı
+PRICING_MAR_MAX_PATHS = int(os.getenv("PRICING_MAR_MAX_PATHS", "100000"))
+# Havuz boyutu: env var veya min(4, CPU)
+PRICING_MAR_MAX_WORKERS = int(
+    os.getenv("PRICING_MAR_MAX_WORKERS", str(min(4, os.cpu_count() or 1)))
+)
+# Bu sayının altındaki koşular süreç başlatma maliyetine değmez → aynı süreçte
+PRICING_MAR_MIN_POOL_PATHS = int(os.getenv("PRICING_MAR_MIN_POOL_PATHS", "50000"))
+
+# Parça başına yol sayısı (yol × saat float64: 1024 × 744 × 8B ≈ 6 MB / dizi).
+# Tohum ayrıştırması bu boyuta bağlıdır — değiştirmek sonuçları değiştirir.
+_PATH_CHUNK = 1024
+
+# Gün tipi kodları
+WEEKDAY, SATURDAY, SUNDAY = 0, 1, 2
+
+# Raporlanan yüzdelikler
+_REPORTED_PERCENTILES = (1, 5, 10, 25, 50, 75, 90, 95, 99)
+
+
+def day_type_code(day: date) -> int:
+    """Gün tipi: 0 = hafta içi, 1 = Cumartesi, 2 = Pazar.
+
+    Resmi tatil takvimi repoda tutulmadığından tatiller hafta içi sayılır.
+    """
+    weekday = day.weekday()
+    if weekday == 5:
+        return SATURDAY
+    if weekday == 6:
+        return SUNDAY
+    return WEEKDAY
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Gün Şekli Kütüphanesi
+# ═══════════════════════════════════════════════════════════════════════════════
+
+@dataclass(frozen=True)
+class DayShapeLibrary:
+    """Geçmiş günlerin normalize saatlik fiyat şekilleri — kronolojik sıralı.
+
+    ptf/smf: (gün, 24) — saatlik fiyat / kaynak dönemin ortalama PTF'si.
+    """
+    ptf: np.ndarray
+    smf: np.ndarray
+    day_type: np.ndarray   # (gün,) int8
+    periods: tuple[str, ...]
+
+    @property
+    def n_days(self) -> int:
+        return int(self.ptf.shape[0])
+
+
+def build_shape_library(segments: Iterable[MarketSegment]) -> DayShapeLibrary:
+    """Piyasa segmentlerinden gün şekli kütüphanesi kur.
+
+    Yalnızca 24 saati eksiksiz günler alınır; ortalama PTF'si pozitif
+    olmayan dönemler normalize edilemediği için atlanır.
+    """
+    ptf_days: list[np.ndarray] = []
+    smf_days: list[np.ndarray] = []
+    day_types: list[int] = []
+    periods: list[str] = []
+
+    for segment in segments:
+        rows = segment.rows
+        if rows.shape[0] == 0:
+            continue
+        level = float(np.mean(rows["ptf"]))
+        if not level > 0:
+            continue
+
+        dates = rows["date"]
+        used = False
+        for day in np.unique(dates).tolist():
+            day_rows = rows[dates == day]
+            hours = day_rows["hour"].astype(np.int64)
+            if np.unique(hours).size != 24 or hours.min() < 0 or hours.max() > 23:
+                continue
+            ptf = np.empty(24)
+            smf = np.empty(24)
+            # Yinelenen saatte son kayıt geçerli (PeriodFrame ile aynı)
+            ptf[hours] = day_rows["ptf"]
+            smf[hours] = day_rows["smf"]
+            ptf_days.append(ptf / level)
+            smf_days.append(smf / level)
+            day_types.append(day_type_code(date.fromisoformat(day)))
+            used = True
+        if used:
+            periods.append(segment.period)
+
+    if not ptf_days:
+        empty = np.empty((0, 24))
+        return DayShapeLibrary(empty, empty, np.empty(0, dtype=np.int8), ())
+    return DayShapeLibrary(
+        ptf=np.vstack(ptf_days),
+        smf=np.vstack(smf_days),
+        day_type=np.array(day_types, dtype=np.int8),
+        periods=tuple(periods),
+    )
+
+
+def history_periods(period: str, months: int) -> list[str]:
+    """Dönem dahil geriye doğru `months` adet dönem (eskiden yeniye)."""
+    year, month = int(period[:4]), int(period[5:7])
+    index = year * 12 + (month - 1)
+    return [
+        f"{i // 12:04d}-{i % 12 + 1:02d}"
+        for i in range(index - months + 1, index + 1)
+    ]
+
+
+def load_shape_library(db: Session, period: str, months: int) -> DayShapeLibrary:
+    """Son `months` dönemin (hedef dahil) aktif piyasa verisinden kütüphane kur."""
+    return build_shape_library(
+        get_market_segment(db, p) for p in history_periods(period, months)
+    )
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Simülasyon Girdisi
+# ═══════════════════════════════════════════════════════════════════════════════
+
+@dataclass
+class MarginAtRiskInputs:
+    """Bir teklif için yol üretiminde gereken her şey — worker'lara bir kez gider."""
+    kwh: np.ndarray                # (H,) saatlik tüketim
+    day_index: np.ndarray          # (H,) hedef gün sırası
+    hour: np.ndarray               # (H,) 0–23
+    target_day_types: np.ndarray   # (D,) int8
+    library: DayShapeLibrary
+    price_level_tl_per_mwh: float  # Referans ortalama PTF
+    yekdem_tl_per_mwh: float
+    offer_price_tl_per_mwh: float  # (Ağırlıklı PTF + YEKDEM) × katsayı
+    dealer_commission_pct: float
+    imbalance_params: ImbalanceParams
+    consumption_noise: float = 0.10
+    price_level_sigma: float = 0.10
+    block_days: int = 3
+
+
+def build_inputs(
+    basis: CostBasis,
+    library: DayShapeLibrary,
+    multiplier: float,
+    imbalance_params: ImbalanceParams,
+    dealer_commission_pct: float = 0.0,
+    consumption_noise: float = 0.10,
+    price_level_sigma: float = 0.10,
+    block_days: int = 3,
+) -> MarginAtRiskInputs:
+    """Maliyet tabanından (PreparedAnalysis.basis) simülasyon girdisini kur.
+
+    Raises:
+        ValueError: Kütüphane boş.
+    """
+    if library.n_days == 0:
+        raise ValueError("Marj riski için geçmiş piyasa verisi (tam gün) bulunamadı.")
+
+    frame = basis.frame
+    unique_dates, day_index = np.unique(np.array(frame.dates), return_inverse=True)
+    return MarginAtRiskInputs(
+        kwh=np.asarray(frame.kwh, dtype=np.float64),
+        day_index=day_index.astype(np.int64),
+        hour=np.asarray(frame.hours, dtype=np.int64),
+        target_day_types=np.array(
+            [day_type_code(date.fromisoformat(d)) for d in unique_dates.tolist()],
+            dtype=np.int8,
+        ),
+        library=library,
+        price_level_tl_per_mwh=float(np.mean(frame.ptf)),
+        yekdem_tl_per_mwh=basis.yekdem_tl_per_mwh,
+        offer_price_tl_per_mwh=basis.energy_cost_tl_per_mwh * multiplier,
+        dealer_commission_pct=dealer_commission_pct,
+        imbalance_params=imbalance_params,
+        consumption_noise=consumption_noise,
+        price_level_sigma=price_level_sigma,
+        block_days=max(1, block_days),
+    )
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Yol Üretimi
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _sample_days(
+    rng: np.random.Generator, inputs: MarginAtRiskInputs, n_paths: int,
+) -> np.ndarray:
+    """Gün tipine göre blok bootstrap → (yol, hedef gün) kütüphane indeksleri."""
+    library = inputs.library
+    target_types = inputs.target_day_types
+    block = inputs.block_days
+    sampled = np.empty((n_paths, target_types.size), dtype=np.int64)
+
+    for code in (WEEKDAY, SATURDAY, SUNDAY):
+        targets = np.flatnonzero(target_types == code)
+        if targets.size == 0:
+            continue
+        pool = np.flatnonzero(library.day_type == code)
+        if pool.size == 0:
+            # Kütüphanede bu tip yok → tüm günlerden örnekle
+            pool = np.arange(library.n_days)
+        n_blocks = -(-targets.size // block)
+        starts = rng.integers(0, max(1, pool.size - block + 1), size=(n_paths, n_blocks))
+        positions = (starts[:, :, None] + np.arange(block)).reshape(n_paths, -1)
+        positions = np.minimum(positions[:, :targets.size], pool.size - 1)
+        sampled[:, targets] = pool[positions]
+    return sampled
+
+
+def _lognormal_unit(rng: np.random.Generator, sigma: float, size) -> np.ndarray:
+    """Ortalaması 1 olan lognormal çarpan (sigma = 0 → sabit 1)."""
+    if sigma <= 0:
+        return np.ones(size)
+    return np.exp(sigma * rng.standard_normal(size) - 0.5 * sigma * sigma)
+
+
+def simulate_net_margins(
+    inputs: MarginAtRiskInputs, n_paths: int, seed: np.random.SeedSequence | int,
+) -> np.ndarray:
+    """n_paths yol için net marj (TL) — tek parça, vektörel."""
+    rng = np.random.default_rng(seed)
+    library = inputs.library
+
+    # Fiyat yolları: örneklenen gün şekilleri × seviye şoku
+    lib_days = _sample_days(rng, inputs, n_paths)[:, inputs.day_index]   # (P, H)
+    level = inputs.price_level_tl_per_mwh * _lognormal_unit(
+        rng, inputs.price_level_sigma, n_paths,
+    )[:, None]
+    ptf = library.ptf[lib_days, inputs.hour] * level
+    smf = library.smf[lib_days, inputs.hour] * level
+
+    # Tüketim yolları
+    kwh = inputs.kwh * _lognormal_unit(rng, inputs.consumption_noise, ptf.shape)
+
+    total_kwh = kwh.sum(axis=1)
+    ptf_weighted = np.einsum("ph,ph->p", kwh, ptf)
+    smf_weighted = np.einsum("ph,ph->p", kwh, smf)
+    safe_kwh = np.where(total_kwh > 0, total_kwh, 1.0)
+    weighted_ptf = ptf_weighted / safe_kwh
+    weighted_smf = smf_weighted / safe_kwh
+
+    # Marj (summarize_cost_totals formülleri, dağıtım = 0)
+    sales = total_kwh * inputs.offer_price_tl_per_mwh / 1000.0
+    cost = (ptf_weighted + total_kwh * inputs.yekdem_tl_per_mwh) / 1000.0
+    gross = sales - cost
+    dealer = np.clip(
+        gross * inputs.dealer_commission_pct / 100.0, 0.0, np.maximum(gross, 0.0),
+    )
+
+    params = inputs.imbalance_params
+    if params.smf_based_imbalance_enabled:
+        imbalance = np.abs(weighted_smf - weighted_ptf) * params.forecast_error_rate
+    else:
+        imbalance = np.full(n_paths, params.imbalance_cost_tl_per_mwh * params.forecast_error_rate)
+    imbalance = np.maximum(imbalance, weighted_ptf * RISK_FLOOR)
+
+    return gross - dealer - imbalance * total_kwh / 1000.0
+
+
+def _chunk_plan(n_paths: int, seed: int) -> list[tuple[int, np.random.SeedSequence]]:
+    """Sabit boyutlu parçalar + parça başına bağımsız tohum."""
+    n_chunks = -(-n_paths // _PATH_CHUNK)
+    children = np.random.SeedSequence(seed).spawn(n_chunks)
+    sizes = [_PATH_CHUNK] * (n_chunks - 1) + [n_paths - _PATH_CHUNK * (n_chunks - 1)]
+    return list(zip(sizes, children))
+
+
+def _simulate_chunk(
+    inputs: MarginAtRiskInputs,
+    plan: tuple[int, np.random.SeedSequence],
+) -> np.ndarray:
+    return simulate_net_margins(inputs, *plan)
+
+
+def simulate_paths(
+    inputs: MarginAtRiskInputs,
+    n_paths: int,
+    seed: int = 0,
+    max_workers: int = 1,
+) -> np.ndarray:
+    """Tüm yollar için net marj dizisi — parça sırasıyla birleştirilir.
+
+    max_workers <= 1 → aynı süreçte. Aksi halde "spawn" süreç havuzu; girdi
+    worker başına bir kez gönderilir, görev başına yalnız (boyut, tohum) gider.
+    Sonuç her iki yolda da aynıdır.
+    """
+    plan = _chunk_plan(n_paths, seed)
+    return np.concatenate(list(iter_ordered_results(
+        _simulate_chunk, inputs, plan, min(max_workers, len(plan)),
+    )))
+
+
+def resolve_worker_count(n_paths: int) -> int:
+    """Koşu büyüklüğüne göre worker sayısı (küçük koşu → aynı süreç)."""
+    if n_paths < PRICING_MAR_MIN_POOL_PATHS:
+        return 1
+    return max(1, PRICING_MAR_MAX_WORKERS)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Dağılım Özeti
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def summarize_margins(
+    net_margins: np.ndarray,
+    confidence: float = 0.95,
+) -> dict:
+    """Net marj dağılımından P5/P50/VaR/CVaR özeti.
+
+    VaR  = −(1−güven) yüzdeliği (pozitif → kuyrukta zarar)
+    CVaR = −(kuyruktaki yolların ortalaması) (expected shortfall)
+    """
+    if net_margins.size == 0:
+        raise ValueError("Marj dağılımı boş.")
+    tail_q = float(np.quantile(net_margins, 1.0 - confidence))
+    tail = net_margins[net_margins <= tail_q]
+    percentiles = np.percentile(net_margins, _REPORTED_PERCENTILES)
+    return dict(
+        expected_net_margin_tl=round(float(net_margins.mean()), 2),
+        std_net_margin_tl=round(float(net_margins.std()), 2),
+        p5_net_margin_tl=round(float(percentiles[1]), 2),
+        p50_net_margin_tl=round(float(percentiles[4]), 2),
+        p95_net_margin_tl=round(float(percentiles[7]), 2),
+        var_tl=round(-tail_q, 2),
+        cvar_tl=round(-float(tail.mean()), 2),
+        loss_probability=round(float(np.mean(net_margins < 0)), 4),
+        percentiles={
+            f"p{p}": round(float(v), 2)
+            for p, v in zip(_REPORTED_PERCENTILES, percentiles.tolist())
+        },
+    )
+
+
+def run_margin_at_risk(
+    inputs: MarginAtRiskInputs,
+    n_paths: int = 10000,
+    seed: int = 0,
+    confidence: float = 0.95,
+    max_workers: Optional[int] = None,
+) -> MarginAtRiskResult:
+    """Teklif katsayısı için Monte Carlo marj dağılımı.
+
+    Args:
+        inputs: build_inputs çıktısı.
+        n_paths: Yol sayısı (1 – PRICING_MAR_MAX_PATHS).
+        seed: Tohum — aynı tohum + girdi → aynı sonuç.
+        confidence: VaR/CVaR güven düzeyi (0.5–0.999).
+        max_workers: None → resolve_worker_count.
+
+    Raises:
+        ValueError: Geçersiz yol sayısı veya güven düzeyi.
+    """
+    if not 1 <= n_paths <= PRICING_MAR_MAX_PATHS:
+        raise ValueError(
+            f"Yol sayısı 1–{PRICING_MAR_MAX_PATHS} arasında olmalı: {n_paths}"
+        )
+    if not 0.5 <= confidence < 1.0 or math.isnan(confidence):
+        raise ValueError(f"Güven düzeyi 0.5–1 arasında olmalı: {confidence}")
+
+    if max_workers is None:
+        max_workers = resolve_worker_count(n_paths)
+    net = simulate_paths(inputs, n_paths, seed=seed, max_workers=max_workers)
+
+    return MarginAtRiskResult(
+        n_paths=n_paths,
+        seed=seed,
+        confidence=confidence,
+        history_periods=list(inputs.library.periods),
+        history_days=inputs.library.n_days,
+        **summarize_margins(net, confidence),
+    )
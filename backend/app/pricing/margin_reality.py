@@ -16,11 +16,15 @@ Bu modül sadece enerji marjını ölçer.
 from __future__ import annotations
 
 import logging
+from dataclasses import dataclass
 from enum import Enum
-from typing import Optional
+from typing import Optional, Sequence
 
+import numpy as np
 from pydantic import BaseModel, Field
 
+from .period_frame import seq_sum
+
 logger = logging.getLogger(__name__)
 
 
@@ -146,21 +150,40 @@ class MarginRealityResult(BaseModel):
 # Ana Hesaplama Fonksiyonu
 # ═══════════════════════════════════════════════════════════════════════════════
 
+# En kötü / en iyi saat tablosu boyutu
+MARGIN_REALITY_TOP_K = 10
+
+
+@dataclass
+class MarginRealityPeriod:
+    """Çok dönemli marj analizinde tek dönem — teklif fiyatı dönem başına sabit."""
+    offer_ptf_tl_per_mwh: float
+    yekdem_tl_per_mwh: float
+    hourly_ptf_prices: Sequence[float]
+    hourly_consumption_kwh: Sequence[float]
+    hourly_timestamps: Optional[list[str]] = None
+    hourly_time_zones: Optional[list[str]] = None
+
 
 def calculate_margin_reality(
     offer_ptf_tl_per_mwh: float,
     yekdem_tl_per_mwh: float,
     multiplier: float,
-    hourly_ptf_prices: list[float],
-    hourly_consumption_kwh: list[float],
+    hourly_ptf_prices: Sequence[float],
+    hourly_consumption_kwh: Sequence[float],
     hourly_timestamps: list[str] | None = None,
     hourly_time_zones: list[str] | None = None,
     include_yekdem: bool = True,
     margin_erosion_threshold_pct: float = 1.0,
     safe_multiplier_buffer: float = 0.01,
+    include_hourly_margins: bool = True,
+    top_k: int = MARGIN_REALITY_TOP_K,
 ) -> MarginRealityResult:
     """Nominal (kağıt üzeri) marj ile gerçek (saatlik) marjı karşılaştır.
 
+    Saatlik hesap NumPy dizileri üzerinde yapılır; detay nesnesi yalnız en
+    kötü / en iyi top_k saat için üretilir.
+
     Args:
         offer_ptf_tl_per_mwh: Teklif PTF (dönem ortalaması, TL/MWh).
         yekdem_tl_per_mwh: YEKDEM bedeli (TL/MWh).
@@ -172,10 +195,57 @@ def calculate_margin_reality(
         include_yekdem: YEKDEM dahil mi.
         margin_erosion_threshold_pct: Marj eriyor eşiği (varsayılan %1).
         safe_multiplier_buffer: Güvenli katsayı tamponu (varsayılan +0.01).
+        include_hourly_margins: False → hourly_margins_tl boş bırakılır.
+        top_k: En kötü / en iyi saat tablosu boyutu.
 
     Returns:
         MarginRealityResult: Tüm marj metrikleri ve karar.
     """
+    offer_unit_price, base_unit_price, ptf, kwh, cost_h, offer_h = _single_period_arrays(
+        offer_ptf_tl_per_mwh, yekdem_tl_per_mwh, multiplier,
+        hourly_ptf_prices, hourly_consumption_kwh, include_yekdem,
+    )
+
+    return _margin_reality_from_arrays(
+        multiplier=multiplier,
+        offer_unit_price=offer_unit_price,
+        base_unit_price=base_unit_price,
+        ptf=ptf, kwh=kwh, cost_h=cost_h, offer_h=offer_h,
+        hourly_timestamps=hourly_timestamps,
+        hourly_time_zones=hourly_time_zones,
+        margin_erosion_threshold_pct=margin_erosion_threshold_pct,
+        safe_multiplier_buffer=safe_multiplier_buffer,
+        include_hourly_margins=include_hourly_margins,
+        top_k=top_k,
+    )
+
+
+def calculate_hourly_margins(
+    offer_ptf_tl_per_mwh: float,
+    yekdem_tl_per_mwh: float,
+    multiplier: float,
+    hourly_ptf_prices: Sequence[float],
+    hourly_consumption_kwh: Sequence[float],
+    include_yekdem: bool = True,
+) -> list[float]:
+    """Yalnız saatlik marj dizisi — calculate_margin_reality(...).hourly_margins_tl
+    ile aynı değerler, diğer metrikler hesaplanmadan."""
+    _, _, _, kwh, cost_h, offer_h = _single_period_arrays(
+        offer_ptf_tl_per_mwh, yekdem_tl_per_mwh, multiplier,
+        hourly_ptf_prices, hourly_consumption_kwh, include_yekdem,
+    )
+    return _rounded_hourly_margins(offer_h - cost_h, ~(kwh <= 0))
+
+
+def _single_period_arrays(
+    offer_ptf_tl_per_mwh: float,
+    yekdem_tl_per_mwh: float,
+    multiplier: float,
+    hourly_ptf_prices: Sequence[float],
+    hourly_consumption_kwh: Sequence[float],
+    include_yekdem: bool,
+) -> tuple[float, float, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Tek dönem: (satış birim fiyatı, taban birim fiyat, ptf, kwh, maliyet, gelir)."""
     assert len(hourly_ptf_prices) == len(hourly_consumption_kwh), (
         f"PTF ({len(hourly_ptf_prices)}) ve tüketim ({len(hourly_consumption_kwh)}) "
         f"dizileri aynı uzunlukta olmalı"
@@ -187,64 +257,140 @@ def calculate_margin_reality(
     offer_unit_price = (offer_ptf_tl_per_mwh + yekdem) / 1000.0 * multiplier
 
     # ── 2. Nominal (kağıt üzeri) hesap ─────────────────────────────────
+    base_unit_price = (offer_ptf_tl_per_mwh + yekdem) / 1000.0
+
+    # ── 3. Saatlik hesaplama (vektörel) ────────────────────────────────
+    ptf = np.asarray(hourly_ptf_prices, dtype=np.float64)
+    kwh = np.asarray(hourly_consumption_kwh, dtype=np.float64)
+    cost_h = (ptf + yekdem) / 1000.0 * kwh
+    offer_h = offer_unit_price * kwh
+    return offer_unit_price, base_unit_price, ptf, kwh, cost_h, offer_h
+
+
+def _rounded_hourly_margins(margin: np.ndarray, valid: np.ndarray) -> list[float]:
+    """Histogram dizisi — geçersiz (tüketimi ≤ 0) saatler 0.0."""
+    return [round(m, 2) for m in np.where(valid, margin, 0.0).tolist()]
+
+
+def calculate_margin_reality_multi(
+    periods: Sequence[MarginRealityPeriod],
+    multiplier: float,
+    include_yekdem: bool = True,
+    margin_erosion_threshold_pct: float = 1.0,
+    safe_multiplier_buffer: float = 0.01,
+    include_hourly_margins: bool = True,
+    top_k: int = MARGIN_REALITY_TOP_K,
+) -> MarginRealityResult:
+    """Çok dönemli (örn. yıllık) marj analizi — tek çağrı, tek sonuç.
+
+    Her dönemin satış fiyatı kendi (teklif PTF + YEKDEM) × katsayı değeridir.
+    Birim fiyat alanları (offer_unit_price, break-even tabanı) tüketim
+    ağırlıklı ortalamadır. Saat etiketi olmayan dönemlerde etiket global
+    sıra numarasıdır (H0000…). Tek dönem için calculate_margin_reality ile
+    aynı saatlik değerleri üretir.
+    """
+    if not periods:
+        raise ValueError("En az bir dönem gerekli")
+    for p in periods:
+        assert len(p.hourly_ptf_prices) == len(p.hourly_consumption_kwh), (
+            f"PTF ({len(p.hourly_ptf_prices)}) ve tüketim ({len(p.hourly_consumption_kwh)}) "
+            f"dizileri aynı uzunlukta olmalı"
+        )
+
+    lengths = [len(p.hourly_ptf_prices) for p in periods]
+    yekdems = [p.yekdem_tl_per_mwh if include_yekdem else 0.0 for p in periods]
+    bases = [(p.offer_ptf_tl_per_mwh + y) / 1000.0 for p, y in zip(periods, yekdems)]
+
+    ptf = np.concatenate([np.asarray(p.hourly_ptf_prices, dtype=np.float64) for p in periods])
+    kwh = np.concatenate([np.asarray(p.hourly_consumption_kwh, dtype=np.float64) for p in periods])
+    yekdem_h = np.repeat(np.asarray(yekdems, dtype=np.float64), lengths)
+    base_h = np.repeat(np.asarray(bases, dtype=np.float64), lengths)
+    cost_h = (ptf + yekdem_h) / 1000.0 * kwh
+    offer_h = (base_h * multiplier) * kwh
+
+    # Tüketim ağırlıklı birim fiyatlar (tüketim yoksa dönem ortalaması)
+    valid = ~(kwh <= 0)
+    total_kwh = seq_sum(kwh[valid])
+    if total_kwh > 0:
+        base_unit_price = seq_sum(base_h[valid] * kwh[valid]) / total_kwh
+        offer_unit_price = seq_sum(offer_h[valid]) / total_kwh
+    else:
+        base_unit_price = sum(bases) / len(bases)
+        offer_unit_price = base_unit_price * multiplier
+
+    timestamps = _concat_labels([p.hourly_timestamps for p in periods], lengths)
+    time_zones = _concat_labels([p.hourly_time_zones for p in periods], lengths)
+
+    return _margin_reality_from_arrays(
+        multiplier=multiplier,
+        offer_unit_price=offer_unit_price,
+        base_unit_price=base_unit_price,
+        ptf=ptf, kwh=kwh, cost_h=cost_h, offer_h=offer_h,
+        hourly_timestamps=timestamps,
+        hourly_time_zones=time_zones,
+        margin_erosion_threshold_pct=margin_erosion_threshold_pct,
+        safe_multiplier_buffer=safe_multiplier_buffer,
+        include_hourly_margins=include_hourly_margins,
+        top_k=top_k,
+    )
+
+
+def _concat_labels(
+    label_lists: list[Optional[list[str]]], lengths: list[int],
+) -> Optional[list]:
+    """Dönem etiketlerini birleştir — eksik/kısa dönem None ile doldurulur."""
+    if not any(label_lists):
+        return None
+    out: list = []
+    for labels, n in zip(label_lists, lengths):
+        labels = list(labels[:n]) if labels else []
+        out.extend(labels + [None] * (n - len(labels)))
+    return out
+
+
+def _margin_reality_from_arrays(
+    multiplier: float,
+    offer_unit_price: float,
+    base_unit_price: float,
+    ptf: np.ndarray,
+    kwh: np.ndarray,
+    cost_h: np.ndarray,
+    offer_h: np.ndarray,
+    hourly_timestamps: Optional[list],
+    hourly_time_zones: Optional[list],
+    margin_erosion_threshold_pct: float,
+    safe_multiplier_buffer: float,
+    include_hourly_margins: bool,
+    top_k: int,
+) -> MarginRealityResult:
+    """Saatlik maliyet/gelir dizilerinden tüm metrikleri ve kararı üret.
+
+    Parite (period_frame ile aynı kural): tüketimi ≤ 0 olan saatler toplamlara
+    girmez, toplamlar soldan sağa (seq_sum), yuvarlama Python round() ile.
+    """
     nominal_margin_pct = (multiplier - 1.0) * 100.0
-    nominal_cost_per_kwh = (offer_ptf_tl_per_mwh + yekdem) / 1000.0
-
-    # ── 3. Saatlik hesaplama ───────────────────────────────────────────
-    total_hours = len(hourly_ptf_prices)
-    hourly_margins: list[float] = []
-    hourly_details: list[HourlyMarginDetail] = []
-    total_cost = 0.0
-    total_offer = 0.0
-    total_kwh = 0.0
-    negative_hours = 0
-    negative_total = 0.0
-    positive_total = 0.0
-
-    for i in range(total_hours):
-        ptf_h = hourly_ptf_prices[i]
-        kwh_h = hourly_consumption_kwh[i]
-
-        if kwh_h <= 0:
-            hourly_margins.append(0.0)
-            continue
-
-        # Saatlik maliyet (TL/kWh)
-        cost_per_kwh_h = (ptf_h + yekdem) / 1000.0
-        cost_h = cost_per_kwh_h * kwh_h
-
-        # Saatlik gelir
-        offer_h = offer_unit_price * kwh_h
-
-        # Saatlik marj
-        margin_h = offer_h - cost_h
-
-        hourly_margins.append(round(margin_h, 2))
-        total_cost += cost_h
-        total_offer += offer_h
-        total_kwh += kwh_h
-
-        if margin_h < 0:
-            negative_hours += 1
-            negative_total += margin_h
-        else:
-            positive_total += margin_h
+    total_hours = int(kwh.shape[0])
 
-        # Detay kaydı (en kötü/en iyi için)
-        ts = hourly_timestamps[i] if hourly_timestamps and i < len(hourly_timestamps) else f"H{i:04d}"
-        tz = hourly_time_zones[i] if hourly_time_zones and i < len(hourly_time_zones) else None
-        hourly_details.append(HourlyMarginDetail(
-            hour=ts,
-            ptf_tl_per_mwh=round(ptf_h, 2),
-            consumption_kwh=round(kwh_h, 2),
-            cost_tl=round(cost_h, 2),
-            margin_tl=round(margin_h, 2),
-            time_zone=tz,
-        ))
+    # NaN tüketim döngü versiyonundaki gibi geçerli sayılır (kwh <= 0 False)
+    valid = ~(kwh <= 0)
+    margin = offer_h - cost_h
+    valid_idx = np.flatnonzero(valid)
+    margin_v = margin[valid_idx]
+
+    total_cost = seq_sum(cost_h[valid_idx])
+    total_offer = seq_sum(offer_h[valid_idx])
+    total_kwh = seq_sum(kwh[valid_idx])
+
+    negative = margin_v < 0
+    negative_hours = int(np.count_nonzero(negative))
+    negative_total = seq_sum(margin_v[negative])
+    positive_total = seq_sum(margin_v[~negative])
+
+    hourly_margins = _rounded_hourly_margins(margin, valid) if include_hourly_margins else []
 
     # ── 4. Toplam gerçek marj ──────────────────────────────────────────
     real_margin_tl = total_offer - total_cost
-    nominal_margin_tl = (offer_unit_price - nominal_cost_per_kwh) * total_kwh
+    nominal_margin_tl = (offer_unit_price - base_unit_price) * total_kwh
 
     # ── 5. Gerçek marj oranı ───────────────────────────────────────────
     # Cost-based margin (iç analiz): marj / maliyet
@@ -272,7 +418,6 @@ def calculate_margin_reality(
     multiplier_delta = effective_multiplier - multiplier
 
     # ── 8. Break-even katsayı ──────────────────────────────────────────
-    base_unit_price = (offer_ptf_tl_per_mwh + yekdem) / 1000.0
     if base_unit_price > 0:
         break_even_multiplier = weighted_cost_per_kwh / base_unit_price
     else:
@@ -293,10 +438,25 @@ def calculate_margin_reality(
     else:
         required_mult = multiplier
 
-    # ── 9. En kötü / en iyi 10 saat ───────────────────────────────────
-    sorted_by_margin = sorted(hourly_details, key=lambda d: d.margin_tl)
-    worst_10 = sorted_by_margin[:10]
-    best_10 = sorted_by_margin[-10:][::-1]  # en iyiler büyükten küçüğe
+    # ── 9. En kötü / en iyi saatler (yalnız seçilenler nesneye dönüşür) ─
+    def detail(i: int) -> HourlyMarginDetail:
+        ts = (
+            hourly_timestamps[i]
+            if hourly_timestamps and i < len(hourly_timestamps) and hourly_timestamps[i] is not None
+            else f"H{i:04d}"
+        )
+        tz = hourly_time_zones[i] if hourly_time_zones and i < len(hourly_time_zones) else None
+        return HourlyMarginDetail(
+            hour=ts,
+            ptf_tl_per_mwh=round(float(ptf[i]), 2),
+            consumption_kwh=round(float(kwh[i]), 2),
+            cost_tl=round(float(cost_h[i]), 2),
+            margin_tl=round(float(margin[i]), 2),
+            time_zone=tz,
+        )
+
+    worst_hours = [detail(i) for i in _top_k_hours(margin_v, valid_idx, top_k, largest=False)]
+    best_hours = [detail(i) for i in _top_k_hours(margin_v, valid_idx, top_k, largest=True)]
 
     # ── 10. Karar (verdict) ────────────────────────────────────────────
     verdict = _determine_verdict(
@@ -357,12 +517,47 @@ def calculate_margin_reality(
         total_consumption_kwh=round(total_kwh, 2),
         offer_unit_price_tl_per_kwh=round(offer_unit_price, 6),
         weighted_cost_tl_per_kwh=round(weighted_cost_per_kwh, 6),
-        worst_hours=worst_10,
-        best_hours=best_10,
+        worst_hours=worst_hours,
+        best_hours=best_hours,
         hourly_margins_tl=hourly_margins,
     )
 
 
+def _top_k_hours(
+    margins: np.ndarray, hour_idx: np.ndarray, k: int, largest: bool,
+) -> list[int]:
+    """En küçük (largest=False) / en büyük k marjlı saatin indeksleri.
+
+    Sıralama döngü versiyonuyla aynıdır: anahtar round(marj, 2); eşitlikte
+    en kötülerde önceki saat, en iyilerde sonraki saat önce gelir.
+
+    argpartition np.round ile aday kümesini daraltır; np.round ile Python
+    round() en fazla bir kuruş ayrışabildiğinden eşik 0.02 gevşetilir ve
+    kesin sıralama yalnız adaylar üzerinde Python round() ile yapılır.
+    """
+    n = int(margins.shape[0])
+    if n == 0 or k <= 0:
+        return []
+
+    approx = np.round(margins, 2)
+    if n > k:
+        if largest:
+            kth = approx[np.argpartition(approx, n - k)[n - k]]
+            candidates = np.flatnonzero(approx >= kth - 0.02)
+        else:
+            kth = approx[np.argpartition(approx, k - 1)[k - 1]]
+            candidates = np.flatnonzero(approx <= kth + 0.02)
+    else:
+        candidates = np.arange(n)
+
+    keyed = [
+        (round(m, 2), c)
+        for m, c in zip(margins[candidates].tolist(), candidates.tolist())
+    ]
+    keyed.sort(reverse=largest)
+    return [int(hour_idx[c]) for _, c in keyed[:k]]
+
+
 def _determine_verdict(
     real_margin_tl: float,
     real_margin_pct: float,
@@ -0,0 +1,480 @@
+"""
+Pricing Risk Engine — Paylaşımlı Piyasa Dönem Deposu (Market Store).
+
+Aktif saatlik PTF/SMF verisi dönem başına BİR KEZ DB'den okunur ve
+memory-mapped .npy segmenti olarak diske yazılır. Aynı makinedeki tüm
+uvicorn worker'ları segmenti np.load(mmap_mode="r") ile açar → sayfa
+önbelleği süreçler arasında paylaşılır, ~744 ORM satırı her istekte
+yeniden hidrate edilmez.
+
+Anahtar: (veritabanı, period, version, stamp)
+- Aynı makinede birden çok veritabanı olabilir (staging/prod, yeniden
+  oluşturulan SQLite dosyası); data_versions satırları aynı id/versiyonu
+  üretebilir. Segmentler veritabanı kimliği (database_identity) adlı alt
+  dizinde tutulur, stamp da kimliği içerir; işlem içi önbellek engine
+  başınadır
+- Piyasa verisi yüklemesi / EPİAŞ alımı her yazımda aktif data_versions
+  satırını (data_type="market_data") yeniler → anahtar bu satırdan türetilir
+  (id, version, row_count, created_at). Tek satırlık indeksli okuma; her
+  istekte saatlik satırlar taranmaz.
+- data_versions kaydı olmayan dönem (seed, test fikstürü, versiyonsuz elle
+  yazım): aktif satırlardan tek aggregate sorgu ile (adet, max id, PTF/SMF
+  toplamı) parmak izi → eski segment okunmaz
+
+Atomik yeniden kurulum:
+- Segment aynı dizindeki geçici dosyaya yazılır, os.replace ile yayınlanır
+- Dönemin eski segmentleri silinir; açık mmap'ler eski inode'u görmeye
+  devam eder (okuyucu yarım dosya görmez)
+
+Kullanan okuyucular:
+- /pricing/analyze, /simulate, /compare, rapor uç noktaları (_load_market_records)
+- recon market_snapshot (calculate_ptf_cost / compute_period_reference_cost)
+- market_prices.weighted_ptf_for_profile / consumption_weighted_ptf
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import uuid
+import weakref
+from dataclasses import dataclass
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from .excel_parser import ParsedMarketRecord
+from .schemas import DataVersion, HourlyMarketPrice
+
+logger = logging.getLogger(__name__)
+
+# Segment kök dizini: env var veya sistem geçici dizini (tüm worker'lar
+# paylaşır); her veritabanı kendi alt dizinini kullanır
+PRICING_MARKET_STORE_DIR = os.getenv(
+    "PRICING_MARKET_STORE_DIR",
+    os.path.join(tempfile.gettempdir(), "pricing_market_store"),
+)
+
+# Segment satır düzeni — object dtype yok → mmap ile açılabilir
+SEGMENT_DTYPE = np.dtype([
+    ("date", "U10"),     # YYYY-MM-DD
+    ("hour", np.int16),  # 0–23
+    ("ptf", np.float64), # TL/MWh
+    ("smf", np.float64), # TL/MWh
+])
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Segment
+# ═══════════════════════════════════════════════════════════════════════════════
+
+@dataclass(frozen=True)
+class MarketSegment:
+    """Bir dönemin aktif saatlik piyasa verisi — (date, hour) sıralı.
+
+    rows salt-okunur structured array'dir (genellikle memory-mapped).
+    """
+    period: str
+    version: int
+    stamp: str
+    rows: np.ndarray
+
+    def __len__(self) -> int:
+        return int(self.rows.shape[0])
+
+    def to_records(self) -> list[ParsedMarketRecord]:
+        """ParsedMarketRecord listesine dönüştür (pricing motoru girdisi)."""
+        return [
+            ParsedMarketRecord(
+                period=self.period, date=d, hour=h,
+                ptf_tl_per_mwh=p, smf_tl_per_mwh=s,
+            )
+            for d, h, p, s in zip(
+                self.rows["date"].tolist(),
+                self.rows["hour"].tolist(),
+                self.rows["ptf"].tolist(),
+                self.rows["smf"].tolist(),
+            )
+        ]
+
+    def hour_ptf_pairs(self) -> list[tuple[int, float]]:
+        """[(hour, ptf), ...] — profil-ağırlıklı PTF girdisi."""
+        return list(zip(self.rows["hour"].tolist(), self.rows["ptf"].tolist()))
+
+    def ptf_index(self) -> dict[tuple[str, int], float]:
+        """(date, hour) → ptf_tl_per_mwh indeksi (son kayıt geçerli)."""
+        return dict(zip(
+            zip(self.rows["date"].tolist(), self.rows["hour"].tolist()),
+            self.rows["ptf"].tolist(),
+        ))
+
+
+# İşlem içi önbellek: engine → (period → son açılan segment); engine
+# kapanınca (GC) kendiliğinden düşer
+_segments: "weakref.WeakKeyDictionary[Engine, dict[str, MarketSegment]]" = (
+    weakref.WeakKeyDictionary()
+)
+# engine → veritabanı kimliği
+_identities: "weakref.WeakKeyDictionary[Engine, str]" = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+def _empty_segment(period: str) -> MarketSegment:
+    return MarketSegment(
+        period=period, version=0, stamp="",
+        rows=np.empty(0, dtype=SEGMENT_DTYPE),
+    )
+
+
+def _engine(db: Session) -> Engine:
+    bind = db.get_bind()
+    return getattr(bind, "engine", bind)
+
+
+def _identity_source(engine: Engine) -> str:
+    url = engine.url
+    if url.get_backend_name() != "sqlite":
+        return url.render_as_string(hide_password=True)
+    database = url.database or ""
+    if database in ("", ":memory:") or "mode=memory" in database or url.query.get("mode") == "memory":
+        # Veri engine ile yaşar → başka süreçle paylaşılamaz
+        return f"sqlite-memory|{uuid.uuid4().hex}"
+    path = os.path.realpath(database)
+    try:
+        inode = os.stat(path).st_ino
+    except OSError:
+        inode = 0
+    # Silinip yeniden oluşturulan dosya yeni inode → yeni kimlik
+    return f"sqlite|{path}|{inode}"
+
+
+def database_identity(db: Session) -> str:
+    """Oturumun veritabanı kimliği (16 hex) — disk depolarını ve stamp'leri ayırır.
+
+    PostgreSQL vb.: parolasız bağlantı URL'si. SQLite dosyası: gerçek yol +
+    inode. In-memory SQLite: engine başına rastgele. Engine başına bir kez
+    hesaplanır.
+    """
+    engine = _engine(db)
+    identity = _identities.get(engine)
+    if identity is None:
+        identity = hashlib.sha256(_identity_source(engine).encode()).hexdigest()[:16]
+        with _lock:
+            identity = _identities.setdefault(engine, identity)
+    return identity
+
+
+def _store_dir(db: Session) -> str:
+    """Veritabanının segment dizini."""
+    return os.path.join(PRICING_MARKET_STORE_DIR, database_identity(db))
+
+
+def _segments_for(db: Session) -> dict[str, MarketSegment]:
+    engine = _engine(db)
+    with _lock:
+        segments = _segments.get(engine)
+        if segments is None:
+            segments = _segments[engine] = {}
+        return segments
+
+
+def _segment_path(directory: str, period: str, version: int, stamp: str) -> str:
+    return os.path.join(directory, f"{period}_v{version}_{stamp}.npy")
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# DB Erişimi
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _read_stamp(db: Session, period: str) -> tuple[int, str] | None:
+    """Tek aggregate sorgu ile (version, stamp) oku. Aktif satır yoksa None."""
+    version, count, max_id, ptf_sum, smf_sum = (
+        db.query(
+            func.max(HourlyMarketPrice.version),
+            func.count(HourlyMarketPrice.id),
+            func.max(HourlyMarketPrice.id),
+            func.sum(HourlyMarketPrice.ptf_tl_per_mwh),
+            func.sum(HourlyMarketPrice.smf_tl_per_mwh),
+        )
+        .filter(
+            HourlyMarketPrice.period == period,
+            HourlyMarketPrice.is_active == 1,
+        )
+        .one()
+    )
+    if not count:
+        return None
+    return int(version), _fingerprint_stamp(database_identity(db), count, max_id, ptf_sum, smf_sum)
+
+
+def _read_stamps(db: Session, periods: list[str]) -> dict[str, tuple[int, str]]:
+    """Çok dönem için (version, stamp) — tek GROUP BY sorgusu.
+
+    Parmak izi _read_stamp ile birebir aynı; aktif satırı olmayan dönem
+    sonuçta yer almaz.
+    """
+    if not periods:
+        return {}
+    rows = (
+        db.query(
+            HourlyMarketPrice.period,
+            func.max(HourlyMarketPrice.version),
+            func.count(HourlyMarketPrice.id),
+            func.max(HourlyMarketPrice.id),
+            func.sum(HourlyMarketPrice.ptf_tl_per_mwh),
+            func.sum(HourlyMarketPrice.smf_tl_per_mwh),
+        )
+        .filter(
+            HourlyMarketPrice.period.in_(periods),
+            HourlyMarketPrice.is_active == 1,
+        )
+        .group_by(HourlyMarketPrice.period)
+        .all()
+    )
+    identity = database_identity(db)
+    stamps: dict[str, tuple[int, str]] = {}
+    for period, version, count, max_id, ptf_sum, smf_sum in rows:
+        if not count:
+            continue
+        stamps[period] = (
+            int(version), _fingerprint_stamp(identity, count, max_id, ptf_sum, smf_sum),
+        )
+    return stamps
+
+
+def _fingerprint_stamp(identity: str, count, max_id, ptf_sum, smf_sum) -> str:
+    fingerprint = f"{identity}|{count}|{max_id}|{float(ptf_sum)!r}|{float(smf_sum)!r}"
+    return hashlib.sha256(fingerprint.encode()).hexdigest()[:16]
+
+
+def _version_stamp(identity: str, dv_id: int, version: int, row_count: int, created_at) -> str:
+    fingerprint = f"{identity}|dv|{dv_id}|{version}|{row_count}|{created_at}"
+    return hashlib.sha256(fingerprint.encode()).hexdigest()[:16]
+
+
+def _active_versions_query(db: Session):
+    return db.query(
+        DataVersion.period,
+        DataVersion.id,
+        DataVersion.version,
+        DataVersion.row_count,
+        DataVersion.created_at,
+    ).filter(
+        DataVersion.data_type == "market_data",
+        DataVersion.customer_id.is_(None),
+        DataVersion.is_active == 1,
+    )
+
+
+def _read_key(db: Session, period: str) -> tuple[int, str] | None:
+    """Dönemin (version, stamp) anahtarı.
+
+    Aktif data_versions satırı varsa ondan (tek satır); yoksa saatlik
+    satırların parmak izinden (_read_stamp). Aktif veri yoksa None.
+    """
+    row = (
+        _active_versions_query(db)
+        .filter(DataVersion.period == period)
+        .order_by(DataVersion.version.desc())
+        .first()
+    )
+    if row is None:
+        return _read_stamp(db, period)
+    _, dv_id, version, row_count, created_at = row
+    return int(version), _version_stamp(
+        database_identity(db), dv_id, version, row_count, created_at,
+    )
+
+
+def _read_keys(db: Session, periods: list[str]) -> dict[str, tuple[int, str]]:
+    """Çok dönem için _read_key — data_versions tek IN sorgusu; kaydı
+    olmayan dönemler için parmak izi tek GROUP BY (_read_stamps)."""
+    if not periods:
+        return {}
+    keys: dict[str, tuple[int, str]] = {}
+    rows = (
+        _active_versions_query(db)
+        .filter(DataVersion.period.in_(periods))
+        .order_by(DataVersion.version)
+        .all()
+    )
+    identity = database_identity(db)
+    # Artan versiyon sırası → dönemin en yüksek aktif versiyonu kalır
+    for period, dv_id, version, row_count, created_at in rows:
+        keys[period] = (
+            int(version), _version_stamp(identity, dv_id, version, row_count, created_at),
+        )
+    unversioned = [period for period in periods if period not in keys]
+    if unversioned:
+        keys.update(_read_stamps(db, unversioned))
+    return keys
+
+
+def _query_rows(db: Session, period: str) -> np.ndarray:
+    """Aktif satırları (date, hour, id) sırasıyla structured array'e oku."""
+    rows = (
+        db.query(
+            HourlyMarketPrice.date,
+            HourlyMarketPrice.hour,
+            HourlyMarketPrice.ptf_tl_per_mwh,
+            HourlyMarketPrice.smf_tl_per_mwh,
+        )
+        .filter(
+            HourlyMarketPrice.period == period,
+            HourlyMarketPrice.is_active == 1,
+        )
+        .order_by(HourlyMarketPrice.date, HourlyMarketPrice.hour, HourlyMarketPrice.id)
+        .all()
+    )
+    return np.array(
+        [(d, int(h), float(p), float(s)) for d, h, p, s in rows],
+        dtype=SEGMENT_DTYPE,
+    )
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Yayınlama / Açma
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _publish(
+    db: Session, period: str, version: int, stamp: str, rows: np.ndarray,
+) -> MarketSegment:
+    """Segmenti veritabanının dizinine atomik olarak yaz ve mmap ile aç.
+
+    Disk yazılamazsa (salt-okunur FS vb.) bellek içi dizi ile devam edilir.
+    """
+    directory = _store_dir(db)
+    path = _segment_path(directory, period, version, stamp)
+    try:
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=f".{period}_", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, rows, allow_pickle=False)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        _remove_stale_segments(directory, period, keep=path)
+        mapped = np.load(path, mmap_mode="r", allow_pickle=False)
+    except OSError as e:
+        logger.warning(f"Market store segmenti yazılamadı ({period}): {e}")
+        mapped = rows
+        mapped.flags.writeable = False
+    return MarketSegment(period=period, version=version, stamp=stamp, rows=mapped)
+
+
+def _remove_stale_segments(directory: str, period: str, keep: str) -> None:
+    """Dönemin diğer segmentlerini sil (açık mmap'ler etkilenmez)."""
+    prefix = f"{period}_v"
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if name.startswith(prefix) and name.endswith(".npy") and path != keep:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def _open(db: Session, period: str, version: int, stamp: str) -> MarketSegment | None:
+    """Yayınlanmış segmenti mmap ile aç. Yoksa None."""
+    path = _segment_path(_store_dir(db), period, version, stamp)
+    try:
+        mapped = np.load(path, mmap_mode="r", allow_pickle=False)
+    except (OSError, ValueError):
+        return None
+    return MarketSegment(period=period, version=version, stamp=stamp, rows=mapped)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Public API
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def get_market_segment(db: Session, period: str) -> MarketSegment:
+    """Dönemin aktif piyasa segmentini getir.
+
+    Sıra: işlem içi önbellek → diskteki segment (başka worker kurmuş olabilir)
+    → DB'den kur ve yayınla. Her çağrı yalnızca aktif data_versions
+    satırını okur; satırlar sadece segment yoksa okunur.
+
+    Args:
+        db: SQLAlchemy session.
+        period: Dönem (YYYY-MM).
+
+    Returns:
+        MarketSegment: Aktif veri yoksa boş segment.
+    """
+    return _resolve(db, period, _read_key(db, period))
+
+
+def get_market_segments(db: Session, periods: list[str]) -> dict[str, MarketSegment]:
+    """Birden çok dönemin segmentleri — anahtarlar tek sorguda okunur.
+
+    Çok aylık dosyalar (recon) için get_market_segment'in toplu hali;
+    satırlar yalnızca önbellekte/diskte segmenti olmayan dönemler için okunur.
+    """
+    keys = _read_keys(db, periods)
+    return {period: _resolve(db, period, keys.get(period)) for period in periods}
+
+
+def _resolve(db: Session, period: str, key: tuple[int, str] | None) -> MarketSegment:
+    """(version, stamp) için segment: önbellek → disk → DB'den kur."""
+    if key is None:
+        return _empty_segment(period)
+    version, stamp = key
+
+    segments = _segments_for(db)
+    cached = segments.get(period)
+    if cached is not None and (cached.version, cached.stamp) == key:
+        return cached
+
+    segment = _open(db, period, version, stamp)
+    if segment is None:
+        segment = _build(db, period, version, stamp)
+
+    with _lock:
+        segments[period] = segment
+    return segment
+
+
+def rebuild_market_segment(db: Session, period: str) -> MarketSegment:
+    """Dönem segmentini DB'den zorla yeniden kur ve atomik olarak yayınla.
+
+    upload_market_data yeni versiyonu commit ettikten sonra çağrılır; diğer
+    worker'lar bir sonraki okumada yeni (version, stamp) ile bu segmenti açar.
+    """
+    segments = _segments_for(db)
+    key = _read_key(db, period)
+    if key is None:
+        with _lock:
+            segments.pop(period, None)
+        return _empty_segment(period)
+    segment = _build(db, period, *key)
+    with _lock:
+        segments[period] = segment
+    return segment
+
+
+def clear_market_store() -> None:
+    """İşlem içi önbelleği temizle (diskteki segmentler stamp ile korunur).
+
+    Veritabanı kimlikleri korunur — in-memory SQLite kimliği yeniden
+    üretilirse kendi segmentlerini bulamaz.
+    """
+    with _lock:
+        _segments.clear()
+
+
+def _build(db: Session, period: str, version: int, stamp: str) -> MarketSegment:
+    rows = _query_rows(db, period)
+    # Okuma sırasında yazım olduysa etiket güvenilmez → yayınlama
+    if _read_key(db, period) != (version, stamp):
+        rows.flags.writeable = False
+        return MarketSegment(period=period, version=version, stamp=stamp, rows=rows)
+    return _publish(db, period, version, stamp, rows)
@@ -34,6 +34,20 @@ class TimeZone(str, Enum):
     T3 = "T3"  # Gece   22:00-05:59
 
 
+class HourDetailMode(str, Enum):
+    """/analyze saatlik detay modu — summary yalnız özet, detay istenirse üretilir."""
+    SUMMARY = "summary"    # Saatlik detay yok (varsayılan)
+    PAGE = "page"          # HourlyCostEntry kayıtları, offset/limit sayfası
+    COLUMNAR = "columnar"  # Paralel diziler (saat başına nesne yok)
+
+
+class ExportFormat(str, Enum):
+    """Dışa aktarma formatı — değer aynı zamanda dosya uzantısıdır."""
+    XLSX = "xlsx"        # Write-only openpyxl çalışma kitabı
+    CSV = "csv"          # UTF-8, makine-dostu sütun adları
+    PARQUET = "parquet"  # pyarrow gerekir (opsiyonel bağımlılık)
+
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # Parametre Modelleri
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -126,6 +140,40 @@ class HourlyCostEntry(BaseModel):
     time_zone: TimeZone = Field(description="Zaman dilimi (T1/T2/T3)")
 
 
+class HourlyCostColumns(BaseModel):
+    """Saatlik maliyet detayı — sütunsal kodlama (HourlyCostEntry alanları,
+    her alan için saat sırasıyla hizalı bir dizi)."""
+    date: list[str]
+    hour: list[int]
+    consumption_kwh: list[float]
+    ptf_tl_per_mwh: list[float]
+    smf_tl_per_mwh: list[float]
+    base_cost_tl: list[float]
+    sales_price_tl: list[float]
+    margin_tl: list[float]
+    is_loss_hour: list[bool]
+    time_zone: list[TimeZone]
+
+
+class HourlyCostDetail(BaseModel):
+    """/analyze saatlik detay dilimi — hour_detail=page|columnar ile istenir."""
+    mode: HourDetailMode
+    total_hours: int = Field(ge=0, description="Dönemdeki eşleşmiş saat sayısı")
+    offset: int = Field(ge=0, description="Dilimin ilk saat indeksi")
+    count: int = Field(ge=0, description="Dilimdeki saat sayısı")
+    next_offset: Optional[int] = Field(
+        default=None,
+        description="Sonraki dilimin offset'i (son dilimde None)",
+    )
+    yekdem_tl_per_mwh: float = Field(description="YEKDEM bedeli (TL/MWh) — dönem sabiti")
+    hours: Optional[list[HourlyCostEntry]] = Field(
+        default=None, description="Saat kayıtları (mode=page)",
+    )
+    columns: Optional[HourlyCostColumns] = Field(
+        default=None, description="Paralel diziler (mode=columnar)",
+    )
+
+
 class HourlyCostResult(BaseModel):
     """Saatlik maliyet hesaplama sonucu — tüm saatlerin toplu özeti.
 
@@ -213,6 +261,24 @@ class SafeMultiplierResult(BaseModel):
     )
 
 
+class MarginAtRiskResult(BaseModel):
+    """Monte Carlo net marj dağılımı özeti (TL)."""
+    n_paths: int
+    seed: int
+    confidence: float
+    history_periods: list[str] = Field(description="Gün şekli örneklenen dönemler")
+    history_days: int = Field(description="Kütüphanedeki tam gün sayısı")
+    expected_net_margin_tl: float
+    std_net_margin_tl: float
+    p5_net_margin_tl: float
+    p50_net_margin_tl: float
+    p95_net_margin_tl: float
+    var_tl: float = Field(description="Value-at-Risk: −(1−güven) yüzdeliği (pozitif = zarar)")
+    cvar_tl: float = Field(description="CVaR / expected shortfall: −kuyruk ortalaması")
+    loss_probability: float = Field(description="Net marjın negatif olma olasılığı (0–1)")
+    percentiles: dict[str, float] = Field(default_factory=dict)
+
+
 class RiskScoreResult(BaseModel):
     """Profil risk skoru sonucu.
 
@@ -344,32 +410,53 @@ class AnalyzeRequest(BaseModel):
         default="og",
         description="Gerilim seviyesi: 'ag' (Alçak Gerilim) veya 'og' (Orta Gerilim). Dağıtım bedeli hesaplamasında kullanılır.",
     )
+    hour_detail: HourDetailMode = Field(
+        default=HourDetailMode.SUMMARY,
+        description="Saatlik detay: summary (yok), page (kayıt sayfası) veya columnar (paralel diziler)",
+    )
+    hour_offset: int = Field(
+        default=0, ge=0,
+        description="Saatlik detay dilim başlangıcı (saat indeksi)",
+    )
+    hour_limit: Optional[int] = Field(
+        default=None, ge=1, le=744,
+        description="Dilimdeki en fazla saat (page varsayılanı PRICING_HOUR_PAGE_SIZE, columnar tümü)",
+    )
 
     @model_validator(mode="after")
     def check_t1t2t3_total(self) -> "AnalyzeRequest":
         """use_template=false/None ve T1/T2/T3 alanları verilmişse toplam > 0 olmalı."""
-        # use_template=True ise T1/T2/T3 alanları yoksayılır — geriye uyumluluk
-        if self.use_template is True:
-            return self
-
-        t1 = self.t1_kwh or 0
-        t2 = self.t2_kwh or 0
-        t3 = self.t3_kwh or 0
-
-        # En az bir T1/T2/T3 alanı verilmişse toplam > 0 kontrolü yap
-        any_provided = (
-            self.t1_kwh is not None
-            or self.t2_kwh is not None
-            or self.t3_kwh is not None
-        )
-        if any_provided and (t1 + t2 + t3) <= 0:
-            raise ValueError(
-                "Toplam tüketim sıfır olamaz. En az bir zaman diliminde tüketim giriniz."
-            )
-
+        _check_t1t2t3_total(self.use_template, self.t1_kwh, self.t2_kwh, self.t3_kwh)
         return self
 
 
+def _check_t1t2t3_total(
+    use_template: Optional[bool],
+    t1_kwh: Optional[float],
+    t2_kwh: Optional[float],
+    t3_kwh: Optional[float],
+) -> None:
+    """T1/T2/T3 alanlarından en az biri verilmişse toplam > 0 olmalı."""
+    # use_template=True ise T1/T2/T3 alanları yoksayılır — geriye uyumluluk
+    if use_template is True:
+        return
+
+    t1 = t1_kwh or 0
+    t2 = t2_kwh or 0
+    t3 = t3_kwh or 0
+
+    # En az bir T1/T2/T3 alanı verilmişse toplam > 0 kontrolü yap
+    any_provided = (
+        t1_kwh is not None
+        or t2_kwh is not None
+        or t3_kwh is not None
+    )
+    if any_provided and (t1 + t2 + t3) <= 0:
+        raise ValueError(
+            "Toplam tüketim sıfır olamaz. En az bir zaman diliminde tüketim giriniz."
+        )
+
+
 class SimulateRequest(BaseModel):
     """Katsayı simülasyonu isteği — POST /api/pricing/simulate."""
     customer_id: Optional[str] = Field(
@@ -402,6 +489,122 @@ class SimulateRequest(BaseModel):
     template_monthly_kwh: Optional[float] = Field(default=None, ge=0)
 
 
+class GridRange(BaseModel):
+    """Senaryo küpü ekseni — [start, end] aralığı adım ile açılır (uçlar dahil)."""
+    start: float
+    end: float
+    step: float = Field(gt=0, default=1.0, description="Adım değeri (> 0)")
+
+    @model_validator(mode="after")
+    def _check_order(self) -> "GridRange":
+        if self.end < self.start:
+            raise ValueError(
+                f"Bitiş ({self.end}) başlangıçtan ({self.start}) küçük olamaz."
+            )
+        return self
+
+
+class ScenarioGridRequest(BaseModel):
+    """Senaryo küpü isteği — POST /api/pricing/scenario-grid.
+
+    Katsayı × bayi komisyonu × tahmin hata oranı × dengesizlik bedeli
+    kombinasyonlarının tamamı tek istekte hesaplanır.
+    """
+    customer_id: Optional[str] = Field(
+        default=None,
+        description="Müşteri kimliği",
+    )
+    period: str = Field(description="Dönem (YYYY-MM)")
+    multiplier: GridRange = Field(
+        default_factory=lambda: GridRange(start=1.02, end=1.10, step=0.01),
+        description="Katsayı ekseni (başlangıç ≥ 1.0, bitiş ≤ 2.0)",
+    )
+    dealer_commission_pct: GridRange = Field(
+        default_factory=lambda: GridRange(start=0, end=0, step=1),
+        description="Bayi komisyon yüzdesi ekseni (0–100)",
+    )
+    forecast_error_rate: GridRange = Field(
+        default_factory=lambda: GridRange(start=0.05, end=0.05, step=0.01),
+        description="Tahmin hata oranı ekseni (0–1)",
+    )
+    imbalance_cost_tl_per_mwh: GridRange = Field(
+        default_factory=lambda: GridRange(start=50, end=50, step=10),
+        description="Sabit mod dengesizlik birim maliyeti ekseni (TL/MWh, ≥ 0)",
+    )
+    smf_based_imbalance_enabled: bool = Field(
+        default=False,
+        description="SMF bazlı dengesizlik hesabı aktif mi (bedel ekseni etkisiz kalır)",
+    )
+    use_template: Optional[bool] = Field(default=None)
+    template_name: Optional[str] = Field(default=None)
+    template_monthly_kwh: Optional[float] = Field(default=None, ge=0)
+
+    @model_validator(mode="after")
+    def _check_bounds(self) -> "ScenarioGridRequest":
+        bounds = {
+            "multiplier": (self.multiplier, 1.0, 2.0),
+            "dealer_commission_pct": (self.dealer_commission_pct, 0.0, 100.0),
+            "forecast_error_rate": (self.forecast_error_rate, 0.0, 1.0),
+            "imbalance_cost_tl_per_mwh": (self.imbalance_cost_tl_per_mwh, 0.0, None),
+        }
+        for name, (axis, lo, hi) in bounds.items():
+            if axis.start < lo or (hi is not None and axis.end > hi):
+                raise ValueError(
+                    f"{name} aralığı [{lo}, {hi if hi is not None else '∞'}] dışında: "
+                    f"{axis.start}–{axis.end}"
+                )
+        return self
+
+
+class MarginAtRiskRequest(BaseModel):
+    """Monte Carlo marj riski isteği — POST /api/pricing/margin-at-risk."""
+    customer_id: Optional[str] = Field(
+        default=None,
+        description="Müşteri kimliği",
+    )
+    period: str = Field(description="Dönem (YYYY-MM)")
+    multiplier: float = Field(
+        ge=1.0,
+        description="Önerilen katsayı (minimum 1.0)",
+    )
+    dealer_commission_pct: float = Field(
+        ge=0, le=100, default=0,
+        description="Bayi komisyon yüzdesi (0–100 arası, varsayılan 0)",
+    )
+    imbalance_params: ImbalanceParams = Field(
+        default_factory=ImbalanceParams,
+        description="Dengesizlik maliyeti parametreleri",
+    )
+    n_paths: int = Field(
+        ge=1, default=10000,
+        description="Monte Carlo yol sayısı",
+    )
+    seed: int = Field(default=0, ge=0, description="Rastgele tohum (tekrar üretilebilirlik)")
+    confidence: float = Field(
+        ge=0.5, lt=1.0, default=0.95,
+        description="VaR/CVaR güven düzeyi",
+    )
+    history_months: int = Field(
+        ge=1, le=36, default=12,
+        description="Gün şekli örneklenecek geçmiş dönem sayısı (hedef dahil)",
+    )
+    block_days: int = Field(
+        ge=1, le=7, default=3,
+        description="Bootstrap blok uzunluğu (aynı tipte ardışık gün)",
+    )
+    consumption_noise: float = Field(
+        ge=0, le=1.0, default=0.10,
+        description="Saatlik tüketim gürültüsü (lognormal sigma)",
+    )
+    price_level_sigma: float = Field(
+        ge=0, le=1.0, default=0.10,
+        description="Dönem fiyat seviyesi şoku (lognormal sigma)",
+    )
+    use_template: Optional[bool] = Field(default=None)
+    template_name: Optional[str] = Field(default=None)
+    template_monthly_kwh: Optional[float] = Field(default=None, ge=0)
+
+
 class CompareRequest(BaseModel):
     """Çoklu ay karşılaştırma isteği — POST /api/pricing/compare."""
     customer_id: Optional[str] = Field(
@@ -409,8 +612,8 @@ class CompareRequest(BaseModel):
         description="Müşteri kimliği",
     )
     periods: list[str] = Field(
-        min_length=2, max_length=12,
-        description="Karşılaştırılacak dönemler (2–12 adet, YYYY-MM)",
+        min_length=2, max_length=24,
+        description="Karşılaştırılacak dönemler (2–24 adet, YYYY-MM)",
     )
     multiplier: float = Field(
         ge=1.0,
@@ -427,6 +630,85 @@ class CompareRequest(BaseModel):
     use_template: Optional[bool] = Field(default=None)
     template_name: Optional[str] = Field(default=None)
     template_monthly_kwh: Optional[float] = Field(default=None, ge=0)
+    max_workers: Optional[int] = Field(
+        default=None, ge=1, le=32,
+        description="Dönemleri süreç havuzunda hesapla (en fazla PRICING_BATCH_MAX_WORKERS; varsayılan aynı süreç)",
+    )
+
+
+class BatchAnalyzeItem(BaseModel):
+    """Toplu analizde tek müşteri / şablon tanımı.
+
+    Tüketim önceliği /analyze ile aynıdır: T1/T2/T3 > şablon > DB profili.
+    """
+    customer_id: Optional[str] = Field(default=None, description="Müşteri kimliği")
+    use_template: Optional[bool] = Field(default=None)
+    template_name: Optional[str] = Field(default=None)
+    template_monthly_kwh: Optional[float] = Field(default=None, ge=0)
+    t1_kwh: Optional[float] = Field(default=None, ge=0)
+    t2_kwh: Optional[float] = Field(default=None, ge=0)
+    t3_kwh: Optional[float] = Field(default=None, ge=0)
+
+    @model_validator(mode="after")
+    def check_t1t2t3_total(self) -> "BatchAnalyzeItem":
+        _check_t1t2t3_total(self.use_template, self.t1_kwh, self.t2_kwh, self.t3_kwh)
+        return self
+
+
+class BatchAnalyzeRequest(BaseModel):
+    """Toplu (portföy) analiz isteği — POST /api/pricing/analyze-batch.
+
+    Tek dönem, ortak fiyatlama parametreleri, N müşteri / şablon.
+    """
+    period: str = Field(description="Dönem (YYYY-MM)")
+    multiplier: float = Field(ge=1.0, description="Katsayı değeri (minimum 1.0)")
+    dealer_commission_pct: float = Field(
+        ge=0, le=100, default=0,
+        description="Bayi komisyon yüzdesi (0–100 arası, varsayılan 0)",
+    )
+    imbalance_params: ImbalanceParams = Field(
+        default_factory=ImbalanceParams,
+        description="Dengesizlik maliyeti parametreleri",
+    )
+    voltage_level: Optional[str] = Field(
+        default="og",
+        description="Gerilim seviyesi: 'ag' veya 'og' (dağıtım bedeli için)",
+    )
+    items: list[BatchAnalyzeItem] = Field(
+        min_length=1, max_length=10000,
+        description="Analiz edilecek müşteriler / şablonlar (1–10000 adet)",
+    )
+    max_workers: Optional[int] = Field(
+        default=None, ge=1, le=32,
+        description="Süreç havuzu boyutu (varsayılan: PRICING_BATCH_MAX_WORKERS)",
+    )
+
+
+class BacktestRequest(BaseModel):
+    """Çok dönemli geçmiş backtest isteği — POST /api/pricing/backtest.
+
+    Ortak sözleşme parametreleri, N müşteri / şablon; her kalem piyasa
+    verisi bulunan tüm dönemlerde (isteğe bağlı aralıkla) çalıştırılır.
+    """
+    multiplier: float = Field(ge=1.0, description="Katsayı değeri (minimum 1.0)")
+    dealer_commission_pct: float = Field(
+        ge=0, le=100, default=0,
+        description="Bayi komisyon yüzdesi (0–100 arası, varsayılan 0)",
+    )
+    imbalance_params: ImbalanceParams = Field(
+        default_factory=ImbalanceParams,
+        description="Dengesizlik maliyeti parametreleri",
+    )
+    start_period: Optional[str] = Field(default=None, description="İlk dönem (YYYY-MM, dahil)")
+    end_period: Optional[str] = Field(default=None, description="Son dönem (YYYY-MM, dahil)")
+    items: list[BatchAnalyzeItem] = Field(
+        min_length=1, max_length=10000,
+        description="Backtest edilecek müşteriler / şablonlar (1–10000 adet)",
+    )
+    max_workers: Optional[int] = Field(
+        default=None, ge=1, le=32,
+        description="Süreç havuzu boyutu (varsayılan: PRICING_BATCH_MAX_WORKERS)",
+    )
 
 
 class ReportRequest(BaseModel):
@@ -600,6 +882,10 @@ class AnalyzeResponse(BaseModel):
         default=None,
         description="Nominal vs Gerçek Marj Analizi — ana karar motoru",
     )
+    hour_costs: Optional[HourlyCostDetail] = Field(
+        default=None,
+        description="Saatlik maliyet detayı (yalnız hour_detail=page|columnar isteğinde)",
+    )
     warnings: list[dict] = Field(default_factory=list)
     data_quality: DataQualityReport
     cache_hit: bool = Field(default=False)
@@ -613,6 +899,44 @@ class SimulateResponse(BaseModel):
     safe_multiplier: SafeMultiplierResult
 
 
+class MarginAtRiskResponse(BaseModel):
+    """Monte Carlo marj riski yanıtı — POST /api/pricing/margin-at-risk."""
+    status: str = Field(default="ok")
+    period: str
+    multiplier: float
+    nominal_net_margin_tl: float = Field(description="Gerçekleşmiş tek yol net marjı")
+    margin_at_risk: MarginAtRiskResult
+    warnings: list[dict] = Field(default_factory=list)
+
+
+class ScenarioGridResponse(BaseModel):
+    """Senaryo küpü yanıtı — sütunsal yük, istemci ek istek olmadan dilimler.
+
+    Küp dizileri C sırasıyla düzleştirilmiştir: indeks
+    ((m × D + d) × F + f) × C + c; shape = [M, D, F, C].
+    Her (bayi, hata oranı, bedel) dilimi aynı parametrelerle /simulate
+    satırlarıyla birebir aynıdır.
+    """
+    status: str = Field(default="ok")
+    period: str
+    shape: list[int] = Field(description="[katsayı, bayi %, hata oranı, bedel] eksen uzunlukları")
+    multipliers: list[float]
+    dealer_commission_pcts: list[float]
+    forecast_error_rates: list[float]
+    imbalance_costs_tl_per_mwh: list[float]
+    smf_based_imbalance_enabled: bool
+    total_cost_tl: float
+    total_sales_tl: list[float] = Field(description="Katsayı ekseni (M)")
+    gross_margin_tl: list[float] = Field(description="Katsayı ekseni (M)")
+    loss_hours: list[int] = Field(description="Katsayı ekseni (M)")
+    total_loss_tl: list[float] = Field(description="Katsayı ekseni (M)")
+    imbalance_tl_per_mwh: list[float] = Field(description="Dengesizlik düzlemi (F × C)")
+    imbalance_cost_tl: list[float] = Field(description="Dengesizlik düzlemi (F × C)")
+    dealer_commission_tl: list[float] = Field(description="Tam küp (M × D × F × C)")
+    net_margin_tl: list[float] = Field(description="Tam küp (M × D × F × C)")
+    warnings: list[dict] = Field(default_factory=list)
+
+
 class PeriodComparison(BaseModel):
     """Tek dönem karşılaştırma sonucu — compare yanıtında kullanılır."""
     period: str
@@ -636,6 +960,50 @@ class CompareResponse(BaseModel):
     safe_multiplier: SafeMultiplierResult
 
 
+class PortfolioSummary(BaseModel):
+    """Toplu analiz portföy özeti — analyze-batch NDJSON akışının son satırı."""
+    period: str
+    items_total: int = Field(ge=0)
+    items_ok: int = Field(ge=0)
+    items_failed: int = Field(ge=0)
+    total_consumption_kwh: float = Field(description="Toplam tüketim (kWh)")
+    total_sales_tl: float = Field(description="Toplam satış (TL)")
+    total_cost_tl: float = Field(description="Toplam baz maliyet (TL)")
+    total_net_margin_tl: float = Field(description="Toplam net marj (TL)")
+    weighted_net_margin_tl_per_mwh: float = Field(
+        description="Tüketim ağırlıklı net marj (TL/MWh) = Σ net marj / Σ MWh",
+    )
+    total_hours: int = Field(ge=0, description="Toplam analiz edilen saat")
+    loss_hours: int = Field(ge=0, description="Toplam zararlı saat")
+    loss_hour_exposure_pct: float = Field(
+        description="Zararlı saat oranı (%) = zararlı saat / toplam saat × 100",
+    )
+    total_loss_tl: float = Field(description="Zararlı saatlerin toplam zararı (TL)")
+    loss_making_items: int = Field(ge=0, description="Net marjı negatif kalem sayısı")
+    risk_distribution: dict[str, int] = Field(
+        default_factory=dict,
+        description="Risk skoruna göre kalem sayıları (Düşük/Orta/Yüksek)",
+    )
+
+
+class BacktestSummary(BaseModel):
+    """Backtest portföy özeti — NDJSON akışının son satırı."""
+    periods: list[str] = Field(description="Piyasa verisi yüklenen dönemler")
+    yekdem_missing_periods: list[str] = Field(
+        default_factory=list,
+        description="YEKDEM kaydı olmayan (0 ile hesaplanan) dönemler",
+    )
+    items_total: int = Field(ge=0)
+    items_ok: int = Field(ge=0)
+    items_failed: int = Field(ge=0)
+    loss_making_items: int = Field(ge=0, description="Kümülatif net marjı negatif kalem sayısı")
+    total_net_margin_tl: float = Field(description="Portföy kümülatif net marjı (TL)")
+    by_period: list[dict] = Field(
+        default_factory=list,
+        description="Dönem bazlı portföy net marjı, zararlı saat ve kümülatif K/Z",
+    )
+
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # Upload Response Modelleri
 # ═══════════════════════════════════════════════════════════════════════════════
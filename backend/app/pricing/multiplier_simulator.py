@@ -1,9 +1,10 @@
 """
 Pricing Risk Engine — Katsayı Simülatörü ve Güvenli Katsayı Hesaplama.
 
-İki ana fonksiyon:
+Ana fonksiyonlar:
 1. run_simulation(): Katsayı aralığında simülasyon çalıştır
-2. calculate_safe_multiplier(): 5. persentil güvenli katsayı hesapla
+2. run_scenario_grid(): Katsayı × bayi × dengesizlik senaryo küpü
+3. calculate_safe_multiplier(): 5. persentil güvenli katsayı hesapla
 
 KRİTİK TASARIM KARARLARI:
 - Güvenli katsayı taramasında integer step kullanılır (1001–1100)
@@ -11,6 +12,10 @@ KRİTİK TASARIM KARARLARI:
   → 1001 = ×1.001, 1100 = ×1.100
 - kWh vs MWh dönüşümü: TL = kWh × (TL/MWh) / 1000
 - Bayi komisyonu = brüt marj × bayi yüzdesi / 100
+- Simülasyon tek geçişte yapılır: saatlik baz maliyet ve dönem istatistikleri
+  bir kez hesaplanır, tüm katsayı satırları matris işlemiyle değerlendirilir
+- Güvenli katsayı aynı integer grid üzerinde ikili arama ile bulunur
+  (p5 marjı katsayıda monoton); doğrusal tarama referans olarak korunur
 
 Requirements: 10.1–10.4, 11.1–11.5, 13.2, 14.5
 """
@@ -19,6 +24,10 @@ from __future__ import annotations
 
 import math
 import os
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+import numpy as np
 
 from .models import (
     SimulationRow,
@@ -26,7 +35,23 @@ from .models import (
     ImbalanceParams,
 )
 from .excel_parser import ParsedMarketRecord, ParsedConsumptionRecord
-from .pricing_engine import calculate_hourly_costs
+from .pricing_engine import (
+    RISK_FLOOR,
+    CostBasis,
+    build_cost_basis,
+    summarize_cost_totals,
+)
+from .period_frame import build_period_frame, seq_sum
+
+# Matris taramada bir seferde değerlendirilen katsayı satırı sayısı
+# (satır × saat float64 bellek üst sınırı: 512 × 744 × 8B ≈ 3 MB)
+_SWEEP_CHUNK_ROWS = 512
+
+# Aralık açma hassasiyeti (ondalık basamak)
+_GRID_PRECISION = 6
+
+# Senaryo küpü hücre üst sınırı (M × D × F × C) — yanıt boyutu koruması
+PRICING_GRID_MAX_CELLS = int(os.getenv("PRICING_GRID_MAX_CELLS", "250000"))
 
 
 def run_simulation(
@@ -41,8 +66,10 @@ def run_simulation(
 ) -> list[SimulationRow]:
     """Katsayı simülasyonu çalıştır.
 
-    Belirtilen aralıkta her katsayı için tam saatlik maliyet hesabı yapar.
-    Sonuçlar katsayıya göre artan sıralıdır.
+    Belirtilen aralıktaki her katsayı için calculate_hourly_costs ile aynı
+    sonuçları üretir; katsayıdan bağımsız taban (ağırlıklı fiyat, saatlik baz
+    maliyet) bir kez kurulur ve satırlar sweep_multipliers ile tek geçişte
+    değerlendirilir. Sonuçlar katsayıya göre artan sıralıdır.
 
     Monotonluk garantileri:
     - multiplier↑ → revenue↑ (kesin artan)
@@ -76,58 +103,243 @@ def run_simulation(
     if multiplier_step <= 0:
         raise ValueError(f"Adım değeri pozitif olmalı: {multiplier_step}")
 
-    # Float kaymasını önlemek için integer aritmetik kullan
-    # Adımı 1e6 hassasiyetle integer'a çevir
-    precision = 6
-    factor = 10 ** precision
-    start_int = round(multiplier_start * factor)
-    end_int = round(multiplier_end * factor)
-    step_int = round(multiplier_step * factor)
+    multipliers = expand_grid_values(multiplier_start, multiplier_end, multiplier_step)
+    if multipliers.size == 0:
+        return []
 
-    if step_int == 0:
-        raise ValueError(f"Adım değeri çok küçük: {multiplier_step}")
+    # Katsayıdan bağımsız taban — bir kez
+    basis = build_cost_basis(
+        build_period_frame(market_records, consumption_records),
+        yekdem_tl_per_mwh,
+    )
 
     rows: list[SimulationRow] = []
-    current_int = start_int
-
-    while current_int <= end_int:
-        multiplier = current_int / factor
-
-        # Tam saatlik maliyet hesabı
-        cost_result = calculate_hourly_costs(
-            market_records=market_records,
-            consumption_records=consumption_records,
-            yekdem_tl_per_mwh=yekdem_tl_per_mwh,
-            multiplier=multiplier,
-            imbalance_params=imbalance_params,
-            dealer_commission_pct=dealer_commission_pct,
+    for block, total_sales, loss_hours, total_loss in sweep_multipliers(
+        basis, multipliers,
+    ):
+        for multiplier, sales, n_loss, loss_tl in zip(
+            block, total_sales, loss_hours, total_loss,
+        ):
+            totals = summarize_cost_totals(
+                basis, sales, imbalance_params,
+                dealer_commission_pct=dealer_commission_pct,
+            )
+            rows.append(SimulationRow(
+                multiplier=round(multiplier, 6),
+                total_sales_tl=totals["total_sales_revenue_tl"],
+                total_cost_tl=totals["total_base_cost_tl"],
+                gross_margin_tl=totals["total_gross_margin_tl"],
+                dealer_commission_tl=round(
+                    totals["total_gross_margin_tl"] * dealer_commission_pct / 100.0, 2
+                ),
+                net_margin_tl=totals["total_net_margin_tl"],
+                loss_hours=n_loss,
+                total_loss_tl=round(loss_tl, 2),
+            ))
+
+    return rows
+
+
+def expand_grid_values(start: float, end: float, step: float) -> np.ndarray:
+    """[start, end] aralığını adım ile float64 diziye aç (uçlar dahil).
+
+    Float kaymasını önlemek için 1e6 hassasiyetli integer aritmetik kullanılır
+    (×1.07 gibi değerler birikimli toplama hatası taşımaz).
+
+    Raises:
+        ValueError: Adım pozitif değil veya çok küçük.
+    """
+    if step <= 0:
+        raise ValueError(f"Adım değeri pozitif olmalı: {step}")
+    factor = 10 ** _GRID_PRECISION
+    start_int = round(start * factor)
+    end_int = round(end * factor)
+    step_int = round(step * factor)
+    if step_int == 0:
+        raise ValueError(f"Adım değeri çok küçük: {step}")
+    return np.arange(start_int, end_int + 1, step_int, dtype=np.int64) / factor
+
+
+def sweep_multipliers(
+    basis: CostBasis,
+    multipliers: np.ndarray,
+) -> Iterator[tuple[list[float], list[float], list[int], list[float]]]:
+    """Katsayı vektörünü matris işlemiyle değerlendir (satır blokları halinde).
+
+    Her satır için calculate_hourly_costs ile bit-for-bit aynı:
+    - toplam satış: Σ(kWh × enerji × katsayı / 1000), soldan sağa
+    - zarar saati: saatlik marj < 0 (yuvarlanmamış)
+    - toplam zarar: zararlı saatlerin round(marj, 2) toplamı
+
+    Args:
+        basis: Katsayıdan bağımsız maliyet tabanı.
+        multipliers: Katsayı dizisi (float64).
+
+    Yields:
+        (katsayılar, toplam_satış, zarar_saati, toplam_zarar) listeleri — blok başına.
+    """
+    for lo in range(0, multipliers.shape[0], _SWEEP_CHUNK_ROWS):
+        block = multipliers[lo:lo + _SWEEP_CHUNK_ROWS]
+
+        # satır × saat matrisleri
+        sales = basis.kwh_energy[np.newaxis, :] * block[:, np.newaxis] / 1000.0
+        margin = sales - basis.base_cost[np.newaxis, :]
+        loss_mask = margin < 0
+
+        if sales.shape[1]:
+            total_sales = (0.0 + np.cumsum(sales, axis=1)[:, -1]).tolist()
+        else:
+            total_sales = [0.0] * block.shape[0]
+
+        # Zarar toplamı yuvarlanmış saatlik marjlar üzerinden (round() parite için
+        # Python tarafında; yalnız zararlı hücreler dolaşılır)
+        total_loss: list[float] = []
+        for row_margin, row_mask in zip(margin, loss_mask):
+            loss_tl = 0.0
+            for value in row_margin[row_mask].tolist():
+                loss_tl += round(value, 2)
+            total_loss.append(loss_tl)
+
+        yield (
+            block.tolist(),
+            total_sales,
+            loss_mask.sum(axis=1).tolist(),
+            total_loss,
         )
 
-        # Zararlı saat sayısı ve toplam zarar
-        loss_hours = 0
-        total_loss_tl = 0.0
-        for entry in cost_result.hour_costs:
-            if entry.is_loss_hour:
-                loss_hours += 1
-                total_loss_tl += entry.margin_tl  # Negatif değer
-
-        rows.append(SimulationRow(
-            multiplier=round(multiplier, 6),
-            total_sales_tl=cost_result.total_sales_revenue_tl,
-            total_cost_tl=cost_result.total_base_cost_tl,
-            gross_margin_tl=cost_result.total_gross_margin_tl,
-            dealer_commission_tl=round(
-                cost_result.total_gross_margin_tl * dealer_commission_pct / 100.0, 2
-            ),
-            net_margin_tl=cost_result.total_net_margin_tl,
-            loss_hours=loss_hours,
-            total_loss_tl=round(total_loss_tl, 2),
-        ))
-
-        current_int += step_int
 
-    return rows
+# ═══════════════════════════════════════════════════════════════════════════════
+# Senaryo Küpü (katsayı × bayi × dengesizlik)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+@dataclass
+class ScenarioGrid:
+    """Senaryo küpü — sütunsal, yuvarlanmış (SimulationRow ile aynı değerler).
+
+    Küp eksen sırası: [katsayı, bayi %, tahmin hata oranı, dengesizlik bedeli];
+    düz listeler C sırasıyla (son eksen en hızlı değişir).
+    """
+    multipliers: list[float]
+    dealer_commission_pcts: list[float]
+    forecast_error_rates: list[float]
+    imbalance_costs_tl_per_mwh: list[float]
+    smf_based_imbalance_enabled: bool
+    total_cost_tl: float
+    # Katsayı ekseni (uzunluk M) — bayi/dengesizlikten bağımsız
+    total_sales_tl: list[float]
+    gross_margin_tl: list[float]
+    loss_hours: list[int]
+    total_loss_tl: list[float]
+    # Dengesizlik düzlemi (F × C)
+    imbalance_tl_per_mwh: list[float]
+    imbalance_cost_tl: list[float]
+    # Tam küp (M × D × F × C)
+    dealer_commission_tl: list[float]
+    net_margin_tl: list[float]
+
+    @property
+    def shape(self) -> tuple[int, int, int, int]:
+        return (
+            len(self.multipliers), len(self.dealer_commission_pcts),
+            len(self.forecast_error_rates), len(self.imbalance_costs_tl_per_mwh),
+        )
+
+
+def _py_max(a, b):
+    """Python max(a, b) ile aynı seçim (eşitlik/NaN/-0.0 dahil) — vektörel."""
+    return np.where(b > a, b, a)
+
+
+def _py_min(a, b):
+    """Python min(a, b) ile aynı seçim — vektörel."""
+    return np.where(b < a, b, a)
+
+
+def _round_list(values: np.ndarray) -> list[float]:
+    # Python round() — np.round ile bazı yarım değerlerde farklı sonuç verir
+    return [round(v, 2) for v in values.ravel().tolist()]
+
 
+def run_scenario_grid(
+    basis: CostBasis,
+    multipliers: np.ndarray,
+    dealer_commission_pcts: np.ndarray,
+    forecast_error_rates: np.ndarray,
+    imbalance_costs_tl_per_mwh: np.ndarray,
+    smf_based_imbalance_enabled: bool = False,
+) -> ScenarioGrid:
+    """Katsayı × bayi × dengesizlik küpünü tek geçişte hesapla.
+
+    Saatlik diziler yalnızca katsayı ekseni için bir kez taranır
+    (sweep_multipliers); bayi ve dengesizlik eksenleri dönem skalerlerinde
+    doğrusal olduğundan küp summarize_cost_totals formülleriyle yayınım
+    (broadcast) ile hesaplanır. Her (bayi, hata oranı, bedel) dilimi aynı
+    parametrelerle run_simulation satırları ile birebir aynıdır.
+    """
+    weighted_ptf = basis.weighted.weighted_ptf_tl_per_mwh
+    weighted_smf = basis.weighted.weighted_smf_tl_per_mwh
+    total_consumption = basis.weighted.total_consumption_kwh
+    total_base_cost = basis.total_base_cost
+
+    # ── Katsayı ekseni: saatlik tarama ──
+    mults: list[float] = []
+    sales: list[float] = []
+    loss_hours: list[int] = []
+    total_loss: list[float] = []
+    for block, block_sales, block_loss_hours, block_loss in sweep_multipliers(basis, multipliers):
+        mults.extend(block)
+        sales.extend(block_sales)
+        loss_hours.extend(block_loss_hours)
+        total_loss.extend(block_loss)
+
+    m_ax = np.array(sales, dtype=np.float64)[:, None, None, None]
+    d_ax = np.asarray(dealer_commission_pcts, dtype=np.float64)[None, :, None, None]
+    f_ax = np.asarray(forecast_error_rates, dtype=np.float64)[None, None, :, None]
+    c_ax = np.asarray(imbalance_costs_tl_per_mwh, dtype=np.float64)[None, None, None, :]
+
+    # ── Dengesizlik düzlemi (calculate_imbalance_cost + RISK_FLOOR) ──
+    if smf_based_imbalance_enabled:
+        # SMF bazlı bedel maliyet ekseninden bağımsız — düzlem şekline yayınla
+        calculated = np.broadcast_to(
+            abs(weighted_smf - weighted_ptf) * f_ax, (1, 1, f_ax.shape[2], c_ax.shape[3]),
+        )
+    else:
+        calculated = c_ax * f_ax
+    imbalance_per_mwh = _py_max(calculated, weighted_ptf * RISK_FLOOR)
+    imbalance_share = imbalance_per_mwh * total_consumption / 1000.0
+
+    # ── Marjlar (summarize_cost_totals, dağıtım = 0 — /simulate ile aynı) ──
+    gross_margin_energy = m_ax - total_base_cost
+    # dağıtım = 0 → x - 0.0 == x (bit-for-bit), brüt toplam = enerji marjı
+    gross_margin_total = gross_margin_energy
+    raw_dealer = gross_margin_energy * d_ax / 100.0
+    dealer = _py_max(0.0, _py_min(raw_dealer, _py_max(0.0, gross_margin_energy)))
+    net_margin = gross_margin_total - dealer - imbalance_share
+
+    # SimulationRow.dealer_commission_tl: yuvarlanmış brüt marj × bayi % (üst sınırsız)
+    gross_rounded = np.array(
+        [round(v, 2) for v in gross_margin_energy.ravel().tolist()], dtype=np.float64,
+    )[:, None, None, None]
+    shape = (len(mults), d_ax.shape[1], f_ax.shape[2], c_ax.shape[3])
+
+    return ScenarioGrid(
+        multipliers=[round(m, 6) for m in mults],
+        dealer_commission_pcts=d_ax.ravel().tolist(),
+        forecast_error_rates=f_ax.ravel().tolist(),
+        imbalance_costs_tl_per_mwh=c_ax.ravel().tolist(),
+        smf_based_imbalance_enabled=smf_based_imbalance_enabled,
+        total_cost_tl=round(total_base_cost, 2),
+        total_sales_tl=[round(v, 2) for v in sales],
+        gross_margin_tl=gross_rounded.ravel().tolist(),
+        loss_hours=loss_hours,
+        total_loss_tl=[round(v, 2) for v in total_loss],
+        imbalance_tl_per_mwh=_round_list(np.broadcast_to(imbalance_per_mwh[0, 0], shape[2:])),
+        imbalance_cost_tl=_round_list(np.broadcast_to(imbalance_share[0, 0], shape[2:])),
+        dealer_commission_tl=_round_list(
+            np.broadcast_to(gross_rounded * d_ax / 100.0, shape)
+        ),
+        net_margin_tl=_round_list(np.broadcast_to(net_margin, shape)),
+    )
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -135,9 +347,6 @@ def run_simulation(
 # ═══════════════════════════════════════════════════════════════════════════════
 
 # PeriodData: Tek dönem için piyasa + tüketim verisi çifti
-from dataclasses import dataclass
-
-
 @dataclass
 class PeriodData:
     """Tek dönem verisi — güvenli katsayı hesabında kullanılır."""
@@ -152,6 +361,8 @@ def calculate_safe_multiplier(
     imbalance_params: ImbalanceParams,
     dealer_commission_pct: float = 0.0,
     confidence_level: float = 0.95,
+    search_mode: str = "bisect",
+    bases: Optional[list[CostBasis]] = None,
 ) -> SafeMultiplierResult:
     """Güvenli katsayı hesapla — 5. persentil algoritması.
 
@@ -164,23 +375,45 @@ def calculate_safe_multiplier(
     5. Önerilen katsayı = ceil(safe × 100) / 100 (bir üst 0.01 adımı)
     6. ×1.10 üzeri uyarısı
 
+    Arama modu:
+    - "bisect" (varsayılan): p5 marjı katsayıda monoton artan olduğundan aynı
+      integer grid üzerinde ikili arama — ~log2(N) değerlendirme. Negatif
+      tüketimli saat varsa monotonluk garanti değildir → otomatik "linear".
+    - "linear": 1001'den itibaren sırayla tarama (referans davranış).
+    Her iki mod da aynı değerlendirme fonksiyonunu kullanır; sonuç aynıdır.
+
     Args:
         periods_data: Dönem verileri listesi (1+ dönem).
         yekdem_tl_per_mwh: YEKDEM bedeli (TL/MWh).
         imbalance_params: Dengesizlik parametreleri.
         dealer_commission_pct: Bayi komisyon yüzdesi (0–100).
         confidence_level: Güven düzeyi (varsayılan 0.95).
+        search_mode: "bisect" veya "linear".
+        bases: Önceden kurulmuş dönem maliyet tabanları (verilirse
+            periods_data yok sayılır; aynı YEKDEM ile kurulmuş olmalı).
 
     Returns:
         SafeMultiplierResult: Güvenli katsayı sonucu.
 
     Raises:
-        ValueError: Dönem verisi boş ise.
+        ValueError: Dönem verisi boş ise veya geçersiz arama modu.
     """
-    if not periods_data:
+    if not periods_data and not bases:
         raise ValueError("En az bir dönem verisi gerekli.")
+    if search_mode not in ("bisect", "linear"):
+        raise ValueError(f"Geçersiz arama modu: {search_mode}")
+
+    # Katsayıdan bağımsız tabanlar — dönem başına bir kez
+    if bases is None:
+        bases = [
+            build_cost_basis(
+                build_period_frame(pd.market_records, pd.consumption_records),
+                yekdem_tl_per_mwh,
+            )
+            for pd in periods_data
+        ]
 
-    n_periods = len(periods_data)
+    n_periods = len(bases)
     is_single_period = n_periods == 1
 
     # Integer step tarama: 1001–max (×1.001 – ×max_multiplier)
@@ -190,60 +423,43 @@ def calculate_safe_multiplier(
     # ×1.10 üzeri uyarı her zaman verilir
     SCAN_END = MAX_SAFE
 
-    safe_int: int | None = None
+    def _net_margin(basis: CostBasis, multiplier: float) -> float:
+        total_sales = seq_sum(basis.kwh_energy * multiplier / 1000.0)
+        return summarize_cost_totals(
+            basis, total_sales, imbalance_params,
+            dealer_commission_pct=dealer_commission_pct,
+        )["total_net_margin_tl"]
 
-    for mult_int in range(SCAN_START, SCAN_END + 1):
+    def _is_safe(mult_int: int) -> bool:
         multiplier = mult_int / 1000.0
 
         if is_single_period:
             # Tek ay: saatlik marj dağılımı üzerinden 5. persentil
-            pd = periods_data[0]
-            cost_result = calculate_hourly_costs(
-                market_records=pd.market_records,
-                consumption_records=pd.consumption_records,
-                yekdem_tl_per_mwh=yekdem_tl_per_mwh,
-                multiplier=multiplier,
-                imbalance_params=imbalance_params,
-                dealer_commission_pct=dealer_commission_pct,
-            )
-
-            # Saatlik marjları topla
-            hourly_margins = [entry.margin_tl for entry in cost_result.hour_costs]
-            if not hourly_margins:
-                continue
-
-            # 5. persentil hesapla
-            sorted_margins = sorted(hourly_margins)
-            p5_value = _percentile(sorted_margins, 5)
-
-            # 5. persentilde marj ≥ 0 ise bu katsayı güvenli
-            if p5_value >= 0:
-                safe_int = mult_int
-                break
+            basis = bases[0]
+            margins = basis.kwh_energy * multiplier / 1000.0 - basis.base_cost
+            n = margins.shape[0]
+            if n == 0:
+                return False
+            # round() monoton → sıralı yuvarlanmış listenin k. elemanı =
+            # k. en küçük ham marjın yuvarlanmışı
+            idx = max(0, min(int(n * 5 / 100), n - 1))
+            p5_value = round(float(np.partition(margins, idx)[idx]), 2)
         else:
             # Çoklu ay: aylık net marj dağılımı üzerinden 5. persentil
-            monthly_net_margins: list[float] = []
-
-            for pd in periods_data:
-                cost_result = calculate_hourly_costs(
-                    market_records=pd.market_records,
-                    consumption_records=pd.consumption_records,
-                    yekdem_tl_per_mwh=yekdem_tl_per_mwh,
-                    multiplier=multiplier,
-                    imbalance_params=imbalance_params,
-                    dealer_commission_pct=dealer_commission_pct,
-                )
-                monthly_net_margins.append(cost_result.total_net_margin_tl)
-
-            if not monthly_net_margins:
-                continue
+            monthly_net_margins = [_net_margin(b, multiplier) for b in bases]
+            p5_value = _percentile(sorted(monthly_net_margins), 5)
 
-            sorted_margins = sorted(monthly_net_margins)
-            p5_value = _percentile(sorted_margins, 5)
+        # 5. persentilde marj ≥ 0 ise bu katsayı güvenli
+        return p5_value >= 0
 
-            if p5_value >= 0:
-                safe_int = mult_int
-                break
+    monotone = all(bool((b.kwh_energy >= 0).all()) for b in bases)
+    if search_mode == "bisect" and monotone:
+        safe_int = _bisect_first_safe(_is_safe, SCAN_START, SCAN_END)
+    else:
+        safe_int = next(
+            (m for m in range(SCAN_START, SCAN_END + 1) if _is_safe(m)),
+            None,
+        )
 
     # Sonuç oluştur
     if safe_int is not None:
@@ -269,17 +485,9 @@ def calculate_safe_multiplier(
         )
 
     # Aylık marjlar (güvenli katsayı ile hesaplanmış)
-    monthly_margins: list[float] = []
-    for pd in periods_data:
-        cost_result = calculate_hourly_costs(
-            market_records=pd.market_records,
-            consumption_records=pd.consumption_records,
-            yekdem_tl_per_mwh=yekdem_tl_per_mwh,
-            multiplier=safe_multiplier,
-            imbalance_params=imbalance_params,
-            dealer_commission_pct=dealer_commission_pct,
-        )
-        monthly_margins.append(round(cost_result.total_net_margin_tl, 2))
+    monthly_margins: list[float] = [
+        round(_net_margin(basis, safe_multiplier), 2) for basis in bases
+    ]
 
     return SafeMultiplierResult(
         safe_multiplier=safe_multiplier,
@@ -291,6 +499,23 @@ def calculate_safe_multiplier(
     )
 
 
+def _bisect_first_safe(is_safe, lo: int, hi: int) -> int | None:
+    """[lo, hi] integer aralığında is_safe'in True olduğu ilk değeri bul.
+
+    is_safe monoton (False…False True…True) varsayılır. Hiç True yoksa None.
+    """
+    if lo > hi or not is_safe(hi):
+        return None
+    # Değişmez: is_safe(hi) True; lo'dan küçük değerler elenmiş
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if is_safe(mid):
+            hi = mid
+        else:
+            lo = mid + 1
+    return hi
+
+
 def _percentile(sorted_values: list[float], percentile: int) -> float:
     """Sıralı listeden persentil değeri hesapla.
 
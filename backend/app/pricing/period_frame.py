@@ -0,0 +1,136 @@
+"""
+Pricing Risk Engine — Sütunsal Dönem Çerçevesi (PeriodFrame).
+
+Piyasa ve tüketim kayıtlarını (date, hour) bazında BİR KEZ eşleştirip
+saat hizalı float64 dizilerine dönüştürür:
+
+    ptf[i], smf[i], kwh[i], zone[i]   (i = eşleşen i. tüketim saati)
+
+calculate_weighted_prices, calculate_hourly_costs ve
+calculate_time_zone_breakdown aynı çerçeve üzerinde vektörel çalışır;
+/pricing/analyze bu üç fonksiyonu art arda çağırdığında indeks yalnızca
+bir kez kurulur.
+
+PARİTE KURALI (bit-for-bit):
+- Eşleştirme semantiği döngü versiyonu ile aynıdır: tüketim sırası korunur,
+  eşleşmeyen saat atlanır, yinelenen piyasa kaydında son kayıt geçerlidir.
+- Eleman bazlı işlemler aynı işlem sırasıyla yapılır (IEEE-754 aynı sonuç).
+- Toplamlar np.sum (pairwise) ile DEĞİL, soldan sağa birikimli toplam ile
+  alınır → Python `+=` döngüsü ile birebir aynı float sonucu.
+- Yuvarlama Python round() ile yapılır (np.round farklı yuvarlayabilir).
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from .models import TimeZone
+from .excel_parser import ParsedMarketRecord, ParsedConsumptionRecord
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Zaman Dilimi Kodları
+# ═══════════════════════════════════════════════════════════════════════════════
+
+# Dizi içinde zaman dilimi int8 kod olarak tutulur: 0=T1, 1=T2, 2=T3
+ZONE_ORDER: tuple[TimeZone, ...] = (TimeZone.T1, TimeZone.T2, TimeZone.T3)
+
+# Saat (0–23) → zone kodu. classify_hour() ile aynı sınırlar:
+# T1 06:00–16:59, T2 17:00–21:59, T3 22:00–05:59
+HOUR_ZONE_CODES = np.array(
+    [2] * 6 + [0] * 11 + [1] * 5 + [2] * 2,
+    dtype=np.int8,
+)
+
+# Geçersiz saat (0–23 dışı) için işaret kodu — classify kullanan
+# fonksiyonlar bu kodu görünce classify_hour() ile aynı hatayı fırlatır.
+INVALID_ZONE_CODE = -1
+
+
+@dataclass
+class PeriodFrame:
+    """Eşleşmiş saatlerin sütunsal temsili — tüketim sırasıyla hizalı.
+
+    Tüm diziler aynı uzunluktadır (matched_hours).
+    """
+    dates: list[str]          # YYYY-MM-DD
+    hours: np.ndarray         # int64, 0–23
+    ptf: np.ndarray           # float64, TL/MWh
+    smf: np.ndarray           # float64, TL/MWh
+    kwh: np.ndarray           # float64, kWh
+    zone: np.ndarray          # int8, ZONE_ORDER indeksi (geçersiz saat → -1)
+
+    @property
+    def matched_hours(self) -> int:
+        return int(self.kwh.shape[0])
+
+
+def build_period_frame(
+    market_records: list[ParsedMarketRecord],
+    consumption_records: list[ParsedConsumptionRecord],
+) -> PeriodFrame:
+    """Piyasa ve tüketim kayıtlarını (date, hour) bazında eşleştirip çerçeve kur.
+
+    Args:
+        market_records: Saatlik piyasa verileri.
+        consumption_records: Saatlik tüketim verileri.
+
+    Returns:
+        PeriodFrame: Eşleşen saatlerin sütunsal temsili (eşleşme yoksa boş).
+    """
+    # Piyasa verilerini (date, hour) → record olarak indeksle (son kayıt geçerli)
+    market_index: dict[tuple[str, int], ParsedMarketRecord] = {}
+    for mr in market_records:
+        market_index[(mr.date, mr.hour)] = mr
+
+    dates: list[str] = []
+    hours: list[int] = []
+    ptf: list[float] = []
+    smf: list[float] = []
+    kwh: list[float] = []
+
+    for cr in consumption_records:
+        mr = market_index.get((cr.date, cr.hour))
+        if mr is None:
+            continue  # Eşleşmeyen kayıt — atla
+        dates.append(cr.date)
+        hours.append(cr.hour)
+        ptf.append(mr.ptf_tl_per_mwh)
+        smf.append(mr.smf_tl_per_mwh)
+        kwh.append(cr.consumption_kwh)
+
+    hours_arr = np.array(hours, dtype=np.int64)
+    zone = np.full(hours_arr.shape[0], INVALID_ZONE_CODE, dtype=np.int8)
+    valid = (hours_arr >= 0) & (hours_arr <= 23)
+    zone[valid] = HOUR_ZONE_CODES[hours_arr[valid]]
+
+    return PeriodFrame(
+        dates=dates,
+        hours=hours_arr,
+        ptf=np.array(ptf, dtype=np.float64),
+        smf=np.array(smf, dtype=np.float64),
+        kwh=np.array(kwh, dtype=np.float64),
+        zone=zone,
+    )
+
+
+def check_zone_codes(frame: PeriodFrame) -> None:
+    """Geçersiz saat varsa classify_hour() ile aynı ValueError'ı fırlat."""
+    invalid = np.flatnonzero(frame.zone == INVALID_ZONE_CODE)
+    if invalid.size:
+        from .time_zones import classify_hour
+        classify_hour(int(frame.hours[invalid[0]]))
+
+
+def seq_sum(values: np.ndarray) -> float:
+    """Soldan sağa birikimli toplam — `total = 0.0; total += v` ile birebir aynı.
+
+    np.sum pairwise toplama kullanır ve son hanelerde farklı sonuç verebilir;
+    parite için cumsum'un son elemanı alınır. `0.0 +` ön eki tümü -0.0 olan
+    dizide döngü versiyonundaki +0.0 sonucunu korur.
+    """
+    if values.shape[0] == 0:
+        return 0.0
+    return 0.0 + float(np.cumsum(values)[-1])
@@ -0,0 +1,102 @@
+"""
+Pricing Risk Engine — Sıralı Süreç Havuzu.
+
+Toplu analiz, backtest, karşılaştırma ve margin-at-risk aynı düzeni kullanır:
+
+- Ortak, büyük bağlam (piyasa deposu, girdiler) worker başına initializer
+  ile BİR KEZ gönderilir; görev başına yalnız küçük görev nesnesi gider
+- Havuz "spawn" bağlamı kullanır — thread'li uvicorn sürecinden fork
+  güvenli değildir
+- Sonuçlar GİRİŞ SIRASIYLA, sınırlı pencere ile üretilir (bellek O(pencere));
+  görevler tembel bir iterator olabilir
+- Havuz hataları (worker çöktü, görev serileştirilemedi) on_error ile kalem
+  sonucuna çevrilebilir; verilmezse istisna yükseltilir
+- Üreteç erken kapanırsa bekleyen görevler iptal edilir, çalışanlar
+  beklenmez
+
+fn modül düzeyinde tanımlı (pickle edilebilir) bir fonksiyon olmalıdır:
+fn(context, task) → sonuç.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+# Worker başına havuzda bekleyen görev sayısı (akış penceresi)
+WINDOW_PER_WORKER = 4
+
+# Worker süreç durumu — initializer ile bir kez kurulur
+_worker_fn: Optional[Callable[[Any, Any], Any]] = None
+_worker_context: Any = None
+
+
+def _init_worker(fn: Callable[[Any, Any], Any], context: Any) -> None:
+    global _worker_fn, _worker_context
+    _worker_fn = fn
+    _worker_context = context
+
+
+def _run_in_worker(task: Any) -> Any:
+    return _worker_fn(_worker_context, task)
+
+
+def iter_ordered_results(
+    fn: Callable[[Any, Any], Any],
+    context: Any,
+    tasks: Iterable[Any],
+    max_workers: int = 1,
+    on_error: Optional[Callable[[Any, Exception], Any]] = None,
+) -> Iterator[Any]:
+    """fn(context, task) sonuçlarını GİRİŞ SIRASIYLA üret.
+
+    max_workers <= 1 → aynı süreçte sırayla. Aksi halde "spawn" süreç
+    havuzu; havuzda en fazla max_workers × pencere görev bekler.
+
+    Args:
+        fn: Modül düzeyinde görev fonksiyonu.
+        context: Worker başına bir kez gönderilen ortak bağlam.
+        tasks: Görevler (tembel iterator olabilir).
+        max_workers: Süreç sayısı.
+        on_error: (task, istisna) → sonuç. Havuz hatalarını kalem sonucuna
+            çevirir; None ise istisna yükseltilir. Aynı süreç yolunda
+            kullanılmaz (fn kendi hatalarını yönetir).
+    """
+    if max_workers <= 1:
+        for task in tasks:
+            yield fn(context, task)
+        return
+
+    window = max_workers * WINDOW_PER_WORKER
+    pool = ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(fn, context),
+    )
+
+    def _next_result(task: Any, future: Future) -> Any:
+        try:
+            return future.result()
+        except Exception as e:
+            if on_error is None:
+                raise
+            return on_error(task, e)
+
+    pending: deque = deque()
+    try:
+        for task in tasks:
+            try:
+                future = pool.submit(_run_in_worker, task)
+            except Exception as e:  # BrokenProcessPool: havuz artık görev almaz
+                future = Future()
+                future.set_exception(e)
+            pending.append((task, future))
+            if len(pending) >= window:
+                yield _next_result(*pending.popleft())
+        while pending:
+            yield _next_result(*pending.popleft())
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,212 @@
+"""
+Pricing Risk Engine — Toplu (Portföy) Analiz.
+
+Ay sonu koşusunda binlerce müşteri aynı dönem için analiz edilir. /analyze
+her çağrıda dönemin piyasa verisini ve YEKDEM'i yeniden yükler; burada:
+
+- Piyasa verisi + YEKDEM + ortak parametreler BİR KEZ hazırlanır (BatchContext)
+- Süreç havuzunda her worker bağlamı initializer ile bir kez alır; görev
+  başına yalnızca müşterinin tüketim kayıtları gönderilir
+- Sonuçlar istek sırasıyla, sınırlı pencere ile akıtılır (bellek O(pencere))
+- PortfolioAccumulator akış bitince portföy özetini üretir
+
+Hesaplama analysis.compute_analysis ile /analyze'dakinin aynısıdır (özet
+yanıt: marj gerçekliğinin saatlik histogramı taşınmaz).
+Süreç havuzu düzeni pool_utils ile ortaktır ("spawn" bağlamı).
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, Optional
+
+from .analysis import compute_analysis
+from .excel_parser import ParsedMarketRecord, ParsedConsumptionRecord
+from .models import ImbalanceParams, PortfolioSummary, RiskLevel
+from .pool_utils import iter_ordered_results
+
+logger = logging.getLogger(__name__)
+
+# Havuz boyutu: env var veya min(4, CPU)
+PRICING_BATCH_MAX_WORKERS = int(
+    os.getenv("PRICING_BATCH_MAX_WORKERS", str(min(4, os.cpu_count() or 1)))
+)
+# Bu sayının altındaki partiler süreç başlatma maliyetine değmez → aynı süreçte
+PRICING_BATCH_MIN_POOL_ITEMS = int(os.getenv("PRICING_BATCH_MIN_POOL_ITEMS", "8"))
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Veri Yapıları
+# ═══════════════════════════════════════════════════════════════════════════════
+
+@dataclass
+class BatchContext:
+    """Partideki tüm kalemler için ortak, bir kez hazırlanan girdiler."""
+    period: str
+    market_records: list[ParsedMarketRecord]
+    yekdem: float
+    multiplier: float
+    imbalance_params: ImbalanceParams
+    dealer_commission_pct: float = 0.0
+    voltage_level: Optional[str] = "og"
+    warnings: list[dict] = field(default_factory=list)
+
+
+@dataclass
+class BatchTask:
+    """Tek kalem: tüketim kayıtları veya yükleme aşamasında oluşan hata."""
+    index: int
+    customer_id: Optional[str]
+    consumption_records: list[ParsedConsumptionRecord] = field(default_factory=list)
+    error: Optional[dict] = None
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Kalem Hesaplama
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def analyze_task(context: BatchContext, task: BatchTask) -> dict:
+    """Tek kalemi analiz et → NDJSON satırı (dict).
+
+    Hata kalemi bozmaz; status="error" satırı döner.
+    """
+    line: dict = {"type": "item", "index": task.index, "customer_id": task.customer_id}
+    if task.error is not None:
+        return {**line, "status": "error", "error": task.error}
+
+    try:
+        response = compute_analysis(
+            period=context.period,
+            customer_id=task.customer_id,
+            market_records=context.market_records,
+            consumption_records=task.consumption_records,
+            yekdem=context.yekdem,
+            multiplier=context.multiplier,
+            imbalance_params=context.imbalance_params,
+            dealer_commission_pct=context.dealer_commission_pct,
+            voltage_level=context.voltage_level,
+            warnings=context.warnings,
+            hourly_margins=False,
+        )
+    except ValueError as e:
+        return {
+            **line, "status": "error",
+            "error": {"error": "calculation_error", "message": str(e)},
+        }
+    except Exception as e:
+        logger.exception("analyze-batch item %d failed", task.index)
+        return {
+            **line, "status": "error",
+            "error": {"error": "internal_error", "message": str(e)},
+        }
+
+    return {**line, "status": "ok", "result": response.model_dump(mode="json")}
+
+
+def _pool_error_line(task: BatchTask, exc: Exception) -> dict:
+    """Havuz hatası (worker çöktü, görev serileştirilemedi) → kalem hata satırı."""
+    logger.error("analyze-batch item %d failed in pool: %r", task.index, exc)
+    return {
+        "type": "item", "index": task.index, "customer_id": task.customer_id,
+        "status": "error",
+        "error": {"error": "worker_error", "message": str(exc) or type(exc).__name__},
+    }
+
+
+def iter_batch_results(
+    context: BatchContext,
+    tasks: Iterable[BatchTask],
+    max_workers: int = 1,
+) -> Iterator[dict]:
+    """Kalemleri analiz et ve sonuç satırlarını GİRİŞ SIRASIYLA üret.
+
+    max_workers <= 1 → aynı süreçte sırayla. Aksi halde sınırlı pencereli
+    süreç havuzu (pool_utils.iter_ordered_results); tasks tembel bir iterator
+    ise (DB'den kalem kalem yükleme) bellek sınırlı kalır.
+
+    Havuz hataları akışı kesmez: çöken worker / serileştirilemeyen görev o
+    kalem(ler) için status="error" satırı üretir. Üreteç erken kapanırsa
+    (istemci koptu) bekleyen görevler iptal edilir.
+    """
+    return iter_ordered_results(
+        analyze_task, context, tasks, max_workers, on_error=_pool_error_line,
+    )
+
+
+def resolve_worker_count(n_items: int, requested: Optional[int] = None) -> int:
+    """Parti boyutuna göre etkin worker sayısı (küçük parti → 1)."""
+    if n_items < PRICING_BATCH_MIN_POOL_ITEMS:
+        return 1
+    workers = requested if requested is not None else PRICING_BATCH_MAX_WORKERS
+    return max(1, min(workers, n_items))
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Portföy Özeti
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class PortfolioAccumulator:
+    """Akış satırlarından portföy özeti biriktir (tek geçiş)."""
+
+    def __init__(self, period: str) -> None:
+        self.period = period
+        self.items_ok = 0
+        self.items_failed = 0
+        self.total_kwh = 0.0
+        self.total_sales = 0.0
+        self.total_cost = 0.0
+        self.total_net_margin = 0.0
+        self.total_hours = 0
+        self.loss_hours = 0
+        self.total_loss = 0.0
+        self.loss_making_items = 0
+        self.risk_distribution: dict[str, int] = {level.value: 0 for level in RiskLevel}
+
+    def add(self, line: dict) -> None:
+        if line.get("status") != "ok":
+            self.items_failed += 1
+            return
+
+        result = line["result"]
+        pricing = result["pricing"]
+        loss_map = result["loss_map"]
+
+        self.items_ok += 1
+        self.total_kwh += result["weighted_prices"]["total_consumption_kwh"]
+        self.total_hours += result["weighted_prices"]["hours_count"]
+        self.total_sales += pricing["total_sales_tl"]
+        self.total_cost += pricing["total_cost_tl"]
+        self.total_net_margin += pricing["total_net_margin_tl"]
+        self.loss_hours += loss_map["total_loss_hours"]
+        self.total_loss += loss_map["total_loss_tl"]
+        if pricing["total_net_margin_tl"] < 0:
+            self.loss_making_items += 1
+        score = result["risk_score"]["score"]
+        self.risk_distribution[score] = self.risk_distribution.get(score, 0) + 1
+
+    def summary(self) -> PortfolioSummary:
+        total_mwh = self.total_kwh / 1000.0
+        return PortfolioSummary(
+            period=self.period,
+            items_total=self.items_ok + self.items_failed,
+            items_ok=self.items_ok,
+            items_failed=self.items_failed,
+            total_consumption_kwh=round(self.total_kwh, 2),
+            total_sales_tl=round(self.total_sales, 2),
+            total_cost_tl=round(self.total_cost, 2),
+            total_net_margin_tl=round(self.total_net_margin, 2),
+            weighted_net_margin_tl_per_mwh=(
+                round(self.total_net_margin / total_mwh, 2) if total_mwh > 0 else 0.0
+            ),
+            total_hours=self.total_hours,
+            loss_hours=self.loss_hours,
+            loss_hour_exposure_pct=(
+                round(self.loss_hours / self.total_hours * 100, 2)
+                if self.total_hours > 0 else 0.0
+            ),
+            total_loss_tl=round(self.total_loss, 2),
+            loss_making_items=self.loss_making_items,
+            risk_distribution=self.risk_distribution,
+        )
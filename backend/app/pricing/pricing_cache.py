@@ -4,10 +4,31 @@ Pricing Risk Engine — Analiz Cache Yönetimi.
 SHA256 bazlı cache key ile analiz sonuçlarını önbelleğe alır.
 TTL süresi dolmuş kayıtlar otomatik atlanır.
 
-Invalidation kuralları:
-- Tüketim verisi güncelleme → müşteri cache sil
-- Piyasa verisi güncelleme → dönem cache sil
-- YEKDEM güncelleme → dönem cache sil
+İki katman:
+- L1: işlem içi LRU (kayıt sayısı + byte + kısa TTL sınırlı), veritabanı
+  engine'i başına ayrı → sıcak okuma DB'ye hiç gitmez
+- L2: analysis_cache tablosu (worker'lar arası paylaşımlı, uzun TTL)
+
+hit_count okuma yolunda commit edilmez; sayaçlar bellekte biriktirilir ve
+toplu UPDATE ile yazılır (PRICING_CACHE_HIT_FLUSH_EVERY okuma veya
+PRICING_CACHE_HIT_FLUSH_SECONDS saniyede bir, ya da flush_hit_counts()).
+SQLite'ta okuma başına yazma transaction'ı en sıcak endpoint'i seri hale
+getiriyordu.
+
+Geçersizleştirme (versiyon damgası):
+- Cache key aktif DataVersion numaralarını içerir (piyasa, tüketim, YEKDEM)
+- Veri güncellemesi yeni versiyon oluşturur → eski kayıtlar artık eşleşmez,
+  upload isteğinde toplu silme yapılmaz
+- Eşleşmeyen kayıtlar TTL dolunca arka plan süpürücüsü ile silinir
+  (start_cache_sweeper, idx_cache_expires üzerinden)
+- invalidate_cache_for_customer/period manuel temizlik için korunur ve
+  her iki katmanı da kapsar
+
+Hazırlık önbelleği (yalnız teklif parametresi değişen tekrar analiz):
+- (müşteri, dönem, veri versiyonları, tüketim kaynağı, gerilim) başına
+  analysis.PreparedAnalysis (yeterli istatistikler) işlem içinde tutulur
+- katsayı / bayi / dengesizlik değişikliği tam cache'i ıskalasa da DB'den
+  yükleme ve hazırlık atlanır; sonuç tam çalıştırma ile bit-for-bit aynı
 
 Cache key bileşenleri (eksiksiz):
 - customer_id
@@ -17,6 +38,7 @@ Cache key bileşenleri (eksiksiz):
 - imbalance_params (forecast_error_rate, imbalance_cost, smf_enabled)
 - template_name (varsa)
 - template_monthly_kwh (varsa)
+- data_versions (aktif piyasa/tüketim/YEKDEM versiyonları)
 
 Requirements: 21.1, 21.2, 21.3, 21.4
 """
@@ -27,18 +49,272 @@ import hashlib
 import json
 import logging
 import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Callable, Optional
 
+from sqlalchemy import and_, or_
 from sqlalchemy.orm import Session
 
-from .schemas import AnalysisCache
+from .schemas import AnalysisCache, DataVersion
 
 logger = logging.getLogger(__name__)
 
 # TTL yapılandırması: env var veya varsayılan 24 saat
 PRICING_CACHE_TTL_HOURS = int(os.getenv("PRICING_CACHE_TTL_HOURS", "24"))
 
+# L1 (işlem içi LRU) sınırları
+PRICING_CACHE_L1_MAX_ENTRIES = int(os.getenv("PRICING_CACHE_L1_MAX_ENTRIES", "512"))
+PRICING_CACHE_L1_MAX_BYTES = int(os.getenv("PRICING_CACHE_L1_MAX_BYTES", str(64 * 1024 * 1024)))
+PRICING_CACHE_L1_TTL_SECONDS = int(os.getenv("PRICING_CACHE_L1_TTL_SECONDS", "60"))
+
+# hit_count toplu yazım eşikleri
+PRICING_CACHE_HIT_FLUSH_EVERY = int(os.getenv("PRICING_CACHE_HIT_FLUSH_EVERY", "50"))
+PRICING_CACHE_HIT_FLUSH_SECONDS = int(os.getenv("PRICING_CACHE_HIT_FLUSH_SECONDS", "30"))
+
+# Hazırlık önbelleği sınırları (numpy dizileri içerir → yalnız işlem içi)
+PRICING_PREP_CACHE_MAX_ENTRIES = int(os.getenv("PRICING_PREP_CACHE_MAX_ENTRIES", "256"))
+PRICING_PREP_CACHE_TTL_SECONDS = int(os.getenv("PRICING_PREP_CACHE_TTL_SECONDS", "900"))
+
+# Arka plan TTL süpürücüsü: çalışma aralığı (0 → kapalı) ve silme parti boyutu
+PRICING_CACHE_SWEEP_SECONDS = int(os.getenv("PRICING_CACHE_SWEEP_SECONDS", "600"))
+PRICING_CACHE_SWEEP_BATCH = int(os.getenv("PRICING_CACHE_SWEEP_BATCH", "500"))
+
+# Cache key'e katılan versiyonlu veri tipleri (DataVersion.data_type)
+CACHE_VERSIONED_DATA_TYPES = ("market_data", "consumption", "yekdem")
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# L1: İşlem İçi LRU
+# ═══════════════════════════════════════════════════════════════════════════════
+
+@dataclass
+class _L1Entry:
+    result_json: str
+    customer_id: str
+    period: str
+    expires_at: float  # time.monotonic() tabanlı
+
+
+class _L1Tier:
+    """Tek bir veritabanı engine'i için LRU + bekleyen hit sayaçları."""
+
+    def __init__(self) -> None:
+        self.entries: OrderedDict[str, _L1Entry] = OrderedDict()
+        self.total_bytes = 0
+        self.pending_hits: dict[str, int] = {}
+        self.last_flush = time.monotonic()
+
+    def get(self, cache_key: str, now: float) -> Optional[str]:
+        entry = self.entries.get(cache_key)
+        if entry is None:
+            return None
+        if entry.expires_at <= now:
+            self.discard(cache_key)
+            return None
+        self.entries.move_to_end(cache_key)
+        return entry.result_json
+
+    def put(self, cache_key: str, entry: _L1Entry) -> None:
+        size = len(entry.result_json)
+        if size > PRICING_CACHE_L1_MAX_BYTES:
+            return
+        self.discard(cache_key)
+        self.entries[cache_key] = entry
+        self.total_bytes += size
+        while (
+            len(self.entries) > PRICING_CACHE_L1_MAX_ENTRIES
+            or self.total_bytes > PRICING_CACHE_L1_MAX_BYTES
+        ):
+            _, evicted = self.entries.popitem(last=False)
+            self.total_bytes -= len(evicted.result_json)
+
+    def discard(self, cache_key: str) -> None:
+        entry = self.entries.pop(cache_key, None)
+        if entry is not None:
+            self.total_bytes -= len(entry.result_json)
+
+    def discard_where(self, predicate: Callable[[_L1Entry], bool]) -> int:
+        keys = [k for k, e in self.entries.items() if predicate(e)]
+        for k in keys:
+            self.discard(k)
+            self.pending_hits.pop(k, None)
+        return len(keys)
+
+
+# Engine başına L1 — engine kapanınca (GC) kendiliğinden düşer
+_l1_tiers: "weakref.WeakKeyDictionary[object, _L1Tier]" = weakref.WeakKeyDictionary()
+_l1_lock = threading.Lock()
+
+
+def _l1_for(db: Session) -> _L1Tier:
+    bind = db.get_bind()
+    with _l1_lock:
+        tier = _l1_tiers.get(bind)
+        if tier is None:
+            tier = _l1_tiers[bind] = _L1Tier()
+        return tier
+
+
+def clear_l1_cache() -> None:
+    """Tüm L1 katmanlarını (ve bekleyen hit sayaçlarını) temizle."""
+    with _l1_lock:
+        _l1_tiers.clear()
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Hazırlık Önbelleği (Yeterli İstatistikler)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+@dataclass
+class _PrepEntry:
+    prepared: object  # analysis.PreparedAnalysis
+    customer_id: str
+    period: str
+    expires_at: float  # time.monotonic() tabanlı
+
+
+# Engine başına LRU — L1 ile aynı yaşam döngüsü
+_prep_tiers: "weakref.WeakKeyDictionary[object, OrderedDict[str, _PrepEntry]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _prep_for(db: Session) -> OrderedDict[str, _PrepEntry]:
+    bind = db.get_bind()
+    with _l1_lock:
+        tier = _prep_tiers.get(bind)
+        if tier is None:
+            tier = _prep_tiers[bind] = OrderedDict()
+        return tier
+
+
+def build_prep_key(
+    customer_id: Optional[str],
+    period: str,
+    data_versions: dict[str, int],
+    consumption_source: Optional[dict] = None,
+    voltage_level: Optional[str] = None,
+) -> str:
+    """Hazırlık aşamasının girdilerinden SHA256 key — teklif parametreleri HARİÇ.
+
+    Args:
+        customer_id: Müşteri kimliği (şablon/T1-T2-T3 analizinde None).
+        period: Dönem (YYYY-MM).
+        data_versions: Aktif veri versiyonları (bkz. get_data_versions).
+        consumption_source: Tüketimi belirleyen istek alanları (şablon adı,
+            aylık kWh, T1/T2/T3 ...).
+        voltage_level: Gerilim seviyesi (dağıtım bedeli).
+    """
+    key_data = {
+        "customer_id": customer_id or "__template__",
+        "period": period,
+        "data_versions": {
+            data_type: int(data_versions.get(data_type) or 0)
+            for data_type in CACHE_VERSIONED_DATA_TYPES
+        },
+        "consumption_source": consumption_source or {},
+        "voltage_level": (voltage_level or "og").lower(),
+    }
+    key_json = json.dumps(key_data, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(key_json.encode("utf-8")).hexdigest()
+
+
+def get_prepared_analysis(db: Session, prep_key: str):
+    """Önbellekteki hazırlık sonucu (PreparedAnalysis) veya None."""
+    tier = _prep_for(db)
+    now = time.monotonic()
+    with _l1_lock:
+        entry = tier.get(prep_key)
+        if entry is None:
+            return None
+        if entry.expires_at <= now:
+            del tier[prep_key]
+            return None
+        tier.move_to_end(prep_key)
+        return entry.prepared
+
+
+def set_prepared_analysis(
+    db: Session,
+    prep_key: str,
+    customer_id: Optional[str],
+    period: str,
+    prepared: object,
+) -> None:
+    """Hazırlık sonucunu önbelleğe al (LRU + TTL sınırlı)."""
+    tier = _prep_for(db)
+    with _l1_lock:
+        tier.pop(prep_key, None)
+        tier[prep_key] = _PrepEntry(
+            prepared=prepared,
+            customer_id=customer_id or "__template__",
+            period=period,
+            expires_at=time.monotonic() + PRICING_PREP_CACHE_TTL_SECONDS,
+        )
+        while len(tier) > PRICING_PREP_CACHE_MAX_ENTRIES:
+            tier.popitem(last=False)
+
+
+def _discard_prepared_where(db: Session, predicate: Callable[[_PrepEntry], bool]) -> None:
+    tier = _prep_for(db)
+    with _l1_lock:
+        for key in [k for k, e in tier.items() if predicate(e)]:
+            del tier[key]
+
+
+def clear_prepared_analyses() -> None:
+    """Tüm hazırlık önbelleklerini temizle."""
+    with _l1_lock:
+        _prep_tiers.clear()
+
+
+def flush_hit_counts(db: Session) -> int:
+    """Biriken hit sayaçlarını tek transaction'da analysis_cache'e yaz.
+
+    Returns:
+        Güncellenen cache key sayısı.
+    """
+    tier = _l1_for(db)
+    with _l1_lock:
+        pending, tier.pending_hits = tier.pending_hits, {}
+        tier.last_flush = time.monotonic()
+    if not pending:
+        return 0
+
+    try:
+        for cache_key, hits in pending.items():
+            (
+                db.query(AnalysisCache)
+                .filter(AnalysisCache.cache_key == cache_key)
+                .update(
+                    {AnalysisCache.hit_count: AnalysisCache.hit_count + hits},
+                    synchronize_session=False,
+                )
+            )
+        db.commit()
+    except Exception as e:
+        # hit_count istatistiktir — yazılamazsa isteği bozmadan bırak
+        db.rollback()
+        logger.warning("Cache hit flush failed: %s", e)
+        return 0
+    return len(pending)
+
+
+def _record_hit(db: Session, tier: _L1Tier, cache_key: str) -> None:
+    with _l1_lock:
+        tier.pending_hits[cache_key] = tier.pending_hits.get(cache_key, 0) + 1
+        due = (
+            sum(tier.pending_hits.values()) >= PRICING_CACHE_HIT_FLUSH_EVERY
+            or time.monotonic() - tier.last_flush >= PRICING_CACHE_HIT_FLUSH_SECONDS
+        )
+    if due:
+        flush_hit_counts(db)
+
 
 def build_cache_key(
     customer_id: Optional[str],
@@ -48,6 +324,7 @@ def build_cache_key(
     imbalance_params: dict,
     template_name: Optional[str] = None,
     template_monthly_kwh: Optional[float] = None,
+    data_versions: Optional[dict[str, int]] = None,
 ) -> str:
     """Analiz parametrelerinden SHA256 cache key oluştur.
 
@@ -61,6 +338,7 @@ def build_cache_key(
         imbalance_params: Dengesizlik parametreleri dict.
         template_name: Şablon adı (opsiyonel).
         template_monthly_kwh: Şablon aylık tüketim (opsiyonel).
+        data_versions: Aktif veri versiyonları (bkz. get_data_versions).
 
     Returns:
         64 karakter SHA256 hash string.
@@ -78,17 +356,62 @@ def build_cache_key(
         "template_name": template_name,
         "template_monthly_kwh": round(template_monthly_kwh, 2) if template_monthly_kwh else None,
     }
+    # Geriye uyumluluk: versiyon verilmezse key eski formatla aynı kalır
+    if data_versions is not None:
+        key_data["data_versions"] = {
+            data_type: int(data_versions.get(data_type) or 0)
+            for data_type in CACHE_VERSIONED_DATA_TYPES
+        }
 
     # Deterministik JSON (sorted keys)
     key_json = json.dumps(key_data, sort_keys=True, ensure_ascii=False)
     return hashlib.sha256(key_json.encode("utf-8")).hexdigest()
 
 
+def get_data_versions(
+    db: Session,
+    period: str,
+    customer_id: Optional[str],
+) -> dict[str, int]:
+    """Cache key için aktif piyasa/tüketim/YEKDEM versiyonlarını tek sorguda oku.
+
+    Tüketim versiyonu müşteriye özeldir; şablon analizinde (customer_id None)
+    yalnızca piyasa ve YEKDEM versiyonu anlamlıdır. Versiyon kaydı yoksa 0.
+
+    Returns:
+        {"market_data": v, "consumption": v, "yekdem": v}
+    """
+    rows = (
+        db.query(DataVersion.data_type, DataVersion.version)
+        .filter(
+            DataVersion.period == period,
+            DataVersion.is_active == 1,
+            or_(
+                and_(
+                    DataVersion.data_type == "consumption",
+                    DataVersion.customer_id == customer_id,
+                ),
+                and_(
+                    DataVersion.data_type.in_(("market_data", "yekdem")),
+                    DataVersion.customer_id.is_(None),
+                ),
+            ),
+        )
+        .all()
+    )
+    versions = {data_type: 0 for data_type in CACHE_VERSIONED_DATA_TYPES}
+    for data_type, version in rows:
+        versions[data_type] = max(versions[data_type], int(version))
+    return versions
+
+
 def get_cached_result(
     db: Session,
     cache_key: str,
 ) -> Optional[dict]:
-    """Cache'den sonuç al — TTL kontrolü + hit_count artırma.
+    """Cache'den sonuç al — önce L1, sonra analysis_cache (TTL kontrolü).
+
+    hit_count artışı bellekte biriktirilir (bkz. flush_hit_counts).
 
     Args:
         db: SQLAlchemy session.
@@ -96,7 +419,16 @@ def get_cached_result(
 
     Returns:
         Cache'deki analiz sonucu dict veya None (miss/expired).
+        Her çağrı yeni bir dict döner (çağıran değiştirebilir).
     """
+    tier = _l1_for(db)
+    with _l1_lock:
+        result_json = tier.get(cache_key, time.monotonic())
+    if result_json is not None:
+        _record_hit(db, tier, cache_key)
+        logger.debug("Cache hit (L1): key=%s", cache_key[:16])
+        return json.loads(result_json)
+
     record = (
         db.query(AnalysisCache)
         .filter(AnalysisCache.cache_key == cache_key)
@@ -106,29 +438,37 @@ def get_cached_result(
     if record is None:
         return None
 
-    # TTL kontrolü
+    # TTL kontrolü — süresi dolmuş kayıt miss sayılır; okuma yolu yazmaz,
+    # silme cleanup_expired_cache / arka plan süpürücüsünündür
     now = datetime.utcnow()
     if record.expires_at and record.expires_at < now:
-        # Süresi dolmuş — sil
-        db.delete(record)
-        db.commit()
         logger.debug("Cache expired: key=%s", cache_key[:16])
         return None
 
-    # Hit count artır
-    record.hit_count = (record.hit_count or 0) + 1
-    db.commit()
-
-    logger.debug("Cache hit: key=%s, hits=%d", cache_key[:16], record.hit_count)
-
     try:
-        return json.loads(record.result_json)
+        result = json.loads(record.result_json)
     except (json.JSONDecodeError, TypeError):
         logger.warning("Cache corrupt: key=%s", cache_key[:16])
         db.delete(record)
         db.commit()
         return None
 
+    # L1'e al — DB TTL'ini aşmayacak şekilde
+    ttl_seconds = PRICING_CACHE_L1_TTL_SECONDS
+    if record.expires_at:
+        ttl_seconds = min(ttl_seconds, (record.expires_at - now).total_seconds())
+    with _l1_lock:
+        tier.put(cache_key, _L1Entry(
+            result_json=record.result_json,
+            customer_id=record.customer_id,
+            period=record.period,
+            expires_at=time.monotonic() + ttl_seconds,
+        ))
+
+    _record_hit(db, tier, cache_key)
+    logger.debug("Cache hit (L2): key=%s", cache_key[:16])
+    return result
+
 
 def set_cached_result(
     db: Session,
@@ -155,6 +495,12 @@ def set_cached_result(
 
     result_json = json.dumps(result, ensure_ascii=False, default=str)
 
+    # Eski L1 kopyası bir sonraki okumada DB'den tazelenir
+    tier = _l1_for(db)
+    with _l1_lock:
+        tier.discard(cache_key)
+        tier.pending_hits.pop(cache_key, None)
+
     existing = (
         db.query(AnalysisCache)
         .filter(AnalysisCache.cache_key == cache_key)
@@ -193,6 +539,11 @@ def invalidate_cache_for_customer(
     Returns:
         Silinen kayıt sayısı.
     """
+    tier = _l1_for(db)
+    with _l1_lock:
+        tier.discard_where(lambda e: e.customer_id == customer_id)
+    _discard_prepared_where(db, lambda e: e.customer_id == customer_id)
+
     count = (
         db.query(AnalysisCache)
         .filter(AnalysisCache.customer_id == customer_id)
@@ -215,6 +566,11 @@ def invalidate_cache_for_period(
     Returns:
         Silinen kayıt sayısı.
     """
+    tier = _l1_for(db)
+    with _l1_lock:
+        tier.discard_where(lambda e: e.period == period)
+    _discard_prepared_where(db, lambda e: e.period == period)
+
     count = (
         db.query(AnalysisCache)
         .filter(AnalysisCache.period == period)
@@ -226,21 +582,113 @@ def invalidate_cache_for_period(
     return count
 
 
-def cleanup_expired_cache(db: Session) -> int:
+def cleanup_expired_cache(db: Session, batch_size: Optional[int] = None) -> int:
     """Süresi dolmuş tüm cache kayıtlarını temizle.
 
-    Periyodik bakım için kullanılır.
+    Periyodik bakım için kullanılır; bekleyen hit sayaçları da yazılır.
+    batch_size verilirse silme expires_at sırasıyla (idx_cache_expires)
+    partiler halinde yapılır ve her parti ayrı commit edilir → SQLite'ta
+    yazma kilidi kısa tutulur.
 
     Returns:
         Silinen kayıt sayısı.
     """
+    flush_hit_counts(db)
+
+    tier = _l1_for(db)
+    mono_now = time.monotonic()
+    with _l1_lock:
+        tier.discard_where(lambda e: e.expires_at <= mono_now)
+
     now = datetime.utcnow()
-    count = (
-        db.query(AnalysisCache)
-        .filter(AnalysisCache.expires_at < now)
-        .delete()
-    )
-    db.commit()
+    if batch_size is None:
+        count = (
+            db.query(AnalysisCache)
+            .filter(AnalysisCache.expires_at < now)
+            .delete()
+        )
+        db.commit()
+    else:
+        count = 0
+        while True:
+            ids = [
+                row_id for (row_id,) in (
+                    db.query(AnalysisCache.id)
+                    .filter(AnalysisCache.expires_at < now)
+                    .order_by(AnalysisCache.expires_at)
+                    .limit(batch_size)
+                    .all()
+                )
+            ]
+            if not ids:
+                break
+            count += (
+                db.query(AnalysisCache)
+                .filter(AnalysisCache.id.in_(ids))
+                .delete(synchronize_session=False)
+            )
+            db.commit()
     if count > 0:
         logger.info("Cache cleanup: expired=%d", count)
     return count
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Arka Plan TTL Süpürücüsü
+# ═══════════════════════════════════════════════════════════════════════════════
+
+_sweeper_thread: Optional[threading.Thread] = None
+_sweeper_stop = threading.Event()
+
+
+def start_cache_sweeper(
+    session_factory: Callable[[], Session],
+    interval_seconds: Optional[int] = None,
+) -> bool:
+    """Süresi dolmuş cache kayıtlarını periyodik silen daemon thread başlat.
+
+    Versiyon damgalı key'lerle eski kayıtlar upload anında silinmez; bu
+    süpürücü onları TTL dolunca partiler halinde temizler. İdempotent.
+
+    Args:
+        session_factory: Her tur için yeni Session üreten fabrika.
+        interval_seconds: Tur aralığı (varsayılan PRICING_CACHE_SWEEP_SECONDS,
+            0 → başlatılmaz).
+
+    Returns:
+        Süpürücü çalışıyorsa True.
+    """
+    global _sweeper_thread
+    interval = PRICING_CACHE_SWEEP_SECONDS if interval_seconds is None else interval_seconds
+    if interval <= 0:
+        return False
+    if _sweeper_thread is not None and _sweeper_thread.is_alive():
+        return True
+
+    _sweeper_stop.clear()
+
+    def _loop() -> None:
+        while not _sweeper_stop.wait(interval):
+            db = session_factory()
+            try:
+                cleanup_expired_cache(db, batch_size=PRICING_CACHE_SWEEP_BATCH)
+            except Exception as e:
+                db.rollback()
+                logger.warning("Cache sweeper failed: %s", e)
+            finally:
+                db.close()
+
+    _sweeper_thread = threading.Thread(
+        target=_loop, name="pricing-cache-sweeper", daemon=True,
+    )
+    _sweeper_thread.start()
+    return True
+
+
+def stop_cache_sweeper(timeout: float = 5.0) -> None:
+    """Süpürücüyü durdur (test ve kapanış için)."""
+    global _sweeper_thread
+    _sweeper_stop.set()
+    if _sweeper_thread is not None:
+        _sweeper_thread.join(timeout=timeout)
+    _sweeper_thread = None
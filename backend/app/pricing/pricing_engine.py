@@ -7,11 +7,19 @@ KRİTİK: kWh vs MWh dönüşümü
     TL = kWh × (TL/MWh) / 1000
 Bu bölme işlemi her maliyet hesabında ZORUNLUDUR.
 
+Hesaplar period_frame.PeriodFrame üzerinde vektörel yapılır; çağıran taraf
+çerçeveyi bir kez kurup tüm fonksiyonlara `frame=` ile geçebilir.
+
 Requirements: 7.1–7.6, 8.1–8.8, 9.1–9.3, 14.1–14.2
 """
 
 from __future__ import annotations
 
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
 from .models import (
     WeightedPriceResult,
     HourlyCostResult,
@@ -19,13 +27,20 @@ from .models import (
     ImbalanceParams,
 )
 from .excel_parser import ParsedMarketRecord, ParsedConsumptionRecord
-from .time_zones import classify_hour
 from .imbalance import calculate_imbalance_cost
+from .period_frame import (
+    PeriodFrame,
+    ZONE_ORDER,
+    build_period_frame,
+    check_zone_codes,
+    seq_sum,
+)
 
 
 def calculate_weighted_prices(
     market_records: list[ParsedMarketRecord],
     consumption_records: list[ParsedConsumptionRecord],
+    frame: Optional[PeriodFrame] = None,
 ) -> WeightedPriceResult:
     """Ağırlıklı PTF ve SMF hesapla.
 
@@ -36,6 +51,8 @@ def calculate_weighted_prices(
     Args:
         market_records: Saatlik piyasa verileri.
         consumption_records: Saatlik tüketim verileri.
+        frame: Önceden kurulmuş sütunsal çerçeve (verilirse kayıtlar yeniden
+            indekslenmez).
 
     Returns:
         WeightedPriceResult: Ağırlıklı fiyat hesaplama sonucu.
@@ -43,31 +60,16 @@ def calculate_weighted_prices(
     Raises:
         ValueError: Toplam tüketim sıfır ise.
     """
-    # Piyasa verilerini (date, hour) → record olarak indeksle
-    market_index: dict[tuple[str, int], ParsedMarketRecord] = {}
-    for mr in market_records:
-        market_index[(mr.date, mr.hour)] = mr
-
-    # Akümülatörler
-    total_consumption_kwh = 0.0
-    ptf_weighted_sum = 0.0
-    smf_weighted_sum = 0.0
-    ptf_sum = 0.0
-    smf_sum = 0.0
-    matched_hours = 0
-
-    for cr in consumption_records:
-        mr = market_index.get((cr.date, cr.hour))
-        if mr is None:
-            continue  # Eşleşmeyen kayıt — atla
-
-        kwh = cr.consumption_kwh
-        total_consumption_kwh += kwh
-        ptf_weighted_sum += kwh * mr.ptf_tl_per_mwh
-        smf_weighted_sum += kwh * mr.smf_tl_per_mwh
-        ptf_sum += mr.ptf_tl_per_mwh
-        smf_sum += mr.smf_tl_per_mwh
-        matched_hours += 1
+    if frame is None:
+        frame = build_period_frame(market_records, consumption_records)
+
+    # Akümülatörler (soldan sağa toplam — döngü versiyonu ile bit-for-bit aynı)
+    total_consumption_kwh = seq_sum(frame.kwh)
+    ptf_weighted_sum = seq_sum(frame.kwh * frame.ptf)
+    smf_weighted_sum = seq_sum(frame.kwh * frame.smf)
+    ptf_sum = seq_sum(frame.ptf)
+    smf_sum = seq_sum(frame.smf)
+    matched_hours = frame.matched_hours
 
     # Eşleşen saat kontrolü (sıfıra bölme korumasından önce)
     if matched_hours == 0:
@@ -102,110 +104,89 @@ def calculate_weighted_prices(
     )
 
 
-def calculate_hourly_costs(
-    market_records: list[ParsedMarketRecord],
-    consumption_records: list[ParsedConsumptionRecord],
-    yekdem_tl_per_mwh: float,
-    multiplier: float,
-    imbalance_params: ImbalanceParams,
-    dealer_commission_pct: float = 0.0,
-    distribution_unit_price_tl_per_kwh: float = 0.0,
-) -> HourlyCostResult:
-    """Saatlik maliyet, satış fiyatı ve marj hesapla.
+# ═══════════════════════════════════════════════════════════════════════════════
+# Katsayıdan Bağımsız Maliyet Tabanı
+# ═══════════════════════════════════════════════════════════════════════════════
 
-    KRİTİK FORMÜLLER:
-        base_cost_tl = consumption_kwh × (ptf_tl_per_mwh + yekdem_tl_per_mwh) / 1000
-        sales_price_tl = consumption_kwh × (weighted_ptf + yekdem) × multiplier / 1000
-        margin_tl = sales_price_tl - base_cost_tl
-
-    Dual Margin Model (v3):
-        gross_margin_energy = total_sales - total_base_cost
-        gross_margin_total  = total_sales - total_base_cost - distribution_cost_total
+# Safety Guard: Imbalance floor (per-MWh bazlı) — ağırlıklı PTF'nin %1'i
+RISK_FLOOR = 0.01
 
-    Safety Guards (v3.1):
-        dealer_commission = max(0, min(dealer_commission, gross_margin_energy))
-        imbalance_cost_per_mwh = max(calculated, weighted_ptf * RISK_FLOOR)
 
-    Args:
-        market_records: Saatlik piyasa verileri.
-        consumption_records: Saatlik tüketim verileri.
-        yekdem_tl_per_mwh: YEKDEM bedeli (TL/MWh).
-        multiplier: Katsayı (≥ 1.0).
-        imbalance_params: Dengesizlik parametreleri.
-        dealer_commission_pct: Bayi komisyon yüzdesi (0–100, varsayılan 0).
-        distribution_unit_price_tl_per_kwh: Dağıtım birim fiyatı (TL/kWh, varsayılan 0).
+@dataclass
+class CostBasis:
+    """Katsayıdan bağımsız saatlik maliyet bileşenleri — bir kez hesaplanır.
 
-    Returns:
-        HourlyCostResult: Saatlik maliyet hesaplama sonucu.
+    Satış fiyatı katsayıda doğrusal olduğu için, herhangi bir katsayı için
+    saatlik satış = kwh_energy × katsayı / 1000 olarak tekrar türetilir
+    (calculate_hourly_costs ile aynı işlem sırası → bit-for-bit aynı sonuç).
     """
-    # Önce ağırlıklı fiyatları hesapla (satış fiyatı için gerekli)
-    weighted_result = calculate_weighted_prices(market_records, consumption_records)
-    weighted_ptf = weighted_result.weighted_ptf_tl_per_mwh
-    weighted_smf = weighted_result.weighted_smf_tl_per_mwh
+    frame: PeriodFrame
+    weighted: WeightedPriceResult
+    yekdem_tl_per_mwh: float
+    energy_cost_tl_per_mwh: float   # Ağırlıklı_PTF + YEKDEM
+    kwh_energy: np.ndarray          # kWh × energy_cost
+    base_cost: np.ndarray           # kWh × (PTF + YEKDEM) / 1000
+    total_base_cost: float          # Σ base_cost (soldan sağa)
 
-    # Dengesizlik maliyeti hesapla (TL/MWh)
-    calculated_imbalance_per_mwh = calculate_imbalance_cost(
-        weighted_ptf, weighted_smf, imbalance_params
-    )
-
-    # Safety Guard: Imbalance floor (per-MWh bazlı)
-    RISK_FLOOR = 0.01
-    imbalance_cost_per_mwh = max(calculated_imbalance_per_mwh, weighted_ptf * RISK_FLOOR)
-
-    # Enerji maliyeti = Ağırlıklı PTF + YEKDEM (satış fiyatı hesabı için)
-    energy_cost_tl_per_mwh = weighted_ptf + yekdem_tl_per_mwh
 
-    # Piyasa verilerini (date, hour) → record olarak indeksle
-    market_index: dict[tuple[str, int], ParsedMarketRecord] = {}
-    for mr in market_records:
-        market_index[(mr.date, mr.hour)] = mr
-
-    # Saatlik maliyet hesaplama
-    hour_costs: list[HourlyCostEntry] = []
-    total_base_cost = 0.0
-    total_sales = 0.0
-
-    for cr in consumption_records:
-        mr = market_index.get((cr.date, cr.hour))
-        if mr is None:
-            continue  # Eşleşmeyen kayıt — atla
-
-        kwh = cr.consumption_kwh
+def build_cost_basis(
+    frame: PeriodFrame,
+    yekdem_tl_per_mwh: float,
+    weighted: Optional[WeightedPriceResult] = None,
+) -> CostBasis:
+    """Çerçeveden katsayıdan bağımsız maliyet tabanını kur.
 
-        # Baz maliyet: kWh × (PTF + YEKDEM) / 1000
-        base_cost_tl = kwh * (mr.ptf_tl_per_mwh + yekdem_tl_per_mwh) / 1000.0
+    Raises:
+        ValueError: Eşleşen saat yok veya toplam tüketim sıfır
+            (calculate_weighted_prices ile aynı).
+    """
+    if weighted is None:
+        weighted = calculate_weighted_prices([], [], frame=frame)
 
-        # Satış fiyatı: kWh × (Ağırlıklı_PTF + YEKDEM) × Katsayı / 1000
-        sales_price_tl = kwh * energy_cost_tl_per_mwh * multiplier / 1000.0
+    # Zaman dilimi kodları (geçersiz saat → classify_hour ile aynı hata)
+    check_zone_codes(frame)
 
-        # Marj
-        margin_tl = sales_price_tl - base_cost_tl
+    # Enerji maliyeti = Ağırlıklı PTF + YEKDEM (satış fiyatı hesabı için)
+    energy_cost_tl_per_mwh = weighted.weighted_ptf_tl_per_mwh + yekdem_tl_per_mwh
+
+    # Baz maliyet: kWh × (PTF + YEKDEM) / 1000
+    base_cost = frame.kwh * (frame.ptf + yekdem_tl_per_mwh) / 1000.0
+
+    return CostBasis(
+        frame=frame,
+        weighted=weighted,
+        yekdem_tl_per_mwh=yekdem_tl_per_mwh,
+        energy_cost_tl_per_mwh=energy_cost_tl_per_mwh,
+        kwh_energy=frame.kwh * energy_cost_tl_per_mwh,
+        base_cost=base_cost,
+        total_base_cost=seq_sum(base_cost),
+    )
 
-        # Zarar saati tespiti
-        is_loss = margin_tl < 0
 
-        # Zaman dilimi
-        tz = classify_hour(cr.hour)
+def summarize_cost_totals(
+    basis: CostBasis,
+    total_sales: float,
+    imbalance_params: ImbalanceParams,
+    dealer_commission_pct: float = 0.0,
+    distribution_unit_price_tl_per_kwh: float = 0.0,
+) -> dict[str, float]:
+    """Toplam satıştan dual marj, bayi, dengesizlik ve net marjı türet.
 
-        hour_costs.append(HourlyCostEntry(
-            date=cr.date,
-            hour=cr.hour,
-            consumption_kwh=round(kwh, 4),
-            ptf_tl_per_mwh=mr.ptf_tl_per_mwh,
-            smf_tl_per_mwh=mr.smf_tl_per_mwh,
-            yekdem_tl_per_mwh=yekdem_tl_per_mwh,
-            base_cost_tl=round(base_cost_tl, 2),
-            sales_price_tl=round(sales_price_tl, 2),
-            margin_tl=round(margin_tl, 2),
-            is_loss_hour=is_loss,
-            time_zone=tz,
-        ))
+    Returns:
+        HourlyCostResult'ın hour_costs dışındaki (yuvarlanmış) alanları.
+    """
+    weighted_ptf = basis.weighted.weighted_ptf_tl_per_mwh
+    weighted_smf = basis.weighted.weighted_smf_tl_per_mwh
+    total_base_cost = basis.total_base_cost
 
-        total_base_cost += base_cost_tl
-        total_sales += sales_price_tl
+    # Dengesizlik maliyeti hesapla (TL/MWh)
+    calculated_imbalance_per_mwh = calculate_imbalance_cost(
+        weighted_ptf, weighted_smf, imbalance_params
+    )
+    imbalance_cost_per_mwh = max(calculated_imbalance_per_mwh, weighted_ptf * RISK_FLOOR)
 
     # Toplamlar
-    total_consumption = weighted_result.total_consumption_kwh
+    total_consumption = basis.weighted.total_consumption_kwh
 
     # Dağıtım maliyeti
     distribution_cost_total = distribution_unit_price_tl_per_kwh * total_consumption
@@ -225,10 +206,9 @@ def calculate_hourly_costs(
     net_margin = gross_margin_total - dealer_commission - imbalance_share
 
     # Tedarikçi gerçek maliyet = Ağırlıklı_PTF + YEKDEM + Dengesizlik
-    supplier_real_cost = weighted_ptf + yekdem_tl_per_mwh + imbalance_cost_per_mwh
+    supplier_real_cost = weighted_ptf + basis.yekdem_tl_per_mwh + imbalance_cost_per_mwh
 
-    return HourlyCostResult(
-        hour_costs=hour_costs,
+    return dict(
         total_base_cost_tl=round(total_base_cost, 2),
         total_sales_revenue_tl=round(total_sales, 2),
         # Dual margin fields
@@ -244,3 +224,118 @@ def calculate_hourly_costs(
         total_net_margin_tl=round(net_margin, 2),
         supplier_real_cost_tl_per_mwh=round(supplier_real_cost, 2),
     )
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Saatlik Maliyet Hesabı
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+def hourly_cost_columns(
+    basis: CostBasis,
+    multiplier: float,
+    start: int = 0,
+    stop: Optional[int] = None,
+) -> dict[str, list]:
+    """Saatlik maliyet detayını paralel diziler olarak üret.
+
+    Anahtarlar HourlyCostEntry alanlarıdır (YEKDEM hariç — dönem sabiti);
+    yuvarlama ve işlem sırası calculate_hourly_costs ile aynıdır. start/stop
+    yalnızca istenen saat dilimini üretir: sayfalı yanıtta tüm ay için
+    kayıt kurulmaz.
+    """
+    frame = basis.frame
+    window = slice(start, stop)
+    sales_price = basis.kwh_energy[window] * multiplier / 1000.0
+    margin = sales_price - basis.base_cost[window]
+    return {
+        "date": frame.dates[window],
+        "hour": frame.hours[window].tolist(),
+        "consumption_kwh": [round(k, 4) for k in frame.kwh[window].tolist()],
+        "ptf_tl_per_mwh": frame.ptf[window].tolist(),
+        "smf_tl_per_mwh": frame.smf[window].tolist(),
+        "base_cost_tl": [round(b, 2) for b in basis.base_cost[window].tolist()],
+        "sales_price_tl": [round(sp, 2) for sp in sales_price.tolist()],
+        "margin_tl": [round(m, 2) for m in margin.tolist()],
+        "is_loss_hour": (margin < 0).tolist(),
+        "time_zone": [ZONE_ORDER[z] for z in frame.zone[window].tolist()],
+    }
+
+
+def calculate_hourly_costs(
+    market_records: list[ParsedMarketRecord],
+    consumption_records: list[ParsedConsumptionRecord],
+    yekdem_tl_per_mwh: float,
+    multiplier: float,
+    imbalance_params: ImbalanceParams,
+    dealer_commission_pct: float = 0.0,
+    distribution_unit_price_tl_per_kwh: float = 0.0,
+    frame: Optional[PeriodFrame] = None,
+    basis: Optional[CostBasis] = None,
+) -> HourlyCostResult:
+    """Saatlik maliyet, satış fiyatı ve marj hesapla.
+
+    KRİTİK FORMÜLLER:
+        base_cost_tl = consumption_kwh × (ptf_tl_per_mwh + yekdem_tl_per_mwh) / 1000
+        sales_price_tl = consumption_kwh × (weighted_ptf + yekdem) × multiplier / 1000
+        margin_tl = sales_price_tl - base_cost_tl
+
+    Dual Margin Model (v3):
+        gross_margin_energy = total_sales - total_base_cost
+        gross_margin_total  = total_sales - total_base_cost - distribution_cost_total
+
+    Safety Guards (v3.1):
+        dealer_commission = max(0, min(dealer_commission, gross_margin_energy))
+        imbalance_cost_per_mwh = max(calculated, weighted_ptf * RISK_FLOOR)
+
+    Args:
+        market_records: Saatlik piyasa verileri.
+        consumption_records: Saatlik tüketim verileri.
+        yekdem_tl_per_mwh: YEKDEM bedeli (TL/MWh).
+        multiplier: Katsayı (≥ 1.0).
+        imbalance_params: Dengesizlik parametreleri.
+        dealer_commission_pct: Bayi komisyon yüzdesi (0–100, varsayılan 0).
+        distribution_unit_price_tl_per_kwh: Dağıtım birim fiyatı (TL/kWh, varsayılan 0).
+        frame: Önceden kurulmuş sütunsal çerçeve (opsiyonel).
+        basis: Önceden kurulmuş maliyet tabanı (opsiyonel; verilirse
+            yekdem_tl_per_mwh ile aynı YEKDEM'le kurulmuş olmalı).
+
+    Returns:
+        HourlyCostResult: Saatlik maliyet hesaplama sonucu.
+    """
+    if basis is None:
+        if frame is None:
+            frame = build_period_frame(market_records, consumption_records)
+        basis = build_cost_basis(frame, yekdem_tl_per_mwh)
+
+    # Saatlik maliyet hesaplama — vektörel, işlem sırası döngü versiyonu ile aynı
+    # Satış fiyatı: kWh × (Ağırlıklı_PTF + YEKDEM) × Katsayı / 1000
+    sales_price = basis.kwh_energy * multiplier / 1000.0
+    total_sales = seq_sum(sales_price)
+
+    columns = hourly_cost_columns(basis, multiplier)
+    hour_costs: list[HourlyCostEntry] = [
+        HourlyCostEntry(
+            date=d,
+            hour=h,
+            consumption_kwh=k,
+            ptf_tl_per_mwh=p,
+            smf_tl_per_mwh=sm,
+            yekdem_tl_per_mwh=yekdem_tl_per_mwh,
+            base_cost_tl=b,
+            sales_price_tl=sp,
+            margin_tl=m,
+            is_loss_hour=loss,  # Zarar saati tespiti
+            time_zone=z,
+        )
+        for d, h, k, p, sm, b, sp, m, loss, z in zip(*columns.values())
+    ]
+
+    return HourlyCostResult(
+        hour_costs=hour_costs,
+        **summarize_cost_totals(
+            basis, total_sales, imbalance_params,
+            dealer_commission_pct=dealer_commission_pct,
+            distribution_unit_price_tl_per_kwh=distribution_unit_price_tl_per_kwh,
+        ),
+    )
@@ -2,21 +2,32 @@
 Pricing Risk Engine — PDF ve Excel Rapor Üretimi.
 
 PDF: Jinja2 HTML template → Playwright/WeasyPrint/ReportLab fallback
-Excel: openpyxl ile 5 sheet
+Excel: openpyxl write-only çalışma kitabı, 5 sheet; saatlik detay
+ayrıca CSV/Parquet olarak dışa aktarılabilir (tabular_export)
 
 Requirements: 17.1, 17.2, 17.3, 17.4
 """
 
 from __future__ import annotations
 
-import io
 import logging
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import IO, Iterator, Optional
 
 from jinja2 import Environment, FileSystemLoader
 
+from .models import ExportFormat
+from .tabular_export import (
+    ExportColumn,
+    ExportTable,
+    append_xlsx_table,
+    export_table,
+    new_write_only_workbook,
+    open_spool,
+    read_spooled,
+)
+
 logger = logging.getLogger(__name__)
 
 # Template dizini
@@ -170,11 +181,78 @@ def _html_to_pdf(html_content: str) -> bytes:
 # ═══════════════════════════════════════════════════════════════════════════════
 
 
-def generate_excel_report(
+# Saatlik Detay tablosu — XLSX sayfası ve CSV/Parquet dışa aktarma ortak
+HOURLY_DETAIL_COLUMNS = (
+    ExportColumn("Tarih", "date"),
+    ExportColumn("Saat", "hour", "int"),
+    ExportColumn("Tüketim (kWh)", "consumption_kwh", "float"),
+    ExportColumn("PTF (TL/MWh)", "ptf_tl_per_mwh", "float"),
+    ExportColumn("SMF (TL/MWh)", "smf_tl_per_mwh", "float"),
+    ExportColumn("YEKDEM", "yekdem_tl_per_mwh", "float"),
+    ExportColumn("Baz Maliyet (TL)", "base_cost_tl", "float"),
+    ExportColumn("Satış (TL)", "sales_price_tl", "float"),
+    ExportColumn("Marj (TL)", "margin_tl", "float"),
+    ExportColumn("Zarar?", "is_loss_hour", "bool", excel=lambda v: "Evet" if v else ""),
+    ExportColumn("Dilim", "time_zone"),
+)
+
+SIMULATION_COLUMNS = (
+    ExportColumn("Katsayı", "multiplier", "float"),
+    ExportColumn("Satış (TL)", "total_sales_tl", "float"),
+    ExportColumn("Maliyet (TL)", "total_cost_tl", "float"),
+    ExportColumn("Brüt Marj", "gross_margin_tl", "float"),
+    ExportColumn("Bayi Kom.", "dealer_commission_tl", "float"),
+    ExportColumn("Net Marj", "net_margin_tl", "float"),
+    ExportColumn("Zarar Saat", "loss_hours", "int"),
+    ExportColumn("Zarar TL", "total_loss_tl", "float"),
+)
+
+TIME_ZONE_COLUMNS = (
+    ExportColumn("Dilim", "label"),
+    ExportColumn("Tüketim (kWh)", "consumption_kwh", "float"),
+    ExportColumn("Pay (%)", "consumption_pct", "float"),
+    ExportColumn("Ağırlıklı PTF", "weighted_ptf_tl_per_mwh", "float"),
+    ExportColumn("Ağırlıklı SMF", "weighted_smf_tl_per_mwh", "float"),
+    ExportColumn("Maliyet (TL)", "total_cost_tl", "float"),
+)
+
+
+def _dict_rows(items, columns) -> Iterator[tuple]:
+    """dict kayıtları → sütun sırasında tuple (eksik alan: "" / 0)."""
+    defaults = tuple(
+        "" if col.kind == "str" else False if col.kind == "bool" else 0
+        for col in columns
+    )
+    keys = tuple(col.key for col in columns)
+    for item in items:
+        if isinstance(item, dict):
+            yield tuple(item.get(k, d) for k, d in zip(keys, defaults))
+
+
+def hourly_detail_table(analysis_result: dict) -> ExportTable:
+    """Analiz sonucunun saatlik detayı → dışa aktarma tablosu."""
+    return ExportTable(
+        title="Saatlik Detay",
+        columns=HOURLY_DETAIL_COLUMNS,
+        rows=_dict_rows(analysis_result.get("hour_costs", []), HOURLY_DETAIL_COLUMNS),
+    )
+
+
+def export_hourly_detail(analysis_result: dict, fmt: ExportFormat) -> IO[bytes]:
+    """Saatlik detay tablosunu CSV/Parquet/XLSX olarak spool'a yaz.
+
+    Returns:
+        Başa sarılmış SpooledTemporaryFile (çağıran kapatır).
+    """
+    return export_table(hourly_detail_table(analysis_result), fmt)
+
+
+def write_excel_report(
     analysis_result: dict,
+    out: IO[bytes],
     customer_name: Optional[str] = None,
-) -> bytes:
-    """Fiyatlama analiz raporu Excel üret.
+) -> None:
+    """Fiyatlama analiz raporunu write-only çalışma kitabı olarak yaz.
 
     5 Sheet:
     - Sheet 1: Özet
@@ -185,25 +263,24 @@ def generate_excel_report(
 
     Args:
         analysis_result: /analyze endpoint çıktısı (dict).
+        out: Hedef ikili dosya (ör. SpooledTemporaryFile).
         customer_name: Müşteri adı (opsiyonel).
-
-    Returns:
-        Excel bytes (.xlsx).
     """
-    from openpyxl import Workbook
-    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font, PatternFill
 
-    wb = Workbook()
+    wb = new_write_only_workbook()
 
     # Stiller
     header_font = Font(bold=True, size=10)
     header_fill = PatternFill(start_color="10B981", end_color="10B981", fill_type="solid")
     header_font_white = Font(bold=True, size=10, color="FFFFFF")
-    num_fmt = '#,##0.00'
-    border = Border(
-        left=Side(style='thin'), right=Side(style='thin'),
-        top=Side(style='thin'), bottom=Side(style='thin'),
-    )
+    header_style = {"font": header_font_white, "fill": header_fill}
+
+    def styled(ws, value, font):
+        cell = WriteOnlyCell(ws, value=value)
+        cell.font = font
+        return cell
 
     wp = analysis_result.get("weighted_prices", {})
     sc = analysis_result.get("supplier_cost", {})
@@ -213,11 +290,9 @@ def generate_excel_report(
     tz = analysis_result.get("time_zone_breakdown", {})
     loss = analysis_result.get("loss_map", {})
     simulation = analysis_result.get("simulation", [])
-    hour_costs = analysis_result.get("hour_costs", [])
 
     # ── Sheet 1: Özet ──────────────────────────────────────────────────
-    ws1 = wb.active
-    ws1.title = "Özet"
+    ws1 = wb.create_sheet("Özet")
     ws1.column_dimensions['A'].width = 30
     ws1.column_dimensions['B'].width = 25
 
@@ -252,106 +327,81 @@ def generate_excel_report(
         ("Önerilen Katsayı", safe.get("recommended_multiplier", 0)),
     ]
 
-    for i, (label, value) in enumerate(rows, 1):
-        ws1.cell(row=i, column=1, value=label)
-        ws1.cell(row=i, column=2, value=value)
-        if i == 1:
-            ws1.cell(row=i, column=1).font = Font(bold=True, size=14)
+    title, first_value = rows[0]
+    ws1.append([styled(ws1, title, Font(bold=True, size=14)), first_value])
+    for row in rows[1:]:
+        ws1.append(row)
 
     # ── Sheet 2: T1/T2/T3 Dağılım ─────────────────────────────────────
-    ws2 = wb.create_sheet("T1-T2-T3 Dağılım")
-    headers2 = ["Dilim", "Tüketim (kWh)", "Pay (%)", "Ağırlıklı PTF", "Ağırlıklı SMF", "Maliyet (TL)"]
-    for col, h in enumerate(headers2, 1):
-        cell = ws2.cell(row=1, column=col, value=h)
-        cell.font = header_font_white
-        cell.fill = header_fill
-
-    row_idx = 2
+    tz_items = []
     for tz_key in ["T1", "T2", "T3"]:
         tz_data = tz.get(tz_key, {})
         if isinstance(tz_data, dict):
-            ws2.cell(row=row_idx, column=1, value=tz_data.get("label", tz_key))
-            ws2.cell(row=row_idx, column=2, value=tz_data.get("consumption_kwh", 0))
-            ws2.cell(row=row_idx, column=3, value=tz_data.get("consumption_pct", 0))
-            ws2.cell(row=row_idx, column=4, value=tz_data.get("weighted_ptf_tl_per_mwh", 0))
-            ws2.cell(row=row_idx, column=5, value=tz_data.get("weighted_smf_tl_per_mwh", 0))
-            ws2.cell(row=row_idx, column=6, value=tz_data.get("total_cost_tl", 0))
-            row_idx += 1
+            tz_items.append({"label": tz_key, **tz_data})
+    append_xlsx_table(wb, ExportTable(
+        title="T1-T2-T3 Dağılım",
+        columns=TIME_ZONE_COLUMNS,
+        rows=_dict_rows(tz_items, TIME_ZONE_COLUMNS),
+    ), header_style)
 
     # ── Sheet 3: Katsayı Simülasyonu ───────────────────────────────────
-    ws3 = wb.create_sheet("Simülasyon")
-    headers3 = ["Katsayı", "Satış (TL)", "Maliyet (TL)", "Brüt Marj", "Bayi Kom.", "Net Marj", "Zarar Saat", "Zarar TL"]
-    for col, h in enumerate(headers3, 1):
-        cell = ws3.cell(row=1, column=col, value=h)
-        cell.font = header_font_white
-        cell.fill = header_fill
-
-    for i, row in enumerate(simulation, 2):
-        if isinstance(row, dict):
-            ws3.cell(row=i, column=1, value=row.get("multiplier", 0))
-            ws3.cell(row=i, column=2, value=row.get("total_sales_tl", 0))
-            ws3.cell(row=i, column=3, value=row.get("total_cost_tl", 0))
-            ws3.cell(row=i, column=4, value=row.get("gross_margin_tl", 0))
-            ws3.cell(row=i, column=5, value=row.get("dealer_commission_tl", 0))
-            ws3.cell(row=i, column=6, value=row.get("net_margin_tl", 0))
-            ws3.cell(row=i, column=7, value=row.get("loss_hours", 0))
-            ws3.cell(row=i, column=8, value=row.get("total_loss_tl", 0))
+    append_xlsx_table(wb, ExportTable(
+        title="Simülasyon",
+        columns=SIMULATION_COLUMNS,
+        rows=_dict_rows(simulation, SIMULATION_COLUMNS),
+    ), header_style)
 
     # ── Sheet 4: Saatlik Detay ─────────────────────────────────────────
-    ws4 = wb.create_sheet("Saatlik Detay")
-    headers4 = ["Tarih", "Saat", "Tüketim (kWh)", "PTF (TL/MWh)", "SMF (TL/MWh)",
-                "YEKDEM", "Baz Maliyet (TL)", "Satış (TL)", "Marj (TL)", "Zarar?", "Dilim"]
-    for col, h in enumerate(headers4, 1):
-        cell = ws4.cell(row=1, column=col, value=h)
-        cell.font = header_font_white
-        cell.fill = header_fill
-
-    for i, hc in enumerate(hour_costs, 2):
-        if isinstance(hc, dict):
-            ws4.cell(row=i, column=1, value=hc.get("date", ""))
-            ws4.cell(row=i, column=2, value=hc.get("hour", 0))
-            ws4.cell(row=i, column=3, value=hc.get("consumption_kwh", 0))
-            ws4.cell(row=i, column=4, value=hc.get("ptf_tl_per_mwh", 0))
-            ws4.cell(row=i, column=5, value=hc.get("smf_tl_per_mwh", 0))
-            ws4.cell(row=i, column=6, value=hc.get("yekdem_tl_per_mwh", 0))
-            ws4.cell(row=i, column=7, value=hc.get("base_cost_tl", 0))
-            ws4.cell(row=i, column=8, value=hc.get("sales_price_tl", 0))
-            ws4.cell(row=i, column=9, value=hc.get("margin_tl", 0))
-            ws4.cell(row=i, column=10, value="Evet" if hc.get("is_loss_hour") else "")
-            ws4.cell(row=i, column=11, value=hc.get("time_zone", ""))
+    append_xlsx_table(wb, hourly_detail_table(analysis_result), header_style)
 
     # ── Sheet 5: Zarar Haritası ────────────────────────────────────────
     ws5 = wb.create_sheet("Zarar Haritası")
-    ws5.cell(row=1, column=1, value="Zarar Haritası Özeti").font = Font(bold=True, size=12)
-    ws5.cell(row=3, column=1, value="Toplam Zararlı Saat")
-    ws5.cell(row=3, column=2, value=loss.get("total_loss_hours", 0))
-    ws5.cell(row=4, column=1, value="Toplam Zarar (TL)")
-    ws5.cell(row=4, column=2, value=loss.get("total_loss_tl", 0))
-    ws5.cell(row=5, column=1, value="T1 Zarar Saati")
-    ws5.cell(row=5, column=2, value=loss.get("by_time_zone", {}).get("T1", 0))
-    ws5.cell(row=6, column=1, value="T2 Zarar Saati")
-    ws5.cell(row=6, column=2, value=loss.get("by_time_zone", {}).get("T2", 0))
-    ws5.cell(row=7, column=1, value="T3 Zarar Saati")
-    ws5.cell(row=7, column=2, value=loss.get("by_time_zone", {}).get("T3", 0))
+    by_tz = loss.get("by_time_zone", {})
+    ws5.append([styled(ws5, "Zarar Haritası Özeti", Font(bold=True, size=12))])
+    ws5.append([])
+    ws5.append(["Toplam Zararlı Saat", loss.get("total_loss_hours", 0)])
+    ws5.append(["Toplam Zarar (TL)", loss.get("total_loss_tl", 0)])
+    ws5.append(["T1 Zarar Saati", by_tz.get("T1", 0)])
+    ws5.append(["T2 Zarar Saati", by_tz.get("T2", 0)])
+    ws5.append(["T3 Zarar Saati", by_tz.get("T3", 0)])
 
     worst = loss.get("worst_hours", [])
     if worst:
-        ws5.cell(row=9, column=1, value="En Kötü Saatler").font = Font(bold=True)
+        ws5.append([])
+        ws5.append([styled(ws5, "En Kötü Saatler", Font(bold=True))])
         wh_headers = ["Tarih", "Saat", "PTF", "Satış", "Zarar (TL)"]
-        for col, h in enumerate(wh_headers, 1):
-            cell = ws5.cell(row=10, column=col, value=h)
-            cell.font = header_font
-        for i, wh in enumerate(worst[:20], 11):
-            ws5.cell(row=i, column=1, value=wh.get("date", ""))
-            ws5.cell(row=i, column=2, value=wh.get("hour", 0))
-            ws5.cell(row=i, column=3, value=wh.get("ptf", 0))
-            ws5.cell(row=i, column=4, value=wh.get("sales_price", 0))
-            ws5.cell(row=i, column=5, value=wh.get("loss_tl", 0))
-
-    # Bytes'a dönüştür
-    buffer = io.BytesIO()
-    wb.save(buffer)
-    buffer.seek(0)
-    excel_bytes = buffer.getvalue()
-    logger.info("Pricing Excel generated: %d bytes, %d sheets", len(excel_bytes), len(wb.sheetnames))
+        ws5.append([styled(ws5, h, header_font) for h in wh_headers])
+        for wh in worst[:20]:
+            ws5.append([
+                wh.get("date", ""),
+                wh.get("hour", 0),
+                wh.get("ptf", 0),
+                wh.get("sales_price", 0),
+                wh.get("loss_tl", 0),
+            ])
+
+    wb.save(out)
+
+
+def generate_excel_report(
+    analysis_result: dict,
+    customer_name: Optional[str] = None,
+) -> bytes:
+    """Fiyatlama analiz raporu Excel üret (sayfa düzeni: write_excel_report).
+
+    Args:
+        analysis_result: /analyze endpoint çıktısı (dict).
+        customer_name: Müşteri adı (opsiyonel).
+
+    Returns:
+        Excel bytes (.xlsx).
+    """
+    spool = open_spool()
+    try:
+        write_excel_report(analysis_result, spool, customer_name)
+    except BaseException:
+        spool.close()
+        raise
+    excel_bytes = read_spooled(spool)
+    logger.info("Pricing Excel generated: %d bytes", len(excel_bytes))
     return excel_bytes
@@ -13,9 +13,14 @@ from __future__ import annotations
 
 import calendar
 import json
+import os
+import re
+import threading
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import Optional
 
+import numpy as np
 from sqlalchemy.orm import Session
 
 from .excel_parser import ParsedConsumptionRecord
@@ -434,10 +439,124 @@ def seed_profile_templates(db: Session) -> int:
 
     if created_count > 0:
         db.commit()
+        clear_template_registry()
 
     return created_count
 
 
+# ═══════════════════════════════════════════════════════════════════════════════
+# Dönem İskeleti + Şablon Kaydı
+# ═══════════════════════════════════════════════════════════════════════════════
+
+_PERIOD_RE = re.compile(r"^\d{4}-(0[1-9]|1[0-2])$")
+
+# Bellekte tutulan dönem iskeleti sayısı (~10 yıl)
+PROFILE_SKELETON_CACHE_SIZE = int(os.getenv("PROFILE_SKELETON_CACHE_SIZE", "128"))
+
+
+@dataclass(frozen=True)
+class PeriodSkeleton:
+    """Dönemin saatlik iskeleti — (gün × 24) kayıt sırasıyla.
+
+    Dizi alanları salt okunurdur; üreticiler değerleri bu şekil üzerinde
+    tek seferde ölçekler.
+    """
+    period: str
+    days_in_month: int
+    dates: tuple[str, ...]
+    hours: tuple[int, ...]
+    zone_codes: np.ndarray                  # TimeZone sırası indeksi (0=T1, 1=T2, 2=T3)
+    zone_hours: dict                        # TimeZone → dönemdeki saat sayısı
+    zone_indices: dict                      # TimeZone → kayıt indeksleri
+    zone_last_index: dict                   # TimeZone → son kayıt indeksi
+
+
+def _validate_period(period: str) -> None:
+    if not _PERIOD_RE.match(period):
+        raise ValueError(
+            f"Geçersiz dönem formatı: '{period}'. Beklenen: YYYY-MM"
+        )
+
+
+@lru_cache(maxsize=PROFILE_SKELETON_CACHE_SIZE)
+def get_period_skeleton(period: str) -> PeriodSkeleton:
+    """Dönem iskeletini üret (dönem başına bir kez, sonra önbellekten).
+
+    Raises:
+        ValueError: Geçersiz dönem formatı.
+    """
+    from .time_zones import classify_hour
+    from .models import TimeZone
+
+    _validate_period(period)
+    year = int(period[:4])
+    month = int(period[5:7])
+    days_in_month = calendar.monthrange(year, month)[1]
+
+    zones = list(TimeZone)
+    day_codes = [zones.index(classify_hour(hour)) for hour in range(24)]
+    zone_codes = np.tile(np.array(day_codes, dtype=np.int8), days_in_month)
+    zone_codes.setflags(write=False)
+
+    zone_indices = {}
+    for code, tz in enumerate(zones):
+        indices = np.flatnonzero(zone_codes == code)
+        indices.setflags(write=False)
+        zone_indices[tz] = indices
+
+    return PeriodSkeleton(
+        period=period,
+        days_in_month=days_in_month,
+        dates=tuple(
+            f"{year:04d}-{month:02d}-{day:02d}"
+            for day in range(1, days_in_month + 1)
+            for _ in range(24)
+        ),
+        hours=tuple(range(24)) * days_in_month,
+        zone_codes=zone_codes,
+        zone_hours={tz: int(idx.size) for tz, idx in zone_indices.items()},
+        zone_indices=zone_indices,
+        zone_last_index={tz: int(idx[-1]) for tz, idx in zone_indices.items() if idx.size},
+    )
+
+
+def _records_from_skeleton(
+    skeleton: PeriodSkeleton,
+    values: list[float],
+) -> list[ParsedConsumptionRecord]:
+    return [
+        ParsedConsumptionRecord(date=d, hour=h, consumption_kwh=v)
+        for d, h, v in zip(skeleton.dates, skeleton.hours, values)
+    ]
+
+
+# Şablon adı → 24 saatlik ağırlık. Şablonlar yalnızca seed ile yazılır;
+# seed yeni kayıt eklediğinde kayıt temizlenir. Bulunamayan ad önbelleğe
+# alınmaz (seed sonrası görünür).
+_template_weights: dict[str, tuple[float, ...]] = {}
+_template_lock = threading.Lock()
+
+
+def get_template_weights(db: Session, name: str) -> Optional[tuple[float, ...]]:
+    """Şablon ağırlıkları — ilk istekte DB'den, sonra bellekteki kayıttan."""
+    weights = _template_weights.get(name)
+    if weights is not None:
+        return weights
+    template = get_template_by_name(db, name)
+    if template is None:
+        return None
+    weights = tuple(json.loads(template.hourly_weights))
+    with _template_lock:
+        _template_weights[name] = weights
+    return weights
+
+
+def clear_template_registry() -> None:
+    """Bellekteki şablon kaydını temizle."""
+    with _template_lock:
+        _template_weights.clear()
+
+
 def generate_t1t2t3_consumption(
     t1_kwh: float,
     t2_kwh: float,
@@ -451,7 +570,7 @@ def generate_t1t2t3_consumption(
     - calendar.monthrange(year, month) ile gün sayısı belirlenir
 
     Dağıtım mantığı (v1: uniform — hafta içi/sonu ayrımı yok):
-    - Her gün için classify_hour(h) ile saat→dilim eşleştirmesi yapılır
+    - Saat→dilim eşleştirmesi dönem iskeletinden gelir (classify_hour ile bir kez)
     - T1 saatleri: 06:00–16:59 (günde 11 saat) → her saat = T1_kWh / (gün_sayısı × 11)
     - T2 saatleri: 17:00–21:59 (günde 5 saat)  → her saat = T2_kWh / (gün_sayısı × 5)
     - T3 saatleri: 22:00–05:59 (günde 8 saat)  → her saat = T3_kWh / (gün_sayısı × 8)
@@ -471,16 +590,10 @@ def generate_t1t2t3_consumption(
     Raises:
         ValueError: Geçersiz dönem formatı veya tüm değerler sıfır
     """
-    import re as _re
-
-    from .time_zones import classify_hour
     from .models import TimeZone
 
     # ── Dönem validasyonu ──
-    if not _re.match(r"^\d{4}-(0[1-9]|1[0-2])$", period):
-        raise ValueError(
-            f"Geçersiz dönem formatı: '{period}'. Beklenen: YYYY-MM"
-        )
+    _validate_period(period)
 
     # ── Toplam > 0 validasyonu ──
     if (t1_kwh + t2_kwh + t3_kwh) <= 0:
@@ -488,83 +601,44 @@ def generate_t1t2t3_consumption(
             "Toplam tüketim sıfır olamaz. En az bir zaman diliminde tüketim giriniz."
         )
 
-    year = int(period[:4])
-    month = int(period[5:7])
-    days_in_month = calendar.monthrange(year, month)[1]
-
-    # ── Zone saat sayıları (dinamik, ay bazlı) ──
-    t1_total_hours = days_in_month * 11  # 06:00–16:59
-    t2_total_hours = days_in_month * 5   # 17:00–21:59
-    t3_total_hours = days_in_month * 8   # 22:00–05:59
-
-    # ── Zone bazlı saatlik kWh hesapla ──
+    skeleton = get_period_skeleton(period)
     zone_kwh_map = {
         TimeZone.T1: t1_kwh,
         TimeZone.T2: t2_kwh,
         TimeZone.T3: t3_kwh,
     }
-    zone_hours_map = {
-        TimeZone.T1: t1_total_hours,
-        TimeZone.T2: t2_total_hours,
-        TimeZone.T3: t3_total_hours,
-    }
 
     # Saatlik kWh: zone_kwh / zone_total_hours, round(4)
     # Sıfır zone'lar için 0.0
-    zone_hourly_kwh: dict[TimeZone, float] = {}
-    for tz in TimeZone:
-        if zone_kwh_map[tz] == 0 or zone_hours_map[tz] == 0:
-            zone_hourly_kwh[tz] = 0.0
-        else:
-            zone_hourly_kwh[tz] = round(zone_kwh_map[tz] / zone_hours_map[tz], 4)
-
-    # ── Kayıtları üret + her zone'un son saatini takip et ──
-    records: list[ParsedConsumptionRecord] = []
-    # Son saat indekslerini zone bazında takip et (residual fix için)
-    zone_last_index: dict[TimeZone, int] = {}
-
-    idx = 0
-    for day in range(1, days_in_month + 1):
-        date_str = f"{year:04d}-{month:02d}-{day:02d}"
-        for hour in range(24):
-            tz = classify_hour(hour)
-            hourly_kwh = zone_hourly_kwh[tz]
-            records.append(ParsedConsumptionRecord(
-                date=date_str,
-                hour=hour,
-                consumption_kwh=hourly_kwh,
-            ))
-            zone_last_index[tz] = idx
-            idx += 1
+    zone_hourly_kwh = np.zeros(len(TimeZone), dtype=np.float64)
+    for code, tz in enumerate(TimeZone):
+        if zone_kwh_map[tz] != 0 and skeleton.zone_hours[tz] != 0:
+            zone_hourly_kwh[code] = round(zone_kwh_map[tz] / skeleton.zone_hours[tz], 4)
+
+    # ── İskelet şekli üzerinde tek seferde ölçekle ──
+    values = zone_hourly_kwh[skeleton.zone_codes]
 
     # ── Residual fix: her zone'un son saatine artık ekle ──
     # Non-negative guard: residual negatifse ve son saati negatife düşürüyorsa,
     # artığı zone'un tüm saatlerine eşit dağıt (daha güvenli).
-    for tz in TimeZone:
+    for code, tz in enumerate(TimeZone):
         if zone_kwh_map[tz] == 0:
             continue  # Sıfır zone — residual gerekmez
-        distributed_total = zone_hourly_kwh[tz] * zone_hours_map[tz]
+        distributed_total = float(zone_hourly_kwh[code]) * skeleton.zone_hours[tz]
         residual = zone_kwh_map[tz] - distributed_total
         if residual != 0.0:
-            last_idx = zone_last_index[tz]
-            new_val = records[last_idx].consumption_kwh + residual
+            last_idx = skeleton.zone_last_index[tz]
+            new_val = float(values[last_idx]) + residual
             if new_val < 0:
                 # Son saat negatife düşer — residual'ı tüm zone saatlerine dağıt
-                per_hour_adj = residual / zone_hours_map[tz]
-                for i, r in enumerate(records):
-                    if classify_hour(r.hour) == tz:
-                        records[i] = ParsedConsumptionRecord(
-                            date=r.date, hour=r.hour,
-                            consumption_kwh=max(0.0, r.consumption_kwh + per_hour_adj),
-                        )
+                per_hour_adj = residual / skeleton.zone_hours[tz]
+                idx = skeleton.zone_indices[tz]
+                adjusted = values[idx] + per_hour_adj
+                values[idx] = np.where(adjusted > 0.0, adjusted, 0.0)
             else:
-                records[last_idx] = ParsedConsumptionRecord(
-                    date=records[last_idx].date,
-                    hour=records[last_idx].hour,
-                    consumption_kwh=new_val,
-                )
+                values[last_idx] = new_val
 
-    return records
+    return _records_from_skeleton(skeleton, values.tolist())
 
 
 def generate_hourly_consumption(
@@ -579,6 +653,9 @@ def generate_hourly_consumption(
         daily_kwh = total_monthly_kwh / days_in_month
         hourly_kwh[h] = daily_kwh × hourly_weight[h]
 
+    Günlük şekil tüm günlerde aynı olduğundan 24 değer bir kez hesaplanıp
+    dönem iskeletine yayılır; şablon ağırlıkları bellekteki kayıttan gelir.
+
     Args:
         template_name: Şablon adı (örn: "3_vardiya_sanayi").
         total_monthly_kwh: Aylık toplam tüketim (kWh).
@@ -591,36 +668,17 @@ def generate_hourly_consumption(
     Raises:
         ValueError: Şablon bulunamadı veya geçersiz dönem.
     """
-    import re as _re
-
-    if not _re.match(r"^\d{4}-(0[1-9]|1[0-2])$", period):
-        raise ValueError(
-            f"Geçersiz dönem formatı: '{period}'. Beklenen: YYYY-MM"
-        )
+    _validate_period(period)
 
-    template = get_template_by_name(db, template_name)
-    if template is None:
+    weights = get_template_weights(db, template_name)
+    if weights is None:
         raise ValueError(f"Profil şablonu bulunamadı: '{template_name}'")
 
-    weights: list[float] = json.loads(template.hourly_weights)
+    skeleton = get_period_skeleton(period)
+    daily_kwh = total_monthly_kwh / skeleton.days_in_month
+    day_shape = [round(daily_kwh * weights[hour], 4) for hour in range(24)]
 
-    year = int(period[:4])
-    month = int(period[5:7])
-    days_in_month = calendar.monthrange(year, month)[1]
-    daily_kwh = total_monthly_kwh / days_in_month
-
-    records: list[ParsedConsumptionRecord] = []
-    for day in range(1, days_in_month + 1):
-        date_str = f"{year:04d}-{month:02d}-{day:02d}"
-        for hour in range(24):
-            hourly_kwh = round(daily_kwh * weights[hour], 4)
-            records.append(ParsedConsumptionRecord(
-                date=date_str,
-                hour=hour,
-                consumption_kwh=hourly_kwh,
-            ))
-
-    return records
+    return _records_from_skeleton(skeleton, day_shape * skeleton.days_in_month)
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -0,0 +1,245 @@
+"""
+Pricing Risk Engine — Dönem PTF Özetleri (materialize).
+
+Teklif hesaplamasındaki profil-ağırlıklı PTF her çağrıda dönemin tüm aktif
+saatlerini okuyup classify_hour ile zonlara dağıtıyordu. Ağırlıklı ortalama
+zon toplamlarına ayrışır:
+
+    Σ_h(w_zone(h) × ptf_h) / Σ_h w_zone(h) = Σ_z(w_z × S_z) / Σ_z(w_z × n_z)
+
+Dolayısıyla dönem başına zon bazlı Σptf (S_z) ve saat sayısı (n_z) saklanır;
+herhangi bir profil için ağırlıklı PTF sabit sürede hesaplanır. Ayrıca
+min/max ve P10/P50/P90 tutulur.
+
+Saklama: market_store segmentinin yanında (veritabanının alt dizini), aynı
+(period, version, stamp) adlı küçük JSON dosyası — tüm worker'lar paylaşır.
+DB tablosu kullanılmaz (şema/migration zinciri değişmez).
+- Yazım: piyasa verisi yüklemesi / EPİAŞ alımı, commit ve
+  rebuild_market_segment SONRASI refresh_ptf_aggregate çağırır (segment
+  gibi); işlem geri alınırsa disk dokunulmamış kalır
+- Okuma: get_ptf_aggregate anahtarı market_store ile aynı yoldan okur
+  (aktif data_versions satırı; kaydı olmayan dönemde parmak izi); dosya
+  yoksa / bayatsa (ör. seed / elle yazım) segmentten hesaplar ve işlem içi
+  önbelleğe alır — okuma yolu diske yazmaz
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import weakref
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+import numpy as np
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from .market_store import MarketSegment, _engine, _read_key, _store_dir, get_market_segment
+from .models import TimeZone
+from .time_zones import classify_hour
+
+logger = logging.getLogger(__name__)
+
+ZONES = tuple(zone.name for zone in TimeZone)
+
+# Saat → zon indeksi (ZONES sırasında)
+_ZONE_INDEX_OF_HOUR = np.array(
+    [ZONES.index(classify_hour(hour).name) for hour in range(24)], dtype=np.int64,
+)
+
+
+@dataclass(frozen=True)
+class PtfAggregate:
+    """Dönemin aktif saatlik PTF özeti."""
+    period: str
+    version: int
+    stamp: str
+    hours: int
+    ptf_sum: float
+    zone_ptf_sums: dict[str, float]
+    zone_hours: dict[str, int]
+    ptf_min: float
+    ptf_max: float
+    ptf_p10: float
+    ptf_p50: float
+    ptf_p90: float
+
+    @property
+    def ptf_mean(self) -> float:
+        return self.ptf_sum / self.hours
+
+    def weighted_ptf(self, weights: dict[str, float]) -> Optional[float]:
+        """Σ_z(w_z × S_z) / Σ_z(w_z × n_z); ağırlığı olmayan zon 1.0 sayılır."""
+        num = 0.0
+        den = 0.0
+        for zone in ZONES:
+            w = weights.get(zone, 1.0)
+            num += w * self.zone_ptf_sums[zone]
+            den += w * self.zone_hours[zone]
+        return (num / den) if den else None
+
+
+def aggregate_rows(period: str, version: int, stamp: str, rows: np.ndarray) -> Optional[PtfAggregate]:
+    """market_store SEGMENT_DTYPE satırlarından özet üret. Boş → None."""
+    if rows.shape[0] == 0:
+        return None
+    ptf = np.asarray(rows["ptf"], dtype=np.float64)
+    zone_idx = _ZONE_INDEX_OF_HOUR[np.asarray(rows["hour"], dtype=np.int64)]
+    sums = np.bincount(zone_idx, weights=ptf, minlength=len(ZONES))
+    counts = np.bincount(zone_idx, minlength=len(ZONES))
+    p10, p50, p90 = np.percentile(ptf, [10, 50, 90]).tolist()
+    return PtfAggregate(
+        period=period,
+        version=version,
+        stamp=stamp,
+        hours=int(ptf.shape[0]),
+        ptf_sum=float(ptf.sum()),
+        zone_ptf_sums={zone: float(sums[i]) for i, zone in enumerate(ZONES)},
+        zone_hours={zone: int(counts[i]) for i, zone in enumerate(ZONES)},
+        ptf_min=float(ptf.min()),
+        ptf_max=float(ptf.max()),
+        ptf_p10=p10,
+        ptf_p50=p50,
+        ptf_p90=p90,
+    )
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Disk
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+def _aggregate_path(directory: str, period: str, version: int, stamp: str) -> str:
+    return os.path.join(directory, f"{period}_v{version}_{stamp}.ptf.json")
+
+
+def _remove_aggregates(directory: str, period: str, keep: Optional[str] = None) -> None:
+    """Dönemin diğer özet dosyalarını sil."""
+    prefix = f"{period}_v"
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return
+    for name in names:
+        path = os.path.join(directory, name)
+        if name.startswith(prefix) and name.endswith(".ptf.json") and path != keep:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def _write(directory: str, agg: PtfAggregate) -> None:
+    """Özeti atomik olarak yaz; yazılamazsa yalnız işlem içi önbellek kalır."""
+    path = _aggregate_path(directory, agg.period, agg.version, agg.stamp)
+    try:
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=f".{agg.period}_", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(asdict(agg), f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    except OSError as e:
+        logger.warning(f"PTF özeti yazılamadı ({agg.period}): {e}")
+        return
+    _remove_aggregates(directory, agg.period, keep=path)
+
+
+def _read(directory: str, period: str, version: int, stamp: str) -> Optional[PtfAggregate]:
+    try:
+        with open(_aggregate_path(directory, period, version, stamp), encoding="utf-8") as f:
+            return PtfAggregate(**json.load(f))
+    except (OSError, ValueError, TypeError):
+        return None
+
+
+# İşlem içi önbellek: engine → (period → son özet); parmak iziyle doğrulanır
+_aggregates: "weakref.WeakKeyDictionary[Engine, dict[str, PtfAggregate]]" = (
+    weakref.WeakKeyDictionary()
+)
+_lock = threading.Lock()
+
+
+def _aggregates_for(db: Session) -> dict[str, PtfAggregate]:
+    engine = _engine(db)
+    with _lock:
+        aggregates = _aggregates.get(engine)
+        if aggregates is None:
+            aggregates = _aggregates[engine] = {}
+        return aggregates
+
+
+def _remember(db: Session, agg: PtfAggregate) -> PtfAggregate:
+    aggregates = _aggregates_for(db)
+    with _lock:
+        aggregates[agg.period] = agg
+    return agg
+
+
+def clear_ptf_aggregates() -> None:
+    """İşlem içi özet önbelleğini temizle."""
+    with _lock:
+        _aggregates.clear()
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Public API
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+def _from_segment(segment: MarketSegment) -> Optional[PtfAggregate]:
+    return aggregate_rows(segment.period, segment.version, segment.stamp, segment.rows)
+
+
+def refresh_ptf_aggregate(db: Session, period: str) -> Optional[PtfAggregate]:
+    """Dönem özetini aktif segmentten yeniden hesapla ve diske yaz.
+
+    Piyasa verisi yazan işlem commit ettikten ve rebuild_market_segment
+    çağırdıktan sonra çağrılır (segment önbellekten gelir). Aktif satır
+    kalmadıysa dönemin özet dosyaları silinir.
+    """
+    directory = _store_dir(db)
+    agg = _from_segment(get_market_segment(db, period))
+    if agg is None:
+        _remove_aggregates(directory, period)
+        aggregates = _aggregates_for(db)
+        with _lock:
+            aggregates.pop(period, None)
+        return None
+
+    _write(directory, agg)
+    return _remember(db, agg)
+
+
+def get_ptf_aggregate(db: Session, period: str) -> Optional[PtfAggregate]:
+    """Dönemin güncel PTF özeti. Aktif saatlik veri yoksa None.
+
+    Sıra: işlem içi önbellek → diskteki özet → market segmentinden hesapla.
+    Hepsi aynı (version, stamp) anahtarıyla doğrulanır; anahtar aktif
+    data_versions satırından okunur (saatlik satırlar taranmaz).
+    """
+    key = _read_key(db, period)
+    if key is None:
+        return None
+
+    cached = _aggregates_for(db).get(period)
+    if cached is not None and (cached.version, cached.stamp) == key:
+        return cached
+
+    stored = _read(_store_dir(db), period, *key)
+    if stored is not None:
+        return _remember(db, stored)
+
+    agg = _from_segment(get_market_segment(db, period))
+    if agg is None:
+        return None
+    logger.debug("PTF özeti bayat/eksik, segmentten hesaplandı: %s", period)
+    return _remember(db, agg)
@@ -5,8 +5,10 @@ Tüm /api/pricing/* endpoint'leri burada tanımlanır.
 
 Endpoint'ler:
   POST /api/pricing/upload-market-data   — EPİAŞ Excel yükleme
+  POST /api/pricing/sync-market-data     — EPİAŞ API'den saatlik PTF/SMF alımı (eksik saatler)
   POST /api/pricing/upload-consumption   — Müşteri tüketim Excel yükleme
   POST /api/pricing/analyze              — Tam fiyatlama analizi
+  POST /api/pricing/analyze-batch        — Toplu (portföy) analiz, NDJSON akışı
   POST /api/pricing/simulate             — Katsayı simülasyonu
   POST /api/pricing/compare              — Çoklu ay karşılaştırma
   POST /api/pricing/calculate-manual     — Manuel giriş → teklif hesaplama (pure, OCR/DB'siz)
@@ -19,12 +21,16 @@ Requirements: 15.1–15.4, 16.1–16.8, 19.1–19.4
 
 from __future__ import annotations
 
+import io
+import json
 import logging
 import os
-from typing import Optional
+from typing import Callable, Iterator, Optional
 
+import numpy as np
 from fastapi import APIRouter, Depends, File, Form, Header, HTTPException, Query, UploadFile
-from sqlalchemy.orm import Session
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session, sessionmaker
 
 from ..database import get_db
 
@@ -72,24 +78,27 @@ def _require_pricing_admin(x_admin_key: str | None = Header(default=None, alias=
 from .models import (
     AnalyzeRequest,
     AnalyzeResponse,
+    BacktestRequest,
+    BatchAnalyzeItem,
+    BatchAnalyzeRequest,
+    MarginAtRiskRequest,
+    MarginAtRiskResponse,
+    ScenarioGridRequest,
+    ScenarioGridResponse,
     SimulateRequest,
     SimulateResponse,
     CompareRequest,
     CompareResponse,
+    ExportFormat,
+    HourDetailMode,
     ImbalanceParams,
-    SupplierCostSummary,
-    PricingSummary,
-    LossMapSummary,
-    DataQualityReport,
     PeriodComparison,
     RiskLevel,
-    DistributionInfo,
 )
 from .schemas import (
     HourlyMarketPrice,
     MonthlyYekdemPrice,
     ConsumptionProfile,
-    ConsumptionHourlyData,
     ProfileTemplate,
     DataVersion,
 )
@@ -101,21 +110,64 @@ from .excel_parser import (
     expected_hours_for_period,
     _calculate_consumption_quality_score,
 )
-from .pricing_engine import calculate_weighted_prices, calculate_hourly_costs
-from .time_zones import calculate_time_zone_breakdown
+from .analysis import (
+    PreparedAnalysis,
+    build_hour_detail,
+    build_hourly_margins,
+    finish_analysis,
+    prepare_analysis,
+)
+from .backtest import (
+    BacktestAccumulator,
+    BacktestContext,
+    BacktestTask,
+    ConsumptionSlots,
+    consumption_slots,
+    iter_backtest_results,
+    list_market_periods,
+    load_market_history,
+)
+from .compare import (
+    CompareContext,
+    ComparePeriodResult,
+    resolve_compare_workers,
+    run_compare_periods,
+    safe_multiplier_bases,
+)
+from .portfolio import (
+    BatchContext,
+    BatchTask,
+    PortfolioAccumulator,
+    iter_batch_results,
+    resolve_worker_count,
+)
+from .pricing_engine import summarize_cost_totals
+from .period_frame import seq_sum
+from .market_store import get_market_segment, rebuild_market_segment
+from .bulk_writer import (
+    archive_data_versions,
+    archive_market_period,
+    insert_market_records,
+)
+from .epias_ingest import ingest_hourly_market_data
+from .ptf_aggregates import refresh_ptf_aggregate
 from .multiplier_simulator import (
+    PRICING_GRID_MAX_CELLS,
+    expand_grid_values,
+    run_scenario_grid,
     run_simulation,
     calculate_safe_multiplier,
     PeriodData,
 )
-from .risk_calculator import (
-    calculate_risk_score,
-    generate_offer_warning,
-    check_risk_safe_multiplier_coherence,
+from .margin_at_risk import (
+    PRICING_MAR_MAX_PATHS,
+    build_inputs as build_margin_at_risk_inputs,
+    load_shape_library,
+    run_margin_at_risk,
 )
-from .margin_reality import calculate_margin_reality
 from .yekdem_service import create_or_update_yekdem, get_yekdem, list_yekdem
 from .consumption_service import save_consumption_profile
+from .consumption_store import get_active_profile, load_profile_records
 from .profile_templates import (
     seed_profile_templates,
     generate_hourly_consumption,
@@ -124,13 +176,17 @@ from .profile_templates import (
 )
 from .pricing_cache import (
     build_cache_key,
+    build_prep_key,
     get_cached_result,
+    get_data_versions,
+    get_prepared_analysis,
     set_cached_result,
-    invalidate_cache_for_customer,
-    invalidate_cache_for_period,
+    set_prepared_analysis,
 )
 from .version_manager import get_active_version
-from .pricing_report import generate_pdf_report, generate_excel_report
+from .pricing_report import generate_pdf_report, export_hourly_detail, write_excel_report
+from .excel_formatter import export_consumption, export_market_data
+from .tabular_export import MEDIA_TYPES, iter_spooled, open_spool, parquet_available
 from .manual_calculator import (
     ManualCalculationRequest,
     ManualCalculationResponse,
@@ -151,86 +207,21 @@ from ..distribution_tariffs import get_all_tariffs as _get_all_tariffs
 # ═══════════════════════════════════════════════════════════════════════════════
 
 
-def _calculate_distribution_info(
-    voltage_level: str,
-    total_kwh: float,
-    tariff_group: str = "sanayi",
-    term_type: str = "çift_terim",
-) -> DistributionInfo | None:
-    """Dağıtım bedeli hesapla — voltage_level (AG/OG) bazlı.
-
-    Mevcut distribution_tariffs.py modülündeki EPDK tarife tablosunu kullanır.
-    Varsayılan: Sanayi, Çift Terim (en yaygın senaryo).
-    """
-    vl = voltage_level.upper() if voltage_level else "OG"
-    if vl not in ("AG", "OG"):
-        vl = "OG"
-
-    lookup = _lookup_dist_tariff(tariff_group, vl, term_type)
-    if not lookup.success or lookup.unit_price is None:
-        return None
-
-    total_tl = round(total_kwh * lookup.unit_price, 2)
-    return DistributionInfo(
-        voltage_level=vl,
-        unit_price_tl_per_kwh=lookup.unit_price,
-        total_kwh=round(total_kwh, 2),
-        total_tl=total_tl,
-        tariff_key=lookup.tariff_key,
-    )
-
-
 def _load_market_records(
     db: Session, period: str,
 ) -> list[ParsedMarketRecord]:
-    """DB'den aktif piyasa verilerini yükle ve ParsedMarketRecord'a dönüştür."""
-    rows = (
-        db.query(HourlyMarketPrice)
-        .filter(
-            HourlyMarketPrice.period == period,
-            HourlyMarketPrice.is_active == 1,
-        )
-        .order_by(HourlyMarketPrice.date, HourlyMarketPrice.hour)
-        .all()
-    )
-    return [
-        ParsedMarketRecord(
-            period=r.period, date=r.date, hour=r.hour,
-            ptf_tl_per_mwh=r.ptf_tl_per_mwh,
-            smf_tl_per_mwh=r.smf_tl_per_mwh,
-        )
-        for r in rows
-    ]
+    """Aktif piyasa verilerini paylaşımlı dönem deposundan yükle."""
+    return get_market_segment(db, period).to_records()
 
 
 def _load_consumption_records(
     db: Session, customer_id: str, period: str,
 ) -> list[ParsedConsumptionRecord]:
-    """DB'den aktif tüketim profilini yükle ve ParsedConsumptionRecord'a dönüştür."""
-    profile = (
-        db.query(ConsumptionProfile)
-        .filter(
-            ConsumptionProfile.customer_id == customer_id,
-            ConsumptionProfile.period == period,
-            ConsumptionProfile.is_active == 1,
-        )
-        .first()
-    )
+    """DB'den aktif tüketim profilini kompakt depo üzerinden yükle."""
+    profile = get_active_profile(db, customer_id, period)
     if not profile:
         return []
-
-    hourly = (
-        db.query(ConsumptionHourlyData)
-        .filter(ConsumptionHourlyData.profile_id == profile.id)
-        .order_by(ConsumptionHourlyData.date, ConsumptionHourlyData.hour)
-        .all()
-    )
-    return [
-        ParsedConsumptionRecord(
-            date=h.date, hour=h.hour, consumption_kwh=h.consumption_kwh,
-        )
-        for h in hourly
-    ]
+    return load_profile_records(db, profile)
 
 
 def _get_or_generate_consumption(
@@ -283,6 +274,96 @@ def _get_or_generate_consumption(
     )
 
 
+def _load_yekdem_with_warnings(db: Session, period: str) -> tuple[float, list[dict]]:
+    """YEKDEM yükle — yoksa 0 ile devam et ve kritik uyarı ekle."""
+    warnings: list[dict] = []
+    yekdem_record = get_yekdem(db, period)
+    if not yekdem_record:
+        warnings.append({
+            "type": "critical_missing_data",
+            "severity": "high",
+            "impact": "pricing_accuracy_low",
+            "message": (
+                f"{period} dönemi için YEKDEM verisi bulunamadı, "
+                f"hesaplama 0 YEKDEM ile yapıldı."
+            ),
+            "yekdem_unit_price": 0,
+        })
+        return 0.0, warnings
+    return yekdem_record.yekdem_tl_per_mwh, warnings
+
+
+def _get_prepared_analysis(
+    db: Session,
+    period: str,
+    customer_id: Optional[str],
+    data_versions: dict[str, int],
+    use_template: Optional[bool],
+    template_name: Optional[str],
+    template_monthly_kwh: Optional[float],
+    t1_kwh: Optional[float] = None,
+    t2_kwh: Optional[float] = None,
+    t3_kwh: Optional[float] = None,
+    voltage_level: Optional[str] = None,
+) -> PreparedAnalysis:
+    """Parametreden bağımsız hazırlığı önbellekten al, yoksa yükle ve kur.
+
+    Anahtar veri versiyonları + tüketim kaynağıdır; aynı veri üzerindeki
+    /analyze ve /scenario-grid istekleri hazırlığı paylaşır.
+    """
+    prep_key = build_prep_key(
+        customer_id=customer_id,
+        period=period,
+        data_versions=data_versions,
+        consumption_source={
+            "use_template": use_template,
+            "template_name": template_name,
+            "template_monthly_kwh": template_monthly_kwh,
+            "t1_kwh": t1_kwh,
+            "t2_kwh": t2_kwh,
+            "t3_kwh": t3_kwh,
+        },
+        voltage_level=voltage_level,
+    )
+    prepared = get_prepared_analysis(db, prep_key)
+    if prepared is not None:
+        return prepared
+
+    # 1. Piyasa verisi yükle
+    market_records = _load_market_records(db, period)
+    if not market_records:
+        raise HTTPException(
+            status_code=404,
+            detail={
+                "error": "market_data_not_found",
+                "message": f"{period} dönemi için piyasa verisi bulunamadı.",
+            },
+        )
+
+    # 2. Tüketim verisi al
+    consumption_records = _get_or_generate_consumption(
+        db, period, customer_id,
+        use_template, template_name, template_monthly_kwh,
+        t1_kwh=t1_kwh, t2_kwh=t2_kwh, t3_kwh=t3_kwh,
+    )
+
+    # 3. YEKDEM — graceful fallback when missing
+    yekdem, warnings = _load_yekdem_with_warnings(db, period)
+
+    # 4–6, 9. Yeterli istatistikler (DB'siz çekirdek — analyze-batch ile ortak)
+    prepared = prepare_analysis(
+        period=period,
+        customer_id=customer_id,
+        market_records=market_records,
+        consumption_records=consumption_records,
+        yekdem=yekdem,
+        voltage_level=voltage_level,
+        warnings=warnings,
+    )
+    set_prepared_analysis(db, prep_key, customer_id, period, prepared)
+    return prepared
+
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # Excel Yükleme Endpoint'leri
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -319,49 +400,15 @@ async def upload_market_data(
     period = result.period
     records = parse_output.records
 
-    # Mevcut aktif verileri arşivle
-    existing = (
-        db.query(HourlyMarketPrice)
-        .filter(
-            HourlyMarketPrice.period == period,
-            HourlyMarketPrice.is_active == 1,
-        )
-        .all()
-    )
-    previous_archived = len(existing) > 0
-    current_max_version = 0
-    for row in existing:
-        row.is_active = 0
-        if row.version > current_max_version:
-            current_max_version = row.version
-
+    # Mevcut aktif verileri arşivle (tek UPDATE) ve yenilerini toplu ekle
+    archived_rows, current_max_version = archive_market_period(db, period)
+    previous_archived = archived_rows > 0
     new_version = current_max_version + 1
 
-    # Yeni verileri kaydet
-    for rec in records:
-        db.add(HourlyMarketPrice(
-            period=rec.period,
-            date=rec.date,
-            hour=rec.hour,
-            ptf_tl_per_mwh=rec.ptf_tl_per_mwh,
-            smf_tl_per_mwh=rec.smf_tl_per_mwh,
-            source="epias_excel",
-            version=new_version,
-            is_active=1,
-        ))
+    insert_market_records(db, records, new_version, source="epias_excel")
 
     # data_versions kaydı
-    existing_dv = (
-        db.query(DataVersion)
-        .filter(
-            DataVersion.data_type == "market_data",
-            DataVersion.period == period,
-            DataVersion.is_active == 1,
-        )
-        .all()
-    )
-    for dv in existing_dv:
-        dv.is_active = 0
+    archive_data_versions(db, "market_data", period, None)
 
     db.add(DataVersion(
         data_type="market_data",
@@ -375,8 +422,13 @@ async def upload_market_data(
 
     db.commit()
 
-    # Cache invalidation: piyasa verisi güncellendi → dönem cache sil
-    invalidate_cache_for_period(db, period)
+    # Paylaşımlı piyasa segmentini yeni versiyonla atomik olarak yeniden kur
+    rebuild_market_segment(db, period)
+    # Dönem PTF özeti (profil-ağırlıklı PTF) — segmentten, commit sonrası
+    refresh_ptf_aggregate(db, period)
+
+    # Analiz cache: key aktif piyasa versiyonunu içerir → eski kayıtlar
+    # eşleşmez, TTL süpürücüsü temizler (toplu silme yok)
 
     return {
         "status": "ok",
@@ -392,6 +444,65 @@ async def upload_market_data(
     }
 
 
+@pricing_router.post("/sync-market-data")
+async def sync_market_data(
+    period: str = Query(..., description="Dönem (YYYY-MM)"),
+    use_mock: bool = Query(False, description="Mock EPİAŞ verisi (test/demo)"),
+    db: Session = Depends(get_db),
+    _admin: str = Depends(_require_pricing_admin),
+):
+    """Dönemin eksik saatlik PTF/SMF verisini EPİAŞ API'sinden al.
+
+    Yalnız eksik (date, hour) slotları istenir; gelen saatler mevcut
+    satırlarla birlikte yeni versiyon olarak yazılır. Eksik saat yoksa
+    versiyon oluşturulmaz (version=null).
+    """
+    from ..epias_client import (
+        EpiasApiError,
+        EpiasAuthError,
+        MockEpiasClient,
+        get_shared_epias_client,
+    )
+
+    try:
+        expected_hours_for_period(period)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=422,
+            detail={"error": "invalid_period", "message": str(e)},
+        )
+
+    client = MockEpiasClient() if use_mock else get_shared_epias_client()
+    try:
+        result = await ingest_hourly_market_data(db, period, client)
+    except EpiasAuthError as e:
+        raise HTTPException(
+            status_code=502,
+            detail={"error": "epias_auth_failed", "message": str(e)},
+        )
+    except EpiasApiError as e:
+        raise HTTPException(
+            status_code=502,
+            detail={"error": "epias_unavailable", "message": str(e)},
+        )
+
+    return {
+        "status": "ok",
+        "period": result.period,
+        "version": result.version,
+        "requested_slots": result.requested_slots,
+        "inserted_slots": result.inserted_slots,
+        "carried_rows": result.carried_rows,
+        "total_rows": result.total_rows,
+        "expected_hours": result.expected_hours,
+        "missing_hours": result.missing_hours,
+        "quality_score": result.quality_score,
+        "ptf_average_tl_per_mwh": result.ptf_average_tl_per_mwh,
+        "ranges": [list(r) for r in result.ranges],
+        "warnings": result.warnings,
+    }
+
+
 @pricing_router.post("/upload-consumption")
 async def upload_consumption(
     file: UploadFile = File(...),
@@ -455,8 +566,7 @@ async def upload_consumption(
             "version": profile.version,
         })
 
-    # Cache invalidation: tüketim verisi güncellendi → müşteri cache sil
-    invalidate_cache_for_customer(db, customer_id)
+    # Analiz cache: key aktif tüketim versiyonunu içerir → ayrıca silme yok
 
     # Otorite: profiles. Tek-ay dosyada da liste döner (tek elemanlı).
     return {
@@ -480,11 +590,16 @@ def analyze(
     """Tam fiyatlama analizi — ana hesaplama endpoint'i.
 
     Cache katmanı: Aynı parametrelerle tekrar istek → cache'den döner.
+    Önbelleğe yalnızca özet yazılır; saatlik detay (hour_detail=page|columnar)
+    her istekte hazırlık dizilerinden istenen dilim için üretilir ve bu
+    modlarda marj gerçekliğinin saatlik histogramı (hourly_margins_tl) da
+    doldurulur. summary modunda histogram boştur.
     """
     period = req.period
 
     # ── Cache check ────────────────────────────────────────────────────
     imbalance_dict = req.imbalance_params.model_dump()
+    data_versions = get_data_versions(db, period, req.customer_id)
     cache_key = build_cache_key(
         customer_id=req.customer_id,
         period=period,
@@ -493,14 +608,107 @@ def analyze(
         imbalance_params=imbalance_dict,
         template_name=req.template_name,
         template_monthly_kwh=req.template_monthly_kwh,
+        data_versions=data_versions,
     )
 
+    def _prepared() -> PreparedAnalysis:
+        # Parametreden bağımsız hazırlık — yalnız teklif parametresi
+        # değiştiyse yükleme ve 4–6. adımlar önbellekten gelir
+        return _get_prepared_analysis(
+            db, period, req.customer_id, data_versions,
+            req.use_template, req.template_name, req.template_monthly_kwh,
+            t1_kwh=req.t1_kwh, t2_kwh=req.t2_kwh, t3_kwh=req.t3_kwh,
+            voltage_level=req.voltage_level,
+        )
+
     cached = get_cached_result(db, cache_key)
     if cached:
         cached["cache_hit"] = True
+        margin_reality = cached.get("margin_reality")
+        if req.hour_detail == HourDetailMode.SUMMARY:
+            # Eski önbellek satırları saatlik histogramı içerebilir
+            if margin_reality:
+                margin_reality["hourly_margins_tl"] = []
+        else:
+            prepared = _prepared()
+            cached["hour_costs"] = build_hour_detail(
+                prepared, req.multiplier, req.hour_detail,
+                req.hour_offset, req.hour_limit,
+            )
+            if margin_reality:
+                margin_reality["hourly_margins_tl"] = build_hourly_margins(
+                    prepared, req.multiplier,
+                )
         return cached
 
-    # 1. Piyasa verisi yükle
+    prepared = _prepared()
+
+    # 7–14. Teklif parametrelerine bağlı hesaplama
+    response = finish_analysis(
+        prepared,
+        multiplier=req.multiplier,
+        imbalance_params=req.imbalance_params,
+        dealer_commission_pct=req.dealer_commission_pct,
+        hourly_margins=False,
+    )
+
+    # ── Cache write ────────────────────────────────────────────────────
+    try:
+        set_cached_result(
+            db, cache_key,
+            customer_id=req.customer_id,
+            period=period,
+            params_hash=cache_key,
+            result=response.model_dump(),
+        )
+    except Exception as e:
+        logger.warning("Cache write failed (non-critical): %s", e)
+
+    # ── Saatlik detay + marj histogramı (önbelleğe yazılmaz) ──────────
+    response.hour_costs = build_hour_detail(
+        prepared, req.multiplier, req.hour_detail, req.hour_offset, req.hour_limit,
+    )
+    if req.hour_detail != HourDetailMode.SUMMARY and response.margin_reality:
+        response.margin_reality["hourly_margins_tl"] = build_hourly_margins(
+            prepared, req.multiplier,
+        )
+
+    # ── Analyze logging ────────────────────────────────────────────────
+    logger.info(
+        "pricing_analyze: customer=%s period=%s multiplier=%.2f "
+        "safe=%.3f risk=%s net_margin=%.2f",
+        req.customer_id or "template", period, req.multiplier,
+        response.safe_multiplier.safe_multiplier, response.risk_score.score.value,
+        response.pricing.total_net_margin_tl,
+    )
+
+    return response
+
+
+def analyze_batch(
+    req: BatchAnalyzeRequest,
+    db: Session,
+    session_factory: Optional[Callable[[], Session]] = None,
+) -> Iterator[dict]:
+    """Toplu (portföy) analiz — Python API.
+
+    Dönemin piyasa verisi ve YEKDEM'i bir kez yüklenir; kalemlerin tüketimi
+    sırayla (tembel) yüklenip süreç havuzunda analiz edilir. Piyasa verisi
+    yoksa HTTPException(404) hemen (iterator üretilmeden) fırlatılır.
+
+    Args:
+        req: Toplu analiz isteği.
+        db: Piyasa/YEKDEM yükleme session'ı.
+        session_factory: Akış sırasında tüketim yüklemesi için yeni session
+            üreten fabrika (HTTP akışında istek session'ı kapanmış olabilir).
+            None ise db kullanılır.
+
+    Yields:
+        {"type": "item", "index", "customer_id", "status": "ok"|"error",
+         "result"|"error"} satırları istek sırasıyla, en sonda
+        {"type": "summary", "summary": PortfolioSummary}.
+    """
+    period = req.period
     market_records = _load_market_records(db, period)
     if not market_records:
         raise HTTPException(
@@ -510,252 +718,208 @@ def analyze(
                 "message": f"{period} dönemi için piyasa verisi bulunamadı.",
             },
         )
+    yekdem, warnings = _load_yekdem_with_warnings(db, period)
 
-    # 2. Tüketim verisi al
-    consumption_records = _get_or_generate_consumption(
-        db, period, req.customer_id,
-        req.use_template, req.template_name, req.template_monthly_kwh,
-        t1_kwh=req.t1_kwh, t2_kwh=req.t2_kwh, t3_kwh=req.t3_kwh,
-    )
-
-    # 3. YEKDEM — graceful fallback when missing
-    warnings = []
-    yekdem_record = get_yekdem(db, period)
-    if not yekdem_record:
-        yekdem = 0.0
-        warnings.append({
-            "type": "critical_missing_data",
-            "severity": "high",
-            "impact": "pricing_accuracy_low",
-            "message": (
-                f"{period} dönemi için YEKDEM verisi bulunamadı, "
-                f"hesaplama 0 YEKDEM ile yapıldı."
-            ),
-            "yekdem_unit_price": 0,
-        })
-    else:
-        yekdem = yekdem_record.yekdem_tl_per_mwh
-
-    # 4. Ağırlıklı fiyat hesapla
-    weighted = calculate_weighted_prices(market_records, consumption_records)
-
-    # 5. Saatlik maliyet hesapla — distribution entegrasyonu
-    dist_info = _calculate_distribution_info(
-        voltage_level=req.voltage_level or "og",
-        total_kwh=weighted.total_consumption_kwh,
-    )
-    dist_unit_price = dist_info.unit_price_tl_per_kwh if dist_info else 0.0
-
-    hourly_result = calculate_hourly_costs(
-        market_records, consumption_records,
-        yekdem_tl_per_mwh=yekdem,
+    context = BatchContext(
+        period=period,
+        market_records=market_records,
+        yekdem=yekdem,
         multiplier=req.multiplier,
         imbalance_params=req.imbalance_params,
         dealer_commission_pct=req.dealer_commission_pct,
-        distribution_unit_price_tl_per_kwh=dist_unit_price,
+        voltage_level=req.voltage_level,
+        warnings=warnings,
     )
+    max_workers = resolve_worker_count(len(req.items), req.max_workers)
+
+    def _tasks(stream_db: Session) -> Iterator[BatchTask]:
+        for index, item in enumerate(req.items):
+            task = BatchTask(index=index, customer_id=item.customer_id)
+            try:
+                task.consumption_records = _get_or_generate_consumption(
+                    stream_db, period, item.customer_id,
+                    item.use_template, item.template_name, item.template_monthly_kwh,
+                    t1_kwh=item.t1_kwh, t2_kwh=item.t2_kwh, t3_kwh=item.t3_kwh,
+                )
+            except HTTPException as e:
+                task.error = e.detail
+            except ValueError as e:
+                task.error = {"error": "consumption_error", "message": str(e)}
+            yield task
+
+    def _stream() -> Iterator[dict]:
+        stream_db = session_factory() if session_factory else db
+        accumulator = PortfolioAccumulator(period)
+        try:
+            for line in iter_batch_results(context, _tasks(stream_db), max_workers):
+                accumulator.add(line)
+                yield line
+        finally:
+            if session_factory:
+                stream_db.close()
+        summary = accumulator.summary()
+        logger.info(
+            "pricing_analyze_batch: period=%s items=%d ok=%d failed=%d workers=%d",
+            period, summary.items_total, summary.items_ok, summary.items_failed,
+            max_workers,
+        )
+        yield {"type": "summary", "summary": summary.model_dump()}
 
-    # 6. Zaman dilimi dağılımı
-    tz_breakdown = calculate_time_zone_breakdown(
-        market_records, consumption_records, yekdem,
-    )
+    return _stream()
 
-    # 7. Dengesizlik maliyeti (TL/MWh)
-    from .imbalance import calculate_imbalance_cost
-    imbalance_cost = calculate_imbalance_cost(
-        weighted.weighted_ptf_tl_per_mwh,
-        weighted.weighted_smf_tl_per_mwh,
-        req.imbalance_params,
-    )
 
-    # 8. Güvenli katsayı
-    pd = PeriodData(
-        period=period,
-        market_records=market_records,
-        consumption_records=consumption_records,
+@pricing_router.post("/analyze-batch")
+def analyze_batch_endpoint(
+    req: BatchAnalyzeRequest,
+    db: Session = Depends(get_db),
+    _key: str | None = Depends(_require_pricing_key),
+):
+    """Toplu (portföy) analiz — NDJSON akışı.
+
+    Her satır bir JSON nesnesi: kalem sonuçları istek sırasıyla, son satır
+    portföy özeti (type="summary").
+    """
+    lines = analyze_batch(
+        req, db, session_factory=sessionmaker(bind=db.get_bind()),
     )
-    safe_result = calculate_safe_multiplier(
-        [pd],
-        yekdem_tl_per_mwh=yekdem,
-        imbalance_params=req.imbalance_params,
-        dealer_commission_pct=req.dealer_commission_pct,
+    return StreamingResponse(
+        (json.dumps(line, ensure_ascii=False, default=str) + "\n" for line in lines),
+        media_type="application/x-ndjson",
     )
 
-    # 9. Risk skoru
-    risk = calculate_risk_score(weighted, tz_breakdown)
-
-    # 10. Zarar haritası
-    loss_hours_list = [e for e in hourly_result.hour_costs if e.is_loss_hour]
-    loss_by_tz: dict[str, int] = {"T1": 0, "T2": 0, "T3": 0}
-    for e in loss_hours_list:
-        loss_by_tz[e.time_zone.value] = loss_by_tz.get(e.time_zone.value, 0) + 1
-
-    worst_hours = sorted(loss_hours_list, key=lambda e: e.margin_tl)[:10]
-    loss_map = LossMapSummary(
-        total_loss_hours=len(loss_hours_list),
-        total_loss_tl=round(sum(e.margin_tl for e in loss_hours_list), 2),
-        by_time_zone=loss_by_tz,
-        worst_hours=[
-            {
-                "date": e.date, "hour": e.hour,
-                "ptf": e.ptf_tl_per_mwh,
-                "sales_price": e.sales_price_tl,
-                "loss_tl": e.margin_tl,
-            }
-            for e in worst_hours
-        ],
-    )
 
-    # 11. Uyarılar (warnings list initialized before YEKDEM check)
-    offer_warning = generate_offer_warning(
-        req.multiplier, safe_result.safe_multiplier,
-        safe_result.recommended_multiplier, risk.score,
-    )
-    if offer_warning:
-        warnings.append({"type": "safe_multiplier_warning", "message": offer_warning})
+def _load_backtest_consumption(
+    db: Session, item: BatchAnalyzeItem, periods: list[str],
+) -> dict[str, ConsumptionSlots]:
+    """Kalemin tüm backtest dönemleri için tüketimi slot dizisi olarak yükle.
 
-    coherence = check_risk_safe_multiplier_coherence(
-        risk.score, safe_result.safe_multiplier,
-    )
-    if coherence:
-        warnings.append({"type": "coherence_warning", "message": coherence})
-
-    # 12. Tedarikçi maliyet özeti
-    energy_cost = weighted.weighted_ptf_tl_per_mwh + yekdem
-    supplier_cost = SupplierCostSummary(
-        weighted_ptf_tl_per_mwh=weighted.weighted_ptf_tl_per_mwh,
-        yekdem_tl_per_mwh=yekdem,
-        imbalance_tl_per_mwh=round(imbalance_cost, 2),
-        total_cost_tl_per_mwh=round(
-            weighted.weighted_ptf_tl_per_mwh + yekdem + imbalance_cost, 2
-        ),
-    )
+    Öncelik /analyze ile aynıdır (T1/T2/T3 > şablon > DB profili). DB
+    profilleri tek sorguda bulunur; profili olmayan dönem atlanır.
+    """
+    t1, t2, t3 = item.t1_kwh or 0, item.t2_kwh or 0, item.t3_kwh or 0
+    has_t1t2t3 = (
+        item.t1_kwh is not None or item.t2_kwh is not None or item.t3_kwh is not None
+    ) and (t1 + t2 + t3) > 0
+    if has_t1t2t3 or (item.use_template and item.template_name and item.template_monthly_kwh):
+        return {
+            period: consumption_slots(_get_or_generate_consumption(
+                db, period, item.customer_id,
+                item.use_template, item.template_name, item.template_monthly_kwh,
+                t1_kwh=item.t1_kwh, t2_kwh=item.t2_kwh, t3_kwh=item.t3_kwh,
+            ))
+            for period in periods
+        }
 
-    # 13. Fiyatlama özeti — dual price, dual margin, risk flags
-    total_consumption = weighted.total_consumption_kwh
-    dist_per_mwh = dist_unit_price * 1000  # TL/kWh → TL/MWh
+    if not item.customer_id:
+        raise HTTPException(
+            status_code=422,
+            detail={
+                "error": "missing_consumption_data",
+                "message": (
+                    "Tüketim verisi bulunamadı. customer_id veya "
+                    "use_template + template_name + template_monthly_kwh kullanın."
+                ),
+            },
+        )
+    profiles = (
+        db.query(ConsumptionProfile)
+        .filter(
+            ConsumptionProfile.customer_id == item.customer_id,
+            ConsumptionProfile.period.in_(periods),
+            ConsumptionProfile.is_active == 1,
+        )
+        .all()
+    )
+    return {
+        profile.period: consumption_slots(load_profile_records(db, profile))
+        for profile in profiles
+    }
 
-    sales_energy_price_per_mwh = round(energy_cost * req.multiplier, 2)
-    sales_effective_price_per_mwh = round(sales_energy_price_per_mwh + dist_per_mwh, 2)
 
-    gross_margin_energy_per_mwh = round(sales_energy_price_per_mwh - energy_cost, 2)
-    gross_margin_total_per_mwh = round(sales_energy_price_per_mwh - energy_cost - dist_per_mwh, 2)
+def backtest(
+    req: BacktestRequest,
+    db: Session,
+    session_factory: Optional[Callable[[], Session]] = None,
+) -> Iterator[dict]:
+    """Çok dönemli backtest — Python API.
 
-    dealer_per_mwh = round(
-        hourly_result.dealer_commission_total_tl / (total_consumption / 1000.0), 2
-    ) if total_consumption > 0 else 0.0
-    imbalance_per_mwh = round(
-        hourly_result.imbalance_cost_total_tl / (total_consumption / 1000.0), 2
-    ) if total_consumption > 0 else 0.0
+    Dönemlerin piyasa verisi ve YEKDEM'i bir kez dizi deposuna yüklenir;
+    kalemlerin tüketimi sırayla (tembel) yüklenip süreç havuzunda işlenir.
+    Hiç piyasa verisi yoksa HTTPException(404) hemen fırlatılır.
 
-    net_margin_per_mwh = round(
-        gross_margin_total_per_mwh - dealer_per_mwh - imbalance_per_mwh, 2
+    Yields:
+        {"type": "item", "index", "customer_id", "status", "result"|"error"}
+        satırları istek sırasıyla, en sonda {"type": "summary", "summary"}.
+    """
+    history = load_market_history(
+        db, list_market_periods(db, req.start_period, req.end_period),
     )
+    if not history.periods:
+        raise HTTPException(
+            status_code=404,
+            detail={
+                "error": "market_data_not_found",
+                "message": "Backtest aralığında piyasa verisi bulunamadı.",
+            },
+        )
+    periods = history.period_list
 
-    # Risk flags (priority ordered: P1 > P2, both can coexist)
-    risk_flags: list[dict] = []
-    if hourly_result.net_margin_total_tl < 0:
-        risk_flags.append({
-            "type": "LOSS_RISK",
-            "priority": 1,
-            "message": "Net marj negatif — teklif zarar üretir",
-        })
-    if gross_margin_total_per_mwh < 0:
-        risk_flags.append({
-            "type": "UNPROFITABLE_OFFER",
-            "priority": 2,
-            "message": "Toplam brüt marj negatif — dağıtım dahil maliyet satışı aşıyor",
-        })
-
-    pricing = PricingSummary(
+    context = BacktestContext(
+        history=history,
         multiplier=req.multiplier,
-        # Dual sales price
-        sales_energy_price_per_mwh=sales_energy_price_per_mwh,
-        sales_effective_price_per_mwh=sales_effective_price_per_mwh,
-        # Dual margin (per MWh)
-        gross_margin_energy_per_mwh=gross_margin_energy_per_mwh,
-        gross_margin_total_per_mwh=gross_margin_total_per_mwh,
-        net_margin_per_mwh=net_margin_per_mwh,
-        # Cost breakdown (per MWh)
-        distribution_cost_per_mwh=round(dist_per_mwh, 2),
-        imbalance_cost_per_mwh=imbalance_per_mwh,
-        dealer_commission_per_mwh=dealer_per_mwh,
-        # Risk flags
-        risk_flags=risk_flags,
-        # Totals (TL)
-        total_sales_tl=hourly_result.total_sales_revenue_tl,
-        total_cost_tl=hourly_result.total_base_cost_tl,
-        total_gross_margin_tl=hourly_result.total_gross_margin_tl,
-        total_dealer_commission_tl=hourly_result.dealer_commission_total_tl,
-        total_net_margin_tl=hourly_result.total_net_margin_tl,
-        # Backward compat aliases
-        sales_price_tl_per_mwh=sales_energy_price_per_mwh,
-        gross_margin_tl_per_mwh=gross_margin_energy_per_mwh,
-        dealer_commission_tl_per_mwh=dealer_per_mwh,
-        net_margin_tl_per_mwh=net_margin_per_mwh,
+        imbalance_params=req.imbalance_params,
+        dealer_commission_pct=req.dealer_commission_pct,
     )
-
-    # ── 14. Nominal vs Gerçek Marj Analizi ─────────────────────────────
-    try:
-        hourly_ptf_list = [e.ptf_tl_per_mwh for e in hourly_result.hour_costs]
-        hourly_kwh_list = [e.consumption_kwh for e in hourly_result.hour_costs]
-        hourly_ts_list = [f"{e.date} {e.hour:02d}:00" for e in hourly_result.hour_costs]
-        hourly_tz_list = [e.time_zone.value for e in hourly_result.hour_costs]
-
-        margin_reality_result = calculate_margin_reality(
-            offer_ptf_tl_per_mwh=weighted.weighted_ptf_tl_per_mwh,
-            yekdem_tl_per_mwh=yekdem,
-            multiplier=req.multiplier,
-            hourly_ptf_prices=hourly_ptf_list,
-            hourly_consumption_kwh=hourly_kwh_list,
-            hourly_timestamps=hourly_ts_list,
-            hourly_time_zones=hourly_tz_list,
-            include_yekdem=True,
+    max_workers = resolve_worker_count(len(req.items), req.max_workers)
+
+    def _tasks(stream_db: Session) -> Iterator[BacktestTask]:
+        for index, item in enumerate(req.items):
+            task = BacktestTask(index=index, customer_id=item.customer_id)
+            try:
+                task.consumption = _load_backtest_consumption(stream_db, item, periods)
+            except HTTPException as e:
+                task.error = e.detail
+            except ValueError as e:
+                task.error = {"error": "consumption_error", "message": str(e)}
+            yield task
+
+    def _stream() -> Iterator[dict]:
+        stream_db = session_factory() if session_factory else db
+        accumulator = BacktestAccumulator(history)
+        try:
+            for line in iter_backtest_results(context, _tasks(stream_db), max_workers):
+                accumulator.add(line)
+                yield line
+        finally:
+            if session_factory:
+                stream_db.close()
+        summary = accumulator.summary()
+        logger.info(
+            "pricing_backtest: periods=%d items=%d ok=%d failed=%d workers=%d",
+            len(periods), summary.items_total, summary.items_ok, summary.items_failed,
+            max_workers,
         )
-        margin_reality_dict = margin_reality_result.model_dump()
-    except Exception as e:
-        logger.warning("margin_reality calculation failed (non-critical): %s", e)
-        margin_reality_dict = None
+        yield {"type": "summary", "summary": summary.model_dump()}
 
-    response = AnalyzeResponse(
-        period=period,
-        customer_id=req.customer_id,
-        weighted_prices=weighted,
-        supplier_cost=supplier_cost,
-        pricing=pricing,
-        time_zone_breakdown=tz_breakdown,
-        loss_map=loss_map,
-        risk_score=risk,
-        safe_multiplier=safe_result,
-        distribution=dist_info,
-        margin_reality=margin_reality_dict,
-        warnings=warnings,
-        data_quality=DataQualityReport(),
-        cache_hit=False,
-    )
+    return _stream()
 
-    # ── Cache write ────────────────────────────────────────────────────
-    try:
-        set_cached_result(
-            db, cache_key,
-            customer_id=req.customer_id,
-            period=period,
-            params_hash=cache_key,
-            result=response.model_dump(),
-        )
-    except Exception as e:
-        logger.warning("Cache write failed (non-critical): %s", e)
 
-    # ── Analyze logging ────────────────────────────────────────────────
-    logger.info(
-        "pricing_analyze: customer=%s period=%s multiplier=%.2f "
-        "safe=%.3f risk=%s net_margin=%.2f",
-        req.customer_id or "template", period, req.multiplier,
-        safe_result.safe_multiplier, risk.score.value,
-        hourly_result.total_net_margin_tl,
-    )
+@pricing_router.post("/backtest")
+def backtest_endpoint(
+    req: BacktestRequest,
+    db: Session = Depends(get_db),
+    _key: str | None = Depends(_require_pricing_key),
+):
+    """Çok dönemli geçmiş backtest — NDJSON akışı.
 
-    return response
+    Kalem satırları dönem bazlı marj, zararlı saat ve kümülatif K/Z içerir;
+    son satır portföy özeti (type="summary").
+    """
+    lines = backtest(req, db, session_factory=sessionmaker(bind=db.get_bind()))
+    return StreamingResponse(
+        (json.dumps(line, ensure_ascii=False, default=str) + "\n" for line in lines),
+        media_type="application/x-ndjson",
+    )
 
 
 @pricing_router.post("/simulate", response_model=SimulateResponse)
@@ -815,52 +979,211 @@ def simulate(
     )
 
 
+@pricing_router.post("/scenario-grid", response_model=ScenarioGridResponse)
+def scenario_grid(
+    req: ScenarioGridRequest,
+    format: str = Query(default="json", pattern="^(json|npz)$"),
+    db: Session = Depends(get_db),
+    _key: str | None = Depends(_require_pricing_key),
+):
+    """Senaryo küpü — katsayı × bayi × hata oranı × dengesizlik bedeli.
+
+    Hazırlık /analyze ile paylaşılır; küp tek vektörel geçişte hesaplanır.
+    format=npz → sıkıştırılmış NumPy arşivi (küp dizileri [M, D, F, C] şeklinde).
+    """
+    axes = []
+    for name in ("multiplier", "dealer_commission_pct",
+                 "forecast_error_rate", "imbalance_cost_tl_per_mwh"):
+        axis = getattr(req, name)
+        axes.append(expand_grid_values(axis.start, axis.end, axis.step))
+
+    cells = int(np.prod([a.size for a in axes]))
+    if cells > PRICING_GRID_MAX_CELLS:
+        raise HTTPException(
+            status_code=422,
+            detail={
+                "error": "grid_too_large",
+                "message": (
+                    f"Senaryo küpü {cells} hücre; üst sınır {PRICING_GRID_MAX_CELLS}. "
+                    f"Aralıkları daraltın veya adımı büyütün."
+                ),
+            },
+        )
+
+    prepared = _get_prepared_analysis(
+        db, req.period, req.customer_id, get_data_versions(db, req.period, req.customer_id),
+        req.use_template, req.template_name, req.template_monthly_kwh,
+    )
+    grid = run_scenario_grid(
+        prepared.basis, *axes,
+        smf_based_imbalance_enabled=req.smf_based_imbalance_enabled,
+    )
+
+    if format == "npz":
+        from fastapi.responses import Response
+
+        buf = io.BytesIO()
+        np.savez_compressed(
+            buf,
+            multipliers=np.array(grid.multipliers),
+            dealer_commission_pcts=np.array(grid.dealer_commission_pcts),
+            forecast_error_rates=np.array(grid.forecast_error_rates),
+            imbalance_costs_tl_per_mwh=np.array(grid.imbalance_costs_tl_per_mwh),
+            total_sales_tl=np.array(grid.total_sales_tl),
+            gross_margin_tl=np.array(grid.gross_margin_tl),
+            loss_hours=np.array(grid.loss_hours, dtype=np.int32),
+            total_loss_tl=np.array(grid.total_loss_tl),
+            imbalance_tl_per_mwh=np.array(grid.imbalance_tl_per_mwh).reshape(grid.shape[2:]),
+            imbalance_cost_tl=np.array(grid.imbalance_cost_tl).reshape(grid.shape[2:]),
+            dealer_commission_tl=np.array(grid.dealer_commission_tl).reshape(grid.shape),
+            net_margin_tl=np.array(grid.net_margin_tl).reshape(grid.shape),
+        )
+        filename = f"scenario_grid_{req.period}_{req.customer_id or 'template'}.npz"
+        return Response(
+            content=buf.getvalue(),
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        )
+
+    return ScenarioGridResponse(
+        period=req.period,
+        shape=list(grid.shape),
+        multipliers=grid.multipliers,
+        dealer_commission_pcts=grid.dealer_commission_pcts,
+        forecast_error_rates=grid.forecast_error_rates,
+        imbalance_costs_tl_per_mwh=grid.imbalance_costs_tl_per_mwh,
+        smf_based_imbalance_enabled=grid.smf_based_imbalance_enabled,
+        total_cost_tl=grid.total_cost_tl,
+        total_sales_tl=grid.total_sales_tl,
+        gross_margin_tl=grid.gross_margin_tl,
+        loss_hours=grid.loss_hours,
+        total_loss_tl=grid.total_loss_tl,
+        imbalance_tl_per_mwh=grid.imbalance_tl_per_mwh,
+        imbalance_cost_tl=grid.imbalance_cost_tl,
+        dealer_commission_tl=grid.dealer_commission_tl,
+        net_margin_tl=grid.net_margin_tl,
+        warnings=prepared.warnings,
+    )
+
+
+@pricing_router.post("/margin-at-risk", response_model=MarginAtRiskResponse)
+def margin_at_risk(
+    req: MarginAtRiskRequest,
+    db: Session = Depends(get_db),
+    _key: str | None = Depends(_require_pricing_key),
+):
+    """Monte Carlo marj riski — önerilen katsayı için net marj dağılımı.
+
+    Geçmiş gün şekilleri gün tipine göre blok bootstrap ile örneklenir;
+    P5/P50/VaR/CVaR tohumla tekrar üretilebilir.
+    """
+    if req.n_paths > PRICING_MAR_MAX_PATHS:
+        raise HTTPException(
+            status_code=422,
+            detail={
+                "error": "too_many_paths",
+                "message": f"Yol sayısı üst sınırı {PRICING_MAR_MAX_PATHS}.",
+            },
+        )
+
+    prepared = _get_prepared_analysis(
+        db, req.period, req.customer_id, get_data_versions(db, req.period, req.customer_id),
+        req.use_template, req.template_name, req.template_monthly_kwh,
+    )
+    library = load_shape_library(db, req.period, req.history_months)
+    try:
+        inputs = build_margin_at_risk_inputs(
+            prepared.basis, library,
+            multiplier=req.multiplier,
+            imbalance_params=req.imbalance_params,
+            dealer_commission_pct=req.dealer_commission_pct,
+            consumption_noise=req.consumption_noise,
+            price_level_sigma=req.price_level_sigma,
+            block_days=req.block_days,
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=422,
+            detail={"error": "insufficient_market_history", "message": str(e)},
+        )
+
+    result = run_margin_at_risk(
+        inputs, n_paths=req.n_paths, seed=req.seed, confidence=req.confidence,
+    )
+    nominal = summarize_cost_totals(
+        prepared.basis,
+        seq_sum(prepared.basis.kwh_energy * req.multiplier / 1000.0),
+        req.imbalance_params,
+        dealer_commission_pct=req.dealer_commission_pct,
+    )
+
+    logger.info(
+        "pricing_margin_at_risk: customer=%s period=%s multiplier=%.3f paths=%d "
+        "p5=%.2f var=%.2f cvar=%.2f",
+        req.customer_id or "template", req.period, req.multiplier, req.n_paths,
+        result.p5_net_margin_tl, result.var_tl, result.cvar_tl,
+    )
+
+    return MarginAtRiskResponse(
+        period=req.period,
+        multiplier=req.multiplier,
+        nominal_net_margin_tl=nominal["total_net_margin_tl"],
+        margin_at_risk=result,
+        warnings=prepared.warnings,
+    )
+
+
 @pricing_router.post("/compare", response_model=CompareResponse)
 def compare(
     req: CompareRequest,
     db: Session = Depends(get_db),
     _key: str | None = Depends(_require_pricing_key),
 ):
-    """Çoklu ay karşılaştırma — her dönem için analiz + dönemler arası değişim."""
+    """Çoklu ay karşılaştırma — her dönem için analiz + dönemler arası değişim.
+
+    Piyasa + YEKDEM ve tüketim profilleri tablo başına tek seferde yüklenir;
+    dönem hesapları yeterli dönem varsa süreç havuzunda paralel çalışır ve
+    maliyet tabanları güvenli katsayı adımında yeniden kullanılır
+    (bkz. compare.py).
+    """
     comparisons: list[PeriodComparison] = []
     missing_periods: list[str] = []
-    periods_data: list[PeriodData] = []
+    results: list[ComparePeriodResult] = []
     prev_weighted_ptf: float | None = None
 
-    for period in req.periods:
-        market_records = _load_market_records(db, period)
-        if not market_records:
-            missing_periods.append(period)
-            continue
+    history = load_market_history(db, req.periods)
+    try:
+        consumption = _load_backtest_consumption(
+            db,
+            BatchAnalyzeItem(
+                customer_id=req.customer_id,
+                use_template=req.use_template,
+                template_name=req.template_name,
+                template_monthly_kwh=req.template_monthly_kwh,
+            ),
+            [p for p in req.periods if p in history.periods],
+        )
+    except HTTPException:
+        consumption = {}
 
-        try:
-            consumption_records = _get_or_generate_consumption(
-                db, period, req.customer_id,
-                req.use_template, req.template_name, req.template_monthly_kwh,
-            )
-        except HTTPException:
+    periods = [p for p in req.periods if p in history.periods and p in consumption]
+    context = CompareContext(
+        history=history,
+        multiplier=req.multiplier,
+        imbalance_params=req.imbalance_params,
+        dealer_commission_pct=req.dealer_commission_pct,
+    )
+    computed = dict(zip(periods, run_compare_periods(
+        context, consumption, periods,
+        max_workers=resolve_compare_workers(len(periods), req.max_workers),
+    )))
+
+    for period in req.periods:
+        result = computed.get(period)
+        if not isinstance(result, ComparePeriodResult):
             missing_periods.append(period)
             continue
-
-        yekdem_record = get_yekdem(db, period)
-        if not yekdem_record:
-            yekdem = 0.0  # Graceful fallback — include period with yekdem=0
-        else:
-            yekdem = yekdem_record.yekdem_tl_per_mwh
-
-        # Hesapla
-        weighted = calculate_weighted_prices(market_records, consumption_records)
-        hourly_result = calculate_hourly_costs(
-            market_records, consumption_records,
-            yekdem_tl_per_mwh=yekdem,
-            multiplier=req.multiplier,
-            imbalance_params=req.imbalance_params,
-            dealer_commission_pct=req.dealer_commission_pct,
-        )
-        tz_breakdown = calculate_time_zone_breakdown(
-            market_records, consumption_records, yekdem,
-        )
-        risk = calculate_risk_score(weighted, tz_breakdown)
+        weighted = result.weighted
 
         # Değişim yüzdesi
         change_pct = None
@@ -878,26 +1201,21 @@ def compare(
             weighted_ptf_tl_per_mwh=weighted.weighted_ptf_tl_per_mwh,
             weighted_smf_tl_per_mwh=weighted.weighted_smf_tl_per_mwh,
             total_cost_tl=weighted.total_cost_tl,
-            net_margin_tl=hourly_result.total_net_margin_tl,
-            risk_score=risk.score,
+            net_margin_tl=result.net_margin_tl,
+            risk_score=result.risk_score,
             change_pct=change_pct,
         ))
+        results.append(result)
 
-        periods_data.append(PeriodData(
-            period=period,
-            market_records=market_records,
-            consumption_records=consumption_records,
-        ))
-
-    # Güvenli katsayı (tüm dönemler üzerinden)
-    if periods_data:
-        yekdem_for_safe = get_yekdem(db, periods_data[0].period)
-        yekdem_val = yekdem_for_safe.yekdem_tl_per_mwh if yekdem_for_safe else 0.0
+    # Güvenli katsayı (tüm dönemler üzerinden — ilk dönemin YEKDEM'i ile)
+    if results:
+        yekdem_val = history.periods[results[0].period].yekdem_tl_per_mwh
         safe_result = calculate_safe_multiplier(
-            periods_data,
+            [],
             yekdem_tl_per_mwh=yekdem_val,
             imbalance_params=req.imbalance_params,
             dealer_commission_pct=req.dealer_commission_pct,
+            bases=safe_multiplier_bases(results, yekdem_val),
         )
     else:
         from .models import SafeMultiplierResult
@@ -960,8 +1278,7 @@ def upsert_yekdem(
     except ValueError as e:
         raise HTTPException(status_code=422, detail={"error": "validation_error", "message": str(e)})
 
-    # Cache invalidation: YEKDEM güncellendi → dönem cache sil
-    invalidate_cache_for_period(db, period)
+    # Analiz cache: key aktif YEKDEM versiyonunu içerir → ayrıca silme yok
 
     return {
         "status": "ok",
@@ -1192,6 +1509,26 @@ def lookup_distribution_tariff_public(
 # ═══════════════════════════════════════════════════════════════════════════════
 
 
+def _report_request(req: AnalyzeRequest) -> AnalyzeRequest:
+    """Raporlar tüm saatlik kayıtları kullanır — tek sayfada tüm dönem."""
+    return req.model_copy(update={
+        "hour_detail": HourDetailMode.PAGE, "hour_offset": 0, "hour_limit": 744,
+    })
+
+
+def _report_analysis_dict(analysis) -> dict:
+    """analyze() sonucu (model veya önbellek dict'i) → rapor girdisi dict'i.
+
+    hour_costs, rapor üreticilerinin beklediği saat kaydı listesine açılır.
+    """
+    if hasattr(analysis, "model_dump"):
+        analysis_dict = analysis.model_dump()
+    else:
+        analysis_dict = {**analysis, "hour_costs": analysis["hour_costs"].model_dump()}
+    analysis_dict["hour_costs"] = analysis_dict["hour_costs"]["hours"]
+    return analysis_dict
+
+
 @pricing_router.post("/report/pdf")
 def report_pdf(
     req: AnalyzeRequest,
@@ -1208,8 +1545,8 @@ def report_pdf(
     from fastapi.responses import Response
 
     # Analiz hesapla (analyze endpoint'i ile aynı mantık)
-    analysis = analyze(req, db)
-    analysis_dict = analysis.model_dump() if hasattr(analysis, 'model_dump') else analysis
+    analysis = analyze(_report_request(req), db)
+    analysis_dict = _report_analysis_dict(analysis)
 
     # Simülasyon ekle (PDF'de simülasyon tablosu için)
     sim_rows = run_simulation(
@@ -1225,21 +1562,6 @@ def report_pdf(
     )
     analysis_dict["simulation"] = [r.model_dump() for r in sim_rows]
 
-    # Saatlik detay ekle (hour_costs)
-    hourly_result = calculate_hourly_costs(
-        _load_market_records(db, req.period),
-        _get_or_generate_consumption(
-            db, req.period, req.customer_id,
-            req.use_template, req.template_name, req.template_monthly_kwh,
-            t1_kwh=req.t1_kwh, t2_kwh=req.t2_kwh, t3_kwh=req.t3_kwh,
-        ),
-        yekdem_tl_per_mwh=analysis_dict.get("supplier_cost", {}).get("yekdem_tl_per_mwh", 0),
-        multiplier=req.multiplier,
-        imbalance_params=req.imbalance_params,
-        dealer_commission_pct=req.dealer_commission_pct,
-    )
-    analysis_dict["hour_costs"] = [e.model_dump() for e in hourly_result.hour_costs]
-
     pdf_bytes = generate_pdf_report(
         analysis_dict,
         customer_name=customer_name or req.customer_id,
@@ -1255,19 +1577,50 @@ def report_pdf(
     )
 
 
+def _require_export_format(fmt: ExportFormat) -> None:
+    """Parquet istendiyse pyarrow kurulu olmalı — değilse 501."""
+    if fmt == ExportFormat.PARQUET and not parquet_available():
+        raise HTTPException(
+            status_code=501,
+            detail={
+                "error": "parquet_unavailable",
+                "message": "Parquet dışa aktarma için pyarrow kurulu değil.",
+            },
+        )
+
+
+def _export_response(spool, fmt: ExportFormat, stem: str) -> StreamingResponse:
+    """Spool'daki dosyayı parça parça indir (akış bitince spool kapanır)."""
+    filename = f"{stem}.{fmt.value}"
+    return StreamingResponse(
+        iter_spooled(spool),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
 @pricing_router.post("/report/excel")
 def report_excel(
     req: AnalyzeRequest,
     customer_name: Optional[str] = None,
+    format: ExportFormat = Query(default=ExportFormat.XLSX),
     db: Session = Depends(get_db),
     _key: str | None = Depends(_require_pricing_key),
 ):
-    """Excel fiyatlama analiz raporu üret ve indir."""
-    from fastapi.responses import Response
+    """Excel fiyatlama analiz raporu üret ve indir.
+
+    format=xlsx → 5 sayfalık rapor; csv / parquet → yalnız saatlik detay
+    tablosu (analitik araçlar için). Dosya geçici spool'a yazılıp akıtılır.
+    """
+    _require_export_format(format)
 
     # Analiz hesapla
-    analysis = analyze(req, db)
-    analysis_dict = analysis.model_dump() if hasattr(analysis, 'model_dump') else analysis
+    analysis = analyze(_report_request(req), db)
+    analysis_dict = _report_analysis_dict(analysis)
+    stem = f"pricing_analysis_{req.period}_{req.customer_id or 'template'}"
+
+    if format != ExportFormat.XLSX:
+        return _export_response(export_hourly_detail(analysis_dict, format), format, stem)
 
     # Simülasyon ekle
     sim_rows = run_simulation(
@@ -1283,29 +1636,121 @@ def report_excel(
     )
     analysis_dict["simulation"] = [r.model_dump() for r in sim_rows]
 
-    # Saatlik detay ekle
-    hourly_result = calculate_hourly_costs(
-        _load_market_records(db, req.period),
-        _get_or_generate_consumption(
-            db, req.period, req.customer_id,
-            req.use_template, req.template_name, req.template_monthly_kwh,
-            t1_kwh=req.t1_kwh, t2_kwh=req.t2_kwh, t3_kwh=req.t3_kwh,
-        ),
-        yekdem_tl_per_mwh=analysis_dict.get("supplier_cost", {}).get("yekdem_tl_per_mwh", 0),
-        multiplier=req.multiplier,
-        imbalance_params=req.imbalance_params,
-        dealer_commission_pct=req.dealer_commission_pct,
-    )
-    analysis_dict["hour_costs"] = [e.model_dump() for e in hourly_result.hour_costs]
+    spool = open_spool()
+    try:
+        write_excel_report(
+            analysis_dict, spool,
+            customer_name=customer_name or req.customer_id,
+        )
+    except BaseException:
+        spool.close()
+        raise
+    return _export_response(spool, format, stem)
 
-    excel_bytes = generate_excel_report(
-        analysis_dict,
-        customer_name=customer_name or req.customer_id,
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Veri Dışa Aktarma Endpoint'leri (çok dönemli, akışlı)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+# Tek istekte dışa aktarılabilecek azami dönem sayısı
+PRICING_EXPORT_MAX_PERIODS = int(os.getenv("PRICING_EXPORT_MAX_PERIODS", "60"))
+
+
+def _validate_export_periods(periods: list[str]) -> list[str]:
+    """Dönemleri doğrula, tekrarları at, kronolojik sırala."""
+    unique = sorted(set(periods))
+    if len(unique) > PRICING_EXPORT_MAX_PERIODS:
+        raise HTTPException(
+            status_code=422,
+            detail={
+                "error": "too_many_periods",
+                "message": (
+                    f"{len(unique)} dönem istendi; üst sınır {PRICING_EXPORT_MAX_PERIODS}."
+                ),
+            },
+        )
+    for period in unique:
+        try:
+            expected_hours_for_period(period)
+        except ValueError:
+            raise HTTPException(
+                status_code=422,
+                detail={
+                    "error": "invalid_period",
+                    "message": f"Geçersiz dönem: {period!r} (YYYY-MM bekleniyor).",
+                },
+            )
+    return unique
+
+
+@pricing_router.get("/export/market-data")
+def export_market_data_endpoint(
+    periods: list[str] = Query(..., description="Dönemler (YYYY-MM); tekrarlanabilir."),
+    format: ExportFormat = Query(default=ExportFormat.XLSX),
+    db: Session = Depends(get_db),
+    _key: str | None = Depends(_require_pricing_key),
+):
+    """Aktif saatlik PTF/SMF verisini tek dosyada dışa aktar.
+
+    Dönemler paylaşımlı piyasa deposundan sırayla akıtılır; verisi olmayan
+    dönemler atlanır. xlsx çıktısı upload-market-data ile geri yüklenebilir.
+    """
+    _require_export_format(format)
+    periods = _validate_export_periods(periods)
+
+    segments = [get_market_segment(db, p) for p in periods]
+    segments = [seg for seg in segments if len(seg)]
+    if not segments:
+        raise HTTPException(
+            status_code=404,
+            detail={
+                "error": "market_data_not_found",
+                "message": "İstenen dönemler için piyasa verisi bulunamadı.",
+            },
+        )
+
+    records = (rec for seg in segments for rec in seg.to_records())
+    spool = export_market_data(records, periods[0], format)
+    logger.info(
+        "pricing_export_market_data: periods=%d format=%s", len(segments), format.value,
+    )
+    return _export_response(
+        spool, format, f"market_data_{segments[0].period}_{segments[-1].period}",
     )
 
-    filename = f"pricing_analysis_{req.period}_{req.customer_id or 'template'}.xlsx"
-    return Response(
-        content=excel_bytes,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+
+@pricing_router.get("/export/consumption")
+def export_consumption_endpoint(
+    customer_id: str,
+    periods: list[str] = Query(..., description="Dönemler (YYYY-MM); tekrarlanabilir."),
+    format: ExportFormat = Query(default=ExportFormat.XLSX),
+    db: Session = Depends(get_db),
+    _key: str | None = Depends(_require_pricing_key),
+):
+    """Müşterinin aktif tüketim profillerini tek dosyada dışa aktar.
+
+    Profili olmayan dönemler atlanır; xlsx çıktısı upload-consumption ile
+    geri yüklenebilir.
+    """
+    _require_export_format(format)
+    periods = _validate_export_periods(periods)
+
+    found = [p for p in periods if get_active_profile(db, customer_id, p)]
+    if not found:
+        raise HTTPException(
+            status_code=404,
+            detail={
+                "error": "consumption_not_found",
+                "message": f"{customer_id} için istenen dönemlerde tüketim profili bulunamadı.",
+            },
+        )
+
+    records = (rec for p in found for rec in _load_consumption_records(db, customer_id, p))
+    spool = export_consumption(records, found[0], format)
+    logger.info(
+        "pricing_export_consumption: customer=%s periods=%d format=%s",
+        customer_id, len(found), format.value,
+    )
+    return _export_response(
+        spool, format, f"consumption_{customer_id}_{found[0]}_{found[-1]}",
     )
@@ -132,11 +132,11 @@ class ProfileTemplate(Base):
 
 
 class DataVersion(Base):
-    """Veri versiyonlama arşivi — piyasa ve tüketim verisi yükleme geçmişi."""
+    """Veri versiyonlama arşivi — piyasa, tüketim ve YEKDEM verisi yükleme geçmişi."""
     __tablename__ = "data_versions"
 
     id = Column(Integer, primary_key=True, index=True)
-    data_type = Column(String(30), nullable=False)                   # market_data, consumption
+    data_type = Column(String(30), nullable=False)                   # market_data, consumption, yekdem
     period = Column(String(7), nullable=False)                       # YYYY-MM
     customer_id = Column(String(100), nullable=True)                 # NULL for market data
     version = Column(Integer, nullable=False)
@@ -0,0 +1,300 @@
+"""
+Pricing Risk Engine — Akışlı Tablo Dışa Aktarma.
+
+Saatlik tablolar (piyasa verisi, tüketim profili, rapor saatlik detayı)
+bellekte tam openpyxl çalışma kitabı kurulmadan dışa aktarılır:
+
+- XLSX: openpyxl write-only çalışma sayfası; satırlar eklendikçe diske
+  yazılır, hücre nesnesi yalnız biçimli sütunlar için üretilir
+- CSV: UTF-8, başlık satırında makine-dostu sütun anahtarları
+- Parquet: pyarrow (opsiyonel, requirements-optional.txt) ile satır grubu
+  bazında yazılır; kurulu değilse endpoint 501 döner
+
+Çıktı SpooledTemporaryFile'a yazılır (küçük dosyalar bellekte, büyükler
+diskte) ve `iter_spooled` ile parça parça StreamingResponse'a verilir.
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import os
+import tempfile
+from dataclasses import dataclass
+from itertools import islice
+from typing import IO, Any, Callable, Iterable, Iterator, Optional, Sequence
+
+from .models import ExportFormat
+
+# Bellekte tutulacak azami çıktı boyutu — aşılırsa geçici dosyaya taşınır
+PRICING_EXPORT_SPOOL_BYTES = int(
+    os.getenv("PRICING_EXPORT_SPOOL_BYTES", str(8 * 1024 * 1024))
+)
+
+# StreamingResponse parça boyutu
+PRICING_EXPORT_CHUNK_BYTES = int(os.getenv("PRICING_EXPORT_CHUNK_BYTES", "65536"))
+
+# Parquet satır grubu boyutu (bir yıllık saatlik veri ≈ 8760 satır)
+PRICING_EXPORT_PARQUET_ROW_GROUP = int(
+    os.getenv("PRICING_EXPORT_PARQUET_ROW_GROUP", "8760")
+)
+
+MEDIA_TYPES: dict[ExportFormat, str] = {
+    ExportFormat.XLSX: "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    ExportFormat.CSV: "text/csv; charset=utf-8",
+    ExportFormat.PARQUET: "application/vnd.apache.parquet",
+}
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Tablo Tanımı
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+@dataclass(frozen=True)
+class ExportColumn:
+    """Dışa aktarılan tablo sütunu.
+
+    header: XLSX başlığı (Türkçe, kullanıcıya dönük)
+    key: CSV/Parquet sütun adı (analitik araçlar için)
+    kind: "str" | "int" | "float" | "bool" | "datetime" — Parquet tipi
+    number_format: XLSX hücre biçimi (ör. "DD.MM.YYYY")
+    excel: XLSX'e yazmadan önce değere uygulanan dönüşüm (ör. bool → "Evet")
+    width: XLSX sütun genişliği
+    """
+    header: str
+    key: str
+    kind: str = "str"
+    number_format: Optional[str] = None
+    excel: Optional[Callable[[Any], Any]] = None
+    width: Optional[float] = None
+
+
+@dataclass
+class ExportTable:
+    """Tek çalışma sayfası / tek CSV-Parquet dosyası.
+
+    rows bir kez tüketilen iterable olabilir (jeneratör) — tablo yalnız bir
+    yazıcıya verilir.
+    """
+    title: str
+    columns: Sequence[ExportColumn]
+    rows: Iterable[Sequence[Any]]
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Spool
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+def open_spool() -> IO[bytes]:
+    """Dışa aktarma hedefi — PRICING_EXPORT_SPOOL_BYTES üstü diske taşar."""
+    return tempfile.SpooledTemporaryFile(max_size=PRICING_EXPORT_SPOOL_BYTES, mode="w+b")
+
+
+def iter_spooled(
+    spool: IO[bytes], chunk_size: int = PRICING_EXPORT_CHUNK_BYTES,
+) -> Iterator[bytes]:
+    """Spool içeriğini baştan parça parça üret; bitince (veya iptalde) kapat."""
+    try:
+        spool.seek(0)
+        while True:
+            chunk = spool.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        spool.close()
+
+
+def read_spooled(spool: IO[bytes]) -> bytes:
+    """Spool içeriğinin tamamı (bytes döndüren eski API'ler için)."""
+    try:
+        spool.seek(0)
+        return spool.read()
+    finally:
+        spool.close()
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# XLSX (write-only)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+def new_write_only_workbook():
+    """Boş write-only çalışma kitabı (aktif sayfa yok)."""
+    from openpyxl import Workbook
+
+    return Workbook(write_only=True)
+
+
+def append_xlsx_table(wb, table: ExportTable, header_style: Optional[dict] = None):
+    """Tabloyu write-only çalışma kitabına yeni sayfa olarak ekle.
+
+    header_style: başlık hücrelerine uygulanacak openpyxl stil nitelikleri
+    (ör. {"font": Font(...), "fill": PatternFill(...)}); None → düz başlık.
+
+    Returns:
+        Oluşturulan WriteOnlyWorksheet.
+    """
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.utils import get_column_letter
+
+    ws = wb.create_sheet(table.title)
+    for idx, col in enumerate(table.columns, 1):
+        if col.width:
+            ws.column_dimensions[get_column_letter(idx)].width = col.width
+
+    if header_style:
+        header = []
+        for col in table.columns:
+            cell = WriteOnlyCell(ws, value=col.header)
+            for attr, value in header_style.items():
+                setattr(cell, attr, value)
+            header.append(cell)
+        ws.append(header)
+    else:
+        ws.append([col.header for col in table.columns])
+
+    # Yalnız biçim/dönüşüm gereken sütunlar için hücre nesnesi üret
+    specials = [
+        (i, col) for i, col in enumerate(table.columns)
+        if col.number_format or col.excel
+    ]
+    if not specials:
+        for row in table.rows:
+            ws.append(row)
+        return ws
+
+    for row in table.rows:
+        values = list(row)
+        for i, col in specials:
+            value = col.excel(values[i]) if col.excel else values[i]
+            if col.number_format and value is not None:
+                cell = WriteOnlyCell(ws, value=value)
+                cell.number_format = col.number_format
+                value = cell
+            values[i] = value
+        ws.append(values)
+    return ws
+
+
+def write_xlsx(table: ExportTable, out: IO[bytes]) -> None:
+    """Tek sayfalık write-only XLSX."""
+    wb = new_write_only_workbook()
+    append_xlsx_table(wb, table)
+    wb.save(out)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# CSV
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+def write_csv(table: ExportTable, out: IO[bytes]) -> None:
+    """UTF-8 CSV — başlık satırı sütun anahtarlarıdır, tarihler ISO 8601."""
+    text = io.TextIOWrapper(out, encoding="utf-8", newline="")
+    try:
+        writer = csv.writer(text)
+        writer.writerow([col.key for col in table.columns])
+        dt_idx = [i for i, col in enumerate(table.columns) if col.kind == "datetime"]
+        if not dt_idx:
+            writer.writerows(table.rows)
+        else:
+            for row in table.rows:
+                values = list(row)
+                for i in dt_idx:
+                    if values[i] is not None:
+                        values[i] = values[i].isoformat()
+                writer.writerow(values)
+        text.flush()
+    finally:
+        # Sarmalayıcıyı ayır — hedef dosya açık kalır
+        text.detach()
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Parquet (opsiyonel: pyarrow)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("pyarrow required for Parquet export. Install: pip install -r requirements-optional.txt")
+    return pa, pq
+
+
+def parquet_available() -> bool:
+    """pyarrow kurulu mu?"""
+    try:
+        _require_pyarrow()
+    except RuntimeError:
+        return False
+    return True
+
+
+def write_parquet(
+    table: ExportTable,
+    out: IO[bytes],
+    row_group_size: int = PRICING_EXPORT_PARQUET_ROW_GROUP,
+) -> None:
+    """Parquet — satırlar row_group_size'lık gruplar halinde yazılır.
+
+    Raises:
+        RuntimeError: pyarrow kurulu değil.
+    """
+    pa, pq = _require_pyarrow()
+    arrow_types = {
+        "str": pa.string(),
+        "int": pa.int64(),
+        "float": pa.float64(),
+        "bool": pa.bool_(),
+        "datetime": pa.timestamp("s"),
+    }
+    schema = pa.schema([(col.key, arrow_types[col.kind]) for col in table.columns])
+
+    rows = iter(table.rows)
+    with pq.ParquetWriter(out, schema) as writer:
+        while True:
+            batch = list(islice(rows, row_group_size))
+            if not batch:
+                break
+            columns = list(zip(*batch))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                schema=schema,
+            ))
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Tek Giriş Noktası
+# ═══════════════════════════════════════════════════════════════════════════════
+
+_WRITERS: dict[ExportFormat, Callable[[ExportTable, IO[bytes]], None]] = {
+    ExportFormat.XLSX: write_xlsx,
+    ExportFormat.CSV: write_csv,
+    ExportFormat.PARQUET: write_parquet,
+}
+
+
+def export_table(table: ExportTable, fmt: ExportFormat) -> IO[bytes]:
+    """Tabloyu istenen formatta spool'a yaz.
+
+    Returns:
+        Başa sarılmış SpooledTemporaryFile — çağıran kapatır
+        (iter_spooled / read_spooled kapatır).
+
+    Raises:
+        RuntimeError: Parquet istendi ve pyarrow kurulu değil.
+    """
+    spool = open_spool()
+    try:
+        _WRITERS[ExportFormat(fmt)](table, spool)
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    return spool
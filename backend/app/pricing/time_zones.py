@@ -11,8 +11,17 @@ Requirements: 6.1, 6.2, 6.3, 6.4
 
 from __future__ import annotations
 
+from typing import Optional
+
 from .models import TimeZone, TimeZoneBreakdown
 from .excel_parser import ParsedMarketRecord, ParsedConsumptionRecord
+from .period_frame import (
+    PeriodFrame,
+    ZONE_ORDER,
+    build_period_frame,
+    check_zone_codes,
+    seq_sum,
+)
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -54,6 +63,7 @@ def calculate_time_zone_breakdown(
     market_records: list[ParsedMarketRecord],
     consumption_records: list[ParsedConsumptionRecord],
     yekdem_tl_per_mwh: float = 0.0,
+    frame: Optional[PeriodFrame] = None,
 ) -> dict[str, TimeZoneBreakdown]:
     """T1/T2/T3 zaman dilimi dağılımı hesapla.
 
@@ -64,34 +74,32 @@ def calculate_time_zone_breakdown(
         market_records: Saatlik piyasa verileri.
         consumption_records: Saatlik tüketim verileri.
         yekdem_tl_per_mwh: YEKDEM bedeli (TL/MWh), maliyet hesabına dahil edilir.
+        frame: Önceden kurulmuş sütunsal çerçeve (opsiyonel).
 
     Returns:
         T1/T2/T3 anahtarlı TimeZoneBreakdown sözlüğü.
     """
-    # Piyasa verilerini (date, hour) → record olarak indeksle
-    market_index: dict[tuple[str, int], ParsedMarketRecord] = {}
-    for mr in market_records:
-        market_index[(mr.date, mr.hour)] = mr
-
-    # Her dilim için akümülatörler
-    zone_consumption: dict[TimeZone, float] = {tz: 0.0 for tz in TimeZone}
-    zone_ptf_weighted_sum: dict[TimeZone, float] = {tz: 0.0 for tz in TimeZone}
-    zone_smf_weighted_sum: dict[TimeZone, float] = {tz: 0.0 for tz in TimeZone}
-    zone_cost: dict[TimeZone, float] = {tz: 0.0 for tz in TimeZone}
-
-    for cr in consumption_records:
-        mr = market_index.get((cr.date, cr.hour))
-        if mr is None:
-            continue  # Eşleşmeyen tüketim kaydı — atla
-
-        tz = classify_hour(cr.hour)
-        kwh = cr.consumption_kwh
-
-        zone_consumption[tz] += kwh
-        zone_ptf_weighted_sum[tz] += kwh * mr.ptf_tl_per_mwh
-        zone_smf_weighted_sum[tz] += kwh * mr.smf_tl_per_mwh
-        # Maliyet: kWh × (PTF + YEKDEM) / 1000
-        zone_cost[tz] += kwh * (mr.ptf_tl_per_mwh + yekdem_tl_per_mwh) / 1000.0
+    if frame is None:
+        frame = build_period_frame(market_records, consumption_records)
+    check_zone_codes(frame)
+
+    kwh = frame.kwh
+    ptf_weighted = kwh * frame.ptf
+    smf_weighted = kwh * frame.smf
+    # Maliyet: kWh × (PTF + YEKDEM) / 1000
+    cost = kwh * (frame.ptf + yekdem_tl_per_mwh) / 1000.0
+
+    # Her dilim için akümülatörler (dilim maskesi sırayı korur)
+    zone_consumption: dict[TimeZone, float] = {}
+    zone_ptf_weighted_sum: dict[TimeZone, float] = {}
+    zone_smf_weighted_sum: dict[TimeZone, float] = {}
+    zone_cost: dict[TimeZone, float] = {}
+    for code, tz in enumerate(ZONE_ORDER):
+        mask = frame.zone == code
+        zone_consumption[tz] = seq_sum(kwh[mask])
+        zone_ptf_weighted_sum[tz] = seq_sum(ptf_weighted[mask])
+        zone_smf_weighted_sum[tz] = seq_sum(smf_weighted[mask])
+        zone_cost[tz] = seq_sum(cost[mask])
 
     # Toplam tüketim
     total_consumption = sum(zone_consumption.values())
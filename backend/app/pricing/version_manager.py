@@ -1,7 +1,7 @@
 """
 Pricing Risk Engine — Veri Versiyonlama Yöneticisi.
 
-Piyasa ve tüketim verisi yükleme geçmişini yönetir.
+Piyasa, tüketim ve YEKDEM verisi yükleme geçmişini yönetir.
 Arşivlenmiş versiyonlar görüntülenebilir ama hesaplamada kullanılmaz.
 
 Requirements: 20.1, 20.2, 20.3, 20.4
@@ -14,6 +14,7 @@ from typing import Optional
 
 from sqlalchemy.orm import Session
 
+from .bulk_writer import archive_data_versions
 from .schemas import DataVersion
 
 logger = logging.getLogger(__name__)
@@ -33,9 +34,9 @@ def archive_and_create_version(
 
     Args:
         db: SQLAlchemy session.
-        data_type: Veri tipi (market_data, consumption).
+        data_type: Veri tipi (market_data, consumption, yekdem).
         period: Dönem (YYYY-MM).
-        customer_id: Müşteri kimliği (market_data için None).
+        customer_id: Müşteri kimliği (market_data ve yekdem için None).
         row_count: Satır sayısı.
         quality_score: Kalite skoru (0–100).
         filename: Yüklenen dosya adı.
@@ -45,18 +46,7 @@ def archive_and_create_version(
         Oluşturulan DataVersion kaydı.
     """
     # Mevcut aktif versiyonları arşivle
-    existing_active = (
-        db.query(DataVersion)
-        .filter(
-            DataVersion.data_type == data_type,
-            DataVersion.period == period,
-            DataVersion.customer_id == customer_id,
-            DataVersion.is_active == 1,
-        )
-        .all()
-    )
-    for dv in existing_active:
-        dv.is_active = 0
+    archive_data_versions(db, data_type, period, customer_id)
 
     # Yeni versiyon numarası
     max_version_row = (
@@ -0,0 +1,282 @@
+"""
+Pricing Risk Engine — Akışlı XLSX Okuyucu.
+
+openpyxl `load_workbook(read_only=True)` her hücre için ReadOnlyCell/dict
+nesnesi üretir; yıllık uzlaştırma ve 15 dakikalık tüketim dosyalarında bu
+hem yavaş hem bellek yoğundur. Bu modül sheet XML'ini doğrudan yüklenen
+byte'lardan `xml.etree.ElementTree.iterparse` ile okur ve satırları
+openpyxl `iter_rows(values_only=True)` ile AYNI değerlerle üretir:
+
+- Paylaşılan metinler (t="s"), satır içi metin (t="inlineStr"), formül
+  metni (t="str"), boolean (t="b"), hata (t="e"), ISO tarih (t="d")
+- Sayılar: "." / "E" içeriyorsa float, değilse int (openpyxl ile aynı)
+- Tarih biçimli hücreler: stil → numFmt → `from_excel` (1904 epoch dahil);
+  süre biçimleri de openpyxl read-only gibi datetime'a çevrilir
+- Satır dizilimi: sütun A'dan başlar; atlanan satırlar boş tuple olarak
+  üretilir → satır numaraları (uyarı/red mesajları) değişmez
+
+Yalnız data_only (önbelleklenmiş formül değeri) okunur. Strict OOXML
+namespace'i desteklenmez.
+"""
+
+from __future__ import annotations
+
+import io
+import posixpath
+import zipfile
+from typing import IO, Iterator, Optional
+from xml.etree.ElementTree import iterparse
+
+from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format
+from openpyxl.utils.datetime import (
+    CALENDAR_MAC_1904,
+    CALENDAR_WINDOWS_1900,
+    from_ISO8601,
+    from_excel,
+)
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Sabitler
+# ═══════════════════════════════════════════════════════════════════════════════
+
+_NS_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_NS_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_NS_PKG_REL = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+_TAG_SHEET_DATA = f"{{{_NS_MAIN}}}sheetData"
+_TAG_ROW = f"{{{_NS_MAIN}}}row"
+_TAG_C = f"{{{_NS_MAIN}}}c"
+_TAG_V = f"{{{_NS_MAIN}}}v"
+_TAG_T = f"{{{_NS_MAIN}}}t"
+_TAG_R = f"{{{_NS_MAIN}}}r"
+_TAG_IS = f"{{{_NS_MAIN}}}is"
+_TAG_SI = f"{{{_NS_MAIN}}}si"
+_TAG_SHEET = f"{{{_NS_MAIN}}}sheet"
+_TAG_WORKBOOK_PR = f"{{{_NS_MAIN}}}workbookPr"
+_TAG_NUMFMT = f"{{{_NS_MAIN}}}numFmt"
+_TAG_CELLXFS = f"{{{_NS_MAIN}}}cellXfs"
+_TAG_XF = f"{{{_NS_MAIN}}}xf"
+_TAG_RELATIONSHIP = f"{{{_NS_PKG_REL}}}Relationship"
+_ATTR_RID = f"{{{_NS_REL}}}id"
+
+_WORKBOOK_PATH = "xl/workbook.xml"
+_WORKBOOK_RELS_PATH = "xl/_rels/workbook.xml.rels"
+_SHARED_STRINGS_PATH = "xl/sharedStrings.xml"
+_STYLES_PATH = "xl/styles.xml"
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Yardımcılar
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+def _column_index(ref: str) -> int:
+    """Hücre referansından 1-tabanlı sütun numarası ("AB12" → 28)."""
+    col = 0
+    for ch in ref:
+        if "A" <= ch <= "Z":
+            col = col * 26 + (ord(ch) - 64)
+        else:
+            break
+    return col
+
+
+def _cast_number(text: str) -> int | float:
+    """openpyxl ile aynı sayı dönüşümü."""
+    if "." in text or "E" in text or "e" in text:
+        return float(text)
+    return int(text)
+
+
+def _element_text(node) -> str:
+    """<si>/<is> düğümünün düz metni — fonetik (rPh) bloklar hariç."""
+    snippets: list[str] = []
+    plain = node.find(_TAG_T)
+    if plain is not None and plain.text is not None:
+        snippets.append(plain.text)
+    for run in node.iterfind(_TAG_R):
+        t = run.find(_TAG_T)
+        if t is not None and t.text is not None:
+            snippets.append(t.text)
+    return "".join(snippets)
+
+
+def _release(parent, row) -> None:
+    """İşlenen satırı boşalt ve ebeveyninden ayır."""
+    row.clear()
+    if parent is not None:
+        parent.remove(row)
+
+
+def _read_shared_strings(src: IO[bytes]) -> list[str]:
+    strings: list[str] = []
+    for _event, node in iterparse(src):
+        if node.tag == _TAG_SI:
+            strings.append(_element_text(node).replace("x005F_", ""))
+            node.clear()
+    return strings
+
+
+def _read_date_styles(src: IO[bytes]) -> frozenset[int]:
+    """Tarih biçimli cellXfs indeksleri."""
+    custom: dict[int, str] = {}
+    date_styles: set[int] = set()
+    in_cell_xfs = False
+    xf_index = 0
+
+    for event, node in iterparse(src, events=("start", "end")):
+        tag = node.tag
+        if event == "start":
+            if tag == _TAG_CELLXFS:
+                in_cell_xfs = True
+            continue
+        if tag == _TAG_NUMFMT:
+            custom[int(node.get("numFmtId"))] = node.get("formatCode", "")
+        elif tag == _TAG_CELLXFS:
+            in_cell_xfs = False
+        elif tag == _TAG_XF and in_cell_xfs:
+            fmt_id = int(node.get("numFmtId", 0))
+            fmt = custom.get(fmt_id, BUILTIN_FORMATS.get(fmt_id))
+            if fmt is not None and is_date_format(fmt):
+                date_styles.add(xf_index)
+            xf_index += 1
+
+    return frozenset(date_styles)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Akışlı Çalışma Kitabı
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+class StreamingWorkbook:
+    """XLSX byte'larından satır akışı — openpyxl read-only yerine.
+
+    Açılışta yalnızca workbook/rels/sharedStrings/styles okunur; sheet XML'i
+    iter_rows() çağrısında parça parça açılır ve işlenen satırlar bırakılır.
+    """
+
+    def __init__(self, file_bytes: bytes) -> None:
+        self._zip = zipfile.ZipFile(io.BytesIO(file_bytes))
+        names = set(self._zip.namelist())
+
+        self._epoch = CALENDAR_WINDOWS_1900
+        sheets: list[tuple[str, str]] = []
+        with self._zip.open(_WORKBOOK_PATH) as src:
+            for _event, node in iterparse(src):
+                if node.tag == _TAG_SHEET:
+                    sheets.append((node.get("name", ""), node.get(_ATTR_RID, "")))
+                elif node.tag == _TAG_WORKBOOK_PR:
+                    if node.get("date1904", "").lower() in ("1", "true"):
+                        self._epoch = CALENDAR_MAC_1904
+
+        targets: dict[str, str] = {}
+        with self._zip.open(_WORKBOOK_RELS_PATH) as src:
+            for _event, node in iterparse(src):
+                if node.tag == _TAG_RELATIONSHIP:
+                    target = node.get("Target", "")
+                    if target.startswith("/"):
+                        target = target.lstrip("/")
+                    else:
+                        target = posixpath.normpath(posixpath.join("xl", target))
+                    targets[node.get("Id", "")] = target
+
+        self._sheet_paths: dict[str, str] = {
+            name: targets[rid] for name, rid in sheets if rid in targets
+        }
+        self.sheetnames: list[str] = [name for name, _rid in sheets]
+
+        self._shared_strings: list[str] = []
+        if _SHARED_STRINGS_PATH in names:
+            with self._zip.open(_SHARED_STRINGS_PATH) as src:
+                self._shared_strings = _read_shared_strings(src)
+
+        self._date_styles: frozenset[int] = frozenset()
+        if _STYLES_PATH in names:
+            with self._zip.open(_STYLES_PATH) as src:
+                self._date_styles = _read_date_styles(src)
+
+    def close(self) -> None:
+        self._zip.close()
+
+    def iter_rows(
+        self,
+        sheet_name: str,
+        min_row: int = 1,
+        max_row: Optional[int] = None,
+    ) -> Iterator[tuple]:
+        """Sheet satırlarını değer tuple'ları olarak üret (1-tabanlı aralık).
+
+        Aradaki boş satırlar () olarak üretilir; her tuple sütun A'dan
+        satırdaki son hücreye kadar uzanır (boş hücreler None).
+        """
+        shared = self._shared_strings
+        date_styles = self._date_styles
+        epoch = self._epoch
+
+        next_row = min_row
+        row_counter = 0
+        # İşlenen <row> düğümleri sheetData'dan ayrılır; yalnız clear() boş
+        # düğümü ağaçta bırakır → bellek satır sayısıyla doğrusal büyür
+        sheet_data = None
+        with self._zip.open(self._sheet_paths[sheet_name]) as src:
+            for event, row in iterparse(src, events=("start", "end")):
+                if event == "start":
+                    if row.tag == _TAG_SHEET_DATA:
+                        sheet_data = row
+                    continue
+                if row.tag != _TAG_ROW:
+                    continue
+
+                r_attr = row.get("r")
+                row_counter = int(float(r_attr)) if r_attr else row_counter + 1
+                if max_row is not None and row_counter > max_row:
+                    break
+                if row_counter < next_row:
+                    _release(sheet_data, row)
+                    continue
+                while next_row < row_counter:
+                    next_row += 1
+                    yield ()
+
+                values: list = []
+                col_counter = 0
+                for cell in row:
+                    if cell.tag != _TAG_C:
+                        continue
+                    ref = cell.get("r")
+                    col_counter = _column_index(ref) if ref else col_counter + 1
+                    data_type = cell.get("t", "n")
+
+                    value = None
+                    if data_type == "inlineStr":
+                        inline = cell.find(_TAG_IS)
+                        if inline is not None:
+                            value = _element_text(inline)
+                    else:
+                        text = cell.findtext(_TAG_V) or None
+                        if text is not None:
+                            if data_type == "n":
+                                value = _cast_number(text)
+                                style_id = int(cell.get("s", 0))
+                                if style_id in date_styles:
+                                    try:
+                                        value = from_excel(value, epoch)
+                                    except (OverflowError, ValueError):
+                                        value = "#VALUE!"
+                            elif data_type == "s":
+                                value = shared[int(text)]
+                            elif data_type == "b":
+                                value = bool(int(text))
+                            elif data_type == "d":
+                                value = from_ISO8601(text)
+                            else:  # "str", "e"
+                                value = text
+
+                    if col_counter > len(values):
+                        values.extend([None] * (col_counter - len(values)))
+                    values[col_counter - 1] = value
+
+                _release(sheet_data, row)
+                next_row = row_counter + 1
+                yield tuple(values)
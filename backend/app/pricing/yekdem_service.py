@@ -17,6 +17,7 @@ from typing import Optional
 from sqlalchemy.orm import Session
 
 from .schemas import MonthlyYekdemPrice
+from .version_manager import archive_and_create_version
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -78,18 +79,19 @@ def create_or_update_yekdem(
         existing.yekdem_tl_per_mwh = yekdem_tl_per_mwh
         existing.source = source
         existing.updated_at = datetime.utcnow()
-        db.commit()
-        db.refresh(existing)
-        return existing
-
-    # Yeni kayıt oluştur
-    record = MonthlyYekdemPrice(
-        period=period,
-        yekdem_tl_per_mwh=yekdem_tl_per_mwh,
-        source=source,
-    )
-    db.add(record)
-    db.commit()
+        record = existing
+    else:
+        # Yeni kayıt oluştur
+        record = MonthlyYekdemPrice(
+            period=period,
+            yekdem_tl_per_mwh=yekdem_tl_per_mwh,
+            source=source,
+        )
+        db.add(record)
+
+    # Versiyon kaydı — analiz cache key'i aktif YEKDEM versiyonunu içerir;
+    # kayıt ile aynı commit'te yazılır
+    archive_and_create_version(db, "yekdem", period, None, row_count=1)
     db.refresh(record)
     return record
 
@@ -114,6 +116,29 @@ def get_yekdem(
     )
 
 
+def get_yekdem_values(
+    db: Session,
+    periods: list[str],
+) -> dict[str, float]:
+    """Birden çok dönemin YEKDEM bedelini tek sorguda getir.
+
+    Args:
+        db: SQLAlchemy oturumu.
+        periods: Dönemler (YYYY-MM).
+
+    Returns:
+        Dönem → YEKDEM (TL/MWh); kaydı olmayan dönem sözlükte yer almaz.
+    """
+    if not periods:
+        return {}
+    rows = (
+        db.query(MonthlyYekdemPrice.period, MonthlyYekdemPrice.yekdem_tl_per_mwh)
+        .filter(MonthlyYekdemPrice.period.in_(periods))
+        .all()
+    )
+    return {period: value for period, value in rows}
+
+
 def list_yekdem(
     db: Session,
     limit: int = 24,
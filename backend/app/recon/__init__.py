@@ -10,6 +10,7 @@ Modüller:
 - splitter: Aylık bölme (monthly split, DST-aware)
 - classifier: T1/T2/T3 sınıflandırma (classify_hour wrapper)
 - reconciler: Fatura mutabakat doğrulaması
+- market_snapshot: Dönem başına bir kez yüklenen PTF/YEKDEM girdileri
 - cost_engine: PTF/YEKDEM maliyet hesaplama
 - comparator: Fatura vs Gelka teklifi karşılaştırma
 - report_builder: Rapor birleştirme ve formatlama
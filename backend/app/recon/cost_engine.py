@@ -16,7 +16,7 @@ from typing import Optional
 
 from sqlalchemy.orm import Session
 
-from ..pricing.schemas import HourlyMarketPrice, MonthlyYekdemPrice
+from .market_snapshot import ReconMarketSnapshot, load_market_snapshot
 from .schemas import HourlyRecord, PtfCostResult, YekdemCostResult
 
 
@@ -24,6 +24,7 @@ def calculate_ptf_cost(
     records: list[HourlyRecord],
     period: str,
     db: Session,
+    snapshot: Optional[ReconMarketSnapshot] = None,
 ) -> PtfCostResult:
     """Saatlik PTF ile maliyet hesapla.
 
@@ -34,6 +35,8 @@ def calculate_ptf_cost(
         records: Dönemin saatlik tüketim kayıtları
         period: "YYYY-MM" formatında dönem
         db: SQLAlchemy session
+        snapshot: Dönem piyasa snapshot'ı (pipeline bir kez yükler);
+            verilmezse db'den yüklenir
 
     Returns:
         PtfCostResult with cost totals and missing hour stats
@@ -51,19 +54,10 @@ def calculate_ptf_cost(
 
     # Load PTF data from canonical source: hourly_market_prices
     # YASAK: market_reference_prices kullanılmaz (SoT steering)
-    ptf_rows = (
-        db.query(HourlyMarketPrice)
-        .filter(
-            HourlyMarketPrice.period == period,
-            HourlyMarketPrice.is_active == 1,
-        )
-        .all()
-    )
-
-    # Build (date, hour) → ptf_tl_per_mwh index
-    ptf_index: dict[tuple[str, int], Decimal] = {}
-    for row in ptf_rows:
-        ptf_index[(row.date, row.hour)] = Decimal(str(row.ptf_tl_per_mwh))
+    # (date, hour) → Decimal(ptf_tl_per_mwh) indeksi snapshot'tan
+    if snapshot is None:
+        snapshot = load_market_snapshot(db, period)
+    ptf_index = snapshot.ptf_index
 
     # Calculate hourly costs
     total_cost = Decimal("0")
@@ -115,6 +109,7 @@ def get_yekdem_cost(
     period: str,
     total_kwh: Decimal,
     db: Session,
+    snapshot: Optional[ReconMarketSnapshot] = None,
 ) -> YekdemCostResult:
     """YEKDEM bedelini hesapla.
 
@@ -125,25 +120,23 @@ def get_yekdem_cost(
         period: "YYYY-MM" formatında dönem
         total_kwh: Dönem toplam tüketimi (Decimal)
         db: SQLAlchemy session
+        snapshot: Dönem piyasa snapshot'ı; verilmezse db'den yüklenir
 
     Returns:
         YekdemCostResult
     """
     # Load YEKDEM from canonical source: monthly_yekdem_prices
-    yekdem_row = (
-        db.query(MonthlyYekdemPrice)
-        .filter(MonthlyYekdemPrice.period == period)
-        .first()
-    )
+    if snapshot is None:
+        snapshot = load_market_snapshot(db, period)
+    yekdem_rate = snapshot.yekdem_tl_per_mwh
 
-    if yekdem_row is None:
+    if yekdem_rate is None:
         return YekdemCostResult(
             yekdem_tl_per_mwh=0.0,
             total_yekdem_cost_tl=0.0,
             available=False,
         )
 
-    yekdem_rate = Decimal(str(yekdem_row.yekdem_tl_per_mwh))
     # IC-1: Decimal arithmetic
     yekdem_cost = total_kwh * (yekdem_rate / Decimal("1000"))
 
@@ -32,7 +32,7 @@ from typing import Optional
 
 from sqlalchemy.orm import Session
 
-from ..pricing.schemas import HourlyMarketPrice, MonthlyYekdemPrice
+from .market_snapshot import ReconMarketSnapshot, load_market_snapshot
 from .schemas import HourlyRecord
 
 logger = logging.getLogger(__name__)
@@ -59,6 +59,7 @@ def compute_period_reference_cost(
     records: list[HourlyRecord],
     period: str,
     db: Session,
+    snapshot: Optional[ReconMarketSnapshot] = None,
 ) -> ReferenceEnergyCostResult:
     """Compute always-on reference energy cost for a period.
 
@@ -73,6 +74,8 @@ def compute_period_reference_cost(
         records: Parsed hourly records for this period (from splitter output).
         period: "YYYY-MM" period identifier.
         db: SQLAlchemy session for DB queries.
+        snapshot: Period market snapshot loaded once by the pipeline;
+            loaded from db when omitted.
 
     Returns:
         ReferenceEnergyCostResult with full Decimal cost or None.
@@ -97,29 +100,14 @@ def compute_period_reference_cost(
             computed_hours=0,
         )
 
-    # ── 1. Bulk-load PTF data (single query per period) ──────────────────────
-    ptf_rows = (
-        db.query(HourlyMarketPrice)
-        .filter(
-            HourlyMarketPrice.period == period,
-            HourlyMarketPrice.is_active == 1,
-        )
-        .all()
-    )
-
-    # Build (date, hour) → Decimal(ptf_tl_per_mwh) index
-    ptf_index: dict[tuple[str, int], Decimal] = {}
-    for row in ptf_rows:
-        ptf_index[(row.date, row.hour)] = Decimal(str(row.ptf_tl_per_mwh))
-
-    # ── 2. Load YEKDEM (single query per period) ─────────────────────────────
-    yekdem_row = (
-        db.query(MonthlyYekdemPrice)
-        .filter(MonthlyYekdemPrice.period == period)
-        .first()
-    )
+    # ── 1–2. PTF index + YEKDEM from the shared period snapshot ─────────────
+    # (date, hour) → Decimal(ptf_tl_per_mwh); loaded once per period
+    if snapshot is None:
+        snapshot = load_market_snapshot(db, period)
+    ptf_index = snapshot.ptf_index
+    yekdem_rate = snapshot.yekdem_tl_per_mwh
 
-    yekdem_missing = yekdem_row is None
+    yekdem_missing = yekdem_rate is None
 
     # ── 3. Match records to PTF — fail-closed on first gap ───────────────────
     ptf_hours_missing = 0
@@ -177,7 +165,6 @@ def compute_period_reference_cost(
         )
 
     # ── 5. Compute YEKDEM component ─────────────────────────────────────────
-    yekdem_rate = Decimal(str(yekdem_row.yekdem_tl_per_mwh))
     yekdem_component = total_kwh * yekdem_rate / Decimal("1000")
 
     # ── 6. Final reference cost (NO rounding — caller rounds) ────────────────
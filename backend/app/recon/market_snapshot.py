@@ -0,0 +1,110 @@
+"""
+Invoice Reconciliation Engine — Dönem Piyasa Anlık Görüntüsü (Market Snapshot).
+
+Recon pipeline'ında aynı dönem için v2 referans maliyeti, v1 PTF maliyeti ve
+YEKDEM bedeli ayrı ayrı hourly_market_prices / monthly_yekdem_prices okuyup
+her biri kendi (date, hour) → Decimal indeksini kuruyordu. Snapshot dönem
+başına BİR KEZ yüklenir ve tüm maliyet motorlarına verilir.
+
+- PTF: market_store segmentinden; Decimal indeks (version, stamp) anahtarıyla
+  işlem içi önbellekte tutulur → veri değişmedikçe yeniden kurulmaz
+- YEKDEM: çok dönem tek IN sorgusu (versiyonsuz tablo → önbelleğe alınmaz)
+- Çok aylık dosya: load_market_snapshots parmak izlerini tek GROUP BY ile okur
+
+SoT: hourly_market_prices (PTF), monthly_yekdem_prices (YEKDEM).
+YASAK: market_reference_prices kullanılmaz.
+"""
+
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from decimal import Decimal
+from types import MappingProxyType
+from typing import Mapping, Optional
+
+from sqlalchemy.orm import Session
+
+from ..pricing.market_store import MarketSegment, get_market_segments
+from ..pricing.schemas import MonthlyYekdemPrice
+
+
+@dataclass(frozen=True)
+class ReconMarketSnapshot:
+    """Bir dönemin recon maliyet girdileri (salt-okunur).
+
+    ptf_index: (date, hour) → Decimal(ptf_tl_per_mwh); aktif veri yoksa boş.
+    yekdem_tl_per_mwh: Decimal veya None (monthly_yekdem_prices satırı yok).
+    """
+    period: str
+    version: int
+    stamp: str
+    ptf_index: Mapping[tuple[str, int], Decimal]
+    yekdem_tl_per_mwh: Optional[Decimal]
+
+
+# İşlem içi önbellek: period → (version, stamp, Decimal PTF indeksi)
+_ptf_indexes: dict[str, tuple[int, str, Mapping[tuple[str, int], Decimal]]] = {}
+_lock = threading.Lock()
+
+_EMPTY_INDEX: Mapping[tuple[str, int], Decimal] = MappingProxyType({})
+
+
+def _decimal_ptf_index(segment: MarketSegment) -> Mapping[tuple[str, int], Decimal]:
+    if len(segment) == 0:
+        return _EMPTY_INDEX
+    cached = _ptf_indexes.get(segment.period)
+    if cached is not None and cached[:2] == (segment.version, segment.stamp):
+        return cached[2]
+    index = MappingProxyType({
+        key: Decimal(str(ptf)) for key, ptf in segment.ptf_index().items()
+    })
+    with _lock:
+        _ptf_indexes[segment.period] = (segment.version, segment.stamp, index)
+    return index
+
+
+def clear_market_snapshots() -> None:
+    """İşlem içi PTF indeks önbelleğini temizle."""
+    with _lock:
+        _ptf_indexes.clear()
+
+
+def load_market_snapshots(db: Session, periods: list[str]) -> dict[str, ReconMarketSnapshot]:
+    """Dönemlerin snapshot'ları — parmak izi ve YEKDEM birer sorguda.
+
+    Args:
+        db: SQLAlchemy session
+        periods: "YYYY-MM" dönemleri
+
+    Returns:
+        period → ReconMarketSnapshot (her dönem için, veri yoksa boş indeks)
+    """
+    periods = list(dict.fromkeys(periods))
+    if not periods:
+        return {}
+
+    segments = get_market_segments(db, periods)
+    yekdem = {
+        period: Decimal(str(rate))
+        for period, rate in (
+            db.query(MonthlyYekdemPrice.period, MonthlyYekdemPrice.yekdem_tl_per_mwh)
+            .filter(MonthlyYekdemPrice.period.in_(periods))
+            .all()
+        )
+    }
+    return {
+        period: ReconMarketSnapshot(
+            period=period,
+            version=segments[period].version,
+            stamp=segments[period].stamp,
+            ptf_index=_decimal_ptf_index(segments[period]),
+            yekdem_tl_per_mwh=yekdem.get(period),
+        )
+        for period in periods
+    }
+
+
+def load_market_snapshot(db: Session, period: str) -> ReconMarketSnapshot:
+    """Tek dönem snapshot'ı (load_market_snapshots kısayolu)."""
+    return load_market_snapshots(db, [period])[period]
@@ -45,6 +45,7 @@ from .comparator import compare_costs
 from .comparator_v2 import compute_markup
 from .cost_engine import calculate_ptf_cost, check_quote_eligibility, get_yekdem_cost
 from .cost_engine_v2 import compute_period_reference_cost
+from .market_snapshot import load_market_snapshots
 from .parser import (
     EmptyFileError,
     FileTooLargeError,
@@ -212,6 +213,9 @@ def _run_pipeline(
         inv.period: inv for inv in request.invoices
     }
 
+    # Piyasa verisi: tüm dönemler için bir kez (PTF indeksi + YEKDEM)
+    snapshots = load_market_snapshots(db, list(period_groups))
+
     # Process each period
     period_results: list[PeriodResult] = []
     all_warnings = list(parse_result.warnings)
@@ -243,7 +247,8 @@ def _run_pipeline(
 
         # ── v2: Always-on reference energy cost ─────────────────────────────
         # Fail-closed: any missing PTF hour or YEKDEM → reference_energy_cost_tl=None
-        ref_result = compute_period_reference_cost(records, period, db)
+        snapshot = snapshots[period]
+        ref_result = compute_period_reference_cost(records, period, db, snapshot)
 
         # ── v2: Markup computation (conditional) ─────────────────────────────
         # Three-way AND: ref_cost present, invoice present, declared_total_tl present
@@ -281,10 +286,10 @@ def _run_pipeline(
         )
 
         # PTF cost
-        ptf_result = calculate_ptf_cost(records, period, db)
+        ptf_result = calculate_ptf_cost(records, period, db, snapshot)
 
         # YEKDEM cost
-        yekdem_result = get_yekdem_cost(period, tz_summary.total_kwh, db)
+        yekdem_result = get_yekdem_cost(period, tz_summary.total_kwh, db, snapshot)
 
         # Quote eligibility (fail-closed) — v1 logic
         quote_blocked, quote_block_reason = check_quote_eligibility(ptf_result, yekdem_result)
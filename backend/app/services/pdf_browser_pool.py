@@ -0,0 +1,455 @@
+"""
+PDF Browser Pool — warm, long-lived headless Chromium shared by the
+HTML → PDF call sites of long-lived processes (API). The RQ render worker
+forks a work-horse per job, so it keeps its one-shot child
+(pdf_render_worker.render_html_to_pdf).
+
+Launching Chromium costs far more than rendering a typical offer report, so
+instead of ``sync_playwright() → launch() → close()`` per document:
+
+    - Each slot is a *render process* (multiprocessing "spawn") that owns one
+      Playwright driver + browser and serves render requests over a Pipe.
+      Playwright's sync API is bound to the thread that started it, and a
+      stuck browser must be killable without touching the caller — a
+      process boundary gives both.
+    - Every render gets a fresh browser context + page which is closed
+      afterwards (page recycling); cookies / storage never leak between
+      documents.
+    - A browser is retired after PDF_BROWSER_MAX_RENDERS documents to bound
+      Chromium memory growth, and replaced lazily on the next acquire.
+    - A render that exceeds its deadline is hard-killed (terminate → kill)
+      and surfaces as RenderError(NAVIGATION_TIMEOUT); the slot relaunches.
+    - A daemon thread pings idle browsers every PDF_BROWSER_HEALTH_INTERVAL
+      seconds and replaces dead ones before a request lands on them.
+
+Slots launch lazily (first render), so importing this module or starting
+the API never spawns Chromium.
+
+Config (env):
+    PDF_BROWSER_POOL_ENABLED     true → pooled, false → per-call launch
+    PDF_BROWSER_POOL_SIZE        concurrent browsers (default 2)
+    PDF_BROWSER_MAX_RENDERS      documents per browser before recycle (50)
+    PDF_BROWSER_RENDER_TIMEOUT   hard per-render deadline, seconds (60)
+    PDF_BROWSER_LAUNCH_TIMEOUT   browser start deadline, seconds (30)
+    PDF_BROWSER_ACQUIRE_TIMEOUT  wait for a free slot, seconds (120)
+    PDF_BROWSER_HEALTH_INTERVAL  health-check period, seconds (60, 0 = off)
+"""
+from __future__ import annotations
+
+import atexit
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+from typing import Any, Callable, Optional
+
+from .pdf_job_store import PdfErrorCode
+from .pdf_render_worker import RenderError
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Config
+# ---------------------------------------------------------------------------
+
+PDF_BROWSER_POOL_ENABLED = os.environ.get("PDF_BROWSER_POOL_ENABLED", "true").lower() in ("1", "true", "yes")
+PDF_BROWSER_POOL_SIZE = int(os.environ.get("PDF_BROWSER_POOL_SIZE", "2"))
+PDF_BROWSER_MAX_RENDERS = int(os.environ.get("PDF_BROWSER_MAX_RENDERS", "50"))
+PDF_BROWSER_RENDER_TIMEOUT = float(os.environ.get("PDF_BROWSER_RENDER_TIMEOUT", "60"))
+PDF_BROWSER_LAUNCH_TIMEOUT = float(os.environ.get("PDF_BROWSER_LAUNCH_TIMEOUT", "30"))
+PDF_BROWSER_ACQUIRE_TIMEOUT = float(os.environ.get("PDF_BROWSER_ACQUIRE_TIMEOUT", "120"))
+PDF_BROWSER_HEALTH_INTERVAL = float(os.environ.get("PDF_BROWSER_HEALTH_INTERVAL", "60"))
+
+GRACEFUL_CANCEL_OFFSET = 5  # seconds: page-level timeout fires before the hard kill
+PING_TIMEOUT = 5  # seconds
+
+
+def classify_render_error(exc: BaseException) -> PdfErrorCode:
+    """Map a Playwright / launch exception onto the PDF error taxonomy."""
+    if isinstance(exc, ImportError):
+        return PdfErrorCode.UNSUPPORTED_PLATFORM
+    ename = type(exc).__name__
+    if "TimeoutError" in ename or "Timeout" in ename:
+        return PdfErrorCode.NAVIGATION_TIMEOUT
+    text = str(exc).lower()
+    if "browser" in text or "launch" in text or "executable" in text:
+        return PdfErrorCode.BROWSER_LAUNCH_FAILED
+    return PdfErrorCode.UNKNOWN
+
+
+# ---------------------------------------------------------------------------
+# Browser backend (lives inside the render process)
+# ---------------------------------------------------------------------------
+
+class ChromiumBackend:
+    """One Playwright driver + headless Chromium, one context/page per render."""
+
+    def __init__(self, viewport: Optional[dict] = None):
+        self.viewport = viewport or {"width": 1280, "height": 720}
+        self._playwright = None
+        self._browser = None
+
+    def start(self) -> None:
+        from playwright.sync_api import sync_playwright
+
+        self._playwright = sync_playwright().start()
+        self._browser = self._playwright.chromium.launch()
+
+    def render(self, html: str, nav_timeout_ms: int) -> bytes:
+        from .pdf_playwright import render_page_pdf
+
+        context = self._browser.new_context(viewport=self.viewport)
+        try:
+            page = context.new_page()
+            return render_page_pdf(page, html, nav_timeout_ms)
+        finally:
+            context.close()
+
+    def healthy(self) -> bool:
+        return self._browser is not None and self._browser.is_connected()
+
+    def stop(self) -> None:
+        try:
+            if self._browser is not None:
+                self._browser.close()
+        finally:
+            if self._playwright is not None:
+                self._playwright.stop()
+
+
+def _render_process_main(conn: Any, backend_factory: Callable[[], Any]) -> None:
+    """
+    Render process loop.
+
+    Messages in:  ("render", html, nav_timeout_ms) | ("ping",) | ("close",)
+    Messages out: ("ready",) | ("ok", pdf_bytes) | ("pong", healthy)
+                  | ("error", PdfErrorCode, message)
+    """
+    backend = backend_factory()
+    try:
+        backend.start()
+    except Exception as e:
+        conn.send(("error", classify_render_error(e), str(e)))
+        return
+    conn.send(("ready",))
+
+    try:
+        while True:
+            try:
+                msg = conn.recv()
+            except EOFError:
+                break  # parent went away
+            if msg[0] == "render":
+                try:
+                    conn.send(("ok", backend.render(msg[1], msg[2])))
+                except Exception as e:
+                    conn.send(("error", classify_render_error(e), str(e)))
+            elif msg[0] == "ping":
+                try:
+                    conn.send(("pong", bool(backend.healthy())))
+                except Exception:
+                    conn.send(("pong", False))
+            else:  # "close"
+                break
+    finally:
+        try:
+            backend.stop()
+        except Exception:
+            pass
+
+
+class _RenderProcess:
+    """Parent-side handle of one render process."""
+
+    def __init__(self, backend_factory: Callable[[], Any], launch_timeout: float):
+        ctx = multiprocessing.get_context("spawn")
+        self.conn, child_conn = ctx.Pipe()
+        self.proc = ctx.Process(
+            target=_render_process_main,
+            args=(child_conn, backend_factory),
+            daemon=True,
+        )
+        self.proc.start()
+        child_conn.close()
+        self.renders = 0
+
+        reply = self._recv(launch_timeout)
+        if reply is None or reply[0] == "exit":
+            self.kill()
+            raise RenderError(PdfErrorCode.BROWSER_LAUNCH_FAILED, "Browser launch timed out or crashed")
+        if reply[0] == "error":
+            self.kill()
+            raise RenderError(reply[1], reply[2])
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self.proc.pid
+
+    def alive(self) -> bool:
+        return self.proc.is_alive()
+
+    def _recv(self, timeout: float) -> Optional[tuple]:
+        """Next reply; None on timeout, ("exit",) if the process died."""
+        try:
+            if self.conn.poll(timeout):
+                return self.conn.recv()
+        except (EOFError, OSError):
+            return ("exit",)
+        return None
+
+    def request(self, msg: tuple, timeout: float) -> Optional[tuple]:
+        try:
+            self.conn.send(msg)
+        except OSError:
+            return ("exit",)
+        return self._recv(timeout)
+
+    def close(self, timeout: float = 5) -> None:
+        try:
+            self.conn.send(("close",))
+        except (BrokenPipeError, OSError):
+            pass
+        self.proc.join(timeout=timeout)
+        self.kill()
+
+    def kill(self) -> None:
+        if self.proc.is_alive():
+            self.proc.terminate()
+            self.proc.join(timeout=5)
+            if self.proc.is_alive():
+                self.proc.kill()
+                self.proc.join(timeout=2)
+        try:
+            self.conn.close()
+        except OSError:
+            pass
+
+
+# ---------------------------------------------------------------------------
+# Pool
+# ---------------------------------------------------------------------------
+
+class BrowserPool:
+    """
+    Fixed number of slots; each slot holds an idle render process or None
+    (launched on demand). LIFO so the most recently used — warmest — browser
+    serves the next request.
+    """
+
+    def __init__(
+        self,
+        size: int = PDF_BROWSER_POOL_SIZE,
+        max_renders: int = PDF_BROWSER_MAX_RENDERS,
+        render_timeout: float = PDF_BROWSER_RENDER_TIMEOUT,
+        launch_timeout: float = PDF_BROWSER_LAUNCH_TIMEOUT,
+        acquire_timeout: float = PDF_BROWSER_ACQUIRE_TIMEOUT,
+        backend_factory: Callable[[], Any] = ChromiumBackend,
+    ):
+        self.size = max(1, size)
+        self.max_renders = max(1, max_renders)
+        self.render_timeout = render_timeout
+        self.launch_timeout = launch_timeout
+        self.acquire_timeout = acquire_timeout
+        self.backend_factory = backend_factory
+
+        self._slots: queue.LifoQueue = queue.LifoQueue()
+        for _ in range(self.size):
+            self._slots.put(None)
+        self._lock = threading.Lock()
+        self._closed = False
+        self._stats = {
+            "launches": 0, "renders": 0, "recycled": 0,
+            "timeouts": 0, "crashes": 0, "health_replaced": 0,
+        }
+        self._health_thread: Optional[threading.Thread] = None
+        self._health_stop = threading.Event()
+
+    # -- internals ----------------------------------------------------------
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+
+    def _launch(self) -> _RenderProcess:
+        proc = _RenderProcess(self.backend_factory, self.launch_timeout)
+        self._count("launches")
+        return proc
+
+    def _acquire(self) -> Optional[_RenderProcess]:
+        if self._closed:
+            raise RenderError(PdfErrorCode.QUEUE_UNAVAILABLE, "Browser pool is shut down")
+        try:
+            return self._slots.get(timeout=self.acquire_timeout)
+        except queue.Empty:
+            raise RenderError(
+                PdfErrorCode.QUEUE_UNAVAILABLE,
+                f"No browser available within {self.acquire_timeout:g}s",
+            )
+
+    def _release(self, proc: Optional[_RenderProcess]) -> None:
+        if self._closed and proc is not None:
+            proc.close()
+            proc = None
+        self._slots.put(proc)
+
+    # -- public -------------------------------------------------------------
+
+    def render(self, html: str, timeout: Optional[float] = None) -> bytes:
+        """
+        Render HTML → raw PDF bytes on a pooled browser.
+
+        Raises:
+            RenderError: launch failure, hard timeout (browser killed),
+                crashed render process, page error, or no free slot.
+        """
+        hard_timeout = self.render_timeout if timeout is None else timeout
+        nav_timeout_ms = int(max(hard_timeout - GRACEFUL_CANCEL_OFFSET, 5) * 1000)
+
+        proc = self._acquire()
+        try:
+            if proc is not None and (proc.renders >= self.max_renders or not proc.alive()):
+                if proc.renders >= self.max_renders:
+                    self._count("recycled")
+                proc.close()
+                proc = None
+            if proc is None:
+                proc = self._launch()
+
+            reply = proc.request(("render", html, nav_timeout_ms), hard_timeout)
+            if reply is None:
+                proc.kill()
+                proc = None
+                self._count("timeouts")
+                raise RenderError(PdfErrorCode.NAVIGATION_TIMEOUT, "Render timed out (hard kill)")
+            if reply[0] == "exit":
+                proc.kill()
+                proc = None
+                self._count("crashes")
+                raise RenderError(PdfErrorCode.UNKNOWN, "Render process exited without result")
+
+            proc.renders += 1
+            self._count("renders")
+            if reply[0] == "ok":
+                return reply[1]
+            raise RenderError(reply[1], reply[2])
+        finally:
+            self._release(proc)
+
+    def warm(self) -> int:
+        """Launch every empty slot now instead of on first render. Returns live count."""
+        held = [self._acquire() for _ in range(self.size)]
+        try:
+            for i, proc in enumerate(held):
+                if proc is None or not proc.alive():
+                    held[i] = self._launch()
+        finally:
+            for proc in held:
+                self._release(proc)
+        return sum(1 for p in held if p is not None)
+
+    def _claim_idle(self, proc: _RenderProcess) -> bool:
+        """Take *proc* out of the idle slots if no render grabbed it meanwhile."""
+        with self._slots.mutex:
+            try:
+                self._slots.queue.remove(proc)
+            except ValueError:
+                return False
+            return True
+
+    def health_check(self) -> int:
+        """
+        Ping idle browsers; replace unresponsive ones with an empty slot
+        (relaunched on next use). Busy slots are skipped. Slots are claimed
+        one at a time, so renders keep acquiring the other idle browsers
+        while a ping is in flight. Returns the number of browsers replaced.
+        """
+        with self._slots.mutex:
+            candidates = [p for p in self._slots.queue if p is not None]
+
+        replaced = 0
+        for proc in candidates:
+            if not self._claim_idle(proc):
+                continue
+            try:
+                reply = proc.request(("ping",), PING_TIMEOUT) if proc.alive() else None
+                if reply is None or reply[0] != "pong" or not reply[1]:
+                    logger.warning("PDF browser pid=%s unhealthy, replacing", proc.pid)
+                    proc.kill()
+                    proc = None
+                    replaced += 1
+            finally:
+                self._release(proc)
+        with self._lock:
+            self._stats["health_replaced"] += replaced
+        return replaced
+
+    def start_health_checks(self, interval_seconds: float = PDF_BROWSER_HEALTH_INTERVAL) -> bool:
+        """Start the health-check daemon thread. Idempotent; 0 → not started."""
+        if interval_seconds <= 0:
+            return False
+        if self._health_thread is not None and self._health_thread.is_alive():
+            return True
+
+        self._health_stop.clear()
+
+        def _loop() -> None:
+            while not self._health_stop.wait(interval_seconds):
+                try:
+                    self.health_check()
+                except Exception as e:
+                    logger.warning("PDF browser health check failed: %s", e)
+
+        self._health_thread = threading.Thread(
+            target=_loop, name="pdf-browser-health", daemon=True,
+        )
+        self._health_thread.start()
+        return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self._stats)
+        out.update(size=self.size, idle=self._slots.qsize())
+        return out
+
+    def shutdown(self) -> None:
+        """Close idle browsers; busy ones are closed when released."""
+        self._closed = True
+        self._health_stop.set()
+        while True:
+            try:
+                proc = self._slots.get_nowait()
+            except queue.Empty:
+                break
+            if proc is not None:
+                proc.close()
+
+
+# ---------------------------------------------------------------------------
+# Process-wide singleton
+# ---------------------------------------------------------------------------
+
+_pool: Optional[BrowserPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_browser_pool() -> BrowserPool:
+    """Shared pool (created on first use, health checks started)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BrowserPool()
+            _pool.start_health_checks()
+        return _pool
+
+
+def shutdown_browser_pool() -> None:
+    """Close the shared pool's browsers (app shutdown / atexit)."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown()
+
+
+atexit.register(shutdown_browser_pool)
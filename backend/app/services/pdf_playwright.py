@@ -12,10 +12,15 @@ CRITICAL RULES:
 - prefer_css_page_size = True (CSS @page controls size)
 - margin = 0 (CSS @page controls margins)
 - emulate_media("print") before PDF generation
+
+Browsers are long-lived and shared (pdf_browser_pool); set
+PDF_BROWSER_POOL_ENABLED=false to launch one per document.
 """
 import logging
 from typing import Optional
 
+from .pdf_browser_pool import PDF_BROWSER_POOL_ENABLED, get_browser_pool
+
 logger = logging.getLogger(__name__)
 
 _playwright_available: Optional[bool] = None
@@ -37,12 +42,13 @@ def is_playwright_available() -> bool:
 def html_to_pdf_bytes_sync_v2(html: str) -> bytes:
     """
     Convert HTML to PDF using headless Chromium (sync API).
+
+    Rendered on a warm browser from the shared pool (see pdf_browser_pool)
+    unless PDF_BROWSER_POOL_ENABLED=false.
     """
     if not is_playwright_available():
         raise RuntimeError("Playwright not available")
-    
-    from playwright.sync_api import sync_playwright
-    
+
     # Debug: dump rendered HTML to file for inspection
     try:
         from pathlib import Path
@@ -62,34 +68,53 @@ def html_to_pdf_bytes_sync_v2(html: str) -> bytes:
     except Exception as e:
         logger.warning(f"DEBUG dump failed: {e}")
     
+    if PDF_BROWSER_POOL_ENABLED:
+        pdf_bytes = get_browser_pool().render(html)
+    else:
+        pdf_bytes = render_with_fresh_browser(html)
+
+    # Post-process: sayfa numarası damgala
+    try:
+        from .pdf_page_numbering import stamp_page_numbers
+        pdf_bytes = stamp_page_numbers(pdf_bytes)
+    except Exception as e:
+        logger.warning(f"Page numbering failed, returning raw PDF: {e}")
+
+    return pdf_bytes
+
+
+def render_page_pdf(page, html: str, nav_timeout_ms: int = 30000) -> bytes:
+    """
+    Render HTML on an open page and return raw PDF bytes.
+
+    Shared by every Chromium render path (warm pool, per-call launch,
+    RQ child process) so the output is identical regardless of where the
+    browser lives.
+    """
+    page.set_content(html, wait_until="load", timeout=nav_timeout_ms)
+    page.emulate_media(media="print")
+
+    # Wait for all images to fully load/decode
+    page.wait_for_function(
+        "() => Array.from(document.images).every(img => img.complete && img.naturalWidth > 0)",
+        timeout=15000,
+    )
+    return page.pdf(
+        print_background=True,
+        prefer_css_page_size=True,
+        scale=1.0,
+    )
+
+
+def render_with_fresh_browser(html: str) -> bytes:
+    """Launch a browser for this document only (PDF_BROWSER_POOL_ENABLED=false)."""
+    from playwright.sync_api import sync_playwright
+
     with sync_playwright() as p:
         browser = p.chromium.launch()
         try:
             page = browser.new_page(viewport={"width": 1280, "height": 720})
-            page.set_content(html, wait_until="load")
-            page.emulate_media(media="print")
-            
-            # Wait for all images to fully load/decode
-            page.wait_for_function(
-                "() => Array.from(document.images).every(img => img.complete && img.naturalWidth > 0)",
-                timeout=15000,
-            )
-            logger.info("DEBUG: All images loaded and decoded")
-            
-            pdf_bytes = page.pdf(
-                print_background=True,
-                prefer_css_page_size=True,
-                scale=1.0,
-            )
-            
-            # Post-process: sayfa numarası damgala
-            try:
-                from .pdf_page_numbering import stamp_page_numbers
-                pdf_bytes = stamp_page_numbers(pdf_bytes)
-            except Exception as e:
-                logger.warning(f"Page numbering failed, returning raw PDF: {e}")
-            
-            return pdf_bytes
+            return render_page_pdf(page, html)
         finally:
             browser.close()
 
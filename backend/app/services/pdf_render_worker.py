@@ -59,39 +59,24 @@ def _render_in_child(html: str, nav_timeout_ms: int, result_queue: multiprocessi
     Runs Playwright synchronously, puts (pdf_bytes,) or (None, error_code, message)
     onto *result_queue*.
     """
+    from .pdf_browser_pool import classify_render_error
+
     try:
-        from playwright.sync_api import sync_playwright, TimeoutError as PwTimeout
+        from playwright.sync_api import sync_playwright
+        from .pdf_playwright import render_page_pdf
 
         with sync_playwright() as p:
             browser = p.chromium.launch()
             try:
                 page = browser.new_page(viewport={"width": 1280, "height": 720})
-                page.set_content(html, wait_until="load", timeout=nav_timeout_ms)
-                page.emulate_media(media="print")
-                # Wait for all images to fully load/decode
-                page.wait_for_function(
-                    "() => Array.from(document.images).every(img => img.complete && img.naturalWidth > 0)",
-                    timeout=15000,
-                )
-                pdf_bytes = page.pdf(
-                    print_background=True,
-                    prefer_css_page_size=True,
-                    scale=1.0,
-                )
-                result_queue.put(("ok", pdf_bytes))
+                result_queue.put(("ok", render_page_pdf(page, html, nav_timeout_ms)))
             finally:
                 browser.close()
 
     except ImportError:
         result_queue.put(("error", PdfErrorCode.UNSUPPORTED_PLATFORM, "Playwright not installed"))
     except Exception as e:
-        ename = type(e).__name__
-        if "TimeoutError" in ename or "Timeout" in ename:
-            result_queue.put(("error", PdfErrorCode.NAVIGATION_TIMEOUT, str(e)))
-        elif "browser" in str(e).lower() or "launch" in str(e).lower():
-            result_queue.put(("error", PdfErrorCode.BROWSER_LAUNCH_FAILED, str(e)))
-        else:
-            result_queue.put(("error", PdfErrorCode.UNKNOWN, str(e)))
+        result_queue.put(("error", classify_render_error(e), str(e)))
 
 
 def render_html_to_pdf(
@@ -101,6 +86,10 @@ def render_html_to_pdf(
     """
     Render HTML → PDF in an isolated child process with hard timeout.
 
+    Always a one-shot child: the RQ Worker forks a fresh work-horse per job,
+    so a pdf_browser_pool created here would be cold (and torn down) every
+    time. The warm pool is for long-lived processes (API, pdf_playwright).
+
     Raises:
         RenderError on any failure (with .error_code).
     """
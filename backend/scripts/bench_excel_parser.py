@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Excel Parser Benchmark — openpyxl ↔ iterparse motoru.
+
+1, 12 ve 36 aylık sentetik EPİAŞ uzlaştırma ve tüketim dosyaları üretir,
+her iki motorla ayrıştırır; süre ve tepe bellek (tracemalloc) raporlar.
+Çıktı eşitliği (kayıtlar + sonuç/kalite skoru) her dosyada doğrulanır.
+
+USAGE:
+  cd backend
+  python scripts/bench_excel_parser.py
+  python scripts/bench_excel_parser.py --months 1 12 --repeat 5 --interval 15
+
+  --interval 15 → tüketim dosyası 15 dakikalık satırlarla üretilir.
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openpyxl import Workbook  # noqa: E402
+
+from app.pricing.excel_parser import (  # noqa: E402
+    EXCEL_ENGINES,
+    parse_consumption_excel,
+    parse_epias_excel,
+)
+
+START = datetime(2023, 1, 1)
+
+
+def _month_end(start: datetime, months: int) -> datetime:
+    year = start.year + (start.month - 1 + months) // 12
+    month = (start.month - 1 + months) % 12 + 1
+    return start.replace(year=year, month=month)
+
+
+def make_epias_file(months: int) -> bytes:
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Uzlaştırma Dönemi Detayı")
+    ws.append(["Tarih", "Versiyon", "Bölge", "PTF (TL / MWh)", "SMF (TL / MWh)"])
+    end = _month_end(START, months)
+    dt = START
+    while dt < end:
+        ptf = 1500.0 + dt.hour * 10.5
+        ws.append([dt, START, "TR1", ptf, ptf + 60.25])
+        dt += timedelta(hours=1)
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+def make_consumption_file(months: int, interval_minutes: int) -> bytes:
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Tüketim")
+    ws.append(["Tarih", "Saat", "Tüketim (kWh)"])
+    end = _month_end(START, months)
+    dt = START
+    step = timedelta(minutes=interval_minutes)
+    while dt < end:
+        ws.append([dt.replace(hour=0, minute=0), dt.hour, 100.0 + dt.hour * 1.25])
+        dt += step
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+def _measure(fn, repeat: int) -> tuple[float, float, object]:
+    """(en iyi süre sn, tepe bellek MB, son çıktı)."""
+    best = float("inf")
+    out = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak / 1e6, out
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--months", type=int, nargs="+", default=[1, 12, 36])
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--interval", type=int, default=60, help="tüketim satır aralığı (dk)")
+    args = ap.parse_args()
+
+    print(f"{'dosya':<22}{'satır':>8}{'KB':>8}  " + "".join(
+        f"{e + ' sn':>14}{e + ' MB':>14}" for e in EXCEL_ENGINES
+    ) + f"{'hız':>8}")
+
+    ok = True
+    for months in args.months:
+        cases = [
+            ("epias", make_epias_file(months),
+             lambda data, e: parse_epias_excel(data, "bench.xlsx", engine=e)),
+            ("tuketim", make_consumption_file(months, args.interval),
+             lambda data, e: parse_consumption_excel(data, "bench.xlsx", "BENCH", engine=e)),
+        ]
+        for kind, data, parse in cases:
+            timings = {}
+            outputs = {}
+            for engine in EXCEL_ENGINES:
+                secs, peak_mb, out = _measure(lambda: parse(data, engine), args.repeat)
+                timings[engine] = (secs, peak_mb)
+                outputs[engine] = out
+
+            base, alt = (outputs[e] for e in EXCEL_ENGINES)
+            same = base.result == alt.result and base.records == alt.records
+            ok = ok and same
+            speedup = timings[EXCEL_ENGINES[0]][0] / timings[EXCEL_ENGINES[1]][0]
+            print(
+                f"{kind + f' {months} ay':<22}{len(base.records):>8}{len(data) // 1024:>8}  "
+                + "".join(f"{s:>14.3f}{m:>14.1f}" for s, m in timings.values())
+                + f"{speedup:>7.1f}x" + ("" if same else "  ÇIKTI FARKLI!")
+            )
+
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
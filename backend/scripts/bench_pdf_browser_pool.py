@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+PDF Browser Pool Benchmark — çağrı başına Chromium ↔ sıcak tarayıcı havuzu.
+
+Sentetik bir teklif raporu HTML'i (744 saatlik tablo) üretir ve:
+  - launch : her belge için sync_playwright → launch → close (eski yol)
+  - pool   : pdf_browser_pool.BrowserPool (ilk render başlatma dahil)
+  - pool×N : aynı havuzda --concurrency eşzamanlı istek
+sürelerini (ilk, p50, p95) ve belge/sn verimini raporlar.
+
+USAGE:
+  cd backend
+  python -m playwright install chromium   # bir kez
+  python scripts/bench_pdf_browser_pool.py
+  python scripts/bench_pdf_browser_pool.py --docs 40 --pool-size 4 --concurrency 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.pdf_browser_pool import BrowserPool  # noqa: E402
+from app.services.pdf_playwright import render_with_fresh_browser  # noqa: E402
+from app.services.pdf_render_worker import RenderError  # noqa: E402
+
+
+def make_report_html(hours: int = 744) -> str:
+    rows = "".join(
+        f"<tr><td>2025-01-{h // 24 + 1:02d}</td><td>{h % 24}</td>"
+        f"<td>{1900 + (h % 24) * 37.5:.2f}</td><td>{120 + h % 7 * 3.1:.2f}</td></tr>"
+        for h in range(hours)
+    )
+    return (
+        "<html><head><style>@page { size: A4; margin: 12mm } "
+        "table { border-collapse: collapse; font: 9px sans-serif } "
+        "td { border: 1px solid #ccc; padding: 1px 4px }</style></head><body>"
+        "<h1>Teklif Raporu</h1><table><tr><th>Tarih</th><th>Saat</th>"
+        f"<th>PTF</th><th>kWh</th></tr>{rows}</table></body></html>"
+    )
+
+
+def _timed(fn) -> float:
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+
+def _row(name: str, durations: list[float], wall: float) -> None:
+    ordered = sorted(durations)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    print(
+        f"{name:<12}{len(durations):>6}{durations[0]:>10.3f}"
+        f"{statistics.median(durations):>10.3f}{p95:>10.3f}{len(durations) / wall:>12.2f}"
+    )
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--docs", type=int, default=20)
+    ap.add_argument("--pool-size", type=int, default=2)
+    ap.add_argument("--concurrency", type=int, default=2)
+    ap.add_argument("--hours", type=int, default=744, help="rapor tablosu satır sayısı")
+    args = ap.parse_args()
+
+    html = make_report_html(args.hours)
+    pool = BrowserPool(size=args.pool_size, max_renders=max(args.docs, 1))
+    try:
+        try:
+            pool.render(html)  # Chromium kurulu mu?
+        except RenderError as e:
+            print(f"Chromium başlatılamadı: {e}")
+            return 1
+        pool.shutdown()
+
+        print(f"{'yol':<12}{'belge':>6}{'ilk sn':>10}{'p50 sn':>10}{'p95 sn':>10}{'belge/sn':>12}")
+
+        t0 = time.perf_counter()
+        launch = [_timed(lambda: render_with_fresh_browser(html)) for _ in range(args.docs)]
+        _row("launch", launch, time.perf_counter() - t0)
+
+        pool = BrowserPool(size=args.pool_size, max_renders=max(args.docs, 1))
+        t0 = time.perf_counter()
+        pooled = [_timed(lambda: pool.render(html)) for _ in range(args.docs)]
+        _row("pool", pooled, time.perf_counter() - t0)
+
+        with ThreadPoolExecutor(max_workers=args.concurrency) as ex:
+            t0 = time.perf_counter()
+            concurrent = list(ex.map(lambda _: _timed(lambda: pool.render(html)), range(args.docs)))
+            _row(f"pool×{args.concurrency}", concurrent, time.perf_counter() - t0)
+
+        print(f"\nhızlanma (p50): {statistics.median(launch) / statistics.median(pooled):.1f}x")
+        print(f"havuz: {pool.stats()}")
+    finally:
+        pool.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,253 @@
+"""
+Pricing Risk Engine — Çok Dönemli Backtest Testleri.
+
+- match_frame: slot eşleştirmesi build_period_frame ile birebir aynı
+- backtest_period: calculate_hourly_costs toplamlarıyla bit-for-bit aynı
+- /backtest: dönem başına marj + kümülatif K/Z, şablon kalemi, hatalı kalem,
+  süreç havuzu aynı sonucu verir
+"""
+
+import json
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from hypothesis import given, settings, strategies as st
+
+from app.pricing import market_store, portfolio
+from app.pricing.backtest import (
+    _period_arrays,
+    backtest_period,
+    consumption_slots,
+    match_frame,
+)
+from app.pricing.excel_parser import ParsedConsumptionRecord, ParsedMarketRecord
+from app.pricing.market_store import SEGMENT_DTYPE
+from app.pricing.models import ImbalanceParams
+from app.pricing.period_frame import build_period_frame
+from app.pricing.pricing_engine import calculate_hourly_costs
+
+PERIODS = ["2024-11", "2024-12", "2025-01"]
+
+
+def _market(period: str, days: int = 3, base: float = 2000.0) -> list[ParsedMarketRecord]:
+    return [
+        ParsedMarketRecord(
+            period=period, date=f"{period}-{d:02d}", hour=h,
+            ptf_tl_per_mwh=base + (1700.0 if 17 <= h <= 21 else 0.0) + d * 11 + h,
+            smf_tl_per_mwh=base + 90.0 + h * 3,
+        )
+        for d in range(1, days + 1) for h in range(24)
+    ]
+
+
+def _consumption(period: str, days: int = 3, scale: float = 100.0) -> list[ParsedConsumptionRecord]:
+    return [
+        ParsedConsumptionRecord(
+            date=f"{period}-{d:02d}", hour=h,
+            consumption_kwh=scale * (1.0 + (h % 6) * 0.25),
+        )
+        for d in range(1, days + 1) for h in range(24)
+    ]
+
+
+def _rows(records: list[ParsedMarketRecord]) -> np.ndarray:
+    rows = np.array(
+        [(r.date, r.hour, r.ptf_tl_per_mwh, r.smf_tl_per_mwh) for r in records],
+        dtype=SEGMENT_DTYPE,
+    )
+    return rows[np.argsort(rows[["date", "hour"]], kind="stable")]
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Çekirdek
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class TestMatchFrame:
+
+    @settings(max_examples=40, deadline=None)
+    @given(
+        market_slots=st.lists(st.integers(min_value=0, max_value=95), min_size=1, max_size=120),
+        consumption_slots_=st.lists(st.integers(min_value=-10, max_value=110), max_size=120),
+    )
+    def test_same_as_build_period_frame(self, market_slots, consumption_slots_):
+        def _date(slot):
+            return f"2025-01-{slot // 24 + 1:02d}"
+
+        market = [
+            ParsedMarketRecord(
+                period="2025-01", date=_date(s), hour=s % 24,
+                ptf_tl_per_mwh=1000.0 + i, smf_tl_per_mwh=2000.0 + i,
+            )
+            for i, s in enumerate(market_slots)
+        ]
+        consumption = [
+            ParsedConsumptionRecord(
+                date=_date(abs(s) % 96), hour=s % 24 if s >= 0 else 24,
+                consumption_kwh=float(i + 1),
+            )
+            for i, s in enumerate(consumption_slots_)
+        ]
+        expected = build_period_frame(market, consumption)
+        frame = match_frame(
+            _period_arrays("2025-01", _rows(market), 0.0), consumption_slots(consumption),
+        )
+        assert frame.dates == expected.dates
+        assert frame.hours.tolist() == expected.hours.tolist()
+        assert frame.ptf.tolist() == expected.ptf.tolist()
+        assert frame.smf.tolist() == expected.smf.tolist()
+        assert frame.kwh.tolist() == expected.kwh.tolist()
+        assert frame.zone.tolist() == expected.zone.tolist()
+
+
+class TestBacktestPeriod:
+
+    @settings(max_examples=30, deadline=None)
+    @given(
+        multiplier=st.floats(min_value=1.0, max_value=1.3),
+        dealer=st.floats(min_value=0, max_value=100),
+        smf_based=st.booleans(),
+    )
+    def test_matches_calculate_hourly_costs(self, multiplier, dealer, smf_based):
+        market, consumption = _market("2025-01"), _consumption("2025-01")
+        imbalance = ImbalanceParams(smf_based_imbalance_enabled=smf_based)
+        row = backtest_period(
+            _period_arrays("2025-01", _rows(market), 364.0), consumption_slots(consumption),
+            multiplier, imbalance, dealer,
+        )
+        hourly = calculate_hourly_costs(
+            market, consumption, 364.0, multiplier, imbalance, dealer_commission_pct=dealer,
+        )
+        loss = [e for e in hourly.hour_costs if e.is_loss_hour]
+        assert row["net_margin_tl"] == hourly.total_net_margin_tl
+        assert row["total_sales_tl"] == hourly.total_sales_revenue_tl
+        assert row["total_cost_tl"] == hourly.total_base_cost_tl
+        assert row["loss_hours"] == len(loss)
+        assert row["total_loss_tl"] == round(sum(e.margin_tl for e in loss), 2)
+
+    def test_no_matching_hours(self):
+        with pytest.raises(ValueError):
+            backtest_period(
+                _period_arrays("2025-01", _rows(_market("2025-01")), 0.0),
+                consumption_slots(_consumption("2025-02")),
+                1.05, ImbalanceParams(),
+            )
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# /backtest
+# ═══════════════════════════════════════════════════════════════════════════════
+
+@pytest.fixture()
+def db(tmp_path, monkeypatch):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from app.database import Base
+    import app.pricing.schemas  # noqa: F401 — tabloları Base.metadata'a kaydet
+    monkeypatch.setattr(market_store, "PRICING_MARKET_STORE_DIR", str(tmp_path))
+    market_store.clear_market_store()
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    market_store.clear_market_store()
+
+
+@pytest.fixture()
+def client(db):
+    from app.main import app as fastapi_app
+    from app.database import get_db
+    fastapi_app.dependency_overrides[get_db] = lambda: db
+    yield TestClient(fastapi_app)
+    fastapi_app.dependency_overrides.clear()
+
+
+@pytest.fixture()
+def seeded(db):
+    from app.pricing.bulk_writer import insert_market_records
+    from app.pricing.consumption_service import save_consumption_profile
+    from app.pricing.profile_templates import seed_profile_templates
+    from app.pricing.yekdem_service import create_or_update_yekdem
+
+    seed_profile_templates(db)
+    for i, period in enumerate(PERIODS):
+        insert_market_records(db, _market(period, base=1800.0 + i * 400), version=1)
+    db.commit()
+    create_or_update_yekdem(db, "2024-12", 320.0)
+    create_or_update_yekdem(db, "2025-01", 364.0)
+    # CUST-A: 2 dönem profili (Kasım yok)
+    for period in PERIODS[1:]:
+        save_consumption_profile(db, "CUST-A", "A", period, _consumption(period))
+    return db
+
+
+def _post(client, **body):
+    resp = client.post("/api/pricing/backtest", json={"multiplier": 1.06, **body})
+    assert resp.status_code == 200, resp.text
+    return [json.loads(line) for line in resp.text.splitlines()]
+
+
+class TestBacktestEndpoint:
+
+    def test_customer_periods_and_cumulative(self, client, seeded):
+        lines = _post(client, dealer_commission_pct=10, items=[
+            {"customer_id": "CUST-A"},
+            {"customer_id": "YOK"},
+            {"use_template": True, "template_name": "ofis", "template_monthly_kwh": 5000},
+        ])
+        item, missing, template, summary = lines
+        result = item["result"]
+        assert [r["period"] for r in result["periods"]] == PERIODS[1:]
+        nets = [r["net_margin_tl"] for r in result["periods"]]
+        assert result["periods"][-1]["cumulative_net_margin_tl"] == round(sum(nets), 2)
+        assert result["total_net_margin_tl"] == round(sum(nets), 2)
+
+        # Aynı dönem /compare ile aynı net marj
+        compare = client.post("/api/pricing/compare", json={
+            "customer_id": "CUST-A", "periods": PERIODS[1:],
+            "multiplier": 1.06, "dealer_commission_pct": 10,
+        }).json()
+        assert nets == [c["net_margin_tl"] for c in compare["comparison"]]
+
+        assert missing["status"] == "error"
+        assert missing["error"]["error"] == "no_backtest_periods"
+        assert template["status"] == "ok"
+        assert template["result"]["periods_analyzed"] == 3
+        assert template["result"]["periods"][0]["yekdem_tl_per_mwh"] == 0.0
+
+        assert summary["type"] == "summary"
+        s = summary["summary"]
+        assert s["periods"] == PERIODS
+        assert s["yekdem_missing_periods"] == ["2024-11"]
+        assert (s["items_ok"], s["items_failed"]) == (2, 1)
+        assert [p["period"] for p in s["by_period"]][-2:] == PERIODS[1:]
+
+    def test_period_range(self, client, seeded):
+        lines = _post(client, start_period="2025-01", items=[{"customer_id": "CUST-A"}])
+        assert [r["period"] for r in lines[0]["result"]["periods"]] == ["2025-01"]
+        assert lines[-1]["summary"]["periods"] == ["2025-01"]
+
+    def test_no_market_data(self, client, db):
+        resp = client.post("/api/pricing/backtest", json={
+            "multiplier": 1.05, "items": [{"customer_id": "CUST-A"}],
+        })
+        assert resp.status_code == 404
+
+    def test_process_pool_same_result(self, seeded, monkeypatch):
+        from app.pricing.models import BacktestRequest
+        from app.pricing.router import backtest
+
+        req = BacktestRequest(
+            multiplier=1.04,
+            items=[{"customer_id": "CUST-A"}, {"customer_id": "YOK"}] * 2,
+        )
+        serial = list(backtest(req, seeded))
+        monkeypatch.setattr(portfolio, "PRICING_BATCH_MIN_POOL_ITEMS", 1)
+        pooled = list(backtest(req.model_copy(update={"max_workers": 2}), seeded))
+        assert pooled == serial
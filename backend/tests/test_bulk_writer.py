@@ -0,0 +1,151 @@
+"""
+Pricing Risk Engine — Toplu Yazma Katmanı Testleri.
+
+- Küme tabanlı arşivleme: aktif satırlar tek UPDATE ile pasife çekilir
+- Toplu ekleme: ORM default'ları (currency, created_at) yazılır
+- Tüketim profili tekrar yükleme: eski profil + data_version arşivlenir
+- COPY yolu için default çözümlemesi (PostgreSQL dışında executemany)
+"""
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+import app.pricing.schemas  # noqa: F401 — tabloları kaydet
+
+from app.pricing.bulk_writer import (
+    _column_defaults,
+    _uses_copy,
+    archive_data_versions,
+    archive_market_period,
+    insert_market_records,
+)
+from app.pricing.consumption_service import save_consumption_profile
+from app.pricing.excel_parser import ParsedConsumptionRecord, ParsedMarketRecord
+from app.pricing.schemas import (
+    ConsumptionHourlyData,
+    ConsumptionProfile,
+    DataVersion,
+    HourlyMarketPrice,
+)
+
+
+@pytest.fixture
+def db_session():
+    """In-memory SQLite session."""
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    session = Session()
+    yield session
+    session.close()
+
+
+def _market_records(period: str, hours: int = 48, base: float = 2000.0):
+    return [
+        ParsedMarketRecord(
+            period=period,
+            date=f"{period}-{i // 24 + 1:02d}",
+            hour=i % 24,
+            ptf_tl_per_mwh=base + i,
+            smf_tl_per_mwh=base + i + 50,
+        )
+        for i in range(hours)
+    ]
+
+
+def _consumption_records(period: str, kwh: float = 10.0):
+    return [
+        ParsedConsumptionRecord(date=f"{period}-01", hour=h, consumption_kwh=kwh)
+        for h in range(24)
+    ]
+
+
+class TestMarketBulkWrite:
+
+    def test_insert_fills_orm_defaults(self, db_session):
+        inserted = insert_market_records(db_session, _market_records("2025-01"), version=1)
+        db_session.commit()
+
+        rows = db_session.query(HourlyMarketPrice).all()
+        assert inserted == len(rows) == 48
+        assert all(r.currency == "TRY" and r.created_at is not None for r in rows)
+        assert {r.source for r in rows} == {"epias_excel"}
+
+    def test_archive_flips_only_period_active_rows(self, db_session):
+        insert_market_records(db_session, _market_records("2025-01"), version=1)
+        insert_market_records(db_session, _market_records("2025-02"), version=1)
+        db_session.commit()
+
+        archived, max_version = archive_market_period(db_session, "2025-01")
+        db_session.commit()
+
+        assert (archived, max_version) == (48, 1)
+        active = db_session.query(HourlyMarketPrice).filter_by(is_active=1).all()
+        assert {r.period for r in active} == {"2025-02"}
+
+    def test_reupload_cycle_versions(self, db_session):
+        for version, base in ((1, 2000.0), (2, 3000.0)):
+            _, max_version = archive_market_period(db_session, "2025-01")
+            assert max_version == version - 1
+            insert_market_records(db_session, _market_records("2025-01", base=base), version)
+            db_session.commit()
+
+        active = db_session.query(HourlyMarketPrice).filter_by(is_active=1).all()
+        assert len(active) == 48
+        assert {r.version for r in active} == {2}
+        assert min(r.ptf_tl_per_mwh for r in active) == 3000.0
+
+    def test_empty_period(self, db_session):
+        assert archive_market_period(db_session, "2025-01") == (0, 0)
+        assert insert_market_records(db_session, [], version=1) == 0
+
+
+class TestConsumptionBulkWrite:
+
+    def test_reupload_archives_previous_profile(self, db_session):
+        first = save_consumption_profile(
+            db_session, "C1", "Müşteri", "2025-01", _consumption_records("2025-01", 10.0),
+        )
+        second = save_consumption_profile(
+            db_session, "C1", "Müşteri", "2025-01", _consumption_records("2025-01", 20.0),
+        )
+
+        db_session.refresh(first)
+        assert (first.is_active, second.is_active) == (0, 1)
+        assert second.version == 2
+        assert len(second.hourly_data) == 24
+        assert {h.consumption_kwh for h in second.hourly_data} == {20.0}
+        assert db_session.query(ConsumptionHourlyData).count() == 48
+
+        active_dv = (
+            db_session.query(DataVersion)
+            .filter_by(data_type="consumption", customer_id="C1", is_active=1)
+            .all()
+        )
+        assert [dv.version for dv in active_dv] == [2]
+
+    def test_archive_data_versions_scoped_by_customer(self, db_session):
+        save_consumption_profile(db_session, "C1", None, "2025-01", _consumption_records("2025-01"))
+        save_consumption_profile(db_session, "C2", None, "2025-01", _consumption_records("2025-01"))
+
+        assert archive_data_versions(db_session, "consumption", "2025-01", "C1") == 1
+        db_session.commit()
+        remaining = db_session.query(DataVersion).filter_by(is_active=1).all()
+        assert [dv.customer_id for dv in remaining] == ["C2"]
+        assert db_session.query(ConsumptionProfile).filter_by(is_active=1).count() == 2
+
+
+class TestCopyDefaults:
+
+    def test_sqlite_uses_executemany(self, db_session):
+        assert _uses_copy(db_session) is False
+
+    def test_defaults_for_omitted_columns(self, db_session):
+        given = ["period", "date", "hour", "ptf_tl_per_mwh", "smf_tl_per_mwh",
+                 "source", "version", "is_active"]
+        defaults = _column_defaults(db_session, HourlyMarketPrice.__table__, given)
+        assert set(defaults) == {"currency", "created_at", "updated_at"}
+        assert defaults["currency"] == "TRY"
+        assert defaults["created_at"] is not None
@@ -0,0 +1,170 @@
+"""
+Pricing Risk Engine — Çoklu Ay Karşılaştırma Testleri.
+
+- /compare: dönem satırları ve güvenli katsayı, kayıt bazlı referans hesapla
+  (calculate_hourly_costs, calculate_risk_score, calculate_safe_multiplier)
+  birebir aynı; piyasa / tüketim verisi olmayan dönem missing_periods'a düşer
+- Süreç havuzu aynı sonucu verir; 24 aylık istek kabul edilir
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.pricing import compare as compare_module, market_store
+from app.pricing.excel_parser import ParsedConsumptionRecord, ParsedMarketRecord
+from app.pricing.models import CompareRequest, ImbalanceParams
+from app.pricing.multiplier_simulator import PeriodData, calculate_safe_multiplier
+from app.pricing.period_frame import build_period_frame
+from app.pricing.pricing_engine import calculate_hourly_costs, calculate_weighted_prices
+from app.pricing.risk_calculator import calculate_risk_score
+from app.pricing.time_zones import calculate_time_zone_breakdown
+
+PERIODS = ["2024-10", "2024-11", "2024-12", "2025-01"]
+YEKDEM = {"2024-11": 320.0, "2024-12": 364.0}  # 2024-10 ve 2025-01 YEKDEM'siz
+
+
+def _market(period: str, base: float, days: int = 4) -> list[ParsedMarketRecord]:
+    return [
+        ParsedMarketRecord(
+            period=period, date=f"{period}-{d:02d}", hour=h,
+            ptf_tl_per_mwh=base + (2100.0 if 17 <= h <= 21 else 0.0) + d * 9 - h,
+            smf_tl_per_mwh=base + 120.0 + h * 2.5,
+        )
+        for d in range(1, days + 1) for h in range(24)
+    ]
+
+
+def _consumption(period: str, scale: float, days: int = 4) -> list[ParsedConsumptionRecord]:
+    return [
+        ParsedConsumptionRecord(
+            date=f"{period}-{d:02d}", hour=h,
+            consumption_kwh=scale * (1.0 + (h % 5) * 0.4) + d,
+        )
+        for d in range(1, days + 1) for h in range(24)
+    ]
+
+
+MARKET = {p: _market(p, 1700.0 + i * 350) for i, p in enumerate(PERIODS[1:])}
+CONSUMPTION = {p: _consumption(p, 90.0 + i * 15) for i, p in enumerate(PERIODS)}
+
+
+@pytest.fixture()
+def db(tmp_path, monkeypatch):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from app.database import Base
+    import app.pricing.schemas  # noqa: F401 — tabloları Base.metadata'a kaydet
+    monkeypatch.setattr(market_store, "PRICING_MARKET_STORE_DIR", str(tmp_path))
+    market_store.clear_market_store()
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    market_store.clear_market_store()
+
+
+@pytest.fixture()
+def client(db):
+    from app.main import app as fastapi_app
+    from app.database import get_db
+    fastapi_app.dependency_overrides[get_db] = lambda: db
+    yield TestClient(fastapi_app)
+    fastapi_app.dependency_overrides.clear()
+
+
+@pytest.fixture()
+def seeded(db):
+    from app.pricing.bulk_writer import insert_market_records
+    from app.pricing.consumption_service import save_consumption_profile
+    from app.pricing.yekdem_service import create_or_update_yekdem
+
+    # 2024-10: tüketim var, piyasa yok; 2025-01: piyasa var, tüketim yok
+    for period, records in MARKET.items():
+        insert_market_records(db, records, version=1)
+    db.commit()
+    for period, value in YEKDEM.items():
+        create_or_update_yekdem(db, period, value)
+    for period in PERIODS[:3]:
+        save_consumption_profile(db, "CUST-A", "A", period, CONSUMPTION[period])
+    return db
+
+
+def _reference(periods, multiplier, imbalance, dealer):
+    """Eski kayıt bazlı /compare hesabı."""
+    rows, periods_data = [], []
+    for period in periods:
+        market, consumption = MARKET[period], CONSUMPTION[period]
+        yekdem = YEKDEM.get(period, 0.0)
+        frame = build_period_frame(market, consumption)
+        weighted = calculate_weighted_prices(market, consumption, frame=frame)
+        hourly = calculate_hourly_costs(
+            market, consumption, yekdem, multiplier, imbalance,
+            dealer_commission_pct=dealer, frame=frame,
+        )
+        tz = calculate_time_zone_breakdown(market, consumption, yekdem, frame=frame)
+        rows.append({
+            "period": period,
+            "weighted_ptf_tl_per_mwh": weighted.weighted_ptf_tl_per_mwh,
+            "weighted_smf_tl_per_mwh": weighted.weighted_smf_tl_per_mwh,
+            "total_cost_tl": weighted.total_cost_tl,
+            "net_margin_tl": hourly.total_net_margin_tl,
+            "risk_score": calculate_risk_score(weighted, tz).score.value,
+        })
+        periods_data.append(PeriodData(period, market, consumption))
+    safe = calculate_safe_multiplier(
+        periods_data, YEKDEM.get(periods[0], 0.0), imbalance, dealer,
+    )
+    return rows, safe.model_dump(mode="json")
+
+
+class TestCompare:
+
+    @pytest.mark.parametrize("smf_based", [False, True])
+    def test_matches_record_based_reference(self, client, seeded, smf_based):
+        imbalance = ImbalanceParams(smf_based_imbalance_enabled=smf_based)
+        resp = client.post("/api/pricing/compare", json={
+            "customer_id": "CUST-A", "periods": PERIODS,
+            "multiplier": 1.05, "dealer_commission_pct": 12,
+            "imbalance_params": imbalance.model_dump(),
+        })
+        assert resp.status_code == 200, resp.text
+        data = resp.json()
+        assert data["missing_periods"] == ["2024-10", "2025-01"]
+
+        rows, safe = _reference(["2024-11", "2024-12"], 1.05, imbalance, 12)
+        for got, expected in zip(data["comparison"], rows):
+            assert {k: got[k] for k in expected} == expected
+        assert data["comparison"][0]["change_pct"] is None
+        assert data["comparison"][1]["change_pct"] is not None
+        assert data["safe_multiplier"] == safe
+
+    def test_no_consumption_source(self, client, seeded):
+        data = client.post("/api/pricing/compare", json={
+            "periods": PERIODS[:2], "multiplier": 1.05,
+        }).json()
+        assert data["periods_analyzed"] == 0
+        assert data["missing_periods"] == PERIODS[:2]
+
+    def test_24_month_request_accepted(self, client, seeded):
+        periods = [f"{y}-{m:02d}" for y in (2023, 2024) for m in range(1, 13)]
+        resp = client.post("/api/pricing/compare", json={
+            "customer_id": "CUST-A", "periods": periods, "multiplier": 1.05,
+        })
+        assert resp.status_code == 200, resp.text
+        assert [c["period"] for c in resp.json()["comparison"]] == ["2024-11", "2024-12"]
+
+    def test_process_pool_same_result(self, seeded, monkeypatch):
+        from app.pricing.router import compare
+
+        req = CompareRequest(customer_id="CUST-A", periods=PERIODS, multiplier=1.07)
+        serial = compare(req, seeded)
+        monkeypatch.setattr(compare_module, "PRICING_BATCH_MAX_WORKERS", 2)
+        assert compare_module.resolve_compare_workers(2, 8) == 2
+        pooled = compare(req.model_copy(update={"max_workers": 8}), seeded)
+        assert pooled == serial
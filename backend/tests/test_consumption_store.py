@@ -0,0 +1,233 @@
+"""
+Pricing Risk Engine — Kompakt Tüketim Profili Deposu Testleri.
+
+- Kodlama/çözme: satırlarla birebir aynı kayıtlar, eksik saatler korunur
+- Bozuk blob / geçersiz saat reddedilir
+- Okuma yolu: blob yoksa satırlardan kurulur ve yayınlanır
+- Blob varken DB'ye gidilmez (anahtar profil satırından)
+- Yeni yükleme → yeni profil anahtarı, eski blob okunmaz
+- Satırlar doğruluk kaynağı olarak yazılmaya devam eder
+- Aynı profil anahtarını üreten iki veritabanı birbirinin blobunu okumaz
+"""
+
+import os
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+from hypothesis import given, settings, strategies as st
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+import app.pricing.schemas  # noqa: F401 — tabloları kaydet
+
+from app.pricing import consumption_store
+from app.pricing.consumption_service import save_consumption_profile
+from app.pricing.consumption_store import (
+    backfill_consumption_blobs,
+    clear_consumption_store,
+    decode_consumption,
+    encode_consumption,
+    get_active_profile,
+    load_profile_records,
+)
+from app.pricing.excel_parser import ParsedConsumptionRecord
+from app.pricing.schemas import ConsumptionHourlyData, ConsumptionProfile
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Fixtures
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _session():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)()
+
+
+@pytest.fixture
+def db_session():
+    """In-memory SQLite session."""
+    session = _session()
+    yield session
+    session.close()
+
+
+def _stored(db) -> list[str]:
+    directory = consumption_store._store_dir(db)
+    return os.listdir(directory) if os.path.isdir(directory) else []
+
+
+@pytest.fixture(autouse=True)
+def store_dir(tmp_path, monkeypatch):
+    """Her test kendi blob dizinini kullanır."""
+    monkeypatch.setattr(consumption_store, "PRICING_CONSUMPTION_STORE_DIR", str(tmp_path))
+    clear_consumption_store()
+    yield tmp_path
+    clear_consumption_store()
+
+
+def _records(period: str, days: int = 2, base: float = 10.0):
+    return [
+        ParsedConsumptionRecord(
+            date=f"{period}-{d + 1:02d}", hour=h, consumption_kwh=base + d * 24 + h * 0.1,
+        )
+        for d in range(days)
+        for h in range(24)
+    ]
+
+
+def _insert_raw_profile(db, customer_id: str, period: str, records) -> ConsumptionProfile:
+    """Blob yayınlamadan (eski yükleme yolu) profil + satır ekle."""
+    profile = ConsumptionProfile(
+        customer_id=customer_id, period=period, profile_type="actual",
+        total_kwh=sum(r.consumption_kwh for r in records), version=1, is_active=1,
+    )
+    db.add(profile)
+    db.flush()
+    for r in records:
+        db.add(ConsumptionHourlyData(
+            profile_id=profile.id, date=r.date, hour=r.hour, consumption_kwh=r.consumption_kwh,
+        ))
+    db.commit()
+    return profile
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Kodlama / Çözme
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class TestEncoding:
+
+    @settings(max_examples=50, deadline=None)
+    @given(
+        slots=st.sets(st.integers(min_value=0, max_value=24 * 40), min_size=1, max_size=200),
+        kwh=st.floats(min_value=0, max_value=1e7, allow_nan=False),
+    )
+    def test_roundtrip_preserves_records(self, slots, kwh):
+        records = [
+            ParsedConsumptionRecord(
+                date=(date(2024, 2, 1) + timedelta(days=s // 24)).isoformat(),
+                hour=s % 24,
+                consumption_kwh=kwh + s,
+            )
+            for s in sorted(slots)
+        ]
+        assert decode_consumption(encode_consumption(records)).to_records() == records
+
+    def test_gaps_stored_as_nan(self):
+        records = [r for r in _records("2025-01") if r.hour != 5]
+        compact = decode_consumption(encode_consumption(records))
+        assert compact.start_date.isoformat() == "2025-01-01"
+        assert compact.values.shape[0] == 48
+        assert np.isnan(compact.values[[5, 29]]).all()
+        assert compact.to_records() == records
+
+    def test_float32_halves_payload(self):
+        records = _records("2025-01", days=31)
+        blob64 = encode_consumption(records)
+        blob32 = encode_consumption(records, np.float32)
+        assert len(blob32) < len(blob64) * 0.6
+        out = decode_consumption(blob32).to_records()
+        assert [(r.date, r.hour) for r in out] == [(r.date, r.hour) for r in records]
+
+    def test_corrupt_blob_rejected(self):
+        blob = encode_consumption(_records("2025-01"))
+        with pytest.raises(ValueError):
+            decode_consumption(blob[:-3])
+        with pytest.raises(ValueError):
+            decode_consumption(b"XXXX" + blob[4:])
+
+    def test_invalid_hour_and_duplicates_rejected(self):
+        with pytest.raises(ValueError, match="Geçersiz saat"):
+            encode_consumption([ParsedConsumptionRecord("2025-01-01", 24, 1.0)])
+        dup = [ParsedConsumptionRecord("2025-01-01", 3, 1.0)] * 2
+        with pytest.raises(ValueError, match="Tekrarlanan"):
+            encode_consumption(dup)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Depo
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class TestStore:
+
+    def test_upload_publishes_blob(self, db_session):
+        records = _records("2025-01")
+        profile = save_consumption_profile(db_session, "C1", None, "2025-01", records)
+        assert len(_stored(db_session)) == 1
+        assert load_profile_records(db_session, profile) == records
+        # Okuma önbelleği — saatlik satırlar doğruluk kaynağı olarak kalır
+        assert db_session.query(ConsumptionHourlyData).filter_by(
+            profile_id=profile.id,
+        ).count() == len(records)
+
+    def test_blob_read_skips_db(self, db_session, monkeypatch):
+        records = _records("2025-01")
+        profile = save_consumption_profile(db_session, "C1", None, "2025-01", records)
+
+        def _fail(*_a, **_k):
+            raise AssertionError("satırlar okunmamalı")
+
+        monkeypatch.setattr(consumption_store, "_query_records", _fail)
+        clear_consumption_store()  # diğer worker: yalnız disk
+
+        statements: list[str] = []
+        engine = db_session.get_bind()
+
+        def _record(_conn, _cursor, statement, *_args):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", _record)
+        try:
+            assert load_profile_records(db_session, profile) == records
+        finally:
+            event.remove(engine, "before_cursor_execute", _record)
+        assert statements == []
+
+    def test_legacy_profile_lazy_migration(self, db_session):
+        records = _records("2025-01")
+        profile = _insert_raw_profile(db_session, "C1", "2025-01", records[::-1])
+        assert _stored(db_session) == []
+
+        assert load_profile_records(db_session, profile) == records
+        assert len(_stored(db_session)) == 1
+
+    def test_reupload_reads_new_profile(self, db_session):
+        save_consumption_profile(db_session, "C1", None, "2025-01", _records("2025-01", base=10.0))
+        save_consumption_profile(db_session, "C1", None, "2025-01", _records("2025-01", base=20.0))
+        profile = get_active_profile(db_session, "C1", "2025-01")
+        assert profile.version == 2
+        assert load_profile_records(db_session, profile) == _records("2025-01", base=20.0)
+
+    def test_databases_with_same_profile_key_do_not_share(self, db_session):
+        other = _session()
+        try:
+            first = _insert_raw_profile(db_session, "C1", "2025-01", _records("2025-01", base=10.0))
+            second = _insert_raw_profile(other, "C1", "2025-01", _records("2025-01", base=10.0))
+            # Aynı id / versiyon / toplam; farklı veritabanı
+            second.created_at = first.created_at
+            other.commit()
+            other.query(ConsumptionHourlyData).update({ConsumptionHourlyData.consumption_kwh: 1.0})
+            other.commit()
+
+            assert load_profile_records(db_session, first) == _records("2025-01", base=10.0)
+            assert {r.consumption_kwh for r in load_profile_records(other, second)} == {1.0}
+            clear_consumption_store()
+            assert load_profile_records(db_session, first) == _records("2025-01", base=10.0)
+        finally:
+            other.close()
+
+    def test_backfill(self, db_session):
+        _insert_raw_profile(db_session, "C1", "2025-01", _records("2025-01"))
+        _insert_raw_profile(db_session, "C2", "2025-01", _records("2025-01", days=1))
+        assert backfill_consumption_blobs(db_session, batch_size=1) == 2
+        assert len(_stored(db_session)) == 2
+        assert backfill_consumption_blobs(db_session) == 0
+
+    def test_missing_profile_rows(self, db_session):
+        profile = _insert_raw_profile(db_session, "C1", "2025-01", [])
+        assert load_profile_records(db_session, profile) == []
+        assert _stored(db_session) == []
+        assert get_active_profile(db_session, "YOK", "2025-01") is None
@@ -6,10 +6,18 @@ Test matrisi:
 - Mock client behavior
 - Data models
 - Error handling
+- Çağrı hattı: hız sınırı, disk önbelleği, jitter'lı yeniden deneme
+- Çok dönemli sync: sınırlı paralellik, giriş sırası korunur
+- Fallback singleflight: eşzamanlı istekler tek fetch, negatif önbellek
 """
 
+import asyncio
+import json
+import os
+import time
+
 import pytest
-from datetime import datetime
+from datetime import date, datetime, timedelta
 from unittest.mock import AsyncMock, patch, MagicMock
 
 from app.epias_client import (
@@ -22,6 +30,8 @@ from app.epias_client import (
     EpiasDataNotFoundError,
     EpiasAuthError,
     MockEpiasClient,
+    EpiasResponseCache,
+    HostRateLimiter,
     fetch_market_prices_from_epias,
     fetch_ptf_from_epias,
     get_epias_client,
@@ -267,3 +277,303 @@ class TestExceptions:
         error = EpiasAuthError("Invalid credentials")
         assert "Invalid" in str(error)
         assert isinstance(error, EpiasApiError)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# ÇAĞRI HATTI TESTS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class TestHostRateLimiter:
+    """Host başına istek aralığı"""
+    
+    def test_reservations_are_spaced(self):
+        limiter = HostRateLimiter()
+        delays = [limiter.reserve("h", 10.0) for _ in range(3)]
+        assert delays[0] == 0.0
+        assert delays[1] == pytest.approx(0.1, abs=0.01)
+        assert delays[2] == pytest.approx(0.2, abs=0.01)
+    
+    def test_hosts_are_independent(self):
+        limiter = HostRateLimiter()
+        limiter.reserve("a", 1.0)
+        assert limiter.reserve("b", 1.0) == 0.0
+    
+    def test_zero_rate_unlimited(self):
+        limiter = HostRateLimiter()
+        assert all(limiter.reserve("h", 0) == 0.0 for _ in range(5))
+
+
+class TestEpiasResponseCache:
+    """(endpoint, start, end) disk önbelleği"""
+    
+    def test_round_trip(self, tmp_path):
+        cache = EpiasResponseCache(str(tmp_path))
+        cache.put("mcp", "2024-01-01", "2024-01-31", [{"price": 1.5}])
+        assert cache.get("mcp", "2024-01-01", "2024-01-31") == [{"price": 1.5}]
+        assert cache.get("mcp", "2024-02-01", "2024-02-29") is None
+    
+    def test_open_range_expires(self, tmp_path):
+        cache = EpiasResponseCache(str(tmp_path), open_ttl_seconds=60)
+        end = date.today().isoformat()
+        cache.put("mcp", end, end, [{"price": 1.0}])
+        assert cache.get("mcp", end, end) == [{"price": 1.0}]
+        
+        with open(cache._path("mcp", end, end), "w", encoding="utf-8") as f:
+            json.dump({"fetched_at": time.time() - 120, "records": [{"price": 1.0}]}, f)
+        assert cache.get("mcp", end, end) is None
+    
+    def test_final_range_never_expires(self, tmp_path):
+        cache = EpiasResponseCache(str(tmp_path), open_ttl_seconds=0, final_after_days=60)
+        cache.put("mcp", "2020-01-01", "2020-01-31", [{"price": 1.0}])
+        assert cache.is_final("2020-01-31")
+        assert not cache.is_final((date.today() - timedelta(days=10)).isoformat())
+        assert cache.get("mcp", "2020-01-01", "2020-01-31") == [{"price": 1.0}]
+    
+    def test_corrupt_entry_is_miss(self, tmp_path):
+        cache = EpiasResponseCache(str(tmp_path))
+        path = cache._path("mcp", "2020-01-01", "2020-01-31")
+        os.makedirs(os.path.dirname(path))
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("{not json")
+        assert cache.get("mcp", "2020-01-01", "2020-01-31") is None
+
+
+def _pipeline_client(tmp_path, **overrides) -> EpiasClient:
+    config = EpiasConfig(
+        username="u", password="p", retry_base_delay_seconds=0.0,
+        rate_limit_per_second=0, cache_dir=str(tmp_path), **overrides,
+    )
+    return EpiasClient(config=config)
+
+
+class TestCallPipeline:
+    """EpiasClient._call: önbellek + yeniden deneme"""
+    
+    def test_retries_then_caches(self, tmp_path):
+        client = _pipeline_client(tmp_path)
+        calls = []
+        
+        def flaky(endpoint, start_date, end_date):
+            calls.append(endpoint)
+            if len(calls) < 3:
+                raise ConnectionError("reset")
+            return [{"price": 2.0}]
+        
+        client._fetch_blocking = flaky
+        assert asyncio.run(client._call("mcp", "2020-01-01", "2020-01-31")) == [{"price": 2.0}]
+        assert len(calls) == 3
+        
+        # İkinci çağrı disk önbelleğinden
+        assert asyncio.run(client._call("mcp", "2020-01-01", "2020-01-31")) == [{"price": 2.0}]
+        assert len(calls) == 3
+    
+    def test_gives_up_after_max_retries(self, tmp_path):
+        client = _pipeline_client(tmp_path, max_retries=2)
+        calls = []
+        
+        def failing(*args):
+            calls.append(args)
+            raise ConnectionError("down")
+        
+        client._fetch_blocking = failing
+        with pytest.raises(EpiasApiError):
+            asyncio.run(client._call("mcp", "2020-01-01", "2020-01-31"))
+        assert len(calls) == 2
+    
+    def test_auth_error_not_retried(self, tmp_path):
+        client = _pipeline_client(tmp_path)
+        calls = []
+        
+        def unauthorized(*args):
+            calls.append(args)
+            raise EpiasAuthError("bad credentials")
+        
+        client._fetch_blocking = unauthorized
+        with pytest.raises(EpiasAuthError):
+            asyncio.run(client._call("mcp", "2020-01-01", "2020-01-31"))
+        assert len(calls) == 1
+    
+    def test_empty_response_not_cached(self, tmp_path):
+        client = _pipeline_client(tmp_path)
+        client._fetch_blocking = lambda *args: []
+        asyncio.run(client._call("mcp", "2020-01-01", "2020-01-31"))
+        assert client.cache.get("mcp", "2020-01-01", "2020-01-31") is None
+
+
+class TestMultiPeriodSync:
+    """sync_multiple_periods_from_epias: sınırlı paralel fetch"""
+    
+    def test_bounded_concurrency_and_order(self, monkeypatch):
+        from app import epias_client, market_prices
+        
+        active = {"now": 0, "peak": 0}
+        
+        async def fake_fetch(period, use_mock=False):
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+            await asyncio.sleep(0.01)
+            active["now"] -= 1
+            if period == "2024-03":
+                raise EpiasApiError("boom")
+            return MarketPricesResult(
+                period=period, ptf_tl_per_mwh=2000.0, yekdem_tl_per_mwh=300.0,
+                ptf_source="epias", yekdem_source="epias",
+            )
+        
+        persisted = []
+        
+        def fake_persist(db, period, result, use_mock=False):
+            persisted.append(period)
+            return (True, None, "ok")
+        
+        monkeypatch.setattr(epias_client, "fetch_market_prices_from_epias", fake_fetch)
+        monkeypatch.setattr(market_prices, "_persist_epias_result", fake_persist)
+        monkeypatch.setattr(market_prices, "get_market_prices", lambda db, period: None)
+        
+        periods = [f"2024-{m:02d}" for m in range(1, 9)]
+        results = asyncio.run(market_prices.sync_multiple_periods_from_epias(
+            None, periods, max_concurrency=3,
+        ))
+        
+        assert list(results) == periods
+        assert active["peak"] == 3
+        assert results["2024-03"][0] is False
+        assert sorted(persisted) == [p for p in periods if p != "2024-03"]
+    
+    def test_db_cache_hits_skip_fetch(self, monkeypatch):
+        from app import epias_client, market_prices
+        
+        fetched = []
+        
+        async def fake_fetch(period, use_mock=False):
+            fetched.append(period)
+            return MarketPricesResult(
+                period=period, ptf_tl_per_mwh=2000.0, yekdem_tl_per_mwh=None,
+                ptf_source="epias", yekdem_source="none",
+            )
+        
+        cached = market_prices.MarketPrices(
+            period="2024-01", ptf_tl_per_mwh=2000.0, yekdem_tl_per_mwh=300.0,
+            source="epias", is_locked=False,
+        )
+        monkeypatch.setattr(epias_client, "fetch_market_prices_from_epias", fake_fetch)
+        monkeypatch.setattr(market_prices, "_persist_epias_result", lambda *a, **k: (True, None, "ok"))
+        monkeypatch.setattr(
+            market_prices, "get_market_prices",
+            lambda db, period: cached if period == "2024-01" else None,
+        )
+        
+        results = asyncio.run(market_prices.sync_multiple_periods_from_epias(
+            None, ["2024-01", "2024-02"],
+        ))
+        assert fetched == ["2024-02"]
+        assert results["2024-01"] == (True, "Cache'den alındı")
+
+
+class _FakeSession:
+    def get_bind(self):
+        return None
+    
+    def close(self):
+        pass
+
+
+@pytest.fixture()
+def fallback_env(monkeypatch):
+    """market_prices fallback'i DB'siz: session ve DB okuması sahte."""
+    from app import market_prices
+    
+    market_prices.clear_epias_fallback_state()
+    monkeypatch.setattr(market_prices, "sessionmaker", lambda bind: _FakeSession)
+    monkeypatch.setattr(market_prices, "get_market_prices", lambda db, period, price_type="PTF": None)
+    calls = []
+    
+    def install(outcome, delay=0.01):
+        async def fake_fetch(db, period, force_refresh=False, use_mock=False):
+            calls.append(period)
+            await asyncio.sleep(delay)
+            return outcome(period) if callable(outcome) else outcome
+        monkeypatch.setattr(market_prices, "fetch_and_cache_from_epias", fake_fetch)
+    
+    yield market_prices, calls, install
+    market_prices.clear_epias_fallback_state()
+
+
+class TestFallbackSingleflight:
+    """get_market_prices_with_epias_fallback: tek uçuş + negatif önbellek"""
+    
+    def test_concurrent_lookups_share_one_fetch(self, fallback_env):
+        market_prices, calls, install = fallback_env
+        install(lambda period: (True, market_prices.MarketPrices(
+            period=period, ptf_tl_per_mwh=2800.0, yekdem_tl_per_mwh=360.0, source="epias",
+        ), "ok"))
+        
+        async def run():
+            return await asyncio.gather(*(
+                market_prices.get_market_prices_with_epias_fallback(_FakeSession(), "2026-09")
+                for _ in range(10)
+            ))
+        
+        results = asyncio.run(run())
+        assert calls == ["2026-09"]
+        assert all(p.ptf_tl_per_mwh == 2800.0 for p, _ in results)
+        assert all(desc == "EPİAŞ API: ok" for _, desc in results)
+        assert market_prices._fallback_inflight == {}
+    
+    def test_distinct_periods_fetch_separately(self, fallback_env):
+        market_prices, calls, install = fallback_env
+        install((False, None, "yok"))
+        
+        async def run():
+            await asyncio.gather(
+                market_prices.get_market_prices_with_epias_fallback(_FakeSession(), "2026-09"),
+                market_prices.get_market_prices_with_epias_fallback(_FakeSession(), "2026-10"),
+            )
+        
+        asyncio.run(run())
+        assert sorted(calls) == ["2026-09", "2026-10"]
+    
+    def test_negative_cache(self, fallback_env, monkeypatch):
+        market_prices, calls, install = fallback_env
+        install((False, None, "EPİAŞ'tan PTF verisi alınamadı"))
+        
+        prices, desc = asyncio.run(market_prices.get_market_prices_with_epias_fallback(_FakeSession(), "2026-11"))
+        assert prices.source == "default"
+        asyncio.run(market_prices.get_market_prices_with_epias_fallback(_FakeSession(), "2026-11"))
+        assert calls == ["2026-11"]
+        
+        # TTL dolunca yeniden denenir
+        expires, msg = market_prices._fallback_negative[("2026-11", "PTF")]
+        market_prices._fallback_negative[("2026-11", "PTF")] = (time.monotonic() - 1, msg)
+        asyncio.run(market_prices.get_market_prices_with_epias_fallback(_FakeSession(), "2026-11"))
+        assert calls == ["2026-11", "2026-11"]
+    
+    def test_cancelled_waiter_does_not_cancel_flight(self, fallback_env):
+        market_prices, calls, install = fallback_env
+        install(lambda period: (True, market_prices.MarketPrices(
+            period=period, ptf_tl_per_mwh=2800.0, yekdem_tl_per_mwh=360.0, source="epias",
+        ), "ok"), delay=0.05)
+        
+        async def run():
+            first = asyncio.ensure_future(
+                market_prices.get_market_prices_with_epias_fallback(_FakeSession(), "2026-12")
+            )
+            await asyncio.sleep(0.01)
+            second = asyncio.ensure_future(
+                market_prices.get_market_prices_with_epias_fallback(_FakeSession(), "2026-12")
+            )
+            first.cancel()
+            return await second
+        
+        prices, _ = asyncio.run(run())
+        assert prices.ptf_tl_per_mwh == 2800.0
+        assert calls == ["2026-12"]
+    
+    def test_no_auto_fetch_for_other_price_types(self, fallback_env):
+        market_prices, calls, install = fallback_env
+        install((True, None, "ok"))
+        prices, _ = asyncio.run(market_prices.get_market_prices_with_epias_fallback(
+            _FakeSession(), "2026-09", price_type="SMF",
+        ))
+        assert prices.source == "default" and prices.price_type == "SMF"
+        assert calls == []
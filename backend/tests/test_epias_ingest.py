@@ -0,0 +1,235 @@
+"""
+Pricing Risk Engine — EPİAŞ Saatlik Alım Testleri.
+
+- Slot / aralık yardımcıları: eptr2 tarih biçimleri, ardışık gün parçalama
+- Boş dönem: tüm saatler alınır, v1 yazılır, aylık PTF özeti güncellenir
+- Artımlı alım: yalnız eksik günler istenir, mevcut satırlar yeni versiyona
+  taşınır, eski versiyon arşivlenir
+- Eksik saat yoksa EPİAŞ'a gidilmez, versiyon oluşmaz
+- SMF gelmeyen saat yazılmaz, eksik kalır
+- /sync-market-data uç noktası (mock istemci)
+"""
+
+import asyncio
+from datetime import date, datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.epias_client import MockEpiasClient
+from app.pricing import market_store
+from app.pricing.bulk_writer import insert_market_records
+from app.pricing.epias_ingest import (
+    chunk_ranges,
+    expected_slots,
+    ingest_hourly_market_data,
+    parse_hourly,
+    slot_of,
+)
+from app.pricing.excel_parser import ParsedMarketRecord
+from app.pricing.schemas import DataVersion, HourlyMarketPrice
+
+PERIOD = "2025-02"  # 28 gün → 672 saat
+AFTER_PERIOD = date(2025, 3, 15)
+
+
+class StubClient(MockEpiasClient):
+    """MockEpiasClient + istenen aralıkların kaydı; SMF saatleri çıkarılabilir."""
+
+    def __init__(self, drop_smf: set = frozenset()):
+        self.calls: list[tuple[str, str, str]] = []
+        self.drop_smf = drop_smf
+
+    async def get_hourly_ptf(self, start_date, end_date):
+        self.calls.append(("ptf", start_date, end_date))
+        return await super().get_hourly_ptf(start_date, end_date)
+
+    async def get_hourly_smf(self, start_date, end_date):
+        self.calls.append(("smf", start_date, end_date))
+        items = await super().get_hourly_smf(start_date, end_date)
+        return [i for i in items if slot_of(i) not in self.drop_smf]
+
+
+def _ingest(db, client, until=AFTER_PERIOD, **kwargs):
+    return asyncio.run(ingest_hourly_market_data(db, PERIOD, client, until=until, **kwargs))
+
+
+def _active(db):
+    return (
+        db.query(HourlyMarketPrice)
+        .filter(HourlyMarketPrice.period == PERIOD, HourlyMarketPrice.is_active == 1)
+        .order_by(HourlyMarketPrice.date, HourlyMarketPrice.hour)
+        .all()
+    )
+
+
+@pytest.fixture()
+def db(tmp_path, monkeypatch):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from app.database import Base
+    import app.pricing.schemas  # noqa: F401 — tabloları Base.metadata'a kaydet
+    monkeypatch.setattr(market_store, "PRICING_MARKET_STORE_DIR", str(tmp_path))
+    market_store.clear_market_store()
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    market_store.clear_market_store()
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Yardımcılar
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+class TestHelpers:
+
+    def test_slot_formats(self):
+        assert slot_of({"date": "2025-02-01T05:00:00+03:00"}) == ("2025-02-01", 5)
+        assert slot_of({"date": "2025-02-01 17:00:00+03:00"}) == ("2025-02-01", 17)
+        assert slot_of({"date": datetime(2025, 2, 1, 9)}) == ("2025-02-01", 9)
+        assert slot_of({"date": "2025-02-01", "hour": "23:00"}) == ("2025-02-01", 23)
+        assert slot_of({"date": date(2025, 2, 1), "hour": 4}) == ("2025-02-01", 4)
+        assert slot_of({"hour": "01:00"}) is None
+
+    def test_parse_hourly_picks_first_present_key(self):
+        items = [
+            {"date": "2025-02-01T00:00:00+03:00", "systemMarginalPrice": 10.5, "price": 1.0},
+            {"date": "2025-02-01T01:00:00+03:00", "price": "11"},
+            {"date": "2025-02-01T02:00:00+03:00", "price": "n/a"},
+        ]
+        assert parse_hourly(items, ("systemMarginalPrice", "price")) == {
+            ("2025-02-01", 0): 10.5,
+            ("2025-02-01", 1): 11.0,
+        }
+
+    def test_chunk_ranges(self):
+        days = [f"2025-02-{d:02d}" for d in (1, 2, 3, 4, 5, 9, 10, 28)]
+        assert chunk_ranges(days, chunk_days=3) == [
+            ("2025-02-01", "2025-02-03"),
+            ("2025-02-04", "2025-02-05"),
+            ("2025-02-09", "2025-02-10"),
+            ("2025-02-28", "2025-02-28"),
+        ]
+        assert chunk_ranges([], chunk_days=3) == []
+
+    def test_expected_slots_until(self):
+        assert len(expected_slots(PERIOD)) == 672
+        slots = expected_slots(PERIOD, until=date(2025, 2, 2))
+        assert len(slots) == 48 and slots[-1] == ("2025-02-02", 23)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Alım
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+class TestIngest:
+
+    def test_full_period(self, db):
+        client = StubClient()
+        result = _ingest(db, client, chunk_days=7)
+
+        assert result.version == 1
+        assert result.inserted_slots == 672 and result.missing_hours == 0
+        assert result.ranges == [
+            ("2025-02-01", "2025-02-07"), ("2025-02-08", "2025-02-14"),
+            ("2025-02-15", "2025-02-21"), ("2025-02-22", "2025-02-28"),
+        ]
+        rows = _active(db)
+        assert len(rows) == 672
+        assert {r.source for r in rows} == {"epias_api"}
+        assert rows[0].smf_tl_per_mwh == pytest.approx(rows[0].ptf_tl_per_mwh * 1.03, abs=0.02)
+
+        dv = db.query(DataVersion).filter_by(data_type="market_data", period=PERIOD, is_active=1).one()
+        assert dv.version == 1 and dv.row_count == 672 and dv.quality_score == 100
+
+        from app.market_prices import get_market_prices
+        expected = round(sum(r.ptf_tl_per_mwh for r in rows) / 672, 2)
+        assert result.ptf_average_tl_per_mwh == expected
+        assert get_market_prices(db, PERIOD).ptf_tl_per_mwh == expected
+
+        segment = market_store.get_market_segment(db, PERIOD)
+        assert segment.version == 1 and len(segment) == 672
+
+    def test_incremental_fetches_only_missing_days(self, db):
+        seeded = [
+            ParsedMarketRecord(period=PERIOD, date=f"2025-02-{d:02d}", hour=h,
+                               ptf_tl_per_mwh=1000.0 + h, smf_tl_per_mwh=1100.0)
+            for d in (1, 2, 3) for h in range(24)
+        ]
+        insert_market_records(db, seeded, version=1)
+        db.commit()
+
+        client = StubClient()
+        result = _ingest(db, client, until=date(2025, 2, 10))
+
+        assert {(s, e) for _, s, e in client.calls} == {("2025-02-04", "2025-02-10")}
+        assert result.version == 2
+        assert result.carried_rows == 72 and result.inserted_slots == 168
+        assert result.missing_hours == 672 - 240
+        assert result.ptf_average_tl_per_mwh is None  # dönem eksik → özet yok
+
+        rows = _active(db)
+        assert len(rows) == 240 and {r.version for r in rows} == {2}
+        assert rows[5].ptf_tl_per_mwh == 1005.0 and rows[5].source == "epias_excel"
+        archived = db.query(HourlyMarketPrice).filter_by(period=PERIOD, is_active=0).count()
+        assert archived == 72
+
+    def test_complete_period_is_noop(self, db):
+        _ingest(db, StubClient())
+        client = StubClient()
+        result = _ingest(db, client)
+        assert result.version is None and result.requested_slots == 0
+        assert client.calls == []
+        assert db.query(HourlyMarketPrice).filter_by(period=PERIOD).count() == 672
+
+    def test_missing_smf_hours_stay_missing(self, db):
+        dropped = {("2025-02-01", 18), ("2025-02-01", 19)}
+        result = _ingest(db, StubClient(drop_smf=dropped), until=date(2025, 2, 1))
+        assert result.inserted_slots == 22
+        assert result.warnings and "2 saat" in result.warnings[0]
+
+        retry = StubClient()
+        result = _ingest(db, retry, until=date(2025, 2, 1))
+        assert result.version == 2 and result.inserted_slots == 2
+        assert {(s, e) for _, s, e in retry.calls} == {("2025-02-01", "2025-02-01")}
+
+    def test_locked_period_keeps_aggregate(self, db):
+        from app.market_prices import get_market_prices, lock_market_prices, upsert_market_prices
+        upsert_market_prices(db, PERIOD, 2500.0, 300.0)
+        lock_market_prices(db, PERIOD)
+
+        result = _ingest(db, StubClient())
+        assert result.version == 1 and result.ptf_average_tl_per_mwh is None
+        assert any("kilitli" in w for w in result.warnings)
+        assert get_market_prices(db, PERIOD).ptf_tl_per_mwh == 2500.0
+
+
+class TestSyncEndpoint:
+
+    def test_mock_sync(self, db):
+        from app.main import app as fastapi_app
+        from app.database import get_db
+        fastapi_app.dependency_overrides[get_db] = lambda: db
+        try:
+            client = TestClient(fastapi_app)
+            resp = client.post("/api/pricing/sync-market-data", params={
+                "period": "2024-06", "use_mock": True,
+            })
+            assert resp.status_code == 200, resp.text
+            body = resp.json()
+            assert body["version"] == 1 and body["total_rows"] == 720
+
+            bad = client.post("/api/pricing/sync-market-data", params={"period": "2024-13"})
+            assert bad.status_code == 422
+            assert bad.json()["detail"]["error"] == "invalid_period"
+        finally:
+            fastapi_app.dependency_overrides.clear()
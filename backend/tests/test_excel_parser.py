@@ -485,3 +485,129 @@ class TestCansuPortalFormat:
         assert out.result.success is True
         periods = {r.date[:7] for r in out.records}
         assert periods == {"2026-01", "2026-02", "2026-04"}
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Tests: engine="iterparse" — akışlı XML okuyucu ↔ openpyxl paritesi
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+def _sheet_rows(data: bytes) -> tuple[list[tuple], list[tuple]]:
+    """Aynı dosyanın (openpyxl, StreamingWorkbook) satırları — sondaki None'lar kırpılmış."""
+    from openpyxl import load_workbook
+    from app.pricing.xlsx_stream import StreamingWorkbook
+
+    def _trim(row):
+        row = list(row)
+        while row and row[-1] is None:
+            row.pop()
+        return tuple(row)
+
+    wb = load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+    expected = [_trim(r) for r in wb[wb.sheetnames[0]].iter_rows(values_only=True)]
+    wb.close()
+    stream = StreamingWorkbook(data)
+    actual = [_trim(r) for r in stream.iter_rows(stream.sheetnames[0])]
+    stream.close()
+    return expected, actual
+
+
+class TestIterparseEngine:
+    """engine="iterparse" openpyxl ile aynı kayıtları ve sonucu üretir."""
+
+    @pytest.mark.parametrize("data", [
+        _make_epias_excel(),
+        _make_epias_excel(year=2024, month=2, skip_hours=[3, 4, 50], duplicate_hours=[7]),
+        _make_epias_excel(sheet_name="Sheet1", region="TR2"),
+        _make_epias_excel(extra_rows=[
+            (datetime(2026, 3, 5, 1), None, "TR1", "abc", 5),
+            ("05.03.2026", None, "TR1", "1.234,5", 1),
+            (datetime(2026, 3, 5, 2), None, "TR1", 99_999, 1),
+        ]),
+    ])
+    def test_epias_parity(self, data):
+        base = parse_epias_excel(data, "t.xlsx")
+        streamed = parse_epias_excel(data, "t.xlsx", engine="iterparse")
+        assert streamed.result == base.result
+        assert streamed.records == base.records
+
+    @pytest.mark.parametrize("data", [
+        _make_consumption_excel(),
+        _make_consumption_excel(with_saat_column=False, negative_hours=[1, 2]),
+        _make_cansu_excel([1, 2, 4]),
+        _make_cansu_excel([3], date_as_string=False, with_trap_columns=True),
+    ])
+    def test_consumption_parity(self, data):
+        base = parse_consumption_excel(data, "t.xlsx", "C1")
+        streamed = parse_consumption_excel(data, "t.xlsx", "C1", engine="iterparse")
+        assert streamed.result == base.result
+        assert streamed.records == base.records
+
+    def test_invalid_excel(self):
+        out = parse_epias_excel(b"not an excel file", "bad.xlsx", engine="iterparse")
+        assert out.result.success is False
+        assert out.result.quality_score == 0
+
+    def test_unknown_engine_raises(self):
+        with pytest.raises(ValueError, match="Geçersiz Excel motoru"):
+            parse_epias_excel(_make_epias_excel(), "t.xlsx", engine="pandas")
+
+    def test_cell_types_and_row_gaps(self):
+        """Boş satır boşlukları, bool, int/float, tarih/saat hücreleri aynı okunur."""
+        wb = Workbook()
+        ws = wb.active
+        ws["A1"] = "Başlık"
+        ws["C1"] = 1
+        ws["A4"] = 2.5
+        ws["B4"] = True
+        ws["D4"] = datetime(2024, 2, 29, 13, 30)
+        ws["B7"] = 1e20
+        ws["C7"] = -3
+        buf = io.BytesIO()
+        wb.save(buf)
+
+        expected, actual = _sheet_rows(buf.getvalue())
+        assert actual == expected
+        assert actual[1] == ()  # satır 2 boş → numaralandırma korunur
+
+    def test_inline_strings_and_1904_epoch(self):
+        """write_only (inlineStr) ve Mac 1904 tarih sistemi."""
+        from openpyxl.utils.datetime import CALENDAR_MAC_1904
+
+        wb = Workbook(write_only=True)
+        wb.epoch = CALENDAR_MAC_1904
+        ws = wb.create_sheet("Veri")
+        ws.append(["Tarih", "Tüketim"])
+        ws.append([datetime(2026, 3, 1, 5), 12.5])
+        buf = io.BytesIO()
+        wb.save(buf)
+
+        expected, actual = _sheet_rows(buf.getvalue())
+        assert actual == expected
+        assert actual[1][0] == datetime(2026, 3, 1, 5)
+
+    def test_large_sheet_memory_is_flat(self):
+        """İşlenen satırlar ağaçtan ayrılır → bellek satır sayısıyla büyümez."""
+        import tracemalloc
+        from app.pricing.xlsx_stream import StreamingWorkbook
+
+        def _peak(n_rows: int) -> int:
+            wb = Workbook(write_only=True)
+            ws = wb.create_sheet("Veri")
+            for i in range(n_rows):
+                ws.append([i, i * 0.5, "x"])
+            buf = io.BytesIO()
+            wb.save(buf)
+
+            stream = StreamingWorkbook(buf.getvalue())
+            tracemalloc.start()
+            try:
+                for _row in stream.iter_rows("Veri"):
+                    pass
+                return tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+                stream.close()
+
+        small, large = _peak(1_000), _peak(20_000)
+        assert large < small * 2
@@ -0,0 +1,205 @@
+"""
+Pricing Risk Engine — /analyze Saatlik Detay Modu Testleri.
+
+- build_hour_detail: page ve columnar dilimleri calculate_hourly_costs
+  kayıtlarıyla birebir aynı; offset/limit sınırları
+- /analyze: varsayılan özet yanıtta saatlik dizi yok, önbellek satırı da
+  saatlik veri taşımaz; önbellekten dönen yanıta detay yine eklenir
+- hour_detail=page|columnar: marj gerçekliği histogramı (hourly_margins_tl)
+  tam hesapla aynı, önbellekten dönerken de dolu
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+from hypothesis import given, settings, strategies as st
+
+from app.pricing import market_store
+from app.pricing.analysis import (
+    PRICING_HOUR_PAGE_SIZE,
+    build_hour_detail,
+    prepare_analysis,
+)
+from app.pricing.excel_parser import ParsedConsumptionRecord, ParsedMarketRecord
+from app.pricing.models import HourDetailMode, ImbalanceParams
+from app.pricing.pricing_cache import clear_l1_cache, clear_prepared_analyses
+from app.pricing.pricing_engine import calculate_hourly_costs
+
+PERIOD = "2025-01"
+DAYS = 9  # 216 saat > varsayılan sayfa boyu
+
+
+def _market(days: int = DAYS) -> list[ParsedMarketRecord]:
+    return [
+        ParsedMarketRecord(
+            period=PERIOD, date=f"{PERIOD}-{d:02d}", hour=h,
+            ptf_tl_per_mwh=1900.0 + (1800.0 if 17 <= h <= 21 else 0.0) + d * 7,
+            smf_tl_per_mwh=2010.0 + h * 4.5,
+        )
+        for d in range(1, days + 1) for h in range(24)
+    ]
+
+
+def _consumption(days: int = DAYS) -> list[ParsedConsumptionRecord]:
+    return [
+        ParsedConsumptionRecord(
+            date=f"{PERIOD}-{d:02d}", hour=h,
+            consumption_kwh=70.0 + (h % 4) * 21.7 + d * 0.3,
+        )
+        for d in range(1, days + 1) for h in range(24)
+    ]
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Çekirdek
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class TestBuildHourDetail:
+
+    @settings(max_examples=30, deadline=None)
+    @given(
+        multiplier=st.floats(min_value=1.0, max_value=1.3),
+        offset=st.integers(min_value=0, max_value=230),
+        limit=st.one_of(st.none(), st.integers(min_value=1, max_value=300)),
+    )
+    def test_slices_match_hourly_cost_entries(self, multiplier, offset, limit):
+        market, consumption = _market(), _consumption()
+        prepared = prepare_analysis(PERIOD, "C1", market, consumption, yekdem=364.0)
+        entries = calculate_hourly_costs(
+            market, consumption, 364.0, multiplier, ImbalanceParams(),
+        ).hour_costs
+
+        page = build_hour_detail(prepared, multiplier, HourDetailMode.PAGE, offset, limit)
+        size = PRICING_HOUR_PAGE_SIZE if limit is None else limit
+        expected = entries[offset:offset + size]
+        assert page.total_hours == len(entries)
+        assert page.count == len(expected)
+        assert [e.model_dump() for e in page.hours] == [e.model_dump() for e in expected]
+        assert page.columns is None
+
+        columnar = build_hour_detail(prepared, multiplier, HourDetailMode.COLUMNAR, offset, limit)
+        expected = entries[offset:] if limit is None else entries[offset:offset + limit]
+        cols = columnar.columns
+        assert columnar.hours is None
+        assert cols.margin_tl == [e.margin_tl for e in expected]
+        assert cols.sales_price_tl == [e.sales_price_tl for e in expected]
+        assert cols.is_loss_hour == [e.is_loss_hour for e in expected]
+        assert cols.time_zone == [e.time_zone for e in expected]
+        assert cols.date == [e.date for e in expected]
+
+    def test_next_offset_and_summary(self):
+        prepared = prepare_analysis(PERIOD, "C1", _market(), _consumption(), yekdem=0.0)
+        first = build_hour_detail(prepared, 1.05, HourDetailMode.PAGE, 0, 100)
+        assert (first.offset, first.count, first.next_offset) == (0, 100, 100)
+        last = build_hour_detail(prepared, 1.05, HourDetailMode.PAGE, 200, 100)
+        assert (last.count, last.next_offset) == (16, None)
+        beyond = build_hour_detail(prepared, 1.05, HourDetailMode.PAGE, 500, 10)
+        assert (beyond.offset, beyond.count, beyond.hours) == (216, 0, [])
+        assert build_hour_detail(prepared, 1.05, HourDetailMode.SUMMARY) is None
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# /analyze
+# ═══════════════════════════════════════════════════════════════════════════════
+
+@pytest.fixture()
+def db(tmp_path, monkeypatch):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from app.database import Base
+    import app.pricing.schemas  # noqa: F401 — tabloları Base.metadata'a kaydet
+    monkeypatch.setattr(market_store, "PRICING_MARKET_STORE_DIR", str(tmp_path))
+    market_store.clear_market_store()
+    clear_prepared_analyses()
+    clear_l1_cache()
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    market_store.clear_market_store()
+    clear_prepared_analyses()
+    clear_l1_cache()
+
+
+@pytest.fixture()
+def client(db):
+    from app.main import app as fastapi_app
+    from app.database import get_db
+    fastapi_app.dependency_overrides[get_db] = lambda: db
+    yield TestClient(fastapi_app)
+    fastapi_app.dependency_overrides.clear()
+
+
+@pytest.fixture()
+def seeded(db):
+    from app.pricing.bulk_writer import insert_market_records
+    from app.pricing.consumption_service import save_consumption_profile
+    from app.pricing.yekdem_service import create_or_update_yekdem
+
+    insert_market_records(db, _market(), version=1)
+    db.commit()
+    create_or_update_yekdem(db, PERIOD, 364.0)
+    save_consumption_profile(db, "CUST-A", "A", PERIOD, _consumption())
+    return db
+
+
+BODY = {"period": PERIOD, "customer_id": "CUST-A", "multiplier": 1.06}
+
+
+class TestAnalyzeHourDetail:
+
+    def test_summary_default_is_lean(self, client, seeded):
+        from app.pricing.schemas import AnalysisCache
+
+        data = client.post("/api/pricing/analyze", json=BODY).json()
+        assert data["hour_costs"] is None
+        assert data["margin_reality"]["hourly_margins_tl"] == []
+        row = seeded.query(AnalysisCache).one()
+        assert "hour_costs\": null" in row.result_json
+        assert "consumption_kwh\": [" not in row.result_json
+
+    def test_page_and_columnar_on_cache_hit(self, client, seeded):
+        fresh = client.post("/api/pricing/analyze", json={
+            **BODY, "hour_detail": "page", "hour_offset": 24, "hour_limit": 48,
+        }).json()
+        assert fresh["cache_hit"] is False
+        page = fresh["hour_costs"]
+        assert (page["offset"], page["count"], page["next_offset"]) == (24, 48, 72)
+        assert page["hours"][0]["date"] == f"{PERIOD}-02"
+
+        cached = client.post("/api/pricing/analyze", json={
+            **BODY, "hour_detail": "columnar",
+        }).json()
+        assert cached["cache_hit"] is True
+        cols = cached["hour_costs"]["columns"]
+        assert len(cols["margin_tl"]) == DAYS * 24
+        assert cols["margin_tl"][24:72] == [h["margin_tl"] for h in page["hours"]]
+        assert cached["pricing"] == fresh["pricing"]
+
+    def test_hourly_margins_filled_with_hour_detail(self, client, seeded):
+        from app.pricing.analysis import compute_analysis
+
+        expected = compute_analysis(
+            period=PERIOD, customer_id="CUST-A",
+            market_records=_market(), consumption_records=_consumption(),
+            yekdem=364.0, multiplier=1.06, imbalance_params=ImbalanceParams(),
+        ).margin_reality["hourly_margins_tl"]
+        assert len(expected) == DAYS * 24
+
+        fresh = client.post("/api/pricing/analyze", json={**BODY, "hour_detail": "page"}).json()
+        cached = client.post("/api/pricing/analyze", json={**BODY, "hour_detail": "columnar"}).json()
+        summary = client.post("/api/pricing/analyze", json=BODY).json()
+
+        assert fresh["cache_hit"] is False and cached["cache_hit"] is True
+        assert fresh["margin_reality"]["hourly_margins_tl"] == expected
+        assert cached["margin_reality"]["hourly_margins_tl"] == expected
+        assert summary["margin_reality"]["hourly_margins_tl"] == []
+
+    def test_limit_bounds(self, client, seeded):
+        resp = client.post("/api/pricing/analyze", json={**BODY, "hour_limit": 745})
+        assert resp.status_code == 422
@@ -0,0 +1,216 @@
+"""
+Pricing Risk Engine — Artımlı Analiz (Hazırlık Önbelleği) Testleri.
+
+- prepare_analysis + finish_analysis: zarar haritası ve toplamlar
+  calculate_hourly_costs saat kayıtları ile birebir aynı
+- /analyze: yalnız teklif parametresi değişince veri yeniden yüklenmez,
+  sonuç önbelleksiz tam çalıştırma ile aynı
+- Veri versiyonu / tüketim kaynağı değişince hazırlık yeniden kurulur
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+from hypothesis import given, settings, strategies as st
+
+from app.pricing import market_store, router as pricing_router_module
+from app.pricing.analysis import finish_analysis, prepare_analysis
+from app.pricing.excel_parser import ParsedConsumptionRecord, ParsedMarketRecord
+from app.pricing.models import ImbalanceParams
+from app.pricing.pricing_cache import (
+    build_prep_key,
+    clear_l1_cache,
+    clear_prepared_analyses,
+    get_prepared_analysis,
+    invalidate_cache_for_period,
+)
+from app.pricing.pricing_engine import calculate_hourly_costs
+
+PERIOD = "2025-01"
+
+
+def _market(days: int = 3) -> list[ParsedMarketRecord]:
+    return [
+        ParsedMarketRecord(
+            period=PERIOD, date=f"{PERIOD}-{d:02d}", hour=h,
+            ptf_tl_per_mwh=2000.0 + (1500.0 if 17 <= h <= 21 else 0.0) + d * 10,
+            smf_tl_per_mwh=2060.0 + d * 10,
+        )
+        for d in range(1, days + 1) for h in range(24)
+    ]
+
+
+def _consumption(scale: float, days: int = 3) -> list[ParsedConsumptionRecord]:
+    return [
+        ParsedConsumptionRecord(
+            date=f"{PERIOD}-{d:02d}", hour=h,
+            consumption_kwh=scale * (1.0 + (h % 7) * 0.3),
+        )
+        for d in range(1, days + 1) for h in range(24)
+    ]
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Çekirdek
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class TestFinishAnalysis:
+
+    @settings(max_examples=40, deadline=None)
+    @given(
+        multiplier=st.floats(min_value=0.9, max_value=1.3),
+        dealer=st.floats(min_value=0, max_value=100),
+        smf_based=st.booleans(),
+    )
+    def test_matches_hourly_cost_entries(self, multiplier, dealer, smf_based):
+        market, consumption = _market(), _consumption(100.0)
+        imbalance = ImbalanceParams(smf_based_imbalance_enabled=smf_based)
+        prepared = prepare_analysis(PERIOD, "C1", market, consumption, yekdem=364.0)
+        result = finish_analysis(prepared, multiplier, imbalance, dealer)
+
+        hourly = calculate_hourly_costs(
+            market, consumption, 364.0, multiplier, imbalance,
+            dealer_commission_pct=dealer,
+            distribution_unit_price_tl_per_kwh=prepared.dist_unit_price,
+        )
+        loss = [e for e in hourly.hour_costs if e.is_loss_hour]
+        assert result.loss_map.total_loss_hours == len(loss)
+        assert result.loss_map.total_loss_tl == round(sum(e.margin_tl for e in loss), 2)
+        assert result.loss_map.worst_hours == [
+            {"date": e.date, "hour": e.hour, "ptf": e.ptf_tl_per_mwh,
+             "sales_price": e.sales_price_tl, "loss_tl": e.margin_tl}
+            for e in sorted(loss, key=lambda e: e.margin_tl)[:10]
+        ]
+        assert result.pricing.total_net_margin_tl == hourly.total_net_margin_tl
+        assert result.pricing.total_sales_tl == hourly.total_sales_revenue_tl
+
+    def test_prepared_is_not_mutated(self):
+        prepared = prepare_analysis(
+            PERIOD, "C1", _market(), _consumption(100.0), yekdem=364.0,
+            warnings=[{"type": "yekdem_missing", "message": "x"}],
+        )
+        first = finish_analysis(prepared, 0.95, ImbalanceParams())
+        first.warnings.append({"type": "extra"})
+        first.risk_score.reasons.append("extra")
+        second = finish_analysis(prepared, 0.95, ImbalanceParams())
+        assert second.model_dump() == finish_analysis(prepared, 0.95, ImbalanceParams()).model_dump()
+        assert {"type": "extra"} not in second.warnings
+        assert "extra" not in second.risk_score.reasons
+
+
+class TestPrepKey:
+
+    def test_offer_parameters_not_in_key(self):
+        base = dict(customer_id="C1", period=PERIOD, data_versions={"market_data": 1})
+        assert build_prep_key(**base) == build_prep_key(**base, voltage_level="OG")
+        assert build_prep_key(**base) != build_prep_key(
+            customer_id="C1", period=PERIOD, data_versions={"market_data": 2},
+        )
+        assert build_prep_key(**base) != build_prep_key(**base, voltage_level="ag")
+        assert build_prep_key(**base, consumption_source={"t1_kwh": 1.0}) != build_prep_key(
+            **base, consumption_source={"t1_kwh": 2.0},
+        )
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# /analyze
+# ═══════════════════════════════════════════════════════════════════════════════
+
+@pytest.fixture()
+def db(tmp_path, monkeypatch):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from app.database import Base
+    import app.pricing.schemas  # noqa: F401 — tabloları Base.metadata'a kaydet
+    monkeypatch.setattr(market_store, "PRICING_MARKET_STORE_DIR", str(tmp_path))
+    market_store.clear_market_store()
+    clear_prepared_analyses()
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    market_store.clear_market_store()
+    clear_prepared_analyses()
+
+
+@pytest.fixture()
+def client(db):
+    from app.main import app as fastapi_app
+    from app.database import get_db
+    fastapi_app.dependency_overrides[get_db] = lambda: db
+    yield TestClient(fastapi_app)
+    fastapi_app.dependency_overrides.clear()
+
+
+@pytest.fixture()
+def seeded(db):
+    from app.pricing.bulk_writer import insert_market_records
+    from app.pricing.consumption_service import save_consumption_profile
+    from app.pricing.yekdem_service import create_or_update_yekdem
+
+    insert_market_records(db, _market(), version=1)
+    db.commit()
+    create_or_update_yekdem(db, PERIOD, 364.0)
+    save_consumption_profile(db, "CUST-A", "A", PERIOD, _consumption(100.0))
+    return db
+
+
+def _analyze(client, **params):
+    body = {"period": PERIOD, "customer_id": "CUST-A", "multiplier": 1.05, **params}
+    resp = client.post("/api/pricing/analyze", json=body)
+    assert resp.status_code == 200, resp.text
+    return resp.json()
+
+
+class TestAnalyzeIncremental:
+
+    def test_parameter_change_skips_loading(self, client, seeded, monkeypatch):
+        _analyze(client)
+
+        def _fail(*_a, **_k):
+            raise AssertionError("veri yeniden yüklenmemeli")
+
+        monkeypatch.setattr(pricing_router_module, "_load_market_records", _fail)
+        monkeypatch.setattr(pricing_router_module, "_get_or_generate_consumption", _fail)
+        tweaked = _analyze(
+            client, multiplier=1.08, dealer_commission_pct=20,
+            imbalance_params={"forecast_error_rate": 0.1, "smf_based_imbalance_enabled": True},
+        )
+        assert tweaked["cache_hit"] is False
+        assert tweaked["pricing"]["multiplier"] == 1.08
+
+    def test_incremental_equals_full_run(self, client, seeded, db):
+        _analyze(client)
+        params = dict(multiplier=1.01, dealer_commission_pct=35)
+        incremental = _analyze(client, **params)
+
+        clear_prepared_analyses()
+        clear_l1_cache()
+        from app.pricing.schemas import AnalysisCache
+        db.query(AnalysisCache).delete()
+        db.commit()
+        full = _analyze(client, **params)
+        assert incremental == full
+
+    def test_consumption_reupload_rebuilds_preparation(self, client, seeded, db):
+        from app.pricing.consumption_service import save_consumption_profile
+
+        first = _analyze(client)
+        save_consumption_profile(db, "CUST-A", "A", PERIOD, _consumption(250.0))
+        second = _analyze(client, multiplier=1.06)
+        assert second["weighted_prices"]["total_consumption_kwh"] == pytest.approx(
+            first["weighted_prices"]["total_consumption_kwh"] * 2.5,
+        )
+
+    def test_invalidate_period_drops_preparation(self, client, seeded, db):
+        _analyze(client)
+        from app.pricing.pricing_cache import _prep_for
+        assert len(_prep_for(db)) == 1
+        invalidate_cache_for_period(db, PERIOD)
+        assert len(_prep_for(db)) == 0
+        assert get_prepared_analysis(db, "yok") is None
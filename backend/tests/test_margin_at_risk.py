@@ -0,0 +1,229 @@
+"""
+Pricing Risk Engine — Monte Carlo Marj Riski Testleri.
+
+- Gün şekli kütüphanesi: tam günler, dönem ortalamasına normalize, gün tipi
+- Blok bootstrap: hedef gün tipine uygun kütüphane günü seçilir
+- Gürültüsüz tek şekilli kütüphane → tüm yollar deterministik marja eşit
+- Aynı tohum → aynı dağılım; süreç havuzu aynı sonucu verir
+- /margin-at-risk: P5 ≤ P50 ≤ P95, CVaR ≥ VaR, geçmiş yoksa 422
+"""
+
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from hypothesis import given, settings, strategies as st
+
+from app.pricing import market_store
+from app.pricing.excel_parser import ParsedConsumptionRecord, ParsedMarketRecord
+from app.pricing.margin_at_risk import (
+    SATURDAY,
+    SUNDAY,
+    WEEKDAY,
+    _sample_days,
+    build_inputs,
+    build_shape_library,
+    day_type_code,
+    history_periods,
+    run_margin_at_risk,
+    simulate_paths,
+)
+from app.pricing.market_store import SEGMENT_DTYPE, MarketSegment
+from app.pricing.models import ImbalanceParams
+from app.pricing.period_frame import build_period_frame, seq_sum
+from app.pricing.pricing_cache import clear_prepared_analyses
+from app.pricing.pricing_engine import build_cost_basis, summarize_cost_totals
+
+PERIOD = "2025-01"
+
+
+def _segment(period: str, ptf_of) -> MarketSegment:
+    start = date.fromisoformat(f"{period}-01")
+    rows, day = [], start
+    while day.month == start.month:
+        for h in range(24):
+            ptf = ptf_of(day, h)
+            rows.append((day.isoformat(), h, ptf, ptf * 1.05))
+        day += timedelta(days=1)
+    return MarketSegment(period, 1, "t", np.array(rows, dtype=SEGMENT_DTYPE))
+
+
+def _records(days: int = 14, ptf: float = 2500.0):
+    market = [
+        ParsedMarketRecord(
+            period=PERIOD, date=f"{PERIOD}-{d:02d}", hour=h,
+            ptf_tl_per_mwh=ptf + (900.0 if 17 <= h <= 21 else 0.0),
+            smf_tl_per_mwh=ptf * 1.05,
+        )
+        for d in range(1, days + 1) for h in range(24)
+    ]
+    consumption = [
+        ParsedConsumptionRecord(
+            date=f"{PERIOD}-{d:02d}", hour=h, consumption_kwh=50.0 + h * 3.0,
+        )
+        for d in range(1, days + 1) for h in range(24)
+    ]
+    return market, consumption
+
+
+def _weekday_pattern(day: date, hour: int) -> float:
+    return 1000.0 * (1 + day_type_code(day)) + hour
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Kütüphane + Örnekleme
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class TestShapeLibrary:
+
+    def test_normalized_complete_days(self):
+        segment = _segment("2024-12", _weekday_pattern)
+        # Eksik gün kütüphaneye girmez
+        partial = segment.rows[segment.rows["date"] != "2024-12-31"]
+        partial = np.concatenate([partial, segment.rows[-5:]])
+        library = build_shape_library([MarketSegment("2024-12", 1, "t", partial)])
+
+        assert library.n_days == 30
+        assert library.periods == ("2024-12",)
+        level = float(np.mean(partial["ptf"]))
+        assert library.ptf[0, 3] == pytest.approx(_weekday_pattern(date(2024, 12, 1), 3) / level)
+        assert library.day_type[0] == SUNDAY  # 2024-12-01 Pazar
+
+    def test_empty_and_history_periods(self):
+        assert build_shape_library([]).n_days == 0
+        assert history_periods("2025-02", 3) == ["2024-12", "2025-01", "2025-02"]
+
+    @settings(max_examples=20, deadline=None)
+    @given(block=st.integers(min_value=1, max_value=7), seed=st.integers(min_value=0, max_value=10**6))
+    def test_bootstrap_respects_day_type(self, block, seed):
+        library = build_shape_library([_segment("2024-11", _weekday_pattern)])
+        basis = build_cost_basis(build_period_frame(*_records()), 0.0)
+        inputs = build_inputs(basis, library, 1.05, ImbalanceParams(), block_days=block)
+        sampled = _sample_days(np.random.default_rng(seed), inputs, 16)
+        assert (library.day_type[sampled] == inputs.target_day_types).all()
+        assert set(inputs.target_day_types.tolist()) == {WEEKDAY, SATURDAY, SUNDAY}
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Simülasyon
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class TestSimulation:
+
+    def test_degenerate_paths_equal_nominal(self):
+        # Şekil = referans saatlik fiyat, gürültü yok → her yol nominal marj
+        market, consumption = _records()
+        basis = build_cost_basis(build_period_frame(market, consumption), 364.0)
+        level = float(np.mean(basis.frame.ptf))
+        shape_ptf = basis.frame.ptf[:24] / level
+        library_segment = _segment("2024-12", lambda d, h: float(shape_ptf[h]) * 1000.0)
+        library = build_shape_library([library_segment])
+        imbalance = ImbalanceParams(forecast_error_rate=0.05)
+
+        inputs = build_inputs(
+            basis, library, 1.07, imbalance, dealer_commission_pct=15,
+            consumption_noise=0.0, price_level_sigma=0.0,
+        )
+        net = simulate_paths(inputs, 50, seed=1)
+        nominal = summarize_cost_totals(
+            basis, seq_sum(basis.kwh_energy * 1.07 / 1000.0), imbalance, 15,
+        )
+        assert np.allclose(net, nominal["total_net_margin_tl"], atol=0.02)
+
+    def test_seeded_and_chunk_stable(self):
+        library = build_shape_library([_segment("2024-12", _weekday_pattern)])
+        basis = build_cost_basis(build_period_frame(*_records()), 364.0)
+        inputs = build_inputs(basis, library, 1.05, ImbalanceParams(smf_based_imbalance_enabled=True))
+        first = run_margin_at_risk(inputs, n_paths=3000, seed=11)
+        assert run_margin_at_risk(inputs, n_paths=3000, seed=11) == first
+        assert run_margin_at_risk(inputs, n_paths=3000, seed=12) != first
+        assert first.p5_net_margin_tl <= first.p50_net_margin_tl <= first.p95_net_margin_tl
+        assert first.cvar_tl >= first.var_tl
+        assert first.var_tl == -first.percentiles["p5"]
+
+    def test_process_pool_matches_in_process(self):
+        library = build_shape_library([_segment("2024-12", _weekday_pattern)])
+        basis = build_cost_basis(build_period_frame(*_records()), 364.0)
+        inputs = build_inputs(basis, library, 1.05, ImbalanceParams())
+        in_process = simulate_paths(inputs, 2500, seed=5, max_workers=1)
+        pooled = simulate_paths(inputs, 2500, seed=5, max_workers=2)
+        assert np.array_equal(in_process, pooled)
+
+    def test_invalid_arguments(self):
+        library = build_shape_library([_segment("2024-12", _weekday_pattern)])
+        basis = build_cost_basis(build_period_frame(*_records()), 364.0)
+        inputs = build_inputs(basis, library, 1.05, ImbalanceParams())
+        with pytest.raises(ValueError):
+            run_margin_at_risk(inputs, n_paths=0)
+        with pytest.raises(ValueError):
+            run_margin_at_risk(inputs, n_paths=10, confidence=1.0)
+        with pytest.raises(ValueError, match="geçmiş piyasa"):
+            build_inputs(basis, build_shape_library([]), 1.05, ImbalanceParams())
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# /margin-at-risk
+# ═══════════════════════════════════════════════════════════════════════════════
+
+@pytest.fixture()
+def db(tmp_path, monkeypatch):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from app.database import Base
+    import app.pricing.schemas  # noqa: F401 — tabloları Base.metadata'a kaydet
+    monkeypatch.setattr(market_store, "PRICING_MARKET_STORE_DIR", str(tmp_path))
+    market_store.clear_market_store()
+    clear_prepared_analyses()
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    market_store.clear_market_store()
+    clear_prepared_analyses()
+
+
+@pytest.fixture()
+def client(db):
+    from app.main import app as fastapi_app
+    from app.database import get_db
+    fastapi_app.dependency_overrides[get_db] = lambda: db
+    yield TestClient(fastapi_app)
+    fastapi_app.dependency_overrides.clear()
+
+
+class TestMarginAtRiskEndpoint:
+
+    def test_distribution(self, client, db):
+        from app.pricing.bulk_writer import insert_market_records
+        from app.pricing.consumption_service import save_consumption_profile
+
+        market, consumption = _records()
+        insert_market_records(db, market, version=1)
+        db.commit()
+        save_consumption_profile(db, "CUST-A", "A", PERIOD, consumption)
+
+        body = {"period": PERIOD, "customer_id": "CUST-A", "multiplier": 1.06,
+                "n_paths": 2000, "seed": 3}
+        resp = client.post("/api/pricing/margin-at-risk", json=body)
+        assert resp.status_code == 200, resp.text
+        data = resp.json()
+        mar = data["margin_at_risk"]
+        assert mar["history_periods"] == [PERIOD]
+        assert mar["history_days"] == 14
+        assert mar["p5_net_margin_tl"] <= mar["p50_net_margin_tl"] <= mar["p95_net_margin_tl"]
+        assert client.post("/api/pricing/margin-at-risk", json=body).json() == data
+
+    def test_too_many_paths(self, client, db, monkeypatch):
+        from app.pricing import router as pricing_router_module
+        monkeypatch.setattr(pricing_router_module, "PRICING_MAR_MAX_PATHS", 10)
+        body = {"period": PERIOD, "customer_id": "CUST-A", "multiplier": 1.06, "n_paths": 11}
+        resp = client.post("/api/pricing/margin-at-risk", json=body)
+        assert resp.status_code == 422
+        assert resp.json()["detail"]["error"] == "too_many_paths"
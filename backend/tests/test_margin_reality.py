@@ -854,3 +854,159 @@ class TestPricingAggressiveness:
             PricingAggressiveness.MEDIUM,
             PricingAggressiveness.HIGH,
         )
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Vektörel çekirdek: döngü versiyonuyla parite + çok dönemli giriş
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+def _loop_reference(offer_ptf, yekdem, multiplier, ptf_list, kwh_list, timestamps=None):
+    """Eski saat-başına-nesne döngüsü (toplamlar, histogram, en kötü/en iyi)."""
+    offer_unit = (offer_ptf + yekdem) / 1000.0 * multiplier
+    margins, details = [], []
+    total_cost = total_offer = total_kwh = neg_total = pos_total = 0.0
+    neg_hours = 0
+    for i, (p, k) in enumerate(zip(ptf_list, kwh_list)):
+        if k <= 0:
+            margins.append(0.0)
+            continue
+        cost = (p + yekdem) / 1000.0 * k
+        offer = offer_unit * k
+        m = offer - cost
+        margins.append(round(m, 2))
+        total_cost += cost
+        total_offer += offer
+        total_kwh += k
+        if m < 0:
+            neg_hours += 1
+            neg_total += m
+        else:
+            pos_total += m
+        ts = timestamps[i] if timestamps else f"H{i:04d}"
+        details.append((ts, round(p, 2), round(k, 2), round(cost, 2), round(m, 2)))
+    ordered = sorted(details, key=lambda d: d[4])
+    return {
+        "total_cost_tl": round(total_cost, 2),
+        "total_offer_tl": round(total_offer, 2),
+        "total_consumption_kwh": round(total_kwh, 2),
+        "negative_margin_hours": neg_hours,
+        "negative_margin_total_tl": round(neg_total, 2),
+        "positive_margin_total_tl": round(pos_total, 2),
+        "hourly_margins_tl": margins,
+        "worst": ordered[:10],
+        "best": ordered[-10:][::-1],
+    }
+
+
+def _as_tuples(hours):
+    return [(h.hour, h.ptf_tl_per_mwh, h.consumption_kwh, h.cost_tl, h.margin_tl) for h in hours]
+
+
+class TestVectorizedParity:
+    """NumPy çekirdeği döngü versiyonuyla birebir aynı sonucu verir."""
+
+    @pytest.mark.parametrize("seed", [0, 1, 2])
+    def test_matches_loop_reference(self, seed):
+        import random
+        rng = random.Random(seed)
+        ptf_list = [rng.choice([1800.0, 2500.0, 3100.5]) + rng.random() * 900 for _ in range(744)]
+        kwh_list = [rng.choice([0.0, 40.0, 85.25, rng.random() * 120]) for _ in range(744)]
+        timestamps = [f"2026-01-{d:02d} {h:02d}:00" for d in range(1, 32) for h in range(24)]
+
+        result = calculate_margin_reality(
+            offer_ptf_tl_per_mwh=2400.0, yekdem_tl_per_mwh=360.0, multiplier=1.05,
+            hourly_ptf_prices=ptf_list, hourly_consumption_kwh=kwh_list,
+            hourly_timestamps=timestamps,
+        )
+        ref = _loop_reference(2400.0, 360.0, 1.05, ptf_list, kwh_list, timestamps)
+
+        for key in ("total_cost_tl", "total_offer_tl", "total_consumption_kwh",
+                    "negative_margin_hours", "negative_margin_total_tl",
+                    "positive_margin_total_tl", "hourly_margins_tl"):
+            assert getattr(result, key) == ref[key], key
+        assert _as_tuples(result.worst_hours) == ref["worst"]
+        assert _as_tuples(result.best_hours) == ref["best"]
+
+    def test_ties_keep_loop_order(self):
+        """Eşit marjlarda: en kötülerde önceki saat, en iyilerde sonraki saat önde."""
+        ptf_list, kwh_list = _make_uniform_hours(ptf=2000.0, kwh=60.0, count=30)
+        result = calculate_margin_reality(
+            offer_ptf_tl_per_mwh=2000.0, yekdem_tl_per_mwh=500.0, multiplier=1.04,
+            hourly_ptf_prices=ptf_list, hourly_consumption_kwh=kwh_list,
+        )
+        assert [h.hour for h in result.worst_hours] == [f"H{i:04d}" for i in range(10)]
+        assert [h.hour for h in result.best_hours] == [f"H{i:04d}" for i in range(29, 19, -1)]
+
+    def test_hourly_margins_optional(self):
+        ptf_list, kwh_list = _make_uniform_hours(ptf=2000.0, kwh=60.0, count=50)
+        result = calculate_margin_reality(
+            offer_ptf_tl_per_mwh=2000.0, yekdem_tl_per_mwh=500.0, multiplier=1.04,
+            hourly_ptf_prices=ptf_list, hourly_consumption_kwh=kwh_list,
+            include_hourly_margins=False,
+        )
+        assert result.hourly_margins_tl == []
+        assert result.total_hours == 50
+
+
+class TestMultiPeriod:
+    """calculate_margin_reality_multi — yıllık analiz tek çağrıda."""
+
+    def test_single_period_same_hours(self):
+        from app.pricing.margin_reality import MarginRealityPeriod, calculate_margin_reality_multi
+
+        ptf_list, kwh_list = _make_peak_heavy_hours(1500.0, 3000.0, 30.0, 100.0, total_hours=100)
+        single = calculate_margin_reality(
+            offer_ptf_tl_per_mwh=2000.0, yekdem_tl_per_mwh=500.0, multiplier=1.04,
+            hourly_ptf_prices=ptf_list, hourly_consumption_kwh=kwh_list,
+        )
+        multi = calculate_margin_reality_multi(
+            [MarginRealityPeriod(2000.0, 500.0, ptf_list, kwh_list)], multiplier=1.04,
+        )
+        assert multi.hourly_margins_tl == single.hourly_margins_tl
+        assert multi.worst_hours == single.worst_hours
+        assert multi.total_cost_tl == single.total_cost_tl
+        assert multi.real_margin_pct == single.real_margin_pct
+
+    def test_year_sums_periods(self):
+        from app.pricing.margin_reality import MarginRealityPeriod, calculate_margin_reality_multi
+
+        periods = []
+        for month in range(1, 13):
+            ptf_list, kwh_list = _make_peak_heavy_hours(
+                1500.0 + month * 40, 3000.0, 30.0, 100.0, total_hours=720,
+            )
+            periods.append(MarginRealityPeriod(
+                offer_ptf_tl_per_mwh=2000.0 + month * 25,
+                yekdem_tl_per_mwh=400.0 + month * 10,
+                hourly_ptf_prices=ptf_list,
+                hourly_consumption_kwh=kwh_list,
+                hourly_timestamps=[f"2025-{month:02d} #{i}" for i in range(720)],
+            ))
+        monthly = [
+            calculate_margin_reality(
+                offer_ptf_tl_per_mwh=p.offer_ptf_tl_per_mwh,
+                yekdem_tl_per_mwh=p.yekdem_tl_per_mwh,
+                multiplier=1.04,
+                hourly_ptf_prices=p.hourly_ptf_prices,
+                hourly_consumption_kwh=p.hourly_consumption_kwh,
+            )
+            for p in periods
+        ]
+        year = calculate_margin_reality_multi(periods, multiplier=1.04)
+
+        assert year.total_hours == 12 * 720
+        assert len(year.hourly_margins_tl) == 12 * 720
+        assert year.negative_margin_hours == sum(m.negative_margin_hours for m in monthly)
+        assert year.total_cost_tl == pytest.approx(sum(m.total_cost_tl for m in monthly), abs=0.1)
+        assert year.total_offer_tl == pytest.approx(sum(m.total_offer_tl for m in monthly), abs=0.1)
+        assert year.real_margin_tl == pytest.approx(sum(m.real_margin_tl for m in monthly), abs=0.1)
+        # Aylık en kötü saatlerin en kötüsü yıllık listenin başındadır
+        assert year.worst_hours[0].margin_tl == min(m.worst_hours[0].margin_tl for m in monthly)
+        assert year.worst_hours[0].hour.startswith("2025-")
+
+    def test_empty_periods_rejected(self):
+        from app.pricing.margin_reality import calculate_margin_reality_multi
+
+        with pytest.raises(ValueError):
+            calculate_margin_reality_multi([], multiplier=1.04)
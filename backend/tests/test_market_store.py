@@ -0,0 +1,272 @@
+"""
+Pricing Risk Engine — Paylaşımlı Piyasa Dönem Deposu Testleri.
+
+- Segment içeriği aktif hourly_market_prices satırları ile aynı
+- Yeni versiyon / versiyonsuz yazım → eski segment okunmaz
+- data_versions kaydı olan dönem: anahtar tek satırdan, saatlik satırlar
+  taranmaz
+- Atomik yayın: dönem başına tek segment dosyası, mmap ile açılır
+- Diğer worker senaryosu: işlem içi önbellek boşken diskten açılır
+- Veritabanı kimliği: aynı anahtarı üreten iki veritabanı birbirinin
+  segmentini görmez; aynı SQLite dosyasına bağlanan engine'ler paylaşır
+"""
+
+import os
+from datetime import datetime
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+import app.pricing.schemas  # noqa: F401 — tabloları kaydet
+
+from app.pricing import market_store
+from app.pricing.market_store import (
+    clear_market_store,
+    get_market_segment,
+    rebuild_market_segment,
+)
+from app.pricing.schemas import DataVersion, HourlyMarketPrice
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Fixtures
+# ═══════════════════════════════════════════════════════════════════════════════
+
+@pytest.fixture
+def db_session():
+    """In-memory SQLite session."""
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    session = Session()
+    yield session
+    session.close()
+
+
+@pytest.fixture(autouse=True)
+def store_dir(tmp_path, monkeypatch):
+    """Her test kendi segment dizinini kullanır."""
+    monkeypatch.setattr(market_store, "PRICING_MARKET_STORE_DIR", str(tmp_path))
+    clear_market_store()
+    yield tmp_path
+    clear_market_store()
+
+
+def _session(url: str = "sqlite:///:memory:"):
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)()
+
+
+def _insert_period(db, period: str, version: int, ptf_base: float, hours: int = 48):
+    for i in range(hours):
+        db.add(HourlyMarketPrice(
+            period=period,
+            date=f"{period}-{i // 24 + 1:02d}",
+            hour=i % 24,
+            ptf_tl_per_mwh=ptf_base + i,
+            smf_tl_per_mwh=ptf_base + i + 50,
+            version=version,
+            is_active=1,
+        ))
+    db.commit()
+
+
+def _add_version(db, period: str, version: int, row_count: int = 48):
+    db.query(DataVersion).filter(DataVersion.period == period).update(
+        {DataVersion.is_active: 0},
+    )
+    db.add(DataVersion(
+        data_type="market_data", period=period, version=version,
+        row_count=row_count, is_active=1,
+    ))
+    db.commit()
+
+
+def _deactivate(db, period: str):
+    db.query(HourlyMarketPrice).filter(
+        HourlyMarketPrice.period == period,
+    ).update({HourlyMarketPrice.is_active: 0})
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Testler
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class TestMarketSegment:
+
+    def test_empty_period(self, db_session):
+        segment = get_market_segment(db_session, "2025-01")
+        assert len(segment) == 0
+        assert segment.to_records() == []
+
+    def test_records_match_active_rows(self, db_session):
+        _insert_period(db_session, "2025-01", 1, 2000.0)
+        records = get_market_segment(db_session, "2025-01").to_records()
+        assert len(records) == 48
+        assert records[0].date == "2025-01-01" and records[0].hour == 0
+        assert records[25].ptf_tl_per_mwh == 2025.0
+        assert records[25].smf_tl_per_mwh == 2075.0
+        assert all(r.period == "2025-01" for r in records)
+
+    def test_segment_is_memory_mapped_single_file(self, db_session, store_dir):
+        _insert_period(db_session, "2025-01", 1, 2000.0)
+        segment = get_market_segment(db_session, "2025-01")
+        assert isinstance(segment.rows, np.memmap)
+        assert not segment.rows.flags.writeable
+        assert os.listdir(market_store._store_dir(db_session)) == [
+            f"2025-01_v1_{segment.stamp}.npy"
+        ]
+
+    def test_new_version_replaces_segment(self, db_session, store_dir):
+        _insert_period(db_session, "2025-01", 1, 2000.0)
+        get_market_segment(db_session, "2025-01")
+
+        _deactivate(db_session, "2025-01")
+        _insert_period(db_session, "2025-01", 2, 3000.0, hours=24)
+        segment = rebuild_market_segment(db_session, "2025-01")
+
+        assert segment.version == 2
+        assert len(segment) == 24
+        assert get_market_segment(db_session, "2025-01").to_records()[0].ptf_tl_per_mwh == 3000.0
+        assert os.listdir(market_store._store_dir(db_session)) == [
+            f"2025-01_v2_{segment.stamp}.npy"
+        ]
+
+    def test_unversioned_write_not_served_stale(self, db_session):
+        """Versiyon artmadan yapılan düzeltme de stamp'i değiştirir."""
+        _insert_period(db_session, "2025-01", 1, 2000.0)
+        before = get_market_segment(db_session, "2025-01")
+
+        row = db_session.query(HourlyMarketPrice).filter_by(date="2025-01-01", hour=5).one()
+        row.ptf_tl_per_mwh = 9999.0
+        db_session.commit()
+
+        after = get_market_segment(db_session, "2025-01")
+        assert after.version == before.version
+        assert after.stamp != before.stamp
+        assert after.ptf_index()[("2025-01-01", 5)] == 9999.0
+
+    def test_other_worker_opens_published_segment(self, db_session, monkeypatch):
+        """İşlem içi önbellek boş → DB satırları okunmadan diskten açılır."""
+        _insert_period(db_session, "2025-01", 1, 2000.0)
+        first = get_market_segment(db_session, "2025-01")
+        clear_market_store()
+
+        def _fail(*_args, **_kwargs):
+            raise AssertionError("segment diskte varken satırlar yeniden okundu")
+
+        monkeypatch.setattr(market_store, "_query_rows", _fail)
+        second = get_market_segment(db_session, "2025-01")
+        assert second.stamp == first.stamp
+        assert second.to_records() == first.to_records()
+
+    def test_periods_isolated(self, db_session, store_dir):
+        _insert_period(db_session, "2025-01", 1, 2000.0)
+        _insert_period(db_session, "2025-02", 1, 2500.0)
+        jan = get_market_segment(db_session, "2025-01")
+        feb = get_market_segment(db_session, "2025-02")
+        assert jan.to_records()[0].ptf_tl_per_mwh == 2000.0
+        assert feb.to_records()[0].ptf_tl_per_mwh == 2500.0
+        assert len(os.listdir(market_store._store_dir(db_session))) == 2
+
+
+class TestVersionedKey:
+    """Yükleme / EPİAŞ alımı data_versions satırı yazar → anahtar oradan."""
+
+    def test_warm_lookup_reads_only_data_versions(self, db_session):
+        _insert_period(db_session, "2025-01", 1, 2000.0)
+        _add_version(db_session, "2025-01", 1)
+        first = get_market_segment(db_session, "2025-01")
+
+        statements: list[str] = []
+
+        def _record(_conn, _cursor, statement, *_args):
+            statements.append(statement)
+
+        engine = db_session.get_bind()
+        event.listen(engine, "before_cursor_execute", _record)
+        try:
+            again = get_market_segment(db_session, "2025-01")
+        finally:
+            event.remove(engine, "before_cursor_execute", _record)
+
+        assert again is first
+        assert len(statements) == 1
+        assert "data_versions" in statements[0]
+        assert "hourly_market_prices" not in statements[0]
+
+    def test_new_data_version_replaces_segment(self, db_session, store_dir):
+        _insert_period(db_session, "2025-01", 1, 2000.0)
+        _add_version(db_session, "2025-01", 1)
+        before = get_market_segment(db_session, "2025-01")
+
+        _deactivate(db_session, "2025-01")
+        _insert_period(db_session, "2025-01", 2, 3000.0, hours=24)
+        _add_version(db_session, "2025-01", 2, row_count=24)
+
+        after = get_market_segment(db_session, "2025-01")
+        assert (after.version, len(after)) == (2, 24)
+        assert after.stamp != before.stamp
+        assert after.to_records()[0].ptf_tl_per_mwh == 3000.0
+
+    def test_batch_mixes_versioned_and_unversioned(self, db_session):
+        _insert_period(db_session, "2025-01", 1, 2000.0)
+        _add_version(db_session, "2025-01", 1)
+        _insert_period(db_session, "2025-02", 1, 2500.0)
+
+        segments = market_store.get_market_segments(
+            db_session, ["2025-01", "2025-02", "2025-03"],
+        )
+        assert segments["2025-01"].stamp == get_market_segment(db_session, "2025-01").stamp
+        assert segments["2025-02"].stamp == get_market_segment(db_session, "2025-02").stamp
+        assert segments["2025-02"].to_records()[0].ptf_tl_per_mwh == 2500.0
+        assert len(segments["2025-03"]) == 0
+
+
+class TestDatabaseIdentity:
+    """Segmentler sistem geçici dizininde paylaşılır → veritabanı ayrılmalı."""
+
+    def test_same_keys_in_two_databases_do_not_collide(self, store_dir):
+        staging, prod = _session(), _session()
+        try:
+            for db, base in ((staging, 1000.0), (prod, 2000.0)):
+                _insert_period(db, "2025-01", 1, base)
+                _add_version(db, "2025-01", 1)
+                # Aynı id / versiyon / satır sayısı / zaman damgası
+                db.query(DataVersion).update({DataVersion.created_at: datetime(2025, 2, 1)})
+                db.commit()
+
+            first = get_market_segment(staging, "2025-01")
+            second = get_market_segment(prod, "2025-01")
+            assert first.stamp != second.stamp
+            assert first.to_records()[0].ptf_tl_per_mwh == 1000.0
+            assert second.to_records()[0].ptf_tl_per_mwh == 2000.0
+
+            clear_market_store()
+            assert get_market_segment(prod, "2025-01").to_records()[0].ptf_tl_per_mwh == 2000.0
+            assert len(os.listdir(store_dir)) == 2  # veritabanı başına bir alt dizin
+        finally:
+            staging.close()
+            prod.close()
+
+    def test_engines_on_same_sqlite_file_share_segments(self, tmp_path, monkeypatch):
+        url = f"sqlite:///{tmp_path / 'pricing.db'}"
+        api, worker = _session(url), _session(url)
+        try:
+            _insert_period(api, "2025-01", 1, 2000.0)
+            first = get_market_segment(api, "2025-01")
+
+            def _fail(*_args, **_kwargs):
+                raise AssertionError("aynı veritabanının segmenti yeniden kuruldu")
+
+            monkeypatch.setattr(market_store, "_query_rows", _fail)
+            second = get_market_segment(worker, "2025-01")
+            assert market_store.database_identity(worker) == market_store.database_identity(api)
+            assert second.stamp == first.stamp
+        finally:
+            api.close()
+            worker.close()
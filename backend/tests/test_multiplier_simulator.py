@@ -768,3 +768,227 @@ class TestSafeMultiplierProperties:
 
         assert result.periods_analyzed == n_periods
         assert len(result.monthly_margins) == n_periods
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Tek Geçişli Katsayı Taraması — calculate_hourly_costs Paritesi
+# ═══════════════════════════════════════════════════════════════════════════════
+
+from app.pricing.pricing_engine import calculate_hourly_costs
+
+
+def _reference_simulation_row(market, consumption, multiplier, yekdem, params, dealer_pct):
+    """Satır başına tam calculate_hourly_costs — eski simülasyon döngüsü."""
+    cost = calculate_hourly_costs(
+        market, consumption,
+        yekdem_tl_per_mwh=yekdem,
+        multiplier=multiplier,
+        imbalance_params=params,
+        dealer_commission_pct=dealer_pct,
+    )
+    loss_hours = 0
+    total_loss = 0.0
+    for entry in cost.hour_costs:
+        if entry.is_loss_hour:
+            loss_hours += 1
+            total_loss += entry.margin_tl
+    return {
+        "total_sales_tl": cost.total_sales_revenue_tl,
+        "total_cost_tl": cost.total_base_cost_tl,
+        "gross_margin_tl": cost.total_gross_margin_tl,
+        "dealer_commission_tl": round(cost.total_gross_margin_tl * dealer_pct / 100.0, 2),
+        "net_margin_tl": cost.total_net_margin_tl,
+        "loss_hours": loss_hours,
+        "total_loss_tl": round(total_loss, 2),
+    }
+
+
+class TestSinglePassSweepParity:
+    """Matris tarama, satır başına tam hesap ile bit-for-bit aynı sonuç verir."""
+
+    @given(
+        ptf_base=st.floats(min_value=100.0, max_value=5000.0),
+        ptf_spread=st.floats(min_value=0.0, max_value=300.0),
+        kwh_base=st.floats(min_value=0.0, max_value=500.0),
+        kwh_spread=st.floats(min_value=0.0, max_value=20.0),
+        yekdem=st.floats(min_value=0.0, max_value=1000.0),
+        dealer_pct=st.floats(min_value=0.0, max_value=100.0),
+        smf_mode=st.booleans(),
+    )
+    @settings(max_examples=25, deadline=None)
+    def test_rows_match_full_hourly_costs(
+        self, ptf_base, ptf_spread, kwh_base, kwh_spread, yekdem, dealer_pct, smf_mode,
+    ):
+        market, consumption = _build_market_consumption(
+            24, ptf_base, ptf_spread, kwh_base + 0.01, kwh_spread,
+        )
+        params = ImbalanceParams(forecast_error_rate=0.07, smf_based_imbalance_enabled=smf_mode)
+
+        rows = run_simulation(
+            market, consumption,
+            yekdem_tl_per_mwh=yekdem,
+            imbalance_params=params,
+            dealer_commission_pct=dealer_pct,
+            multiplier_start=1.0,
+            multiplier_end=1.2,
+            multiplier_step=0.013,
+        )
+
+        assert rows
+        for row in rows:
+            expected = _reference_simulation_row(
+                market, consumption, row.multiplier, yekdem, params, dealer_pct,
+            )
+            assert row.model_dump(exclude={"multiplier"}) == expected
+
+    def test_fine_step_row_count_and_chunking(self, monkeypatch):
+        """0.001 adım, 1.00–1.20 → 201 satır; blok sınırı sonucu değiştirmez."""
+        from app.pricing import multiplier_simulator
+
+        market, consumption = _build_test_data(24)
+        kwargs = dict(
+            yekdem_tl_per_mwh=300.0,
+            imbalance_params=DEFAULT_PARAMS,
+            multiplier_start=1.0,
+            multiplier_end=1.2,
+            multiplier_step=0.001,
+        )
+        rows = run_simulation(market, consumption, **kwargs)
+        assert len(rows) == 201
+        assert rows[-1].multiplier == 1.2
+
+        monkeypatch.setattr(multiplier_simulator, "_SWEEP_CHUNK_ROWS", 7)
+        assert run_simulation(market, consumption, **kwargs) == rows
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Güvenli Katsayı — İkili Arama ↔ Doğrusal Tarama Paritesi
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+def _period(period: str, ptf_base: float, ptf_spread: float, kwh_base: float,
+            kwh_spread: float) -> PeriodData:
+    date = f"{period}-01"
+    return PeriodData(
+        period=period,
+        market_records=[
+            _market(date, h, ptf_base + h * ptf_spread, ptf_base + 30) for h in range(24)
+        ],
+        consumption_records=[
+            _consumption(date, h, kwh_base + ((h * 7) % 24) * kwh_spread) for h in range(24)
+        ],
+    )
+
+
+def _reference_safe_multiplier(periods, yekdem_tl_per_mwh, imbalance_params,
+                               dealer_commission_pct) -> float:
+    """Orijinal tarama: her adımda calculate_hourly_costs + 5. persentil kontrolü.
+
+    Vektörel taban / _is_safe değerlendiricisinden bağımsız referans (oracle).
+    """
+    import os
+    from app.pricing.multiplier_simulator import _percentile
+
+    max_safe = int(os.environ.get("PRICING_MAX_MULTIPLIER_INT", "1100"))
+    for mult_int in range(1001, max_safe + 1):
+        results = [
+            calculate_hourly_costs(
+                market_records=pd.market_records,
+                consumption_records=pd.consumption_records,
+                yekdem_tl_per_mwh=yekdem_tl_per_mwh,
+                multiplier=mult_int / 1000.0,
+                imbalance_params=imbalance_params,
+                dealer_commission_pct=dealer_commission_pct,
+            )
+            for pd in periods
+        ]
+        if len(results) == 1:
+            margins = [entry.margin_tl for entry in results[0].hour_costs]
+            if not margins:
+                continue
+        else:
+            margins = [r.total_net_margin_tl for r in results]
+        if _percentile(sorted(margins), 5) >= 0:
+            return round(mult_int / 1000.0, 3)
+    return 1.100
+
+
+class TestSafeMultiplierSearchModes:
+    """search_mode="bisect" ve "linear" aynı sonucu üretir ve orijinal
+    calculate_hourly_costs taramasıyla (referans) eşleşir."""
+
+    @given(
+        n_periods=st.integers(min_value=1, max_value=3),
+        ptf_base=st.floats(min_value=500.0, max_value=4000.0),
+        ptf_spread=st.floats(min_value=0.0, max_value=300.0),
+        kwh_base=st.floats(min_value=0.1, max_value=300.0),
+        kwh_spread=st.floats(min_value=0.0, max_value=50.0),
+        yekdem=st.floats(min_value=0.0, max_value=1000.0),
+        dealer_pct=st.floats(min_value=0.0, max_value=50.0),
+        smf_mode=st.booleans(),
+    )
+    @settings(max_examples=25, deadline=None)
+    def test_matches_reference_scan(
+        self, n_periods, ptf_base, ptf_spread, kwh_base, kwh_spread,
+        yekdem, dealer_pct, smf_mode,
+    ):
+        periods = [
+            _period(f"2025-{i + 1:02d}", ptf_base * (1 + 0.1 * i), ptf_spread,
+                    kwh_base, kwh_spread)
+            for i in range(n_periods)
+        ]
+        params = ImbalanceParams(forecast_error_rate=0.05, smf_based_imbalance_enabled=smf_mode)
+        expected = _reference_safe_multiplier(periods, yekdem, params, dealer_pct)
+        for mode in ("bisect", "linear"):
+            result = calculate_safe_multiplier(
+                periods, yekdem_tl_per_mwh=yekdem, imbalance_params=params,
+                dealer_commission_pct=dealer_pct, search_mode=mode,
+            )
+            assert result.safe_multiplier == expected, mode
+
+    @given(
+        n_periods=st.integers(min_value=1, max_value=4),
+        ptf_base=st.floats(min_value=500.0, max_value=4000.0),
+        ptf_spread=st.floats(min_value=0.0, max_value=300.0),
+        kwh_base=st.floats(min_value=0.1, max_value=300.0),
+        kwh_spread=st.floats(min_value=0.0, max_value=50.0),
+        yekdem=st.floats(min_value=0.0, max_value=1000.0),
+        dealer_pct=st.floats(min_value=0.0, max_value=50.0),
+        smf_mode=st.booleans(),
+    )
+    @settings(max_examples=40, deadline=None)
+    def test_bisect_matches_linear(
+        self, n_periods, ptf_base, ptf_spread, kwh_base, kwh_spread,
+        yekdem, dealer_pct, smf_mode,
+    ):
+        periods = [
+            _period(f"2025-{i + 1:02d}", ptf_base * (1 + 0.1 * i), ptf_spread,
+                    kwh_base, kwh_spread)
+            for i in range(n_periods)
+        ]
+        params = ImbalanceParams(forecast_error_rate=0.05, smf_based_imbalance_enabled=smf_mode)
+        kwargs = dict(
+            yekdem_tl_per_mwh=yekdem,
+            imbalance_params=params,
+            dealer_commission_pct=dealer_pct,
+        )
+        bisect = calculate_safe_multiplier(periods, **kwargs)
+        linear = calculate_safe_multiplier(periods, search_mode="linear", **kwargs)
+        assert bisect == linear
+
+    def test_negative_consumption_falls_back_to_linear(self):
+        """Negatif tüketim monotonluğu bozabilir → doğrusal tarama ile aynı sonuç."""
+        pd = _period("2025-01", 2000.0, 10.0, 100.0, 5.0)
+        pd.consumption_records[3] = _consumption("2025-01-01", 3, -50.0)
+        kwargs = dict(yekdem_tl_per_mwh=200.0, imbalance_params=DEFAULT_PARAMS)
+        assert calculate_safe_multiplier([pd], **kwargs) == calculate_safe_multiplier(
+            [pd], search_mode="linear", **kwargs,
+        )
+
+    def test_invalid_search_mode_raises(self):
+        pd = _period("2025-01", 2000.0, 10.0, 100.0, 5.0)
+        with pytest.raises(ValueError, match="arama modu"):
+            calculate_safe_multiplier(
+                [pd], yekdem_tl_per_mwh=0.0, imbalance_params=DEFAULT_PARAMS,
+                search_mode="golden",
+            )
@@ -0,0 +1,165 @@
+"""
+PDF Browser Pool tests.
+
+Render processes are real (spawn) but run a fake backend instead of
+Chromium, so reuse, recycling, hard kill and health checks are exercised
+without a browser install.
+"""
+import os
+import signal
+import threading
+import time
+
+import pytest
+
+from app.services import pdf_browser_pool
+from app.services.pdf_browser_pool import BrowserPool, classify_render_error
+from app.services.pdf_job_store import PdfErrorCode
+from app.services.pdf_render_worker import RenderError
+
+
+class FakeBackend:
+    """Stands in for ChromiumBackend inside the render process."""
+
+    def start(self) -> None:
+        pass
+
+    def render(self, html: str, nav_timeout_ms: int) -> bytes:
+        if html == "hang":
+            time.sleep(60)
+        if html == "crash":
+            os._exit(1)
+        if html == "boom":
+            raise ValueError("template exploded")
+        return f"{os.getpid()}:{html}".encode()
+
+    def healthy(self) -> bool:
+        return True
+
+    def stop(self) -> None:
+        pass
+
+
+class SlowPingBackend(FakeBackend):
+    def healthy(self) -> bool:
+        time.sleep(1)
+        return True
+
+
+class FailingBackend(FakeBackend):
+    def start(self) -> None:
+        raise RuntimeError("Executable doesn't exist — browser launch failed")
+
+
+def _fake_child(html, nav_timeout_ms, result_queue):
+    result_queue.put(("ok", f"child:{html}".encode()))
+
+
+def _pid(pdf: bytes) -> int:
+    return int(pdf.split(b":")[0])
+
+
+@pytest.fixture()
+def pool():
+    p = BrowserPool(size=1, max_renders=3, render_timeout=3, backend_factory=FakeBackend)
+    yield p
+    p.shutdown()
+
+
+class TestBrowserPool:
+
+    def test_reuses_warm_process_and_recycles(self, pool):
+        pids = [_pid(pool.render(f"doc{i}")) for i in range(4)]
+        assert pids[0] == pids[1] == pids[2]  # 3 renders on one browser
+        assert pids[3] != pids[0]  # max_renders reached → relaunched
+        stats = pool.stats()
+        assert (stats["launches"], stats["renders"], stats["recycled"]) == (2, 4, 1)
+
+    def test_hang_is_hard_killed(self, pool):
+        first = _pid(pool.render("ok"))
+        with pytest.raises(RenderError) as exc:
+            pool.render("hang", timeout=1)
+        assert exc.value.error_code == PdfErrorCode.NAVIGATION_TIMEOUT
+        assert _pid(pool.render("ok")) != first
+        assert pool.stats()["timeouts"] == 1
+
+    def test_crash_and_render_error(self, pool):
+        with pytest.raises(RenderError) as exc:
+            pool.render("boom")
+        assert exc.value.error_code == PdfErrorCode.UNKNOWN
+        assert "template exploded" in exc.value.message
+        with pytest.raises(RenderError) as exc:
+            pool.render("crash")
+        assert exc.value.error_code == PdfErrorCode.UNKNOWN
+        assert pool.render("ok").endswith(b":ok")
+
+    def test_health_check_replaces_dead_browser(self, pool):
+        pool.warm()
+        first = _pid(pool.render("ok"))
+        assert pool.health_check() == 0
+        os.kill(first, signal.SIGKILL)
+        time.sleep(0.2)
+        assert pool.health_check() == 1
+        assert _pid(pool.render("ok")) != first
+
+    def test_health_check_claims_one_slot_at_a_time(self):
+        p = BrowserPool(size=2, acquire_timeout=0.5, backend_factory=SlowPingBackend)
+        try:
+            assert p.warm() == 2
+            checker = threading.Thread(target=p.health_check)
+            checker.start()
+            time.sleep(0.3)  # first ping in flight
+            assert p.render("ok").endswith(b":ok")  # other idle slot still serves
+            checker.join()
+            assert p.stats()["idle"] == 2
+        finally:
+            p.shutdown()
+
+    def test_launch_failure(self):
+        p = BrowserPool(size=1, backend_factory=FailingBackend)
+        try:
+            with pytest.raises(RenderError) as exc:
+                p.render("doc")
+            assert exc.value.error_code == PdfErrorCode.BROWSER_LAUNCH_FAILED
+            assert p.stats()["idle"] == 1  # slot returned
+        finally:
+            p.shutdown()
+
+    def test_acquire_timeout_and_shutdown(self):
+        p = BrowserPool(size=1, acquire_timeout=0.1, backend_factory=FakeBackend)
+        held = p._acquire()
+        with pytest.raises(RenderError) as exc:
+            p.render("doc")
+        assert exc.value.error_code == PdfErrorCode.QUEUE_UNAVAILABLE
+        p._release(held)
+        p.shutdown()
+        with pytest.raises(RenderError):
+            p.render("doc")
+
+
+class TestCallSites:
+
+    def test_rq_worker_render_uses_one_shot_child(self, pool, monkeypatch):
+        from app.services import pdf_render_worker
+
+        # RQ forks a work-horse per job → a pool would be cold every time
+        monkeypatch.setattr(pdf_browser_pool, "get_browser_pool", lambda: pool)
+        monkeypatch.setattr(pdf_render_worker, "_render_in_child", _fake_child)
+        assert pdf_render_worker.render_html_to_pdf("<p>x</p>") == b"child:<p>x</p>"
+        assert pool.stats()["launches"] == 0
+
+    def test_playwright_v2_uses_pool(self, pool, monkeypatch):
+        from app.services import pdf_playwright
+
+        monkeypatch.setattr(pdf_playwright, "is_playwright_available", lambda: True)
+        monkeypatch.setattr(pdf_playwright, "get_browser_pool", lambda: pool)
+        assert pdf_playwright.html_to_pdf_bytes_sync_v2("<p>y</p>").endswith(b":<p>y</p>")
+
+    def test_classify_render_error(self):
+        class TimeoutError_(Exception):
+            pass
+        TimeoutError_.__name__ = "TimeoutError"
+        assert classify_render_error(TimeoutError_("x")) == PdfErrorCode.NAVIGATION_TIMEOUT
+        assert classify_render_error(ImportError("x")) == PdfErrorCode.UNSUPPORTED_PLATFORM
+        assert classify_render_error(RuntimeError("Executable doesn't exist")) == PdfErrorCode.BROWSER_LAUNCH_FAILED
+        assert classify_render_error(ValueError("x")) == PdfErrorCode.UNKNOWN
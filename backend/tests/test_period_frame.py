@@ -0,0 +1,163 @@
+"""
+Pricing Risk Engine — Sütunsal Dönem Çerçevesi (PeriodFrame) Testleri.
+
+- build_period_frame eşleştirme semantiği (atlama, son-kayıt-geçerli, zone kodu)
+- seq_sum: Python `+=` döngüsü ile bit-for-bit parite
+- Vektörel çekirdek ↔ referans döngü paritesi (PBT)
+"""
+
+import numpy as np
+import pytest
+from hypothesis import given, settings
+from hypothesis import strategies as st
+
+from app.pricing.excel_parser import ParsedMarketRecord, ParsedConsumptionRecord
+from app.pricing.models import ImbalanceParams, TimeZone
+from app.pricing.period_frame import ZONE_ORDER, build_period_frame, seq_sum
+from app.pricing.pricing_engine import calculate_weighted_prices, calculate_hourly_costs
+from app.pricing.time_zones import classify_hour, calculate_time_zone_breakdown
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Helpers
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _market(date: str, hour: int, ptf: float, smf: float) -> ParsedMarketRecord:
+    return ParsedMarketRecord(
+        period=date[:7], date=date, hour=hour,
+        ptf_tl_per_mwh=ptf, smf_tl_per_mwh=smf,
+    )
+
+
+def _consumption(date: str, hour: int, kwh: float) -> ParsedConsumptionRecord:
+    return ParsedConsumptionRecord(date=date, hour=hour, consumption_kwh=kwh)
+
+
+def _reference_weighted_sums(market, consumption):
+    """Döngü versiyonu — vektörel çekirdeğin referansı."""
+    index = {(m.date, m.hour): m for m in market}
+    total = ptf_w = smf_w = 0.0
+    for c in consumption:
+        m = index.get((c.date, c.hour))
+        if m is None:
+            continue
+        total += c.consumption_kwh
+        ptf_w += c.consumption_kwh * m.ptf_tl_per_mwh
+        smf_w += c.consumption_kwh * m.smf_tl_per_mwh
+    return total, ptf_w, smf_w
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# build_period_frame
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class TestBuildPeriodFrame:
+
+    def test_unmatched_hours_skipped_in_consumption_order(self):
+        market = [_market("2025-01-01", h, 1000.0 + h, 1100.0) for h in (0, 1, 3)]
+        consumption = [_consumption("2025-01-01", h, 10.0 * (h + 1)) for h in (3, 2, 1, 0)]
+        frame = build_period_frame(market, consumption)
+        assert frame.matched_hours == 3
+        assert frame.hours.tolist() == [3, 1, 0]
+        assert frame.kwh.tolist() == [40.0, 20.0, 10.0]
+        assert frame.ptf.tolist() == [1003.0, 1001.0, 1000.0]
+
+    def test_duplicate_market_record_last_wins(self):
+        market = [
+            _market("2025-01-01", 5, 1000.0, 1000.0),
+            _market("2025-01-01", 5, 2000.0, 2100.0),
+        ]
+        frame = build_period_frame(market, [_consumption("2025-01-01", 5, 1.0)])
+        assert frame.ptf.tolist() == [2000.0]
+        assert frame.smf.tolist() == [2100.0]
+
+    def test_zone_codes_match_classify_hour(self):
+        market = [_market("2025-01-01", h, 1000.0, 1000.0) for h in range(24)]
+        consumption = [_consumption("2025-01-01", h, 1.0) for h in range(24)]
+        frame = build_period_frame(market, consumption)
+        assert [ZONE_ORDER[z] for z in frame.zone.tolist()] == [
+            classify_hour(h) for h in range(24)
+        ]
+
+    def test_empty_inputs(self):
+        frame = build_period_frame([], [])
+        assert frame.matched_hours == 0
+        assert seq_sum(frame.kwh) == 0.0
+
+    def test_invalid_hour_raises_like_classify_hour(self):
+        market = [_market("2025-01-01", 24, 1000.0, 1000.0)]
+        consumption = [_consumption("2025-01-01", 24, 1.0)]
+        with pytest.raises(ValueError, match="Geçersiz saat"):
+            calculate_time_zone_breakdown(market, consumption)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# seq_sum
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class TestSeqSum:
+
+    @given(st.lists(st.floats(min_value=-1e9, max_value=1e9, allow_nan=False), max_size=800))
+    @settings(max_examples=100, deadline=None)
+    def test_matches_python_loop_exactly(self, values):
+        total = 0.0
+        for v in values:
+            total += v
+        assert seq_sum(np.array(values, dtype=np.float64)) == total
+
+    def test_negative_zero_normalized(self):
+        assert str(seq_sum(np.array([-0.0, -0.0]))) == "0.0"
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Vektörel çekirdek paritesi
+# ═══════════════════════════════════════════════════════════════════════════════
+
+_hour_st = st.tuples(
+    st.integers(min_value=1, max_value=3),                       # gün
+    st.integers(min_value=0, max_value=23),                      # saat
+    st.floats(min_value=0, max_value=5000, allow_nan=False),     # ptf
+    st.floats(min_value=0, max_value=5000, allow_nan=False),     # smf
+    st.floats(min_value=0, max_value=10000, allow_nan=False),    # kwh
+)
+
+
+class TestVectorizedKernelParity:
+
+    @given(
+        hours=st.lists(_hour_st, min_size=1, max_size=72),
+        yekdem=st.floats(min_value=0, max_value=1000, allow_nan=False),
+        multiplier=st.floats(min_value=1.0, max_value=1.5, allow_nan=False),
+    )
+    @settings(max_examples=60, deadline=None)
+    def test_frame_reuse_identical_to_fresh_build(self, hours, yekdem, multiplier):
+        market = [_market(f"2025-01-{d:02d}", h, p, s) for d, h, p, s, _ in hours]
+        consumption = [_consumption(f"2025-01-{d:02d}", h, k) for d, h, _, _, k in hours]
+        total, ptf_w, _ = _reference_weighted_sums(market, consumption)
+        if total == 0:
+            return
+
+        frame = build_period_frame(market, consumption)
+        params = ImbalanceParams()
+
+        weighted = calculate_weighted_prices(market, consumption, frame=frame)
+        assert weighted.weighted_ptf_tl_per_mwh == round(ptf_w / total, 2)
+        assert weighted.total_cost_tl == round(ptf_w / 1000.0, 2)
+
+        shared = calculate_hourly_costs(
+            market, consumption, yekdem, multiplier, params, frame=frame,
+        )
+        fresh = calculate_hourly_costs(market, consumption, yekdem, multiplier, params)
+        assert shared.model_dump() == fresh.model_dump()
+
+        assert calculate_time_zone_breakdown(
+            market, consumption, yekdem, frame=frame,
+        ) == calculate_time_zone_breakdown(market, consumption, yekdem)
+
+    def test_hour_cost_entries_follow_consumption_order(self):
+        market = [_market("2025-01-01", h, 1000.0 + 100 * h, 1000.0) for h in range(24)]
+        consumption = [_consumption("2025-01-01", h, 10.0) for h in reversed(range(24))]
+        result = calculate_hourly_costs(market, consumption, 0.0, 1.05, ImbalanceParams())
+        assert [e.hour for e in result.hour_costs] == list(reversed(range(24)))
+        assert result.hour_costs[0].time_zone == TimeZone.T3
+        assert result.hour_costs[0].ptf_tl_per_mwh == 3300.0
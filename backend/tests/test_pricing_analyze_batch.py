@@ -0,0 +1,286 @@
+"""
+Router-level entegrasyon testi — POST /api/pricing/analyze-batch.
+
+Kapsam:
+- NDJSON akışı: kalem satırları istek sırasıyla, son satır portföy özeti
+- Parite: her kalem sonucu /analyze yanıtı ile aynı
+- Kalem hatası akışı bozmaz (status="error"), özet sayımı doğru
+- Süreç havuzu ↔ aynı süreç sonuç eşitliği
+- Havuz hatası (serileştirme, çöken worker) kalem hatası olur; akış sürer
+
+TestClient + in-memory SQLite (thread paylaşımı için StaticPool).
+"""
+import json
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.pricing import market_store
+from app.pricing.excel_parser import ParsedConsumptionRecord
+from app.pricing.models import ImbalanceParams
+from app.pricing.portfolio import (
+    BatchContext,
+    BatchTask,
+    PortfolioAccumulator,
+    iter_batch_results,
+)
+
+PERIOD = "2025-01"
+
+
+@pytest.fixture()
+def db(tmp_path, monkeypatch):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from app.database import Base
+    import app.pricing.schemas  # noqa: F401 — tabloları Base.metadata'a kaydet
+    monkeypatch.setattr(market_store, "PRICING_MARKET_STORE_DIR", str(tmp_path))
+    market_store.clear_market_store()
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    market_store.clear_market_store()
+
+
+@pytest.fixture()
+def client(db):
+    from app.main import app as fastapi_app
+    from app.database import get_db
+    fastapi_app.dependency_overrides[get_db] = lambda: db
+    yield TestClient(fastapi_app)
+    fastapi_app.dependency_overrides.clear()
+
+
+def _consumption(scale: float, days: int = 3) -> list[ParsedConsumptionRecord]:
+    return [
+        ParsedConsumptionRecord(
+            date=f"{PERIOD}-{d:02d}", hour=h,
+            consumption_kwh=scale * (1.0 + (h % 7) * 0.3),
+        )
+        for d in range(1, days + 1) for h in range(24)
+    ]
+
+
+@pytest.fixture()
+def seeded(db):
+    from app.pricing.consumption_service import save_consumption_profile
+    from app.pricing.schemas import HourlyMarketPrice
+    from app.pricing.yekdem_service import create_or_update_yekdem
+
+    for d in range(1, 4):
+        for h in range(24):
+            ptf = 2000.0 + (1500.0 if 17 <= h <= 21 else 0.0) + d * 10
+            db.add(HourlyMarketPrice(
+                period=PERIOD, date=f"{PERIOD}-{d:02d}", hour=h,
+                ptf_tl_per_mwh=ptf, smf_tl_per_mwh=ptf + 60,
+                version=1, is_active=1,
+            ))
+    db.commit()
+    create_or_update_yekdem(db, PERIOD, 364.0)
+    save_consumption_profile(db, "CUST-A", "A", PERIOD, _consumption(100.0))
+    save_consumption_profile(db, "CUST-B", "B", PERIOD, _consumption(40.0))
+    return db
+
+
+def _batch(client, items, **params):
+    body = {"period": PERIOD, "multiplier": 1.05, "items": items, **params}
+    resp = client.post("/api/pricing/analyze-batch", json=body)
+    return resp, [json.loads(line) for line in resp.text.splitlines() if line]
+
+
+class TestAnalyzeBatchEndpoint:
+
+    def test_streams_items_in_order_then_summary(self, client, seeded):
+        resp, lines = _batch(client, [
+            {"customer_id": "CUST-A"},
+            {"customer_id": "CUST-B"},
+            {"t1_kwh": 5000, "t2_kwh": 2000, "t3_kwh": 3000},
+        ])
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("application/x-ndjson")
+        assert [line["type"] for line in lines] == ["item", "item", "item", "summary"]
+        assert [line["index"] for line in lines[:3]] == [0, 1, 2]
+        assert all(line["status"] == "ok" for line in lines[:3])
+
+        summary = lines[-1]["summary"]
+        assert summary["items_total"] == 3
+        assert summary["items_ok"] == 3
+        results = [line["result"] for line in lines[:3]]
+        assert summary["total_consumption_kwh"] == pytest.approx(
+            sum(r["weighted_prices"]["total_consumption_kwh"] for r in results), abs=0.01,
+        )
+        assert summary["loss_hours"] == sum(r["loss_map"]["total_loss_hours"] for r in results)
+
+    def test_item_matches_single_analyze(self, client, seeded):
+        params = {
+            "dealer_commission_pct": 5.0,
+            "imbalance_params": {"forecast_error_rate": 0.08},
+        }
+        _, lines = _batch(client, [{"customer_id": "CUST-A"}], **params)
+        single = client.post("/api/pricing/analyze", json={
+            "customer_id": "CUST-A", "period": PERIOD, "multiplier": 1.05, **params,
+        })
+        assert single.status_code == 200
+        assert lines[0]["result"] == single.json()
+
+    def test_failed_item_does_not_break_stream(self, client, seeded):
+        _, lines = _batch(client, [
+            {"customer_id": "CUST-A"},
+            {"customer_id": "UNKNOWN"},
+        ])
+        assert lines[1]["status"] == "error"
+        assert lines[1]["error"]["error"] == "missing_consumption_data"
+        summary = lines[-1]["summary"]
+        assert (summary["items_ok"], summary["items_failed"]) == (1, 1)
+
+    def test_missing_market_data_404(self, client, db):
+        resp, _ = _batch(client, [{"customer_id": "CUST-A"}])
+        assert resp.status_code == 404
+        assert resp.json()["detail"]["error"] == "market_data_not_found"
+
+    def test_empty_items_rejected(self, client, seeded):
+        resp, _ = _batch(client, [])
+        assert resp.status_code == 422
+
+
+class TestProcessPool:
+
+    def test_pool_results_equal_inline(self, seeded):
+        from app.pricing.router import _load_market_records
+
+        context = BatchContext(
+            period=PERIOD,
+            market_records=_load_market_records(seeded, PERIOD),
+            yekdem=364.0,
+            multiplier=1.04,
+            imbalance_params=ImbalanceParams(),
+        )
+        tasks = [
+            BatchTask(index=i, customer_id=f"C{i}", consumption_records=_consumption(10.0 + i))
+            for i in range(5)
+        ] + [BatchTask(index=5, customer_id="BAD", error={"error": "x"})]
+
+        inline = list(iter_batch_results(context, tasks, max_workers=1))
+        pooled = list(iter_batch_results(context, iter(tasks), max_workers=2))
+        assert pooled == inline
+        assert [line["index"] for line in pooled] == list(range(6))
+
+
+class _ExitOnUnpickle:
+    """Worker'da açılırken süreci öldürür → BrokenProcessPool."""
+
+    def __reduce__(self):
+        return (os._exit, (1,))
+
+
+class TestPoolFailures:
+
+    @staticmethod
+    def _context(db):
+        from app.pricing.router import _load_market_records
+        return BatchContext(
+            period=PERIOD,
+            market_records=_load_market_records(db, PERIOD),
+            yekdem=364.0,
+            multiplier=1.04,
+            imbalance_params=ImbalanceParams(),
+        )
+
+    def test_unpicklable_task_becomes_error_item(self, seeded):
+        tasks = [
+            BatchTask(index=i, customer_id=f"C{i}", consumption_records=_consumption(10.0 + i))
+            for i in range(4)
+        ]
+        tasks[2].consumption_records = [lambda: None]
+
+        lines = list(iter_batch_results(self._context(seeded), tasks, max_workers=2))
+        assert [line["index"] for line in lines] == [0, 1, 2, 3]
+        assert [line["status"] for line in lines] == ["ok", "ok", "error", "ok"]
+        assert lines[2]["error"]["error"] == "worker_error"
+
+    def test_crashed_worker_yields_error_items(self, seeded):
+        tasks = [
+            BatchTask(index=i, customer_id=f"C{i}", consumption_records=_consumption(10.0))
+            for i in range(12)
+        ]
+        tasks[1].consumption_records = [_ExitOnUnpickle()]
+
+        lines = list(iter_batch_results(self._context(seeded), tasks, max_workers=2))
+        assert [line["index"] for line in lines] == list(range(12))
+        assert lines[1]["status"] == "error"
+        assert all(
+            line["error"]["error"] == "worker_error"
+            for line in lines if line["status"] == "error"
+        )
+
+    def test_crash_still_ends_stream_with_summary(self, seeded, monkeypatch):
+        from app.pricing import router as pricing_router
+        from app.pricing.models import BatchAnalyzeItem, BatchAnalyzeRequest
+
+        original = pricing_router._get_or_generate_consumption
+        calls = []
+
+        def _consumption_or_crash(*args, **kwargs):
+            calls.append(1)
+            if len(calls) == 3:
+                return [_ExitOnUnpickle()]
+            return original(*args, **kwargs)
+
+        monkeypatch.setattr(pricing_router, "_get_or_generate_consumption", _consumption_or_crash)
+        req = BatchAnalyzeRequest(
+            period=PERIOD, multiplier=1.05, max_workers=2,
+            items=[BatchAnalyzeItem(customer_id="CUST-A")] * 8,
+        )
+        lines = list(pricing_router.analyze_batch(req, seeded))
+
+        assert lines[-1]["type"] == "summary"
+        summary = lines[-1]["summary"]
+        assert summary["items_total"] == 8
+        assert summary["items_failed"] >= 1
+        assert lines[2]["status"] == "error"
+
+    def test_early_close_cancels_pending(self, seeded):
+        tasks = (
+            BatchTask(index=i, customer_id=f"C{i}", consumption_records=_consumption(10.0))
+            for i in range(100)
+        )
+        stream = iter_batch_results(self._context(seeded), tasks, max_workers=2)
+        assert next(stream)["index"] == 0
+        stream.close()  # istemci koptu — kalan görevler beklenmez
+
+
+class TestPortfolioAccumulator:
+
+    @staticmethod
+    def _line(kwh, net, hours, loss_hours, score="Düşük"):
+        return {
+            "status": "ok",
+            "result": {
+                "weighted_prices": {"total_consumption_kwh": kwh, "hours_count": hours},
+                "pricing": {"total_sales_tl": 0.0, "total_cost_tl": 0.0,
+                            "total_net_margin_tl": net},
+                "loss_map": {"total_loss_hours": loss_hours, "total_loss_tl": -1.0 * loss_hours},
+                "risk_score": {"score": score},
+            },
+        }
+
+    def test_weighted_margin_and_exposure(self):
+        acc = PortfolioAccumulator(PERIOD)
+        acc.add(self._line(kwh=1000.0, net=100.0, hours=744, loss_hours=10))
+        acc.add(self._line(kwh=3000.0, net=-20.0, hours=744, loss_hours=30, score="Yüksek"))
+        acc.add({"status": "error", "error": {}})
+        summary = acc.summary()
+
+        assert summary.weighted_net_margin_tl_per_mwh == 20.0  # 80 TL / 4 MWh
+        assert summary.loss_hour_exposure_pct == round(40 / 1488 * 100, 2)
+        assert summary.loss_making_items == 1
+        assert summary.items_failed == 1
+        assert summary.risk_distribution == {"Düşük": 1, "Orta": 0, "Yüksek": 1}
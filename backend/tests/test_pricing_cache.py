@@ -7,14 +7,16 @@ Task 19.2: Veri versiyonlama testleri
 
 import pytest
 import json
+import time
 from datetime import datetime, timedelta
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 
 from app.database import Base
 import app.pricing.schemas  # noqa: F401 — tabloları kaydet
 
+from app.pricing import pricing_cache
 from app.pricing.pricing_cache import (
     build_cache_key,
     get_cached_result,
@@ -22,6 +24,10 @@ from app.pricing.pricing_cache import (
     invalidate_cache_for_customer,
     invalidate_cache_for_period,
     cleanup_expired_cache,
+    flush_hit_counts,
+    get_data_versions,
+    start_cache_sweeper,
+    stop_cache_sweeper,
 )
 from app.pricing.version_manager import (
     archive_and_create_version,
@@ -29,6 +35,7 @@ from app.pricing.version_manager import (
     get_active_version,
 )
 from app.pricing.schemas import AnalysisCache
+from app.pricing.yekdem_service import create_or_update_yekdem
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -157,12 +164,13 @@ class TestCacheOperations:
         get_cached_result(db_session, key)
         get_cached_result(db_session, key)
         get_cached_result(db_session, key)
+        flush_hit_counts(db_session)
 
         record = db_session.query(AnalysisCache).filter_by(cache_key=key).first()
         assert record.hit_count == 3
 
     def test_expired_returns_none(self, db_session):
-        """TTL süresi dolmuş → None + kayıt silinir."""
+        """TTL süresi dolmuş → None; okuma yazmaz, kaydı süpürücü siler."""
         key = "test_key_expired"
         set_cached_result(db_session, key, "CUST-001", "2025-01", key, {"x": 1})
 
@@ -171,12 +179,19 @@ class TestCacheOperations:
         record.expires_at = datetime.utcnow() - timedelta(hours=1)
         db_session.commit()
 
-        result = get_cached_result(db_session, key)
-        assert result is None
+        statements = []
+        listener = lambda *args: statements.append(args[2])  # noqa: E731
+        event.listen(db_session.get_bind(), "before_cursor_execute", listener)
+        try:
+            assert get_cached_result(db_session, key) is None
+        finally:
+            event.remove(db_session.get_bind(), "before_cursor_execute", listener)
+        assert statements and all(sql.lstrip().upper().startswith("SELECT") for sql in statements)
 
-        # Kayıt silinmiş olmalı
-        remaining = db_session.query(AnalysisCache).filter_by(cache_key=key).first()
-        assert remaining is None
+        # Kayıt süpürücüye kalır
+        assert db_session.query(AnalysisCache).filter_by(cache_key=key).count() == 1
+        assert cleanup_expired_cache(db_session) == 1
+        assert db_session.query(AnalysisCache).filter_by(cache_key=key).first() is None
 
     def test_overwrite_existing(self, db_session):
         """Aynı key ile tekrar set → güncelle."""
@@ -232,6 +247,190 @@ class TestCacheOperations:
         assert get_cached_result(db_session, "stale") is None
 
 
+class TestTwoTierCache:
+    """L1 (işlem içi LRU) + toplu hit_count yazımı."""
+
+    @staticmethod
+    def _count_statements(db_session):
+        statements = []
+        event.listen(
+            db_session.get_bind(), "before_cursor_execute",
+            lambda *args: statements.append(args[2]),
+        )
+        return statements
+
+    def test_l1_hit_issues_no_sql(self, db_session):
+        set_cached_result(db_session, "hot", "CUST-001", "2025-01", "hot", {"x": 1})
+        get_cached_result(db_session, "hot")  # L2 → L1
+
+        statements = self._count_statements(db_session)
+        for _ in range(10):
+            assert get_cached_result(db_session, "hot") == {"x": 1}
+        assert statements == []
+
+    def test_l1_returns_independent_copies(self, db_session):
+        set_cached_result(db_session, "k", "CUST-001", "2025-01", "k", {"x": 1})
+        first = get_cached_result(db_session, "k")
+        first["cache_hit"] = True
+        assert get_cached_result(db_session, "k") == {"x": 1}
+
+    def test_hit_counts_flushed_in_batches(self, db_session, monkeypatch):
+        monkeypatch.setattr(pricing_cache, "PRICING_CACHE_HIT_FLUSH_EVERY", 3)
+        set_cached_result(db_session, "k", "CUST-001", "2025-01", "k", {"x": 1})
+
+        get_cached_result(db_session, "k")
+        get_cached_result(db_session, "k")
+        record = db_session.query(AnalysisCache).filter_by(cache_key="k").first()
+        assert record.hit_count == 0
+
+        get_cached_result(db_session, "k")
+        db_session.refresh(record)
+        assert record.hit_count == 3
+
+    def test_l1_ttl_expiry_falls_back_to_db(self, db_session, monkeypatch):
+        monkeypatch.setattr(pricing_cache, "PRICING_CACHE_L1_TTL_SECONDS", 0)
+        set_cached_result(db_session, "k", "CUST-001", "2025-01", "k", {"x": 1})
+        get_cached_result(db_session, "k")
+
+        db_session.query(AnalysisCache).filter_by(cache_key="k").delete()
+        db_session.commit()
+        assert get_cached_result(db_session, "k") is None
+
+    def test_lru_bounded_by_entries(self, db_session, monkeypatch):
+        monkeypatch.setattr(pricing_cache, "PRICING_CACHE_L1_MAX_ENTRIES", 2)
+        for key in ("a", "b", "c"):
+            set_cached_result(db_session, key, "CUST-001", "2025-01", key, {"k": key})
+            get_cached_result(db_session, key)
+
+        tier = pricing_cache._l1_for(db_session)
+        assert list(tier.entries) == ["b", "c"]
+
+    def test_set_replaces_l1_copy(self, db_session):
+        set_cached_result(db_session, "k", "CUST-001", "2025-01", "k", {"v": 1})
+        get_cached_result(db_session, "k")
+        set_cached_result(db_session, "k", "CUST-001", "2025-01", "k", {"v": 2})
+        assert get_cached_result(db_session, "k") == {"v": 2}
+
+    def test_invalidation_covers_l1(self, db_session):
+        set_cached_result(db_session, "k1", "CUST-001", "2025-01", "k1", {"a": 1})
+        set_cached_result(db_session, "k2", "CUST-002", "2025-02", "k2", {"b": 2})
+        get_cached_result(db_session, "k1")
+        get_cached_result(db_session, "k2")
+
+        invalidate_cache_for_customer(db_session, "CUST-001")
+        invalidate_cache_for_period(db_session, "2025-02")
+
+        assert get_cached_result(db_session, "k1") is None
+        assert get_cached_result(db_session, "k2") is None
+
+    def test_l1_isolated_per_engine(self, db_session):
+        set_cached_result(db_session, "k", "CUST-001", "2025-01", "k", {"db": 1})
+        get_cached_result(db_session, "k")
+
+        other_engine = create_engine("sqlite:///:memory:")
+        Base.metadata.create_all(bind=other_engine)
+        other = sessionmaker(bind=other_engine)()
+        try:
+            assert get_cached_result(other, "k") is None
+        finally:
+            other.close()
+
+
+class TestVersionStampedKeys:
+    """Aktif DataVersion numaraları cache key'e katılır."""
+
+    _KEY_PARAMS = dict(
+        customer_id="CUST-001", period="2025-01",
+        multiplier=1.05, dealer_commission_pct=2.0,
+        imbalance_params={"forecast_error_rate": 0.05},
+    )
+
+    def test_without_versions_key_unchanged(self):
+        assert build_cache_key(**self._KEY_PARAMS) == build_cache_key(
+            **self._KEY_PARAMS, data_versions=None,
+        )
+
+    def test_version_bump_changes_key(self):
+        base = {"market_data": 1, "consumption": 1, "yekdem": 1}
+        key = build_cache_key(**self._KEY_PARAMS, data_versions=base)
+        for data_type in base:
+            bumped = {**base, data_type: 2}
+            assert build_cache_key(**self._KEY_PARAMS, data_versions=bumped) != key
+
+    def test_get_data_versions(self, db_session):
+        archive_and_create_version(db_session, "market_data", "2025-01", None, 744)
+        archive_and_create_version(db_session, "market_data", "2025-01", None, 744)
+        archive_and_create_version(db_session, "consumption", "2025-01", "CUST-001", 744)
+        archive_and_create_version(db_session, "consumption", "2025-01", "CUST-002", 744)
+        archive_and_create_version(db_session, "consumption", "2025-01", "CUST-002", 744)
+        archive_and_create_version(db_session, "market_data", "2025-02", None, 744)
+
+        assert get_data_versions(db_session, "2025-01", "CUST-001") == {
+            "market_data": 2, "consumption": 1, "yekdem": 0,
+        }
+        assert get_data_versions(db_session, "2025-01", "CUST-002")["consumption"] == 2
+        assert get_data_versions(db_session, "2025-01", None)["consumption"] == 0
+
+    def test_yekdem_update_creates_version(self, db_session):
+        create_or_update_yekdem(db_session, "2025-01", 350.0)
+        create_or_update_yekdem(db_session, "2025-01", 364.0)
+        assert get_data_versions(db_session, "2025-01", None)["yekdem"] == 2
+
+    def test_stale_entry_stops_matching(self, db_session):
+        """Yeni versiyon → eski kayıt silinmeden miss."""
+        versions = get_data_versions(db_session, "2025-01", "CUST-001")
+        old_key = build_cache_key(**self._KEY_PARAMS, data_versions=versions)
+        set_cached_result(db_session, old_key, "CUST-001", "2025-01", old_key, {"v": 1})
+
+        archive_and_create_version(db_session, "market_data", "2025-01", None, 744)
+        versions = get_data_versions(db_session, "2025-01", "CUST-001")
+        new_key = build_cache_key(**self._KEY_PARAMS, data_versions=versions)
+
+        assert get_cached_result(db_session, new_key) is None
+        assert db_session.query(AnalysisCache).filter_by(cache_key=old_key).count() == 1
+
+
+class TestCacheSweeper:
+    """TTL süpürücüsü — partili silme ve arka plan thread'i."""
+
+    @staticmethod
+    def _expire(db_session, key):
+        record = db_session.query(AnalysisCache).filter_by(cache_key=key).first()
+        record.expires_at = datetime.utcnow() - timedelta(hours=1)
+        db_session.commit()
+
+    def test_cleanup_in_batches(self, db_session):
+        for i in range(7):
+            set_cached_result(db_session, f"s{i}", "C1", "2025-01", f"s{i}", {"i": i})
+            self._expire(db_session, f"s{i}")
+        set_cached_result(db_session, "fresh", "C1", "2025-01", "fresh", {"x": 1})
+
+        assert cleanup_expired_cache(db_session, batch_size=3) == 7
+        assert db_session.query(AnalysisCache).count() == 1
+
+    def test_background_sweeper_deletes_expired(self, tmp_path):
+        engine = create_engine(f"sqlite:///{tmp_path / 'cache.db'}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        db = Session()
+        try:
+            set_cached_result(db, "stale", "C1", "2025-01", "stale", {"x": 1})
+            self._expire(db, "stale")
+
+            assert start_cache_sweeper(Session, interval_seconds=0.05)
+            deadline = datetime.utcnow() + timedelta(seconds=5)
+            while db.query(AnalysisCache).count() and datetime.utcnow() < deadline:
+                db.rollback()
+                time.sleep(0.02)
+            assert db.query(AnalysisCache).count() == 0
+        finally:
+            stop_cache_sweeper()
+            db.close()
+
+    def test_sweeper_disabled_with_zero_interval(self):
+        assert start_cache_sweeper(lambda: None, interval_seconds=0) is False
+
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # Task 19.2: Versiyonlama Testleri
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -0,0 +1,124 @@
+"""
+Pricing Risk Engine — Dönem İskeleti ve Şablon Kaydı Testleri.
+
+- İskelet: gün × 24 kayıt, dilim saat sayıları, dönem başına tek üretim
+- T1/T2/T3 üretimi: dilim toplamları korunur, negatif saat yok
+- Şablon kaydı: ilk istekten sonra DB sorgulanmaz; seed kaydı temizler
+"""
+
+import math
+
+import pytest
+from hypothesis import given, settings, strategies as st
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+import app.pricing.schemas  # noqa: F401 — tabloları kaydet
+
+from app.pricing import profile_templates
+from app.pricing.models import TimeZone
+from app.pricing.profile_templates import (
+    clear_template_registry,
+    generate_hourly_consumption,
+    generate_t1t2t3_consumption,
+    get_period_skeleton,
+    seed_profile_templates,
+)
+from app.pricing.schemas import ProfileTemplate
+from app.pricing.time_zones import classify_hour
+
+
+@pytest.fixture
+def db_session():
+    """In-memory SQLite session."""
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    session = Session()
+    yield session
+    session.close()
+
+
+@pytest.fixture(autouse=True)
+def fresh_registry():
+    clear_template_registry()
+    yield
+    clear_template_registry()
+
+
+class TestPeriodSkeleton:
+
+    @pytest.mark.parametrize("period,days", [("2025-01", 31), ("2024-02", 29), ("2025-02", 28), ("2025-04", 30)])
+    def test_shape(self, period, days):
+        sk = get_period_skeleton(period)
+        assert len(sk.dates) == len(sk.hours) == sk.zone_codes.size == days * 24
+        assert sk.zone_hours == {TimeZone.T1: days * 11, TimeZone.T2: days * 5, TimeZone.T3: days * 8}
+        assert sk.dates[0] == f"{period}-01" and sk.dates[-1] == f"{period}-{days:02d}"
+        zones = list(TimeZone)
+        assert all(zones[c] == classify_hour(h) for c, h in zip(sk.zone_codes.tolist(), sk.hours))
+
+    def test_cached_and_read_only(self):
+        sk = get_period_skeleton("2025-03")
+        assert get_period_skeleton("2025-03") is sk
+        with pytest.raises(ValueError):
+            sk.zone_codes[0] = 1
+
+    def test_invalid_period(self):
+        with pytest.raises(ValueError, match="Geçersiz dönem"):
+            get_period_skeleton("2025-13")
+
+
+class TestT1T2T3FromSkeleton:
+
+    @settings(max_examples=100, deadline=None)
+    @given(
+        kwh=st.tuples(*[st.floats(min_value=0, max_value=1e7, allow_nan=False)] * 3),
+        month=st.integers(min_value=1, max_value=12),
+    )
+    def test_zone_totals_preserved(self, kwh, month):
+        if sum(kwh) <= 0:
+            return
+        records = generate_t1t2t3_consumption(*kwh, f"2024-{month:02d}")
+        assert all(r.consumption_kwh >= 0 for r in records)
+        for tz, target in zip(TimeZone, kwh):
+            total = sum(r.consumption_kwh for r in records if classify_hour(r.hour) == tz)
+            assert math.isclose(total, target, rel_tol=1e-9, abs_tol=1e-3)
+
+    def test_records_are_independent(self):
+        first = generate_t1t2t3_consumption(100.0, 50.0, 80.0, "2025-01")
+        first[0].consumption_kwh = -1.0
+        second = generate_t1t2t3_consumption(100.0, 50.0, 80.0, "2025-01")
+        assert second[0].consumption_kwh >= 0
+
+
+class TestTemplateRegistry:
+
+    def test_second_call_skips_db(self, db_session, monkeypatch):
+        seed_profile_templates(db_session)
+        first = generate_hourly_consumption("3_vardiya_sanayi", 74400.0, "2025-01", db_session)
+
+        def _fail(*_a, **_k):
+            raise AssertionError("DB sorgulanmamalı")
+
+        monkeypatch.setattr(profile_templates, "get_template_by_name", _fail)
+        second = generate_hourly_consumption("3_vardiya_sanayi", 74400.0, "2025-01", db_session)
+        assert second == first
+        assert len(second) == 744
+
+    def test_unknown_template_not_cached(self, db_session):
+        with pytest.raises(ValueError, match="bulunamadı"):
+            generate_hourly_consumption("ozel", 1000.0, "2025-01", db_session)
+        db_session.add(ProfileTemplate(
+            name="ozel", display_name="Özel", description="",
+            hourly_weights="[" + ",".join(["0.041666666666666664"] * 24) + "]", is_builtin=0,
+        ))
+        db_session.commit()
+        records = generate_hourly_consumption("ozel", 744.0, "2025-01", db_session)
+        assert {r.consumption_kwh for r in records} == {1.0}
+
+    def test_seed_clears_registry(self, db_session):
+        profile_templates._template_weights["3_vardiya_sanayi"] = (0.0,) * 24
+        seed_profile_templates(db_session)
+        records = generate_hourly_consumption("3_vardiya_sanayi", 74400.0, "2025-01", db_session)
+        assert sum(r.consumption_kwh for r in records) > 0
@@ -0,0 +1,227 @@
+"""
+Pricing Risk Engine — Dönem PTF Özeti Testleri.
+
+- Zon toplamlarından ağırlıklı PTF, saat döngüsüyle (_zone_weighted_avg_ptf)
+  tüm profillerde eşit
+- refresh_ptf_aggregate: özet dosyası yazar, veri değişince günceller, veri yoksa siler
+- get_ptf_aggregate: anahtar aktif data_versions satırından tek sorguda;
+  bayat özet parmak iziyle tespit edilir, segmentten hesaplanır
+- Aynı anahtarı üreten iki veritabanı birbirinin özetini okumaz
+- Yükleme / EPİAŞ alımı özeti commit sonrası yazar; geri alınan işlem diske
+  dokunmaz
+"""
+
+import asyncio
+import os
+from datetime import date, datetime
+
+import numpy as np
+import pytest
+
+from app.epias_client import MockEpiasClient
+from app.market_prices import PROFILE_WEIGHTS, _zone_weighted_avg_ptf, weighted_ptf_for_profile
+from app.pricing import market_store, ptf_aggregates
+from app.pricing.bulk_writer import archive_market_period, insert_market_records
+from app.pricing.epias_ingest import ingest_hourly_market_data
+from app.pricing.excel_parser import ParsedMarketRecord
+from app.pricing.ptf_aggregates import get_ptf_aggregate, refresh_ptf_aggregate
+from app.pricing.schemas import DataVersion
+
+PERIOD = "2025-02"
+
+
+def _records(seed: int = 7, days: int = 28) -> list[ParsedMarketRecord]:
+    rng = np.random.default_rng(seed)
+    return [
+        ParsedMarketRecord(
+            period=PERIOD, date=f"2025-02-{d:02d}", hour=h,
+            ptf_tl_per_mwh=round(float(rng.uniform(500, 3500)), 2),
+            smf_tl_per_mwh=round(float(rng.uniform(500, 3500)), 2),
+        )
+        for d in range(1, days + 1) for h in range(24)
+    ]
+
+
+def _seed(db, records, version=1, versioned=False):
+    insert_market_records(db, records, version=version)
+    if versioned:
+        db.add(DataVersion(
+            data_type="market_data", period=PERIOD, version=version,
+            row_count=len(records), is_active=1,
+        ))
+    db.commit()
+
+
+def _session():
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from app.database import Base
+    import app.pricing.schemas  # noqa: F401 — tabloları Base.metadata'a kaydet
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)()
+
+
+@pytest.fixture()
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(market_store, "PRICING_MARKET_STORE_DIR", str(tmp_path))
+    market_store.clear_market_store()
+    ptf_aggregates.clear_ptf_aggregates()
+    session = _session()
+    yield session
+    session.close()
+    market_store.clear_market_store()
+    ptf_aggregates.clear_ptf_aggregates()
+
+
+def _stored(db):
+    directory = market_store._store_dir(db)
+    return sorted(name for name in os.listdir(directory) if name.endswith(".ptf.json"))
+
+
+class TestAggregate:
+
+    @pytest.mark.parametrize("profile", sorted(PROFILE_WEIGHTS) + ["olmayan"])
+    def test_weighted_ptf_matches_hourly_loop(self, db, profile):
+        records = _records()
+        _seed(db, records)
+        pairs = [(r.hour, r.ptf_tl_per_mwh) for r in records]
+
+        result = weighted_ptf_for_profile(db, PERIOD, profile)
+        assert result.hours == 672
+        assert result.ptf_tl_per_mwh == pytest.approx(
+            _zone_weighted_avg_ptf(pairs, profile), rel=1e-12,
+        )
+
+    def test_statistics(self, db):
+        records = _records()
+        _seed(db, records)
+        ptf = np.array([r.ptf_tl_per_mwh for r in records])
+
+        agg = get_ptf_aggregate(db, PERIOD)
+        assert agg.hours == 672 and sum(agg.zone_hours.values()) == 672
+        assert agg.zone_hours == {"T1": 11 * 28, "T2": 5 * 28, "T3": 8 * 28}
+        assert agg.ptf_mean == pytest.approx(ptf.mean())
+        assert agg.ptf_min == ptf.min() and agg.ptf_max == ptf.max()
+        assert agg.ptf_p50 == pytest.approx(np.median(ptf))
+        assert agg.ptf_p10 < agg.ptf_p50 < agg.ptf_p90
+
+    def test_no_data(self, db):
+        assert get_ptf_aggregate(db, PERIOD) is None
+        result = weighted_ptf_for_profile(db, PERIOD)
+        assert result.ptf_tl_per_mwh is None and result.hours == 0
+
+
+class TestFreshness:
+
+    def test_refresh_writes_and_read_uses_file(self, db):
+        _seed(db, _records())
+        agg = refresh_ptf_aggregate(db, PERIOD)
+
+        assert _stored(db) == [f"{PERIOD}_v1_{agg.stamp}.ptf.json"]
+
+        # Başka worker: bellek önbelleği boş, segment yok → dosyadan okunur
+        ptf_aggregates.clear_ptf_aggregates()
+        directory = market_store._store_dir(db)
+        for name in os.listdir(directory):
+            if name.endswith(".npy"):
+                os.remove(os.path.join(directory, name))
+        assert get_ptf_aggregate(db, PERIOD) == agg
+        assert not any(name.endswith(".npy") for name in os.listdir(directory))
+
+    def test_stale_file_is_recomputed(self, db):
+        _seed(db, _records(seed=1))
+        first = refresh_ptf_aggregate(db, PERIOD)
+
+        # Yeni versiyon, özet yenilenmeden yazılır → dosya bayat
+        archive_market_period(db, PERIOD)
+        _seed(db, _records(seed=2), version=2)
+        ptf_aggregates.clear_ptf_aggregates()
+
+        agg = get_ptf_aggregate(db, PERIOD)
+        assert agg.version == 2
+        assert agg.ptf_sum == pytest.approx(sum(r.ptf_tl_per_mwh for r in _records(seed=2)))
+        # Okuma yolu diske yazmaz
+        assert _stored(db) == [f"{PERIOD}_v1_{first.stamp}.ptf.json"]
+
+        refresh_ptf_aggregate(db, PERIOD)
+        assert _stored(db) == [f"{PERIOD}_v2_{agg.stamp}.ptf.json"]
+
+    def test_refresh_without_data_deletes_file(self, db):
+        _seed(db, _records())
+        refresh_ptf_aggregate(db, PERIOD)
+
+        archive_market_period(db, PERIOD)
+        db.commit()
+        assert refresh_ptf_aggregate(db, PERIOD) is None
+        assert _stored(db) == []
+        assert get_ptf_aggregate(db, PERIOD) is None
+
+    def test_versioned_lookup_reads_data_versions_only(self, db):
+        from sqlalchemy import event
+
+        _seed(db, _records(), versioned=True)
+        agg = refresh_ptf_aggregate(db, PERIOD)
+        statements = []
+        engine = db.get_bind()
+        listener = lambda conn, cursor, sql, *a: statements.append(sql)  # noqa: E731
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            assert get_ptf_aggregate(db, PERIOD) is agg
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+        assert len(statements) == 1
+        assert "data_versions" in statements[0]
+        assert "hourly_market_prices" not in statements[0]
+
+    def test_rolled_back_ingest_leaves_files(self, db, monkeypatch):
+        _seed(db, _records(days=10), versioned=True)
+        first = refresh_ptf_aggregate(db, PERIOD)
+
+        def _fail_commit():
+            raise RuntimeError("commit failed")
+
+        with monkeypatch.context() as m, pytest.raises(RuntimeError):
+            m.setattr(db, "commit", _fail_commit)
+            asyncio.run(ingest_hourly_market_data(
+                db, PERIOD, MockEpiasClient(), until=date(2025, 3, 15),
+            ))
+
+        assert _stored(db) == [f"{PERIOD}_v1_{first.stamp}.ptf.json"]
+        ptf_aggregates.clear_ptf_aggregates()
+        assert get_ptf_aggregate(db, PERIOD) == first
+
+    def test_databases_with_same_key_do_not_share(self, db):
+        other = _session()
+        try:
+            for session, seed in ((db, 1), (other, 2)):
+                _seed(session, _records(seed=seed), versioned=True)
+                session.query(DataVersion).update({DataVersion.created_at: datetime(2025, 3, 1)})
+                session.commit()
+                refresh_ptf_aggregate(session, PERIOD)
+
+            ptf_aggregates.clear_ptf_aggregates()
+            market_store.clear_market_store()
+            for session, seed in ((db, 1), (other, 2)):
+                assert get_ptf_aggregate(session, PERIOD).ptf_sum == pytest.approx(
+                    sum(r.ptf_tl_per_mwh for r in _records(seed=seed)),
+                )
+        finally:
+            other.close()
+
+    def test_ingest_writes_aggregate(self, db):
+        result = asyncio.run(ingest_hourly_market_data(
+            db, PERIOD, MockEpiasClient(), until=date(2025, 3, 15),
+        ))
+        [name] = _stored(db)
+        assert name.startswith(f"{PERIOD}_v{result.version}_")
+
+        ptf_aggregates.clear_ptf_aggregates()
+        agg = get_ptf_aggregate(db, PERIOD)
+        assert agg.hours == 672
+        assert round(agg.ptf_mean, 2) == result.ptf_average_tl_per_mwh
@@ -0,0 +1,176 @@
+"""
+Recon — Dönem piyasa snapshot'ı testleri.
+
+- Çok dönem yükleme: data_versions + YEKDEM birer sorgu; sıcak önbellekte
+  24 dönem için toplam 2 sorgu
+- Snapshot verilen maliyet motorları, db'den yükleyen çağrıyla aynı sonucu verir
+- Veri değişince (yeni stamp) PTF indeksi yeniden kurulur — versiyonsuz
+  yazımda parmak izi ile
+- Veri/YEKDEM olmayan dönem → boş indeks / None
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+import app.pricing.schemas  # noqa: F401  (register pricing tables on Base)
+from app.pricing import market_store
+from app.pricing.schemas import DataVersion, HourlyMarketPrice, MonthlyYekdemPrice
+from app.recon import market_snapshot
+from app.recon.cost_engine import calculate_ptf_cost, get_yekdem_cost
+from app.recon.cost_engine_v2 import compute_period_reference_cost
+from app.recon.market_snapshot import load_market_snapshot, load_market_snapshots
+from app.recon.schemas import HourlyRecord
+
+PERIODS = [f"{2024 + i // 12}-{i % 12 + 1:02d}" for i in range(24)]
+
+
+@pytest.fixture()
+def engine(tmp_path, monkeypatch):
+    monkeypatch.setattr(market_store, "PRICING_MARKET_STORE_DIR", str(tmp_path))
+    market_store.clear_market_store()
+    market_snapshot.clear_market_snapshots()
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+    market_store.clear_market_store()
+    market_snapshot.clear_market_snapshots()
+
+
+@pytest.fixture()
+def db(engine):
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def _seed(db, periods, *, days=2, yekdem=True, versioned=True,
+          ptf=lambda d, h: 2000.0 + 10 * h):
+    for period in periods:
+        if versioned:
+            db.add(DataVersion(
+                data_type="market_data", period=period, version=1,
+                row_count=days * 24, is_active=1,
+            ))
+        for d in range(1, days + 1):
+            for h in range(24):
+                db.add(HourlyMarketPrice(
+                    period=period, date=f"{period}-{d:02d}", hour=h,
+                    ptf_tl_per_mwh=ptf(d, h), smf_tl_per_mwh=ptf(d, h) + 50.0,
+                    version=1, is_active=1,
+                ))
+        if yekdem:
+            db.add(MonthlyYekdemPrice(period=period, yekdem_tl_per_mwh=400.0, source="test"))
+    db.commit()
+
+
+def _records(period, days=2):
+    return [
+        HourlyRecord(
+            timestamp=datetime.fromisoformat(f"{period}-{d:02d}T{h:02d}:00:00"),
+            period=period, date=f"{period}-{d:02d}", hour=h,
+            consumption_kwh=Decimal("12.345") + h,
+        )
+        for d in range(1, days + 1) for h in range(24)
+    ]
+
+
+class _StatementCounter:
+    def __init__(self, engine):
+        self.count = 0
+        self._engine = engine
+
+    def __enter__(self):
+        event.listen(self._engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self._engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+
+class TestLoadSnapshots:
+
+    def test_multi_period_query_count(self, engine, db):
+        _seed(db, PERIODS)
+
+        with _StatementCounter(engine) as cold:
+            snapshots = load_market_snapshots(db, PERIODS)
+        # data_versions IN + YEKDEM IN + dönem başına satır okuma / doğrulama
+        assert cold.count <= 2 + 2 * len(PERIODS)
+
+        with _StatementCounter(engine) as warm:
+            again = load_market_snapshots(db, PERIODS)
+        assert warm.count == 2
+        assert again["2025-06"].ptf_index is snapshots["2025-06"].ptf_index
+
+        snap = snapshots["2024-03"]
+        assert len(snap.ptf_index) == 48
+        assert snap.ptf_index[("2024-03-02", 5)] == Decimal("2050.0")
+        assert snap.yekdem_tl_per_mwh == Decimal("400.0")
+
+    def test_missing_data(self, db):
+        _seed(db, ["2024-01"], yekdem=False)
+        snapshots = load_market_snapshots(db, ["2024-01", "2024-02", "2024-01"])
+        assert list(snapshots) == ["2024-01", "2024-02"]
+        assert snapshots["2024-01"].yekdem_tl_per_mwh is None
+        assert len(snapshots["2024-02"].ptf_index) == 0
+        assert load_market_snapshots(db, []) == {}
+
+    def test_index_rebuilt_after_data_change(self, db):
+        _seed(db, ["2024-01"], versioned=False)
+        before = load_market_snapshot(db, "2024-01")
+
+        row = db.query(HourlyMarketPrice).filter_by(date="2024-01-01", hour=0).one()
+        row.ptf_tl_per_mwh = 9999.0
+        db.commit()
+
+        after = load_market_snapshot(db, "2024-01")
+        assert after.stamp != before.stamp
+        assert after.ptf_index[("2024-01-01", 0)] == Decimal("9999.0")
+        with pytest.raises(TypeError):
+            after.ptf_index[("2024-01-01", 0)] = Decimal("1")  # type: ignore[index]
+
+
+class TestEnginesWithSnapshot:
+
+    def test_same_results_as_db_loading(self, db):
+        _seed(db, ["2024-01", "2024-02"], ptf=lambda d, h: 1500.0 + 7.25 * h + d)
+        snapshots = load_market_snapshots(db, ["2024-01", "2024-02"])
+        for period, snapshot in snapshots.items():
+            records = _records(period)
+            total_kwh = sum((r.consumption_kwh for r in records), Decimal("0"))
+
+            assert compute_period_reference_cost(records, period, db, snapshot) == \
+                compute_period_reference_cost(records, period, db)
+            assert calculate_ptf_cost(records, period, db, snapshot) == \
+                calculate_ptf_cost(records, period, db)
+            assert get_yekdem_cost(period, total_kwh, db, snapshot) == \
+                get_yekdem_cost(period, total_kwh, db)
+
+    def test_snapshot_engines_do_not_query(self, engine, db):
+        _seed(db, ["2024-01"])
+        snapshot = load_market_snapshot(db, "2024-01")
+        records = _records("2024-01")
+
+        with _StatementCounter(engine) as counter:
+            ref = compute_period_reference_cost(records, "2024-01", db, snapshot)
+            ptf = calculate_ptf_cost(records, "2024-01", db, snapshot)
+            yekdem = get_yekdem_cost("2024-01", ref.total_kwh, db, snapshot)
+        assert counter.count == 0
+        assert ref.reference_energy_cost_tl is not None
+        assert ptf.hours_matched == 48 and yekdem.available
@@ -0,0 +1,208 @@
+"""
+Pricing Risk Engine — Senaryo Küpü Testleri.
+
+- run_scenario_grid: her (bayi, hata oranı, bedel) dilimi run_simulation
+  satırlarıyla birebir aynı (SMF ve sabit mod)
+- expand_grid_values: uçlar dahil, float kayması yok
+- /scenario-grid: JSON sütunsal yük + NPZ indirme, hücre üst sınırı
+"""
+
+import io
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from hypothesis import given, settings, strategies as st
+
+from app.pricing import market_store
+from app.pricing.excel_parser import ParsedConsumptionRecord, ParsedMarketRecord
+from app.pricing.models import ImbalanceParams
+from app.pricing.multiplier_simulator import (
+    expand_grid_values,
+    run_scenario_grid,
+    run_simulation,
+)
+from app.pricing.period_frame import build_period_frame
+from app.pricing.pricing_cache import clear_prepared_analyses
+from app.pricing.pricing_engine import build_cost_basis
+
+PERIOD = "2025-01"
+
+
+def _market(days: int = 3) -> list[ParsedMarketRecord]:
+    return [
+        ParsedMarketRecord(
+            period=PERIOD, date=f"{PERIOD}-{d:02d}", hour=h,
+            ptf_tl_per_mwh=1800.0 + (1900.0 if 17 <= h <= 21 else 0.0) + d * 13,
+            smf_tl_per_mwh=1950.0 + h * 7.5,
+        )
+        for d in range(1, days + 1) for h in range(24)
+    ]
+
+
+def _consumption(days: int = 3) -> list[ParsedConsumptionRecord]:
+    return [
+        ParsedConsumptionRecord(
+            date=f"{PERIOD}-{d:02d}", hour=h,
+            consumption_kwh=80.0 + (h % 5) * 17.3 + d,
+        )
+        for d in range(1, days + 1) for h in range(24)
+    ]
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Çekirdek
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class TestExpandGridValues:
+
+    def test_inclusive_without_drift(self):
+        values = expand_grid_values(1.01, 1.15, 0.01)
+        assert values.size == 15
+        assert values[0] == 1.01 and values[-1] == 1.15
+        assert values[6] == 1.07
+
+    def test_invalid_step(self):
+        with pytest.raises(ValueError):
+            expand_grid_values(0, 1, 0)
+
+
+class TestScenarioGridParity:
+
+    @settings(max_examples=15, deadline=None)
+    @given(
+        dealers=st.lists(st.floats(min_value=0, max_value=100), min_size=1, max_size=3),
+        rates=st.lists(st.floats(min_value=0, max_value=1), min_size=1, max_size=3),
+        costs=st.lists(st.floats(min_value=0, max_value=500), min_size=1, max_size=2),
+        smf_based=st.booleans(),
+    )
+    def test_slices_match_run_simulation(self, dealers, rates, costs, smf_based):
+        market, consumption = _market(), _consumption()
+        basis = build_cost_basis(build_period_frame(market, consumption), 364.0)
+        grid = run_scenario_grid(
+            basis, expand_grid_values(1.0, 1.2, 0.02),
+            np.array(dealers), np.array(rates), np.array(costs), smf_based,
+        )
+        net = np.array(grid.net_margin_tl).reshape(grid.shape)
+        dealer_tl = np.array(grid.dealer_commission_tl).reshape(grid.shape)
+
+        for di, dealer in enumerate(dealers):
+            for fi, rate in enumerate(rates):
+                for ci, cost in enumerate(costs):
+                    rows = run_simulation(
+                        market, consumption, 364.0,
+                        ImbalanceParams(
+                            forecast_error_rate=rate,
+                            imbalance_cost_tl_per_mwh=cost,
+                            smf_based_imbalance_enabled=smf_based,
+                        ),
+                        dealer_commission_pct=dealer,
+                        multiplier_start=1.0, multiplier_end=1.2, multiplier_step=0.02,
+                    )
+                    assert [r.multiplier for r in rows] == grid.multipliers
+                    assert [r.net_margin_tl for r in rows] == net[:, di, fi, ci].tolist()
+                    assert [r.dealer_commission_tl for r in rows] == dealer_tl[:, di, fi, ci].tolist()
+                    assert [r.gross_margin_tl for r in rows] == grid.gross_margin_tl
+                    assert [r.total_sales_tl for r in rows] == grid.total_sales_tl
+                    assert [r.loss_hours for r in rows] == grid.loss_hours
+                    assert [r.total_loss_tl for r in rows] == grid.total_loss_tl
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# /scenario-grid
+# ═══════════════════════════════════════════════════════════════════════════════
+
+@pytest.fixture()
+def db(tmp_path, monkeypatch):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from app.database import Base
+    import app.pricing.schemas  # noqa: F401 — tabloları Base.metadata'a kaydet
+    monkeypatch.setattr(market_store, "PRICING_MARKET_STORE_DIR", str(tmp_path))
+    market_store.clear_market_store()
+    clear_prepared_analyses()
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    market_store.clear_market_store()
+    clear_prepared_analyses()
+
+
+@pytest.fixture()
+def client(db):
+    from app.main import app as fastapi_app
+    from app.database import get_db
+    fastapi_app.dependency_overrides[get_db] = lambda: db
+    yield TestClient(fastapi_app)
+    fastapi_app.dependency_overrides.clear()
+
+
+@pytest.fixture()
+def seeded(db):
+    from app.pricing.bulk_writer import insert_market_records
+    from app.pricing.consumption_service import save_consumption_profile
+    from app.pricing.yekdem_service import create_or_update_yekdem
+
+    insert_market_records(db, _market(), version=1)
+    db.commit()
+    create_or_update_yekdem(db, PERIOD, 364.0)
+    save_consumption_profile(db, "CUST-A", "A", PERIOD, _consumption())
+    return db
+
+
+GRID_BODY = {
+    "period": PERIOD,
+    "customer_id": "CUST-A",
+    "multiplier": {"start": 1.02, "end": 1.08, "step": 0.02},
+    "dealer_commission_pct": {"start": 0, "end": 20, "step": 10},
+    "forecast_error_rate": {"start": 0.05, "end": 0.10, "step": 0.05},
+    "imbalance_cost_tl_per_mwh": {"start": 50, "end": 50, "step": 10},
+}
+
+
+class TestScenarioGridEndpoint:
+
+    def test_json_matches_simulate(self, client, seeded):
+        resp = client.post("/api/pricing/scenario-grid", json=GRID_BODY)
+        assert resp.status_code == 200, resp.text
+        data = resp.json()
+        assert data["shape"] == [4, 3, 2, 1]
+        assert data["dealer_commission_pcts"] == [0.0, 10.0, 20.0]
+        net = np.array(data["net_margin_tl"]).reshape(data["shape"])
+
+        sim = client.post("/api/pricing/simulate", json={
+            "period": PERIOD, "customer_id": "CUST-A",
+            "dealer_commission_pct": 10,
+            "imbalance_params": {"forecast_error_rate": 0.1, "imbalance_cost_tl_per_mwh": 50},
+            "multiplier_start": 1.02, "multiplier_end": 1.08, "multiplier_step": 0.02,
+        }).json()
+        assert [r["net_margin_tl"] for r in sim["simulation"]] == net[:, 1, 1, 0].tolist()
+
+    def test_npz_download(self, client, seeded):
+        resp = client.post("/api/pricing/scenario-grid?format=npz", json=GRID_BODY)
+        assert resp.status_code == 200, resp.text
+        assert "attachment" in resp.headers["content-disposition"]
+        arrays = np.load(io.BytesIO(resp.content))
+        assert arrays["net_margin_tl"].shape == (4, 3, 2, 1)
+        as_json = client.post("/api/pricing/scenario-grid", json=GRID_BODY).json()
+        assert arrays["net_margin_tl"].ravel().tolist() == as_json["net_margin_tl"]
+
+    def test_grid_too_large(self, client, seeded, monkeypatch):
+        from app.pricing import router as pricing_router_module
+        monkeypatch.setattr(pricing_router_module, "PRICING_GRID_MAX_CELLS", 10)
+        resp = client.post("/api/pricing/scenario-grid", json=GRID_BODY)
+        assert resp.status_code == 422
+        assert resp.json()["detail"]["error"] == "grid_too_large"
+
+    def test_invalid_axis_rejected(self, client, seeded):
+        body = {**GRID_BODY, "multiplier": {"start": 0.9, "end": 1.1, "step": 0.1}}
+        assert client.post("/api/pricing/scenario-grid", json=body).status_code == 422
+        body = {**GRID_BODY, "forecast_error_rate": {"start": 0.2, "end": 0.1, "step": 0.1}}
+        assert client.post("/api/pricing/scenario-grid", json=body).status_code == 422
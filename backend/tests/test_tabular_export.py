@@ -0,0 +1,249 @@
+"""
+Pricing Risk Engine — Akışlı Dışa Aktarma Testleri.
+
+- Write-only XLSX: piyasa / tüketim dışa aktarması parser ile round-trip
+  yapar, tarih biçimleri korunur
+- CSV / Parquet: aynı tablolar makine-dostu sütun adlarıyla yazılır
+- /export/market-data, /export/consumption: çok dönemli akışlı indirme;
+  verisi olmayan dönem atlanır, geçersiz dönem 422, pyarrow yoksa Parquet 501
+- /report/excel?format=csv → saatlik detay tablosu
+"""
+
+import csv
+import io
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+from openpyxl import load_workbook
+
+from app.pricing import market_store
+from app.pricing.excel_formatter import (
+    export_consumption,
+    export_consumption_to_excel,
+    export_market_data,
+    export_market_data_to_excel,
+)
+from app.pricing.excel_parser import (
+    ParsedConsumptionRecord,
+    ParsedMarketRecord,
+    parse_consumption_excel,
+    parse_epias_excel,
+)
+from app.pricing.models import ExportFormat
+from app.pricing.pricing_report import export_hourly_detail
+from app.pricing.tabular_export import iter_spooled, read_spooled
+
+PERIODS = ["2025-01", "2025-02"]
+
+
+def _market(period: str, days: int = 2) -> list[ParsedMarketRecord]:
+    return [
+        ParsedMarketRecord(
+            period=period, date=f"{period}-{d:02d}", hour=h,
+            ptf_tl_per_mwh=2000.0 + d * 11 + h * 0.5,
+            smf_tl_per_mwh=2100.0 + h * 2.25,
+        )
+        for d in range(1, days + 1) for h in range(24)
+    ]
+
+
+def _consumption(period: str, days: int = 2) -> list[ParsedConsumptionRecord]:
+    return [
+        ParsedConsumptionRecord(
+            date=f"{period}-{d:02d}", hour=h, consumption_kwh=100.0 + (h % 4) * 12.5,
+        )
+        for d in range(1, days + 1) for h in range(24)
+    ]
+
+
+def _csv_rows(data: bytes) -> list[list[str]]:
+    return list(csv.reader(io.StringIO(data.decode("utf-8"))))
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Formatter
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+class TestFormatterExports:
+
+    def test_market_xlsx_round_trip(self):
+        records = _market("2025-01")
+        output = parse_epias_excel(export_market_data_to_excel(records, "2025-01"), "m.xlsx")
+        parsed = [(r.date, r.hour, r.ptf_tl_per_mwh, r.smf_tl_per_mwh) for r in output.records]
+        assert parsed == [(r.date, r.hour, r.ptf_tl_per_mwh, r.smf_tl_per_mwh) for r in records]
+
+    def test_market_xlsx_date_format(self):
+        wb = load_workbook(io.BytesIO(export_market_data_to_excel(_market("2025-01"), "2025-01")))
+        ws = wb["Uzlaştırma Dönemi Detayı"]
+        assert ws.cell(row=2, column=1).value == datetime(2025, 1, 1, 0)
+        assert ws.cell(row=2, column=1).number_format == "DD.MM.YYYY HH:MM"
+        assert ws.cell(row=25, column=1).value == datetime(2025, 1, 1, 23)
+
+    def test_consumption_xlsx_round_trip(self):
+        records = _consumption("2025-01")
+        output = parse_consumption_excel(
+            export_consumption_to_excel(records, "2025-01"), "c.xlsx", "CUST-A",
+        )
+        parsed = [(r.date, r.hour, r.consumption_kwh) for r in output.records]
+        assert parsed == [(r.date, r.hour, r.consumption_kwh) for r in records]
+
+    def test_market_csv_accepts_iterator(self):
+        records = (rec for p in PERIODS for rec in _market(p))
+        rows = _csv_rows(read_spooled(export_market_data(records, PERIODS[0], ExportFormat.CSV)))
+        assert rows[0] == ["timestamp", "region", "ptf_tl_per_mwh", "smf_tl_per_mwh"]
+        assert len(rows) == 1 + 2 * 48
+        assert rows[1] == ["2025-01-01T00:00:00", "TR1", "2011.0", "2100.0"]
+        assert rows[-1][0] == "2025-02-02T23:00:00"
+
+    def test_consumption_csv(self):
+        rows = _csv_rows(read_spooled(
+            export_consumption(_consumption("2025-01"), "2025-01", ExportFormat.CSV)
+        ))
+        assert rows[0] == ["date", "hour", "consumption_kwh"]
+        assert rows[2] == ["2025-01-01T00:00:00", "1", "112.5"]
+
+    def test_parquet(self):
+        pq = pytest.importorskip("pyarrow.parquet")
+        data = read_spooled(export_market_data(_market("2025-01"), "2025-01", ExportFormat.PARQUET))
+        table = pq.read_table(io.BytesIO(data))
+        assert table.column_names == ["timestamp", "region", "ptf_tl_per_mwh", "smf_tl_per_mwh"]
+        assert table.num_rows == 48
+        assert table.column("ptf_tl_per_mwh").to_pylist()[:2] == [2011.0, 2011.5]
+
+    def test_iter_spooled_chunks_and_closes(self):
+        spool = export_market_data(_market("2025-01"), "2025-01", ExportFormat.CSV)
+        chunks = list(iter_spooled(spool, chunk_size=256))
+        assert len(chunks) > 1
+        assert all(len(c) <= 256 for c in chunks)
+        assert spool.closed
+
+
+class TestHourlyDetailExport:
+
+    def test_csv_keeps_raw_loss_flag(self):
+        analysis = {"hour_costs": [
+            {"date": "2025-01-01", "hour": 0, "margin_tl": -4.5, "is_loss_hour": True,
+             "time_zone": "T3"},
+            {"date": "2025-01-01", "hour": 1, "margin_tl": 2.0},
+        ]}
+        rows = _csv_rows(read_spooled(export_hourly_detail(analysis, ExportFormat.CSV)))
+        assert rows[0][0] == "date" and rows[0][-2:] == ["is_loss_hour", "time_zone"]
+        assert rows[1][-2:] == ["True", "T3"]
+        assert rows[2][-2:] == ["False", ""]
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Endpoint'ler
+# ═══════════════════════════════════════════════════════════════════════════════
+
+
+@pytest.fixture()
+def db(tmp_path, monkeypatch):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from app.database import Base
+    import app.pricing.schemas  # noqa: F401 — tabloları Base.metadata'a kaydet
+    monkeypatch.setattr(market_store, "PRICING_MARKET_STORE_DIR", str(tmp_path))
+    market_store.clear_market_store()
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    market_store.clear_market_store()
+
+
+@pytest.fixture()
+def client(db):
+    from app.main import app as fastapi_app
+    from app.database import get_db
+    fastapi_app.dependency_overrides[get_db] = lambda: db
+    yield TestClient(fastapi_app)
+    fastapi_app.dependency_overrides.clear()
+
+
+@pytest.fixture()
+def seeded(db):
+    from app.pricing.bulk_writer import insert_market_records
+    from app.pricing.consumption_service import save_consumption_profile
+
+    for period in PERIODS:
+        insert_market_records(db, _market(period), version=1)
+        save_consumption_profile(db, "CUST-A", "A", period, _consumption(period))
+    db.commit()
+    return db
+
+
+class TestExportEndpoints:
+
+    def test_market_data_multi_period_xlsx(self, client, seeded):
+        resp = client.get("/api/pricing/export/market-data", params={
+            "periods": ["2025-02", "2024-12", "2025-01"],
+        })
+        assert resp.status_code == 200, resp.text
+        assert 'filename="market_data_2025-01_2025-02.xlsx"' in resp.headers["content-disposition"]
+        ws = load_workbook(io.BytesIO(resp.content)).active
+        assert ws.max_row == 1 + 2 * 48
+        assert ws.cell(row=2, column=1).value == datetime(2025, 1, 1, 0)
+        assert ws.cell(row=ws.max_row, column=1).value == datetime(2025, 2, 2, 23)
+
+    def test_market_data_csv(self, client, seeded):
+        resp = client.get("/api/pricing/export/market-data", params={
+            "periods": ["2025-01"], "format": "csv",
+        })
+        assert resp.status_code == 200, resp.text
+        assert resp.headers["content-type"].startswith("text/csv")
+        assert len(_csv_rows(resp.content)) == 49
+
+    def test_market_data_missing(self, client, seeded):
+        resp = client.get("/api/pricing/export/market-data", params={"periods": ["2023-01"]})
+        assert resp.status_code == 404
+        assert resp.json()["detail"]["error"] == "market_data_not_found"
+
+    def test_invalid_period(self, client, seeded):
+        resp = client.get("/api/pricing/export/market-data", params={"periods": ["2025-13"]})
+        assert resp.status_code == 422
+        assert resp.json()["detail"]["error"] == "invalid_period"
+
+    def test_parquet_without_pyarrow_is_501(self, client, seeded, monkeypatch):
+        from app.pricing import router
+        monkeypatch.setattr(router, "parquet_available", lambda: False)
+        resp = client.get("/api/pricing/export/market-data", params={
+            "periods": ["2025-01"], "format": "parquet",
+        })
+        assert resp.status_code == 501
+        assert resp.json()["detail"]["error"] == "parquet_unavailable"
+
+    def test_consumption_csv(self, client, seeded):
+        resp = client.get("/api/pricing/export/consumption", params={
+            "customer_id": "CUST-A", "periods": PERIODS + ["2025-03"], "format": "csv",
+        })
+        assert resp.status_code == 200, resp.text
+        rows = _csv_rows(resp.content)
+        assert len(rows) == 1 + 2 * 48
+        assert rows[-1][:2] == ["2025-02-02T00:00:00", "23"]
+
+    def test_report_excel_csv_is_hourly_detail(self, client, seeded):
+        resp = client.post("/api/pricing/report/excel?format=csv", json={
+            "period": "2025-01", "customer_id": "CUST-A", "multiplier": 1.05,
+        })
+        assert resp.status_code == 200, resp.text
+        rows = _csv_rows(resp.content)
+        assert rows[0][:2] == ["date", "hour"]
+        assert len(rows) == 1 + 48
+
+    def test_report_excel_streams_xlsx(self, client, seeded):
+        resp = client.post("/api/pricing/report/excel", json={
+            "period": "2025-01", "customer_id": "CUST-A", "multiplier": 1.05,
+        })
+        assert resp.status_code == 200, resp.text
+        wb = load_workbook(io.BytesIO(resp.content))
+        assert len(wb.sheetnames) == 5
+        assert wb["Saatlik Detay"].max_row == 1 + 48